@@ -12,9 +12,11 @@ from flask_cors import CORS
 from config import (
     SERVER_HOST, SERVER_PORT, DEBUG_MODE, 
     FRONTEND_STATIC_PATH, FRONTEND_TEMPLATES_PATH,
-    DATABASE_PATH, logger
+    DATABASE_PATH, EVENT_STORE_ENABLED, logger
 )
 from database import db_manager
+from device_events import device_events
+from event_store import event_store
 from error_handlers import register_error_handlers
 
 # Import Blueprint-ova
@@ -23,6 +25,14 @@ from routes.mappings import mappings_bp
 from routes.config import config_bp
 from routes.frontend import frontend_bp
 from routes.presets import presets_bp
+from routes.links import links_bp
+from routes.wire_tap import wire_tap_bp
+from routes.firmware import firmware_bp
+from routes.events import events_bp
+from routes.leds import leds_bp
+from routes.clock import clock_bp
+from routes.benchmark import benchmark_bp
+from routes.setlists import setlists_bp
 
 def create_app():
     """Factory funkcija za kreiranje Flask aplikacije."""
@@ -40,11 +50,23 @@ def create_app():
     app.register_blueprint(mappings_bp)
     app.register_blueprint(config_bp)
     app.register_blueprint(presets_bp)
+    app.register_blueprint(links_bp)
+    app.register_blueprint(wire_tap_bp)
+    app.register_blueprint(firmware_bp)
+    app.register_blueprint(events_bp)
+    app.register_blueprint(leds_bp)
+    app.register_blueprint(clock_bp)
+    app.register_blueprint(benchmark_bp)
+    app.register_blueprint(setlists_bp)
     app.register_blueprint(frontend_bp)
     
     # Registruj error handlers
     register_error_handlers(app)
     
+    # Događaji sa uređaja se trajno čuvaju u bazi
+    if EVENT_STORE_ENABLED:
+        device_events.add_listener(event_store.record)
+    
     return app
 
 def main():
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Auto-sync - debounced background push of edits to opted-in devices
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime
+
+from config import AUTO_SYNC_DEBOUNCE, AUTO_SYNC_MAX_DELAY, RELIABLE_DELIVERY
+from config_delivery import push_to_port
+from database import db_manager
+from payload_cache import payload_cache
+from link_health import RTTHistogram
+
+logger = logging.getLogger(__name__)
+
+class AutoSync:
+    """Automatsko slanje izmjena na uključene portove.
+
+    Izmjene mapiranja, boja, komandi i učitavanje preseta samo označe port
+    kao "prljav". Pozadinska nit šalje jednu objedinjenu konfiguraciju kada
+    izmjene miruju `debounce` sekundi, a najkasnije `max_delay` sekundi nakon
+    prve neposlane izmjene, pa niz brzih izmjena ne šalje međustanja.
+    """
+
+    def __init__(self):
+        self.ports = {}
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.push_lock = threading.Lock()  # Ručni flush i pozadinska nit ne šalju istovremeno
+        self.thread = None
+
+    def enable(self, port, debounce=AUTO_SYNC_DEBOUNCE, max_delay=AUTO_SYNC_MAX_DELAY, reliable=RELIABLE_DELIVERY):
+        """Uključi automatsko slanje za port (postojeća statistika se zadržava)."""
+        with self.lock:
+            state = self.ports.get(port)
+            if state is None:
+                state = self.ports[port] = {
+                    'first_edit': None,
+                    'last_edit': None,
+                    'pending_edits': 0,
+                    'sources': set(),
+                    'pushes': 0,
+                    'edits_pushed': 0,
+                    'errors': 0,
+                    'last_push': None,
+                    'latency': RTTHistogram()
+                }
+            state.update(debounce=debounce, max_delay=max(debounce, max_delay), reliable=reliable)
+        self._ensure_thread()
+        logger.info(f"Automatsko slanje uključeno za {port} (mirovanje {debounce}s, najkasnije {max_delay}s)")
+
+    def disable(self, port):
+        """Isključi automatsko slanje (neposlane izmjene se odbacuju)."""
+        with self.lock:
+            state = self.ports.pop(port, None)
+        if state is not None:
+            logger.info(f"Automatsko slanje isključeno za {port}")
+        return state is not None
+
+    def is_enabled(self, port):
+        return port in self.ports
+
+    def mark_dirty(self, source):
+        """Zabilježi izmjenu (`source` - mappings, color, commands, preset) za sve uključene portove."""
+        if not self.ports:
+            return
+        now = time.monotonic()
+        with self.lock:
+            for state in self.ports.values():
+                if state['first_edit'] is None:
+                    state['first_edit'] = now
+                state['last_edit'] = now
+                state['pending_edits'] += 1
+                state['sources'].add(source)
+        self.wakeup.set()
+
+    def flush(self, port=None):
+        """Odmah pošalji neposlane izmjene (jednog ili svih portova) i vrati rezultate."""
+        with self.lock:
+            ports = [port] if port is not None else list(self.ports)
+            batches = [(name, self._take(name)) for name in ports if name in self.ports]
+        return [self._push(name, batch) for name, batch in batches if batch]
+
+    def _take(self, port):
+        """Preuzmi neposlane izmjene porta (poziva se pod lock-om)."""
+        state = self.ports[port]
+        if state['first_edit'] is None:
+            return None
+        batch = {
+            'first_edit': state['first_edit'],
+            'edits': state['pending_edits'],
+            'sources': sorted(state['sources']),
+            'reliable': state['reliable']
+        }
+        state.update(first_edit=None, last_edit=None, pending_edits=0, sources=set())
+        return batch
+
+    def _due(self, state):
+        """Trenutak slanja: mirovanje nakon zadnje izmjene, ali ne kasnije od max_delay od prve."""
+        if state['first_edit'] is None:
+            return None
+        return min(state['last_edit'] + state['debounce'], state['first_edit'] + state['max_delay'])
+
+    def _push(self, port, batch):
+        """Pošalji trenutna mapiranja iz keša podataka za slanje (šalju se samo izmijenjeni tasteri)."""
+        with self.push_lock:
+            all_button_data = payload_cache.load(db=db_manager)
+            result = push_to_port(port, all_button_data, batch['reliable'])
+
+        latency = time.monotonic() - batch['first_edit']
+        with self.lock:
+            state = self.ports.get(port)
+            if state is not None:
+                state['pushes'] += 1
+                state['edits_pushed'] += batch['edits']
+                state['latency'].record(latency)
+                if not result['success']:
+                    state['errors'] += 1
+                state['last_push'] = {
+                    'time': datetime.now().isoformat(),
+                    'edits': batch['edits'],
+                    'sources': batch['sources'],
+                    'latency_ms': round(latency * 1000, 1),
+                    'success': result['success'],
+                    'push': result.get('push'),
+                    'error': result['error']
+                }
+        if result['success']:
+            logger.info(f"Automatski poslano na {port}: {batch['edits']} izmjena ({', '.join(batch['sources'])})")
+        return {'port': port, 'edits': batch['edits'], **result}
+
+    def _ensure_thread(self):
+        if self.thread is None or not self.thread.is_alive():
+            self.thread = threading.Thread(target=self._run, name='auto-sync', daemon=True)
+            self.thread.start()
+
+    def _run(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                due = [(port, self._due(state)) for port, state in self.ports.items()]
+                ready = [port for port, when in due if when is not None and when <= now]
+                batches = [(port, self._take(port)) for port in ready]
+                pending = [when for _, when in due if when is not None and when > now]
+
+            for port, batch in batches:
+                try:
+                    self._push(port, batch)
+                except Exception as e:
+                    logger.error(f"Greška pri automatskom slanju na {port}: {e}")
+
+            if not batches:
+                self.wakeup.wait(min(pending) - now if pending else None)
+                self.wakeup.clear()
+
+    def status(self, port=None):
+        """Stanje automatskog slanja po portu (neposlane izmjene, broj slanja, latencija od izmjene)."""
+        with self.lock:
+            ports = [port] if port is not None else list(self.ports)
+            now = time.monotonic()
+            result = []
+            for name in ports:
+                state = self.ports.get(name)
+                if state is None:
+                    continue
+                due = self._due(state)
+                result.append({
+                    'port': name,
+                    'debounce_ms': round(state['debounce'] * 1000),
+                    'max_delay_ms': round(state['max_delay'] * 1000),
+                    'reliable': state['reliable'],
+                    'pending_edits': state['pending_edits'],
+                    'pending_sources': sorted(state['sources']),
+                    'next_push_in_ms': round(max(0.0, due - now) * 1000, 1) if due is not None else None,
+                    'pushes': state['pushes'],
+                    'edits_pushed': state['edits_pushed'],
+                    'errors': state['errors'],
+                    'latency_ms': state['latency'].to_dict(),
+                    'last_push': state['last_push']
+                })
+            return result
+
+# Globalna instanca automatskog slanja
+auto_sync = AutoSync()
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Bank and page layout of switch slots
+"""
+
+from config import SWITCHES_PER_BANK, BANK_COUNT, BANKS_PER_PAGE
+
+def slot_count():
+    """Ukupan broj slotova tastera (sve banke)."""
+    return BANK_COUNT * SWITCHES_PER_BANK
+
+def is_valid_slot(slot):
+    """Provjeri da li je broj slota (1-based) unutar konfigurisanih banaka."""
+    return isinstance(slot, int) and 1 <= slot <= slot_count()
+
+def slot_number(bank, switch):
+    """Broj slota (1-based) za banku i taster u banci (oboje 1-based)."""
+    return (bank - 1) * SWITCHES_PER_BANK + switch
+
+def slot_position(slot):
+    """Vrati stranicu, banku i taster u banci (sve 1-based) za broj slota."""
+    bank = (slot - 1) // SWITCHES_PER_BANK + 1
+    return {
+        'page': (bank - 1) // BANKS_PER_PAGE + 1,
+        'bank': bank,
+        'switch': (slot - 1) % SWITCHES_PER_BANK + 1
+    }
+
+def bank_range(bank):
+    """Prvi i zadnji slot banke (1-based, uključivo)."""
+    return slot_number(bank, 1), slot_number(bank, SWITCHES_PER_BANK)
+
+def page_range(page):
+    """Prvi i zadnji slot stranice (1-based, uključivo, ograničeno na postojeće banke)."""
+    first_bank = (page - 1) * BANKS_PER_PAGE + 1
+    last_bank = min(BANK_COUNT, first_bank + BANKS_PER_PAGE - 1)
+    return slot_number(first_bank, 1), slot_number(last_bank, SWITCHES_PER_BANK)
+
+def layout():
+    """Opis rasporeda za API i za config_begin poruku."""
+    return {
+        'switches_per_bank': SWITCHES_PER_BANK,
+        'banks': BANK_COUNT,
+        'banks_per_page': BANKS_PER_PAGE,
+        'pages': (BANK_COUNT + BANKS_PER_PAGE - 1) // BANKS_PER_PAGE,
+        'slots': slot_count()
+    }
@@ -25,6 +25,118 @@ SERVER_HOST = os.environ.get('BACKEND_HOST', '127.0.0.1')
 SERVER_PORT = int(os.environ.get('BACKEND_PORT', '5001'))
 DEBUG_MODE = os.environ.get('BACKEND_DEBUG', '1') == '1'
 
+# Serial configuration
+# Osnovna brzina na kojoj se uređaj uvijek javlja (ESP32 standard)
+SERIAL_BAUDRATE = int(os.environ.get('SERIAL_BAUDRATE', '115200'))
+# Brzine koje se nude uređaju nakon uspješnog ping-a (bira se najveća zajednička)
+SERIAL_UPGRADE_BAUDRATES = [
+    int(b) for b in os.environ.get('SERIAL_UPGRADE_BAUDRATES', '921600,460800,230400').split(',')
+    if b.strip()
+]
+SERIAL_NEGOTIATE_BAUDRATE = os.environ.get('SERIAL_NEGOTIATE_BAUDRATE', '1') == '1'
+
+# Dodatni portovi za detekciju koje list_ports ne vidi (npr. PTY farma simulatora): datoteka sa po jednim portom u redu
+EXTRA_SERIAL_PORTS_FILE = os.environ.get('EXTRA_SERIAL_PORTS_FILE', '')
+
+# Reliable delivery (okviri sa rednim brojevima, ACK/NACK, klizni prozor)
+RELIABLE_DELIVERY = os.environ.get('RELIABLE_DELIVERY', '0') == '1'
+RELIABLE_WINDOW = int(os.environ.get('RELIABLE_WINDOW', '4'))
+RELIABLE_ACK_TIMEOUT = float(os.environ.get('RELIABLE_ACK_TIMEOUT', '0.5'))
+RELIABLE_MAX_RETRIES = int(os.environ.get('RELIABLE_MAX_RETRIES', '3'))
+
+# Ogledalo konfiguracije uređaja: slanje samo izmijenjenih tastera (ili preskakanje) na osnovu ogledala
+CONFIG_PUSH_MINIMIZE = os.environ.get('CONFIG_PUSH_MINIMIZE', '1') == '1'
+CONFIG_READBACK_TIMEOUT = float(os.environ.get('CONFIG_READBACK_TIMEOUT', '0.5'))
+
+# Istovremeno slanje konfiguracije na više uređaja (najveći broj paralelnih slanja)
+FLEET_MAX_WORKERS = int(os.environ.get('FLEET_MAX_WORKERS', '16'))
+
+# Slanje firmware-a: veličina dijela u bajtovima, klizni prozor i čekanje na fw_ready
+FIRMWARE_CHUNK_SIZE = int(os.environ.get('FIRMWARE_CHUNK_SIZE', '512'))
+FIRMWARE_WINDOW = int(os.environ.get('FIRMWARE_WINDOW', '16'))
+FIRMWARE_BEGIN_TIMEOUT = float(os.environ.get('FIRMWARE_BEGIN_TIMEOUT', '2.0'))
+
+# Strujanje boja LED-ova uživo: ciljni broj okvira u sekundi i broj okvira koji čekaju na slanje
+LED_STREAM_FPS = float(os.environ.get('LED_STREAM_FPS', '60'))
+LED_STREAM_MAX_FPS = float(os.environ.get('LED_STREAM_MAX_FPS', '240'))
+LED_STREAM_QUEUE = max(1, int(os.environ.get('LED_STREAM_QUEUE', '2')))
+
+# MIDI clock: početni tempo, dozvoljeni opseg i koliko prije roka nit prelazi na aktivno čekanje
+CLOCK_DEFAULT_BPM = float(os.environ.get('CLOCK_DEFAULT_BPM', '120'))
+CLOCK_MIN_BPM = float(os.environ.get('CLOCK_MIN_BPM', '20'))
+CLOCK_MAX_BPM = float(os.environ.get('CLOCK_MAX_BPM', '300'))
+CLOCK_SPIN_MARGIN = float(os.environ.get('CLOCK_SPIN_MARGIN', '0.001'))
+
+# Banke i stranice tastera (slot = (banka - 1) * SWITCHES_PER_BANK + taster)
+SWITCHES_PER_BANK = int(os.environ.get('SWITCHES_PER_BANK', '6'))
+BANK_COUNT = max(1, min(128, int(os.environ.get('BANK_COUNT', '1'))))
+BANKS_PER_PAGE = max(1, int(os.environ.get('BANKS_PER_PAGE', '4')))
+# Broj tastera po poruci pri slanju konfiguracije veće od jedne banke
+CONFIG_STREAM_CHUNK_SWITCHES = int(os.environ.get('CONFIG_STREAM_CHUNK_SWITCHES', '24'))
+
+# Makro komande: ograničenja bajtkoda koji uređaj čuva i izvršava
+MACRO_MAX_STEPS = int(os.environ.get('MACRO_MAX_STEPS', '64'))
+MACRO_MAX_BYTES = int(os.environ.get('MACRO_MAX_BYTES', '256'))
+MACRO_MAX_DELAY_MS = int(os.environ.get('MACRO_MAX_DELAY_MS', '10000'))
+
+# Automatsko slanje izmjena: mirovanje prije slanja i najduže čekanje od prve izmjene (sekunde)
+AUTO_SYNC_DEBOUNCE = float(os.environ.get('AUTO_SYNC_DEBOUNCE', '0.3'))
+AUTO_SYNC_MAX_DELAY = float(os.environ.get('AUTO_SYNC_MAX_DELAY', '2.0'))
+
+# Poslovi slanja konfiguracije u pozadini: broj niti, najviše portova u redu, broj zapamćenih poslova
+CONFIG_JOB_WORKERS = int(os.environ.get('CONFIG_JOB_WORKERS', '4'))
+CONFIG_JOB_QUEUE_LIMIT = int(os.environ.get('CONFIG_JOB_QUEUE_LIMIT', '64'))
+CONFIG_JOB_HISTORY = int(os.environ.get('CONFIG_JOB_HISTORY', '100'))
+CONFIG_JOB_KEEPALIVE = float(os.environ.get('CONFIG_JOB_KEEPALIVE', '15'))
+
+# Keš sastavljenih konfiguracija (broj verzija: trenutna mapiranja i preseti)
+PAYLOAD_CACHE_SIZE = int(os.environ.get('PAYLOAD_CACHE_SIZE', '16'))
+
+# Preset slotovi u memoriji uređaja (unaprijed upisani preseti, aktivacija jednom porukom)
+PRESET_SLOT_COUNT = max(1, int(os.environ.get('PRESET_SLOT_COUNT', '8')))
+PRESET_SLOT_SYNC_TIMEOUT = float(os.environ.get('PRESET_SLOT_SYNC_TIMEOUT', '0.5'))
+
+# Setliste: broj narednih pjesama upisanih unaprijed i broj zapamćenih promjena
+SETLIST_LOOKAHEAD = max(0, int(os.environ.get('SETLIST_LOOKAHEAD', '2')))
+SETLIST_HISTORY = max(1, int(os.environ.get('SETLIST_HISTORY', '256')))
+
+# Izlazni red za interaktivna ažuriranja (spajanje naleta poruka u jedan write)
+WRITE_QUEUE_WINDOW = float(os.environ.get('WRITE_QUEUE_WINDOW', '0.01'))
+WRITE_QUEUE_MAX_MESSAGES = int(os.environ.get('WRITE_QUEUE_MAX_MESSAGES', '256'))
+WRITE_QUEUE_MAX_BYTES = int(os.environ.get('WRITE_QUEUE_MAX_BYTES', '65536'))
+
+# Wire tap (prstenasti bafer TX/RX okvira po portu umjesto ispisa na konzolu)
+WIRE_TAP_ENABLED = os.environ.get('WIRE_TAP_ENABLED', '1') == '1'
+WIRE_TAP_CAPACITY = int(os.environ.get('WIRE_TAP_CAPACITY', '1000'))
+WIRE_TAP_MAX_FRAME = int(os.environ.get('WIRE_TAP_MAX_FRAME', '4096'))
+
+# Snimanje sesija (TX/RX sa vremenskim oznakama) u direktorij za kasniju reprodukciju
+SESSION_RECORD_DIR = os.environ.get('SESSION_RECORD_DIR', '')
+
+# Događaji sa uređaja (pritisci tastera, status) - prstenasti bafer po uređaju i SSE
+DEVICE_EVENT_CAPACITY = int(os.environ.get('DEVICE_EVENT_CAPACITY', '4096'))
+DEVICE_EVENT_POLL_INTERVAL = float(os.environ.get('DEVICE_EVENT_POLL_INTERVAL', '0.01'))
+DEVICE_EVENT_KEEPALIVE = float(os.environ.get('DEVICE_EVENT_KEEPALIVE', '15.0'))
+
+# Trajno čuvanje događaja uređaja (grupni upis u pozadini i sažeci po minuti/satu)
+EVENT_STORE_ENABLED = os.environ.get('EVENT_STORE_ENABLED', '1') == '1'
+EVENT_STORE_BATCH_SIZE = int(os.environ.get('EVENT_STORE_BATCH_SIZE', '500'))
+EVENT_STORE_FLUSH_INTERVAL = float(os.environ.get('EVENT_STORE_FLUSH_INTERVAL', '1.0'))
+EVENT_STORE_QUEUE_LIMIT = int(os.environ.get('EVENT_STORE_QUEUE_LIMIT', '100000'))
+EVENT_RETENTION_DAYS = float(os.environ.get('EVENT_RETENTION_DAYS', '7'))
+EVENT_ROLLUP_MINUTE_RETENTION_DAYS = float(os.environ.get('EVENT_ROLLUP_MINUTE_RETENTION_DAYS', '30'))
+EVENT_ROLLUP_HOUR_RETENTION_DAYS = float(os.environ.get('EVENT_ROLLUP_HOUR_RETENTION_DAYS', '365'))
+
+# Nadzor veze (detekcija prekida i automatsko ponovno povezivanje)
+LINK_CHECK_INTERVAL = float(os.environ.get('LINK_CHECK_INTERVAL', '0.5'))
+LINK_HEARTBEAT_INTERVAL = float(os.environ.get('LINK_HEARTBEAT_INTERVAL', '2.0'))
+LINK_MAX_MISSED_HEARTBEATS = int(os.environ.get('LINK_MAX_MISSED_HEARTBEATS', '3'))
+LINK_BACKOFF_INITIAL = float(os.environ.get('LINK_BACKOFF_INITIAL', '0.25'))
+LINK_BACKOFF_MAX = float(os.environ.get('LINK_BACKOFF_MAX', '8.0'))
+# Broj neuspjelih pokušaja nakon kojeg se port smatra trajno uklonjenim (0 - pokušavaj zauvijek)
+LINK_MAX_RECONNECT_ATTEMPTS = int(os.environ.get('LINK_MAX_RECONNECT_ATTEMPTS', '12'))
+LINK_STALL_TIMEOUT = float(os.environ.get('LINK_STALL_TIMEOUT', '5.0'))
+
 # Paths configuration
 _ENV_FRONTEND_DIR = os.environ.get('FRONTEND_DIR')
 if _ENV_FRONTEND_DIR:
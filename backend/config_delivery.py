@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Configuration delivery - loading button data and pushing it to one or many devices
+"""
+
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from serial_comm import SerialCommunicator
+from link_supervisor import link_supervisor
+from config import SERIAL_NEGOTIATE_BAUDRATE, FLEET_MAX_WORKERS, SWITCHES_PER_BANK
+
+logger = logging.getLogger(__name__)
+
+# Zaključavanja po portu: registar port -> RLock
+_port_locks = {}
+_port_locks_guard = threading.Lock()
+
+def port_lock(port):
+    """Zaključavanje porta koje drži svako slanje na uređaj (poslovi, fleet, auto-sync, API rute).
+
+    Bez njega bi dva slanja na isti port otvorila vlastite konekcije, a
+    njihove poruke (ping, config_begin/chunk/end) bi se ispreplitale na liniji.
+    Firmware i benchmark ga drže cijelo vrijeme; dugotrajne vlastite veze
+    (LED stream, clock, setliste) ga koriste kao `lock` komunikatora, pa ga
+    drže samo tokom svakog upisa.
+    """
+    with _port_locks_guard:
+        lock = _port_locks.get(port)
+        if lock is None:
+            lock = _port_locks[port] = threading.RLock()
+        return lock
+
+class CompiledConfig(dict):
+    """Podaci tastera (broj -> podaci) jedne verzije baze sa memoizovanim oblicima za slanje.
+
+    Komunikator pri prvom slanju sastavi poruke (set_config, dijelovi banaka)
+    i njihov JSON, a svako sljedeće slanje iste verzije ih samo upiše.
+    """
+
+    def __init__(self, button_data, version=None):
+        super().__init__(button_data)
+        self.version = version
+        self.forms = {}
+        self.lock = threading.Lock()
+
+    def memo(self, key, build):
+        """Vrati sačuvani oblik `key`, a sastavi ga sa `build()` samo prvi put."""
+        with self.lock:
+            if key not in self.forms:
+                self.forms[key] = build()
+            return self.forms[key]
+
+def load_button_data(cursor):
+    """Učitaj podatke svih tastera (komanda, vrijednost, boja) iz baze, uključujući nemapirane."""
+    # Get all button mappings with their colors (including unmapped buttons)
+    cursor.execute('''
+        SELECT 
+            bm.button_number,
+            c.name as command_name,
+            c.value as command_value,
+            c.midi_type,
+            c.midi_channel,
+            c.midi_param,
+            c.macro,
+            bm.color,
+            bm.is_preset_color
+        FROM button_mappings bm
+        LEFT JOIN commands c ON bm.command_id = c.id
+        ORDER BY bm.button_number ASC
+    ''')
+    
+    all_button_data = {}
+    for row in cursor.fetchall():
+        all_button_data[row['button_number']] = {
+            'button': row['button_number'],
+            'command_name': row['command_name'],
+            'command_value': row['command_value'],
+            'midi_type': row['midi_type'],
+            'midi_channel': row['midi_channel'],
+            'midi_param': row['midi_param'],
+            'macro': row['macro'],
+            'color': row['color'],
+            'is_preset_color': bool(row['is_preset_color']) if row['is_preset_color'] is not None else True
+        }
+    
+    # Ensure we have data for all buttons of the first bank
+    for i in range(1, SWITCHES_PER_BANK + 1):
+        if i not in all_button_data:
+            all_button_data[i] = {
+                'button': i,
+                'command_name': None,
+                'command_value': None,
+                'color': None,
+                'is_preset_color': True
+            }
+    
+    return all_button_data
+
+def deliver_configuration(comm, all_button_data, reliable, payload=None):
+    """Pošalji konfiguraciju preko komunikatora i vrati detalje isporuke (None ako slanje nije uspjelo).
+
+    `payload` (CompiledConfig) omogućava ponovnu upotrebu već sastavljenih poruka.
+    """
+    if not comm.send_configuration(all_button_data, reliable=reliable, payload=payload):
+        return None
+    
+    details = {
+        'baudrate': comm.baudrate,
+        'status': 'sent',
+        'push': comm.last_push
+    }
+    
+    delivery = comm.last_delivery
+    if delivery:
+        # Uređaj je potvrdio prijem - vrati stvarnu latenciju i broj ponavljanja
+        details['status'] = 'delivered'
+        details['delivery'] = {
+            'latency_ms': delivery['latency_ms']['max'],
+            'retries': delivery['retries']
+        }
+        if delivery['responses']:
+            details['device_response'] = json.dumps(delivery['responses'][0], ensure_ascii=False)
+    elif comm.last_push and comm.last_push['mode'] == 'skipped':
+        details['status'] = 'unchanged'
+    elif comm.last_push and comm.last_push['mode'] == 'full':
+        # Pokušaj da pročitaš odgovor (neobavezno; set_switch nema odgovor)
+        response = comm.read_response(timeout=1)
+        if response:
+            details['device_response'] = response
+    
+    return details
+
+def button_data_from_preset(config_data):
+    """Pretvori sačuvani preset (`config_data`) u podatke tastera za slanje, bez izmjene baze."""
+    all_button_data = {}
+    for button_number, mapping in config_data.items():
+        button = int(button_number)
+        all_button_data[button] = {
+            'button': button,
+            'command_name': mapping.get('command_name'),
+            'command_value': mapping.get('command_value'),
+            'midi_type': mapping.get('midi_type'),
+            'midi_channel': mapping.get('midi_channel'),
+            'midi_param': mapping.get('midi_param'),
+            'macro': mapping.get('macro'),
+            'color': mapping.get('color'),
+            'is_preset_color': mapping.get('is_preset_color', True)
+        }
+    
+    for i in range(1, SWITCHES_PER_BANK + 1):
+        if i not in all_button_data:
+            all_button_data[i] = {
+                'button': i,
+                'command_name': None,
+                'command_value': None,
+                'color': None,
+                'is_preset_color': True
+            }
+    
+    return all_button_data
+
+def push_to_port(port, all_button_data, reliable=False):
+    """Pošalji konfiguraciju na jedan port i vrati rezultat (latencija, potvrda, greška).
+    
+    Nadgledani port koristi postojeću vezu; ostali portovi dobijaju vlastiti
+    komunikator, pa se više uređaja može konfigurisati istovremeno. Slanja
+    na isti port idu jedno za drugim (port_lock).
+    """
+    start = time.monotonic()
+    payload = all_button_data if isinstance(all_button_data, CompiledConfig) else None
+    result = {
+        'port': port,
+        'success': False,
+        'ack': False,
+        'latency_ms': None,
+        'error': None
+    }
+    
+    try:
+        with port_lock(port):
+            if link_supervisor.is_supervised(port):
+                details = link_supervisor.call(
+                    port,
+                    lambda comm: deliver_configuration(comm, list(all_button_data.values()), reliable, payload)
+                )
+            else:
+                comm = SerialCommunicator()
+                if not comm.connect(port):
+                    raise Exception(f'Nije moguće povezati se sa portom {port}')
+                try:
+                    if SERIAL_NEGOTIATE_BAUDRATE:
+                        comm.negotiate_baudrate()
+                    details = deliver_configuration(comm, list(all_button_data.values()), reliable, payload)
+                finally:
+                    comm.disconnect()
+        
+        if not details:
+            raise Exception('Greška pri slanju konfiguracije na uređaj')
+        
+        result.update(details)
+        result['success'] = True
+        # Potvrda: okvir potvrđen, konfiguracija već aktuelna ili config_ack od uređaja
+        result['ack'] = (details['status'] in ('delivered', 'unchanged')
+                         or 'config_ack' in (details.get('device_response') or ''))
+    
+    except Exception as e:
+        logger.warning(f"Slanje konfiguracije na port {port} nije uspjelo: {e}")
+        result['error'] = str(e)
+    
+    result['latency_ms'] = round((time.monotonic() - start) * 1000, 1)
+    return result
+
+def push_fleet(ports, all_button_data, reliable=False, max_workers=FLEET_MAX_WORKERS):
+    """Pošalji istu konfiguraciju na više portova istovremeno.
+    
+    Generator vraća rezultat svakog uređaja čim završi, pa ukupno vrijeme
+    odgovara najsporijem uređaju, a ne zbiru.
+    """
+    ports = list(dict.fromkeys(ports))
+    if not ports:
+        return
+    
+    with ThreadPoolExecutor(max_workers=min(len(ports), max_workers), thread_name_prefix='fleet-push') as executor:
+        futures = [executor.submit(push_to_port, port, all_button_data, reliable) for port in ports]
+        for future in as_completed(futures):
+            yield future.result()
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Configuration jobs - queued background sends with status and progress
+"""
+
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from config import CONFIG_JOB_WORKERS, CONFIG_JOB_QUEUE_LIMIT, CONFIG_JOB_HISTORY
+from config_delivery import push_to_port
+
+logger = logging.getLogger(__name__)
+
+# Stanja posla i pojedinačnih portova
+JOB_FINAL_STATES = ('completed', 'failed', 'cancelled')
+
+class JobQueueFull(Exception):
+    """Previše nezavršenih slanja (u redu ili u toku) - novi posao se odbija."""
+
+class ConfigJobManager:
+    """Poslovi slanja konfiguracije koji se izvršavaju u ograničenom skupu niti.
+
+    API odmah vraća ID posla, a slanje ide u pozadini: svaki port je jedan
+    zadatak, a najviše `max_workers` portova se šalje istovremeno. Zadaci za
+    isti port idu jedan za drugim, pa uređaj koji visi zauzima samo jednu
+    nit, a ostali portovi i API ostaju slobodni.
+    """
+
+    def __init__(self, max_workers=CONFIG_JOB_WORKERS, queue_limit=CONFIG_JOB_QUEUE_LIMIT, history=CONFIG_JOB_HISTORY):
+        self.max_workers = max_workers
+        self.queue_limit = queue_limit
+        self.history = history
+        self.jobs = OrderedDict()
+        self.condition = threading.Condition()
+        self.busy_ports = set()  # Portovi čiji se zadatak upravo izvršava (ili je predat niti)
+        self.waiting = {}  # port -> deque zadataka koji čekaju da port bude slobodan
+        self.executor = None
+
+    def submit(self, ports, all_button_data, reliable=False, source=None):
+        """Stavi slanje na portove u red i vrati stanje novog posla."""
+        ports = list(dict.fromkeys(ports))
+        with self.condition:
+            pending = sum(1 for job in self.jobs.values() for entry in job['ports'].values()
+                          if entry['state'] in ('queued', 'running'))
+            if pending + len(ports) > self.queue_limit:
+                raise JobQueueFull(f'Već je {pending} nezavršenih slanja (najviše {self.queue_limit})')
+
+            job = {
+                'id': uuid.uuid4().hex[:12],
+                'state': 'queued',
+                'source': source,
+                'reliable': reliable,
+                'created': datetime.now().isoformat(),
+                'started': None,
+                'finished': None,
+                'start_time': None,
+                'elapsed_ms': None,
+                'version': 0,
+                'data': all_button_data,
+                'ports': OrderedDict((port, {'state': 'queued', 'result': None}) for port in ports)
+            }
+            self.jobs[job['id']] = job
+            self._trim()
+            for port in ports:
+                self._enqueue(job['id'], port)
+            snapshot = self._snapshot(job)
+
+        logger.info(f"Posao slanja {job['id']} u redu za {len(ports)} portova")
+        return snapshot
+
+    def _enqueue(self, job_id, port):
+        """Predaj zadatak niti ili ga ostavi da čeka slobodan port (poziva se pod lock-om)."""
+        if port in self.busy_ports:
+            self.waiting.setdefault(port, deque()).append(job_id)
+            return
+        self.busy_ports.add(port)
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='config-job')
+        self.executor.submit(self._run, job_id, port)
+
+    def _release(self, port):
+        """Port je slobodan - pokreni sljedeći zadatak koji čeka na njega (poziva se pod lock-om)."""
+        self.busy_ports.discard(port)
+        queue = self.waiting.get(port)
+        while queue:
+            job_id = queue.popleft()
+            job = self.jobs.get(job_id)
+            if job is not None and job['ports'][port]['state'] == 'queued':
+                self._enqueue(job_id, port)
+                break
+        if queue is not None and not queue:
+            self.waiting.pop(port, None)
+
+    def _run(self, job_id, port):
+        with self.condition:
+            job = self.jobs.get(job_id)
+            entry = job['ports'][port] if job is not None else None
+            if entry is None or entry['state'] != 'queued':
+                # Posao je otkazan dok je zadatak čekao
+                self._release(port)
+                return
+            entry['state'] = 'running'
+            if job['state'] == 'queued':
+                job.update(state='running', started=datetime.now().isoformat(), start_time=time.monotonic())
+            self._changed(job)
+            all_button_data, reliable = job['data'], job['reliable']
+
+        try:
+            result = push_to_port(port, all_button_data, reliable)
+        except Exception as e:
+            result = {'port': port, 'success': False, 'ack': False, 'latency_ms': None, 'error': str(e)}
+
+        with self.condition:
+            entry['result'] = result
+            entry['state'] = 'done' if result['success'] else 'failed'
+            self._finish_if_done(job)
+            self._changed(job)
+            self._release(port)
+
+    def _finish_if_done(self, job):
+        states = [entry['state'] for entry in job['ports'].values()]
+        if any(state in ('queued', 'running') for state in states):
+            return
+        if all(state == 'done' for state in states):
+            job['state'] = 'completed'
+        elif 'cancelled' in states and 'failed' not in states:
+            job['state'] = 'cancelled'
+        else:
+            job['state'] = 'failed'
+        job['finished'] = datetime.now().isoformat()
+        if job['start_time'] is not None:
+            job['elapsed_ms'] = round((time.monotonic() - job['start_time']) * 1000, 1)
+        job['data'] = None  # Podaci za slanje više nisu potrebni
+        logger.info(f"Posao slanja {job['id']} završen: {job['state']}")
+
+    def _changed(self, job):
+        job['version'] += 1
+        self.condition.notify_all()
+
+    def _trim(self):
+        """Zadrži najviše `history` poslova; najstariji završeni se brišu prvi."""
+        finished = [job_id for job_id, job in self.jobs.items() if job['state'] in JOB_FINAL_STATES]
+        for job_id in finished[:max(0, len(self.jobs) - self.history)]:
+            del self.jobs[job_id]
+
+    def cancel(self, job_id):
+        """Otkaži portove posla koji još čekaju; vraća stanje posla ili None."""
+        with self.condition:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return None
+            if job['state'] in JOB_FINAL_STATES:
+                return self._snapshot(job)
+            for entry in job['ports'].values():
+                if entry['state'] == 'queued':
+                    entry['state'] = 'cancelled'
+            self._finish_if_done(job)
+            self._changed(job)
+            return self._snapshot(job)
+
+    def get(self, job_id):
+        with self.condition:
+            job = self.jobs.get(job_id)
+            return self._snapshot(job) if job is not None else None
+
+    def list(self):
+        with self.condition:
+            return [self._snapshot(job) for job in reversed(self.jobs.values())]
+
+    def wait(self, job_id, version=None, timeout=None):
+        """Sačekaj promjenu posla (novija verzija od `version`) i vrati stanje; None ako posao ne postoji."""
+        with self.condition:
+            self.condition.wait_for(
+                lambda: job_id not in self.jobs or self.jobs[job_id]['version'] != version
+                or self.jobs[job_id]['state'] in JOB_FINAL_STATES,
+                timeout
+            )
+            job = self.jobs.get(job_id)
+            return self._snapshot(job) if job is not None else None
+
+    def follow(self, job_id, keepalive):
+        """Generator stanja posla pri svakoj promjeni, do završetka posla."""
+        version = None
+        while True:
+            snapshot = self.wait(job_id, version, keepalive)
+            if snapshot is None:
+                return
+            if snapshot['version'] != version:
+                version = snapshot['version']
+                yield snapshot
+            else:
+                yield None  # Nema promjene - prilika za keepalive
+            if snapshot['state'] in JOB_FINAL_STATES:
+                return
+
+    def _snapshot(self, job):
+        """Stanje posla za API (napredak, rezultat po portu)."""
+        entries = job['ports'].values()
+        done = [entry for entry in entries if entry['state'] in ('done', 'failed', 'cancelled')]
+        return {
+            'id': job['id'],
+            'state': job['state'],
+            'source': job['source'],
+            'reliable': job['reliable'],
+            'created': job['created'],
+            'started': job['started'],
+            'finished': job['finished'],
+            'elapsed_ms': job['elapsed_ms'] if job['finished'] or job['start_time'] is None
+                          else round((time.monotonic() - job['start_time']) * 1000, 1),
+            'version': job['version'],
+            'progress': {
+                'total': len(job['ports']),
+                'completed': len(done),
+                'succeeded': len([entry for entry in entries if entry['state'] == 'done']),
+                'failed': len([entry for entry in entries if entry['state'] == 'failed']),
+                'percent': round(100.0 * len(done) / len(job['ports']), 1) if job['ports'] else 100.0
+            },
+            'ports': [
+                {'port': port, 'state': entry['state'], **({'result': entry['result']} if entry['result'] else {})}
+                for port, entry in job['ports'].items()
+            ]
+        }
+
+# Globalna instanca poslova slanja konfiguracije
+config_jobs = ConfigJobManager()
@@ -7,7 +7,7 @@ Database management module for MIDI Configurator Backend
 import sqlite3
 import os
 import logging
-from config import DATABASE_PATH
+from config import DATABASE_PATH, SWITCHES_PER_BANK
 
 logger = logging.getLogger(__name__)
 
@@ -27,6 +27,9 @@ class DatabaseManager:
         with sqlite3.connect(self.db_path) as conn:
             cursor = conn.cursor()
             
+            # WAL dozvoljava čitanje tokom grupnog upisa događaja
+            cursor.execute('PRAGMA journal_mode=WAL')
+            
             # Tabela za komande
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS commands (
@@ -38,6 +41,14 @@ class DatabaseManager:
                 )
             ''')
             
+            # MIDI podešavanja komande (vrsta poruke, kanal, broj kontrolera/parametra, koraci makroa)
+            for column in ("midi_type TEXT DEFAULT 'auto'", 'midi_channel INTEGER DEFAULT 1', 'midi_param INTEGER DEFAULT NULL',
+                           'macro TEXT DEFAULT NULL'):
+                try:
+                    cursor.execute(f'ALTER TABLE commands ADD COLUMN {column}')
+                except sqlite3.OperationalError:
+                    pass  # Kolona već postoji
+            
             # Kreacija tabele za mapiranje tastera
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS button_mappings (
@@ -63,8 +74,8 @@ class DatabaseManager:
             except sqlite3.OperationalError:
                 pass  # Kolona već postoji
             
-            # Inicijalizuj mapiranje tastera ako ne postoji
-            for i in range(1, 7):
+            # Inicijalizuj mapiranje tastera prve banke (ostali slotovi se kreiraju pri prvoj izmjeni)
+            for i in range(1, SWITCHES_PER_BANK + 1):
                 cursor.execute('''
                     INSERT OR IGNORE INTO button_mappings (button_number, command_id) 
                     VALUES (?, NULL)
@@ -82,6 +93,54 @@ class DatabaseManager:
                 )
             ''')
             
+            # Setliste (uređen niz preset-a za nastup)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS setlists (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    name TEXT NOT NULL UNIQUE,
+                    description TEXT DEFAULT '',
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS setlist_items (
+                    setlist_id INTEGER NOT NULL,
+                    position INTEGER NOT NULL,
+                    preset_id INTEGER NOT NULL,
+                    PRIMARY KEY (setlist_id, position),
+                    FOREIGN KEY (setlist_id) REFERENCES setlists (id) ON DELETE CASCADE,
+                    FOREIGN KEY (preset_id) REFERENCES presets (id) ON DELETE CASCADE
+                )
+            ''')
+            
+            # Događaji sa uređaja (upisuje ih event_store u grupama)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS device_events (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    timestamp REAL NOT NULL,
+                    port TEXT NOT NULL,
+                    type TEXT NOT NULL,
+                    switch INTEGER,
+                    command TEXT,
+                    data TEXT NOT NULL
+                )
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_device_events_timestamp ON device_events (timestamp)')
+            
+            # Sažeci događaja po minuti i po satu (bucket = početak intervala u sekundama)
+            for table in ('event_rollups_minute', 'event_rollups_hour'):
+                cursor.execute(f'''
+                    CREATE TABLE IF NOT EXISTS {table} (
+                        bucket INTEGER NOT NULL,
+                        port TEXT NOT NULL,
+                        type TEXT NOT NULL,
+                        command TEXT NOT NULL DEFAULT '',
+                        count INTEGER NOT NULL DEFAULT 0,
+                        PRIMARY KEY (bucket, port, type, command)
+                    )
+                ''')
+            
             conn.commit()
             logger.info("Baza podataka je inicijalizovana")
     
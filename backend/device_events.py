@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Device events - bounded per-device ring buffers of unsolicited device messages
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime
+
+from config import DEVICE_EVENT_CAPACITY
+
+logger = logging.getLogger(__name__)
+
+# Tipovi poruka koje uređaj šalje sam od sebe (nisu odgovor na zahtjev)
+DEVICE_EVENT_TYPES = ('event', 'button', 'switch', 'status', 'log')
+
+class EventRing:
+    """Prstenasti bafer fiksne veličine sa rednim brojevima događaja.
+
+    Upis je dodjela u slot i povećanje brojača, bez zaključavanja. Svaki
+    čitalac drži svoj kursor (redni broj sljedećeg događaja), pa broj
+    čitalaca ne utiče na memoriju; čitalac koji zaostane za više od
+    kapaciteta preskače najstarije događaje i dobija broj izgubljenih.
+    """
+
+    def __init__(self, capacity=DEVICE_EVENT_CAPACITY):
+        self.capacity = capacity
+        self.slots = [None] * capacity
+        self.next_seq = 0  # Redni broj sljedećeg upisanog događaja
+        self.condition = threading.Condition()
+        self.waiters = 0
+
+    def append(self, event):
+        """Upiši događaj i vrati njegov redni broj."""
+        seq = self.next_seq
+        self.slots[seq % self.capacity] = (seq, time.time(), event)
+        self.next_seq = seq + 1
+        # Budi čitaoce samo ako neko čeka - upis bez čitalaca ne uzima lock
+        if self.waiters:
+            with self.condition:
+                self.condition.notify_all()
+        return seq
+
+    def read(self, cursor, limit=None):
+        """Vrati (događaji, novi kursor, broj preskočenih) od kursora nadalje."""
+        end = self.next_seq
+        start = max(cursor, end - self.capacity)
+        if limit:
+            end = min(end, start + limit)
+
+        events = []
+        for seq in range(start, end):
+            entry = self.slots[seq % self.capacity]
+            if entry is None or entry[0] != seq:
+                # Slot je prepisan tokom čitanja - događaj je izgubljen
+                continue
+            events.append(entry)
+
+        dropped = (start - cursor) + (end - start - len(events))
+        return events, end, max(0, dropped)
+
+    def wait(self, cursor, timeout):
+        """Čekaj da se pojavi događaj iza kursora; vraća True ako postoji."""
+        if self.next_seq > cursor:
+            return True
+        with self.condition:
+            self.waiters += 1
+            try:
+                deadline = time.monotonic() + timeout
+                while self.next_seq <= cursor:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                    self.condition.wait(remaining)
+                return True
+            finally:
+                self.waiters -= 1
+
+class DeviceEventBus:
+    """Događaji sa uređaja po portu, za više istovremenih čitalaca (npr. SSE)."""
+
+    def __init__(self, capacity=DEVICE_EVENT_CAPACITY):
+        self.capacity = capacity
+        self.rings = {}
+        self.readers = {}
+        self.listeners = []  # Pozivaju se sa (port, poruka) za svaki događaj (npr. upis u bazu)
+        self.lock = threading.Lock()
+
+    def ring(self, port):
+        """Vrati prstenasti bafer porta (kreira se pri prvom korištenju)."""
+        ring = self.rings.get(port)
+        if ring is None:
+            with self.lock:
+                ring = self.rings.setdefault(port, EventRing(self.capacity))
+        return ring
+
+    def add_listener(self, listener):
+        """Dodaj funkciju koja prima svaki objavljeni događaj (ne dodaje se dva puta)."""
+        with self.lock:
+            if listener not in self.listeners:
+                self.listeners.append(listener)
+
+    def publish(self, port, message):
+        """Zabilježi nezatraženu poruku uređaja kao događaj."""
+        seq = self.ring(port).append(message)
+        for listener in self.listeners:
+            try:
+                listener(port, message)
+            except Exception as e:
+                logger.warning(f"Greška u obradi događaja sa {port}: {e}")
+        return seq
+
+    def head(self, port):
+        """Redni broj sljedećeg događaja porta (kursor za praćenje samo novih)."""
+        return self.ring(port).next_seq
+
+    def recent(self, port, limit=100):
+        """Vrati zadnjih `limit` događaja porta u formatu za API."""
+        ring = self.rings.get(port)
+        if ring is None:
+            return []
+        events, _, _ = ring.read(max(0, ring.next_seq - limit))
+        return [self.to_dict(entry) for entry in events]
+
+    def follow(self, port, cursor=None, timeout=1.0):
+        """Generator koji prati događaje porta od kursora.
+
+        Vraća (događaji, broj preskočenih) nakon svakog buđenja; prazna lista
+        znači da je istekao `timeout` bez novih događaja.
+        """
+        ring = self.ring(port)
+        if cursor is None:
+            cursor = ring.next_seq
+        with self.lock:
+            self.readers[port] = self.readers.get(port, 0) + 1
+        try:
+            while True:
+                if not ring.wait(cursor, timeout):
+                    yield [], 0
+                    continue
+                events, cursor, dropped = ring.read(cursor)
+                yield events, dropped
+        finally:
+            with self.lock:
+                self.readers[port] -= 1
+
+    def to_dict(self, entry):
+        """Pretvori zapis iz bafera u rječnik za API."""
+        seq, timestamp, message = entry
+        return {
+            'seq': seq,
+            'timestamp': datetime.fromtimestamp(timestamp).isoformat(),
+            'type': message.get('type'),
+            'data': message
+        }
+
+    def status(self):
+        """Vrati broj događaja i čitalaca po portu."""
+        return {
+            'capacity': self.capacity,
+            'ports': {
+                port: {
+                    'events': ring.next_seq,
+                    'buffered': min(ring.next_seq, ring.capacity),
+                    'readers': self.readers.get(port, 0)
+                }
+                for port, ring in list(self.rings.items())
+            }
+        }
+
+# Globalna instanca magistrale događaja uređaja
+device_events = DeviceEventBus()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Device mirror - cached copy of the configuration each device currently holds
+"""
+
+import copy
+import logging
+import threading
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+class DeviceMirror:
+    """Keš aktivne konfiguracije po uređaju sa brojačem generacija.
+
+    Ogledalo se puni čitanjem sa uređaja (`get_config`) i nakon uspješnog
+    slanja, pa je pitanje "šta je na uređaju" samo čitanje iz memorije.
+    Generacija se povećava samo kada se sadržaj stvarno promijeni. Nakon
+    novog povezivanja ogledalo je zastarjelo (`stale`) dok se ne potvrdi.
+    """
+
+    def __init__(self):
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    def replace(self, port, switches, source):
+        """Zamijeni kompletnu konfiguraciju porta (čitanje ili puno slanje)."""
+        new_switches = {switch.get('id'): copy.deepcopy(switch) for switch in switches}
+        with self.lock:
+            entry = self.entries.get(port)
+            if entry is None:
+                entry = self.entries[port] = {'switches': {}, 'generation': 0}
+            self._commit(entry, new_switches, source)
+            return entry['generation']
+
+    def apply(self, port, switches, source):
+        """Primijeni izmjene pojedinačnih tastera (ignoriše se ako port nije poznat)."""
+        with self.lock:
+            entry = self.entries.get(port)
+            if entry is None:
+                return None
+            new_switches = dict(entry['switches'])
+            for switch in switches:
+                new_switches[switch.get('id')] = copy.deepcopy(switch)
+            self._commit(entry, new_switches, source, stale=entry['stale'])
+            return entry['generation']
+
+    def mark_stale(self, port):
+        """Označi da ogledalo porta treba potvrditi (npr. nakon ponovnog povezivanja)."""
+        with self.lock:
+            entry = self.entries.get(port)
+            if entry is not None:
+                entry['stale'] = True
+
+    def diff(self, port, switches):
+        """Vrati tastere koji se razlikuju od ogledala (None ako ogledalo nije pouzdano)."""
+        with self.lock:
+            entry = self.entries.get(port)
+            if entry is None or entry['stale']:
+                return None
+            return [switch for switch in switches if entry['switches'].get(switch.get('id')) != switch]
+
+    def get(self, port):
+        """Vrati kopiju stanja ogledala porta (None ako nije poznato)."""
+        with self.lock:
+            entry = self.entries.get(port)
+            if entry is None:
+                return None
+            return {
+                'port': port,
+                'generation': entry['generation'],
+                'source': entry['source'],
+                'updated': entry['updated'],
+                'stale': entry['stale'],
+                'switches': [
+                    copy.deepcopy(switch)
+                    for _, switch in sorted(entry['switches'].items(), key=lambda item: item[0] if isinstance(item[0], int) else -1)
+                ]
+            }
+
+    def _commit(self, entry, new_switches, source, stale=False):
+        if new_switches != entry['switches']:
+            entry['switches'] = new_switches
+            entry['generation'] += 1
+        entry['source'] = source
+        entry['updated'] = datetime.now().isoformat()
+        entry['stale'] = stale
+
+# Globalna instanca ogledala uređaja
+device_mirror = DeviceMirror()
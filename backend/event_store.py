@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Event store - batched SQLite persistence of device events with per-minute/hour rollups
+"""
+
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from config import (
+    DATABASE_PATH, EVENT_STORE_BATCH_SIZE, EVENT_STORE_FLUSH_INTERVAL, EVENT_STORE_QUEUE_LIMIT,
+    EVENT_RETENTION_DAYS, EVENT_ROLLUP_MINUTE_RETENTION_DAYS, EVENT_ROLLUP_HOUR_RETENTION_DAYS
+)
+
+logger = logging.getLogger(__name__)
+
+# Tabele sažetaka i dužina njihovog intervala u sekundama
+ROLLUP_TABLES = {
+    'minute': ('event_rollups_minute', 60),
+    'hour': ('event_rollups_hour', 3600),
+}
+
+# Koliko često pisač briše stare događaje i sažetke
+RETENTION_INTERVAL = 3600.0
+
+class EventStore:
+    """Pozadinski pisač događaja uređaja u bazu.
+
+    `record` samo stavlja događaj u red, pa je bezbjedan na putanji prijema.
+    Pisač skuplja događaje do `batch_size` ili `flush_interval` i upisuje ih
+    jednim `executemany` u jednoj transakciji, zajedno sa povećanjem
+    sažetaka po minuti i po satu. Upiti o korištenju čitaju samo sažetke.
+    """
+
+    def __init__(self, db_path=DATABASE_PATH, batch_size=EVENT_STORE_BATCH_SIZE,
+                 flush_interval=EVENT_STORE_FLUSH_INTERVAL, queue_limit=EVENT_STORE_QUEUE_LIMIT):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue(maxsize=queue_limit)
+        self.thread = None
+        self.lock = threading.Lock()
+        self.written = 0
+        self.dropped = 0  # Događaji odbačeni jer je red pun
+        self.batches = 0
+        self.last_retention = None
+
+    def record(self, port, message, timestamp=None):
+        """Stavi događaj u red za upis (ne blokira)."""
+        self._ensure_thread()
+        try:
+            self.queue.put_nowait((timestamp or time.time(), port, message))
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self, timeout=5.0):
+        """Sačekaj da pisač upiše sve događaje koji su trenutno u redu."""
+        if self.thread is None:
+            return True
+        done = threading.Event()
+        self.queue.put(done)
+        return done.wait(timeout)
+
+    def usage(self, since, until=None, port=None, event_type='button', limit=10, resolution=None):
+        """Vrati najkorištenije komande u intervalu, iz tabele sažetaka."""
+        resolution = resolution or self._resolution(since, until)
+        table, _ = ROLLUP_TABLES[resolution]
+        query = f'SELECT command, SUM(count) AS count FROM {table} WHERE bucket >= ? AND type = ?'
+        params = [self._bucket_start(since, resolution), event_type]
+        if until is not None:
+            query += ' AND bucket < ?'
+            params.append(until)
+        if port:
+            query += ' AND port = ?'
+            params.append(port)
+        query += " AND command != '' GROUP BY command ORDER BY count DESC, command LIMIT ?"
+        params.append(limit)
+
+        with sqlite3.connect(self.db_path) as conn:
+            return [{'command': command, 'count': count} for command, count in conn.execute(query, params)]
+
+    def timeline(self, since, until=None, port=None, event_type=None, resolution=None):
+        """Vrati broj događaja po intervalu (minuta ili sat) iz tabele sažetaka."""
+        resolution = resolution or self._resolution(since, until)
+        table, _ = ROLLUP_TABLES[resolution]
+        query = f'SELECT bucket, type, SUM(count) FROM {table} WHERE bucket >= ?'
+        params = [self._bucket_start(since, resolution)]
+        if until is not None:
+            query += ' AND bucket < ?'
+            params.append(until)
+        if port:
+            query += ' AND port = ?'
+            params.append(port)
+        if event_type:
+            query += ' AND type = ?'
+            params.append(event_type)
+        query += ' GROUP BY bucket, type ORDER BY bucket'
+
+        with sqlite3.connect(self.db_path) as conn:
+            return [
+                {'bucket': datetime.fromtimestamp(bucket).isoformat(), 'type': kind, 'count': count}
+                for bucket, kind, count in conn.execute(query, params)
+            ]
+
+    def status(self):
+        """Vrati stanje pisača."""
+        return {
+            'queued': self.queue.qsize(),
+            'written': self.written,
+            'dropped': self.dropped,
+            'batches': self.batches,
+            'running': self.thread is not None and self.thread.is_alive()
+        }
+
+    def _resolution(self, since, until):
+        # Kraći intervali koriste minutne sažetke, duži satne
+        span = (until or time.time()) - since
+        return 'minute' if span <= 86400 else 'hour'
+
+    def _bucket_start(self, since, resolution):
+        size = ROLLUP_TABLES[resolution][1]
+        return int(since // size * size)
+
+    def _ensure_thread(self):
+        """Pokreni pisača ako već ne radi."""
+        if self.thread is not None and self.thread.is_alive():
+            return
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._run, name='event-store', daemon=True)
+                self.thread.start()
+
+    def _run(self):
+        """Petlja pisača: skupljanje događaja u grupe i upis."""
+        conn = sqlite3.connect(self.db_path)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        try:
+            while True:
+                batch, waiters = self._collect()
+                if batch:
+                    try:
+                        self._write(conn, batch)
+                    except sqlite3.Error as e:
+                        logger.error(f"Greška pri upisu {len(batch)} događaja: {e}")
+                if self.last_retention is None or time.monotonic() - self.last_retention >= RETENTION_INTERVAL:
+                    self._apply_retention(conn)
+                for waiter in waiters:
+                    waiter.set()
+        finally:
+            conn.close()
+
+    def _collect(self):
+        """Sačekaj prvi događaj pa skupljaj do `batch_size` ili isteka `flush_interval`."""
+        batch = []
+        waiters = []
+        item = self.queue.get()
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            if isinstance(item, threading.Event):
+                # Zahtjev za flush - upiši odmah ono što je skupljeno
+                waiters.append(item)
+                return batch, waiters
+            batch.append(item)
+            if len(batch) >= self.batch_size:
+                return batch, waiters
+            remaining = deadline - time.monotonic()
+            try:
+                item = self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait()
+            except queue.Empty:
+                return batch, waiters
+
+    def _write(self, conn, batch):
+        """Upiši grupu događaja i povećaj sažetke u jednoj transakciji."""
+        commands = self._switch_commands(conn)
+        rows = []
+        rollups = {resolution: Counter() for resolution in ROLLUP_TABLES}
+        for timestamp, port, message in batch:
+            kind = message.get('type') or 'event'
+            switch = message.get('switch') if isinstance(message.get('switch'), int) else None
+            command = message.get('command') or commands.get(switch) or ''
+            rows.append((timestamp, port, kind, switch, command or None,
+                         json.dumps(message, ensure_ascii=False, separators=(',', ':'))))
+            # Otpuštanje tastera se ne broji kao korištenje komande
+            counted = '' if message.get('state') == 'up' else command
+            for resolution, (_, size) in ROLLUP_TABLES.items():
+                rollups[resolution][(int(timestamp // size * size), port, kind, counted)] += 1
+
+        with conn:
+            conn.executemany(
+                'INSERT INTO device_events (timestamp, port, type, switch, command, data) VALUES (?, ?, ?, ?, ?, ?)',
+                rows
+            )
+            for resolution, counts in rollups.items():
+                table, _ = ROLLUP_TABLES[resolution]
+                conn.executemany(
+                    f'INSERT INTO {table} (bucket, port, type, command, count) VALUES (?, ?, ?, ?, ?) '
+                    f'ON CONFLICT(bucket, port, type, command) DO UPDATE SET count = count + excluded.count',
+                    [key + (count,) for key, count in counts.items()]
+                )
+        self.written += len(rows)
+        self.batches += 1
+
+    def _switch_commands(self, conn):
+        """Vrati nazive komandi po ID-u tastera (0-bazirano) u trenutku upisa."""
+        rows = conn.execute('''
+            SELECT bm.button_number, c.name
+            FROM button_mappings bm
+            JOIN commands c ON bm.command_id = c.id
+        ''')
+        return {button_number - 1: name for button_number, name in rows}
+
+    def _apply_retention(self, conn):
+        """Obriši događaje i sažetke starije od perioda čuvanja."""
+        self.last_retention = time.monotonic()
+        now = time.time()
+        try:
+            with conn:
+                conn.execute('DELETE FROM device_events WHERE timestamp < ?', (now - EVENT_RETENTION_DAYS * 86400,))
+                conn.execute('DELETE FROM event_rollups_minute WHERE bucket < ?',
+                             (now - EVENT_ROLLUP_MINUTE_RETENTION_DAYS * 86400,))
+                conn.execute('DELETE FROM event_rollups_hour WHERE bucket < ?',
+                             (now - EVENT_ROLLUP_HOUR_RETENTION_DAYS * 86400,))
+        except sqlite3.Error as e:
+            logger.error(f"Greška pri brisanju starih događaja: {e}")
+
+# Globalna instanca skladišta događaja
+event_store = EventStore()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Firmware upload - chunked, windowed and resumable image transfer over the serial link
+"""
+
+import base64
+import logging
+import threading
+import time
+import zlib
+from datetime import datetime
+
+from reliable_link import ReliableChannel
+from config import (
+    FIRMWARE_CHUNK_SIZE, FIRMWARE_WINDOW, FIRMWARE_BEGIN_TIMEOUT,
+    RELIABLE_ACK_TIMEOUT, RELIABLE_MAX_RETRIES
+)
+
+logger = logging.getLogger(__name__)
+
+class FirmwareUploadError(Exception):
+    """Greška pri slanju firmware-a (uređaj odbio sliku ili provjera nije prošla)."""
+
+def image_crc(data):
+    """CRC32 bajtova kao hex string."""
+    return format(zlib.crc32(data) & 0xFFFFFFFF, '08x')
+
+class FirmwareUploader:
+    """Šalje firmware u dijelovima kroz pouzdani kanal sa kliznim prozorom.
+
+    Protokol: `fw_begin` (veličina, CRC slike) -> uređaj odgovara `fw_ready`
+    sa pomakom od kojeg treba nastaviti (nastavak prekinutog slanja), zatim
+    `fw_chunk` poruke sa CRC-om svakog dijela i na kraju `fw_end`, na koji
+    uređaj odgovara `fw_done` nakon provjere cijele slike.
+    """
+
+    def __init__(self, chunk_size=FIRMWARE_CHUNK_SIZE, window=FIRMWARE_WINDOW):
+        self.chunk_size = chunk_size
+        self.window = window
+        self.progress = {}
+        self.lock = threading.Lock()
+
+    def begin(self, port, size):
+        """Zauzmi port za slanje; vraća False ako slanje na taj port već traje."""
+        with self.lock:
+            current = self.progress.get(port)
+            if current and current['state'] == 'uploading':
+                return False
+            self.progress[port] = {
+                'state': 'uploading',
+                'total_bytes': size,
+                'acked_bytes': 0,
+                'resumed_from': 0,
+                'bytes_per_second': None,
+                'started': datetime.now().isoformat(),
+                'error': None
+            }
+            return True
+
+    def status(self, port=None):
+        """Vrati napredak slanja za port ili za sve portove."""
+        with self.lock:
+            if port is not None:
+                return dict(self.progress[port]) if port in self.progress else None
+            return {key: dict(value) for key, value in self.progress.items()}
+
+    def upload(self, comm, image):
+        """Pošalji sliku preko povezanog komunikatora i vrati izvještaj (propusnost u bytes/s).
+
+        Poziv na isti port nakon prekida nastavlja od zadnjeg dijela koji je
+        uređaj primio. Izuzeci se propagiraju pozivaocu.
+        """
+        port = comm.port
+        size = len(image)
+        crc = image_crc(image)
+        start = time.monotonic()
+        progress = self.progress.get(port)
+
+        # Nastavak ponovo šalje dijelove koje je uređaj možda već vidio - nova
+        # sesija sprječava da ih odbaci kao duplikate ranijih rednih brojeva
+        comm.new_session()
+        comm.write_message({"type": "fw_begin", "size": size, "crc": crc, "chunk_size": self.chunk_size})
+        ready = comm.read_message(FIRMWARE_BEGIN_TIMEOUT, types=('fw_ready', 'fw_error'))
+        if ready is None:
+            raise FirmwareUploadError(f"Uređaj na portu {port} nije odgovorio na fw_begin")
+        if ready['type'] == 'fw_error':
+            raise FirmwareUploadError(f"Uređaj je odbio firmware: {ready.get('reason', 'n/a')}")
+
+        # Uređaj može smanjiti veličinu dijela; nastavak kreće od početka dijela
+        chunk_size = min(self.chunk_size, ready.get('chunk_size') or self.chunk_size)
+        offset = max(0, min(size, ready.get('offset', 0)))
+        offset -= offset % chunk_size
+        if progress is not None:
+            progress['resumed_from'] = offset
+            progress['acked_bytes'] = offset
+        if offset:
+            logger.info(f"Nastavljam slanje firmware-a na port {port} od {offset}/{size} bytes")
+
+        def on_ack(message):
+            if progress is not None and message['type'] == 'fw_chunk':
+                progress['acked_bytes'] += message['length']
+                elapsed = time.monotonic() - start
+                if elapsed > 0:
+                    progress['bytes_per_second'] = round((progress['acked_bytes'] - offset) / elapsed)
+
+        channel = ReliableChannel(
+            comm,
+            window=self.window,
+            ack_timeout=RELIABLE_ACK_TIMEOUT,
+            max_retries=RELIABLE_MAX_RETRIES,
+            on_ack=on_ack
+        )
+        chunks_report = channel.send(self._chunks(image, offset, chunk_size))
+        end_report = channel.send([{"type": "fw_end", "size": size, "crc": crc}])
+
+        done = next((reply for reply in end_report['responses'] if reply.get('type') == 'fw_done'), None)
+        if done is None:
+            done = comm.read_message(FIRMWARE_BEGIN_TIMEOUT, types=('fw_done',))
+        if done is None or done.get('status') != 'ok':
+            reason = done.get('reason', 'n/a') if done else 'nema odgovora'
+            raise FirmwareUploadError(f"Provjera firmware-a nije prošla: {reason}")
+
+        elapsed = time.monotonic() - start
+        sent = size - offset
+        report = {
+            'size': size,
+            'crc': crc,
+            'chunk_size': chunk_size,
+            'window': self.window,
+            'resumed_from': offset,
+            'bytes_sent': sent,
+            'chunks': chunks_report['frames'],
+            'retries': chunks_report['retries'] + end_report['retries'],
+            'elapsed_ms': round(elapsed * 1000, 1),
+            'bytes_per_second': round(sent / elapsed) if elapsed > 0 else None
+        }
+        logger.info(f"Firmware ({size} bytes) poslan na port {port} za {report['elapsed_ms']} ms "
+                    f"({report['bytes_per_second']} bytes/s)")
+        return report
+
+    def finish(self, port, report=None, error=None):
+        """Zabilježi kraj slanja na port."""
+        with self.lock:
+            progress = self.progress.get(port)
+            if progress is None:
+                return
+            progress['state'] = 'failed' if error else 'done'
+            progress['error'] = str(error) if error else None
+            if report:
+                progress['bytes_per_second'] = report['bytes_per_second']
+                progress['acked_bytes'] = report['size']
+
+    def _chunks(self, image, offset, chunk_size):
+        """Generator fw_chunk poruka od `offset` do kraja slike (bez kopiranja cijele slike)."""
+        view = memoryview(image)
+        for position in range(offset, len(image), chunk_size):
+            chunk = view[position:position + chunk_size]
+            yield {
+                "type": "fw_chunk",
+                "offset": position,
+                "length": len(chunk),
+                "crc": image_crc(chunk),
+                "data": base64.b64encode(chunk).decode('ascii')
+            }
+
+# Globalna instanca za slanje firmware-a
+firmware_uploader = FirmwareUploader()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Latency benchmark - round-trip times of pings or no-op reliable frames on a port
+"""
+
+import argparse
+import sys
+import time
+
+from config import SERIAL_BAUDRATE
+from link_health import RTTHistogram
+from reliable_link import build_frame
+from serial_comm import SerialCommunicator, PING_REPLY_TYPES
+
+# Načini mjerenja: ping/pong ili no-op poruka u pouzdanom okviru (ack)
+BENCHMARK_MODES = ('ping', 'frame')
+
+# Ograničenja za jedan benchmark (API i CLI)
+BENCHMARK_MAX_COUNT = 10000
+BENCHMARK_MAX_PAYLOAD = 4096
+
+def _round_trip(comm, mode, payload, timeout):
+    """Pošalji jednu poruku i vrati (RTT u sekundama ili None, poslani bajtovi)."""
+    message = {'type': 'ping' if mode == 'ping' else 'noop'}
+    if payload:
+        message['pad'] = 'x' * payload
+
+    if mode == 'ping':
+        start = time.perf_counter()
+        written = comm.write_message(message)
+        reply = comm.read_message(timeout, types=PING_REPLY_TYPES)
+        return (time.perf_counter() - start if reply is not None else None), written
+
+    seq = comm.next_sequence()
+    frame = build_frame(seq, message, comm.session)
+    start = time.perf_counter()
+    written = comm.write_message(frame)
+    deadline = start + timeout
+    while True:
+        reply = comm.read_message(max(0.0, deadline - time.perf_counter()), types=('ack', 'nack'))
+        if reply is None:
+            return None, written
+        if reply.get('seq') == seq:
+            return (time.perf_counter() - start if reply['type'] == 'ack' else None), written
+
+def run_benchmark(comm, count=100, rate=None, payload=0, mode='ping', timeout=1.0):
+    """Izmjeri RTT za `count` poruka, najviše `rate` u sekundi (None - jedna za drugom).
+
+    Vraća izvještaj sa min/p50/p95/p99/max RTT-om u ms, gubicima i propusnošću.
+    """
+    if mode not in BENCHMARK_MODES:
+        raise ValueError(f"mode mora biti jedno od: {', '.join(BENCHMARK_MODES)}")
+    if not comm.is_connected():
+        raise Exception("Nema aktivne konekcije sa serial portom")
+
+    histogram = RTTHistogram()
+    lost = 0
+    bytes_sent = 0
+    comm.connection.reset_input_buffer()
+    start = time.perf_counter()
+    for index in range(count):
+        if rate:
+            # Apsolutni raspored slanja - sporiji odgovori ne pomjeraju sljedeće poruke
+            delay = start + index / rate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        rtt, written = _round_trip(comm, mode, payload, timeout)
+        bytes_sent += written or 0
+        if rtt is None:
+            lost += 1
+        else:
+            histogram.record(rtt)
+    elapsed = time.perf_counter() - start
+
+    return {
+        'port': comm.port,
+        'mode': mode,
+        'baudrate': comm.baudrate,
+        'count': count,
+        'received': count - lost,
+        'lost': lost,
+        'payload_bytes': payload,
+        'rate': rate,
+        'rtt_ms': histogram.to_dict(),
+        'elapsed_ms': round(elapsed * 1000, 3),
+        'messages_per_second': round((count - lost) / elapsed, 1) if elapsed else None,
+        'bytes_per_second': round(bytes_sent / elapsed) if elapsed else None
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Mjerenje vremena odziva uređaja (RTT) na serijskom portu')
+    parser.add_argument('port', help='serijski port ili transport URL (npr. /dev/ttyUSB0, socket://host:port)')
+    parser.add_argument('--count', type=int, default=100, help='broj poruka (podrazumijevano 100)')
+    parser.add_argument('--rate', type=float, default=None, help='poruka u sekundi (podrazumijevano bez pauze)')
+    parser.add_argument('--payload', type=int, default=0, help='dodatnih bajtova po poruci')
+    parser.add_argument('--mode', choices=BENCHMARK_MODES, default='ping', help='ping ili pouzdani no-op okvir')
+    parser.add_argument('--baudrate', type=int, default=SERIAL_BAUDRATE)
+    parser.add_argument('--negotiate', action='store_true', help='dogovori višu brzinu prije mjerenja')
+    args = parser.parse_args()
+
+    if not 0 < args.count <= BENCHMARK_MAX_COUNT or not 0 <= args.payload <= BENCHMARK_MAX_PAYLOAD:
+        parser.error(f'count mora biti 1-{BENCHMARK_MAX_COUNT}, payload 0-{BENCHMARK_MAX_PAYLOAD}')
+
+    comm = SerialCommunicator()
+    if not comm.connect(args.port, baudrate=args.baudrate):
+        print(f"Nije moguće povezati se sa portom {args.port}")
+        sys.exit(1)
+    try:
+        if args.negotiate:
+            comm.negotiate_baudrate()
+        report = run_benchmark(comm, args.count, args.rate, args.payload, args.mode)
+    finally:
+        comm.disconnect()
+
+    rtt = report['rtt_ms']
+    print(f"Port: {report['port']} ({report['baudrate']} baud), način: {report['mode']}, payload: {report['payload_bytes']} bytes")
+    print(f"Primljeno: {report['received']}/{report['count']} (izgubljeno {report['lost']})")
+    print(f"RTT ms: min {rtt['min']}  p50 {rtt['p50']}  p95 {rtt['p95']}  p99 {rtt['p99']}  max {rtt['max']}")
+    print(f"Propusnost: {report['messages_per_second']} poruka/s, {report['bytes_per_second']} bytes/s")
+
+if __name__ == "__main__":
+    main()
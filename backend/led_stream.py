@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LED stream - paced live RGB frames for the device switch LEDs
+"""
+
+import base64
+import colorsys
+import logging
+import threading
+import time
+from collections import deque
+
+from config import LED_STREAM_FPS, LED_STREAM_QUEUE
+from serial_comm import PRESET_COLORS
+from banks import slot_count
+
+logger = logging.getLogger(__name__)
+
+# Efekti koje stream generiše sam kada nema poslanih okvira
+LED_EFFECTS = ('rainbow', 'chase')
+
+def parse_color(value):
+    """Pretvori boju (#rrggbb, naziv preseta ili [r, g, b]) u tri bajta."""
+    if isinstance(value, (list, tuple)) and len(value) == 3:
+        return bytes(max(0, min(255, int(channel))) for channel in value)
+    if isinstance(value, str):
+        value = PRESET_COLORS.get(value, value)
+        if value.startswith('#') and len(value) == 7:
+            return bytes.fromhex(value[1:])
+    raise ValueError(f"Neispravna boja: {value}")
+
+def encode_frame(number, pixels, offset=0):
+    """Kompaktan okvir: redni broj, prvi slot i RGB bajtovi kao base64 (3 bajta po tasteru)."""
+    message = {'type': 'led', 'f': number & 0xFFFF, 'c': base64.b64encode(pixels).decode('ascii')}
+    if offset:
+        message['o'] = offset
+    return message
+
+def effect_frame(effect, t, count):
+    """Generiši okvir efekta za trenutak `t` (sekunde)."""
+    pixels = bytearray()
+    for index in range(count):
+        if effect == 'rainbow':
+            r, g, b = colorsys.hsv_to_rgb((t * 0.25 + index / count) % 1.0, 1.0, 1.0)
+        else:
+            r = g = b = 1.0 if int(t * 10) % count == index else 0.05
+        pixels += bytes((int(r * 255), int(g * 255), int(b * 255)))
+    return bytes(pixels)
+
+class LedStream:
+    """Slanje LED okvira jednom uređaju sa fiksnim ritmom.
+
+    Okviri se šalju na apsolutnim rokovima (start + n * period), pa greške
+    tajmera ne akumuliraju. Red okvira je kratak: kada veza kasni, najstariji
+    okvir se odbacuje i šalje se najnovije stanje; propušteni rokovi se
+    preskaču umjesto da se šalju u naletu.
+    """
+
+    def __init__(self, port, communicator, fps=LED_STREAM_FPS, effect=None, owned=False, queue_size=LED_STREAM_QUEUE):
+        self.port = port
+        self.communicator = communicator
+        self.fps = fps
+        self.period = 1.0 / fps
+        self.effect = effect
+        self.owned = owned  # Komunikator je otvoren samo za ovaj stream i zatvara se sa njim
+        self.frames = deque(maxlen=queue_size)
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.frame_number = 0
+        self.sent_times = deque(maxlen=max(2, int(fps * 2)))
+        self.stats = {
+            'frames_submitted': 0,
+            'frames_sent': 0,
+            'frames_dropped': 0,  # Zamijenjeni novijim okvirom prije slanja
+            'ticks_skipped': 0,   # Propušteni rokovi jer je slanje kasnilo
+            'write_errors': 0,
+            'bytes_sent': 0,
+            'write_ms_max': 0.0
+        }
+        self.started = None
+
+    def start(self):
+        """Pokreni nit slanja."""
+        self.started = time.monotonic()
+        self.thread = threading.Thread(target=self._run, name=f'led-stream-{self.port}', daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=1.0):
+        """Zaustavi slanje (i zatvori vlastitu vezu)."""
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout)
+        if self.owned:
+            with self.communicator.lock:
+                self.communicator.disconnect()
+
+    def submit(self, pixels, offset=0):
+        """Dodaj okvir za slanje; pun red odbacuje najstariji okvir."""
+        if len(self.frames) == self.frames.maxlen:
+            self.stats['frames_dropped'] += 1
+        self.frames.append((pixels, offset))
+        self.stats['frames_submitted'] += 1
+
+    def achieved_fps(self):
+        """Broj poslanih okvira u sekundi, mjeren na zadnjim okvirima."""
+        times = list(self.sent_times)
+        if len(times) < 2 or time.monotonic() - times[-1] > 1.0:
+            return 0.0
+        return (len(times) - 1) / (times[-1] - times[0])
+
+    def to_dict(self):
+        """Vrati stanje streama za API."""
+        data = dict(self.stats)
+        data.update({
+            'port': self.port,
+            'fps': self.fps,
+            'effect': self.effect,
+            'achieved_fps': round(self.achieved_fps(), 1),
+            'running': self.thread is not None and self.thread.is_alive(),
+            'uptime_s': round(time.monotonic() - self.started, 3) if self.started else 0.0,
+            'write_ms_max': round(self.stats['write_ms_max'], 3)
+        })
+        return data
+
+    def _next_frame(self, now):
+        try:
+            return self.frames.popleft()
+        except IndexError:
+            if self.effect:
+                return effect_frame(self.effect, now - self.started, slot_count()), 0
+            return None
+
+    def _run(self):
+        """Petlja slanja na apsolutnim rokovima."""
+        deadline = time.monotonic()
+        while not self.stop_event.is_set():
+            now = time.monotonic()
+            if now < deadline:
+                if self.stop_event.wait(deadline - now):
+                    break
+                now = time.monotonic()
+
+            # Slanje je kasnilo više od jednog perioda - preskoči propuštene rokove
+            behind = int((now - deadline) / self.period)
+            if behind:
+                self.stats['ticks_skipped'] += behind
+                deadline += behind * self.period
+            deadline += self.period
+
+            frame = self._next_frame(now)
+            if frame is None:
+                continue
+            self._send(*frame)
+
+    def _send(self, pixels, offset):
+        message = encode_frame(self.frame_number, pixels, offset)
+        start = time.monotonic()
+        try:
+            with self.communicator.lock:
+                written = self.communicator.write_message(message)
+        except Exception as e:
+            self.stats['write_errors'] += 1
+            logger.debug(f"Greška pri slanju LED okvira na {self.port}: {e}")
+            return
+        end = time.monotonic()
+        self.frame_number += 1
+        self.sent_times.append(end)
+        self.stats['frames_sent'] += 1
+        self.stats['bytes_sent'] += written or 0
+        self.stats['write_ms_max'] = max(self.stats['write_ms_max'], (end - start) * 1000)
+
+class LedStreamManager:
+    """Aktivni LED streamovi po portu."""
+
+    def __init__(self):
+        self.streams = {}
+        self.lock = threading.Lock()
+
+    def start(self, port, communicator, fps=LED_STREAM_FPS, effect=None, owned=False):
+        """Pokreni stream na portu (postojeći stream se zamjenjuje)."""
+        self.stop(port)
+        stream = LedStream(port, communicator, fps, effect, owned)
+        with self.lock:
+            self.streams[port] = stream
+        stream.start()
+        logger.info(f"LED stream na {port} pokrenut ({fps} fps{', efekat ' + effect if effect else ''})")
+        return stream
+
+    def stop(self, port):
+        """Zaustavi stream na portu i vrati njegovu završnu statistiku (ili None)."""
+        with self.lock:
+            stream = self.streams.pop(port, None)
+        if stream is None:
+            return None
+        stream.stop()
+        logger.info(f"LED stream na {port} zaustavljen")
+        return stream.to_dict()
+
+    def get(self, port):
+        """Vrati aktivni stream porta (ili None)."""
+        return self.streams.get(port)
+
+    def status(self, port=None):
+        """Vrati statistiku streamova (fps, odbačeni okviri)."""
+        streams = list(self.streams.values()) if port is None else [self.streams[port]] if port in self.streams else []
+        return [stream.to_dict() for stream in streams]
+
+# Globalna instanca LED streamova
+led_streams = LedStreamManager()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Link health statistics - fixed-memory RTT histogram and heartbeat loss counters
+"""
+
+import math
+import threading
+
+class RTTHistogram:
+    """Histogram vremena odziva sa log-linearnim (HDR) korpama fiksne veličine.
+
+    Vrijednosti se čuvaju u mikrosekundama. Svaka potencija dvojke je podijeljena
+    na `sub_bucket_count / 2` linearnih korpi, pa je relativna greška percentila
+    ograničena (za 32 korpe ~3%) bez obzira na broj uzoraka.
+    """
+
+    def __init__(self, highest_us=60_000_000, sub_bucket_bits=5):
+        self.sub_bucket_bits = sub_bucket_bits
+        self.sub_bucket_count = 1 << sub_bucket_bits
+        self.sub_bucket_half = self.sub_bucket_count // 2
+        self.highest_us = highest_us
+        self.counts = [0] * (self._index(highest_us) + 1)
+        self.total = 0
+        self.sum_us = 0
+        self.min_us = None
+        self.max_us = None
+        self.lock = threading.Lock()
+
+    def _index(self, value):
+        """Indeks korpe za vrijednost u mikrosekundama."""
+        if value < self.sub_bucket_count:
+            return value
+        exponent = value.bit_length() - self.sub_bucket_bits
+        return exponent * self.sub_bucket_half + (value >> exponent)
+
+    def _bounds(self, index):
+        """Donja i gornja granica (uključivo) korpe."""
+        if index < self.sub_bucket_count:
+            return index, index
+        exponent = index // self.sub_bucket_half - 1
+        sub_bucket = index - exponent * self.sub_bucket_half
+        return sub_bucket << exponent, ((sub_bucket + 1) << exponent) - 1
+
+    def record(self, seconds):
+        """Zabilježi jedno vrijeme odziva (u sekundama)."""
+        value = min(self.highest_us, max(0, int(seconds * 1_000_000)))
+        with self.lock:
+            self.counts[self._index(value)] += 1
+            self.total += 1
+            self.sum_us += value
+            self.min_us = value if self.min_us is None else min(self.min_us, value)
+            self.max_us = value if self.max_us is None else max(self.max_us, value)
+
+    def percentile(self, percent):
+        """Vrati percentil u milisekundama (None ako nema uzoraka)."""
+        with self.lock:
+            if not self.total:
+                return None
+            target = max(1, math.ceil(self.total * percent / 100.0))
+            cumulative = 0
+            for index, count in enumerate(self.counts):
+                cumulative += count
+                if cumulative >= target:
+                    lower, upper = self._bounds(index)
+                    # Sredina korpe, ograničena stvarnim min/max vrijednostima
+                    value = min(max((lower + upper) / 2.0, self.min_us), self.max_us)
+                    return round(value / 1000.0, 3)
+        return None
+
+    def reset(self):
+        """Obriši sve uzorke."""
+        with self.lock:
+            self.counts = [0] * len(self.counts)
+            self.total = 0
+            self.sum_us = 0
+            self.min_us = None
+            self.max_us = None
+
+    def to_dict(self):
+        """Sažetak histograma za API (vrijednosti u ms)."""
+        return {
+            'count': self.total,
+            'min': round(self.min_us / 1000.0, 3) if self.min_us is not None else None,
+            'mean': round(self.sum_us / self.total / 1000.0, 3) if self.total else None,
+            'p50': self.percentile(50),
+            'p95': self.percentile(95),
+            'p99': self.percentile(99),
+            'max': round(self.max_us / 1000.0, 3) if self.max_us is not None else None
+        }
+
+class LinkHealth:
+    """Statistika heartbeat-a jedne veze: RTT histogram i brojači gubitaka."""
+
+    def __init__(self):
+        self.rtt = RTTHistogram()
+        self.sent = 0
+        self.lost = 0
+        self.consecutive_lost = 0
+        self.last_rtt = None
+
+    def record(self, rtt):
+        """Zabilježi rezultat heartbeat-a (`rtt` u sekundama ili None za gubitak)."""
+        self.sent += 1
+        if rtt is None:
+            self.lost += 1
+            self.consecutive_lost += 1
+            return
+        self.consecutive_lost = 0
+        self.last_rtt = rtt
+        self.rtt.record(rtt)
+
+    def to_dict(self):
+        """Vrati statistiku za API."""
+        data = {
+            'heartbeats_sent': self.sent,
+            'heartbeats_lost': self.lost,
+            'loss_ratio': round(self.lost / self.sent, 4) if self.sent else 0.0,
+            'consecutive_lost': self.consecutive_lost,
+            'last_rtt_ms': round(self.last_rtt * 1000, 3) if self.last_rtt is not None else None
+        }
+        data['rtt_ms'] = self.rtt.to_dict()
+        return data
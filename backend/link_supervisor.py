@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Link supervisor - keeps device connections open and restores them after link loss
+"""
+
+import random
+import logging
+import threading
+import time
+from datetime import datetime
+
+import serial.tools.list_ports
+
+from config import (
+    SERIAL_NEGOTIATE_BAUDRATE, RELIABLE_DELIVERY,
+    LINK_CHECK_INTERVAL, LINK_HEARTBEAT_INTERVAL, LINK_MAX_MISSED_HEARTBEATS,
+    LINK_BACKOFF_INITIAL, LINK_BACKOFF_MAX, LINK_MAX_RECONNECT_ATTEMPTS, LINK_STALL_TIMEOUT,
+    DEVICE_EVENT_POLL_INTERVAL
+)
+from transports import port_available
+from serial_comm import SerialCommunicator, forget_baudrate
+from link_health import LinkHealth
+
+logger = logging.getLogger(__name__)
+
+class SupervisedLink:
+    """Stanje jedne nadgledane veze sa uređajem."""
+
+    def __init__(self, port, reliable=False, heartbeat_interval=None):
+        self.port = port
+        self.communicator = SerialCommunicator()
+        self.state = 'connecting'
+        # Sesija koja se vraća nakon ponovnog povezivanja
+        self.session = {
+            'baudrate': None,
+            'reliable': reliable
+        }
+        self.connected = threading.Event()
+        # Interval heartbeat-a (0 isključuje heartbeat za ovaj uređaj)
+        self.heartbeat_interval = LINK_HEARTBEAT_INTERVAL if heartbeat_interval is None else heartbeat_interval
+        self.health = LinkHealth()
+        self.last_heartbeat = 0.0
+        self.reconnect_attempts = 0
+        self.next_attempt = 0.0
+        self.reconnects = 0
+        self.last_error = None
+        self.connected_since = None
+        self.event_thread = None  # Nit koja čita nezatražene događaje uređaja
+
+    def to_dict(self):
+        """Vrati stanje veze za API."""
+        return {
+            'port': self.port,
+            'state': self.state,
+            'baudrate': self.communicator.baudrate if self.connected.is_set() else None,
+            'session': dict(self.session),
+            'reconnects': self.reconnects,
+            'reconnect_attempts': self.reconnect_attempts,
+            'heartbeat_interval': self.heartbeat_interval,
+            'missed_heartbeats': self.health.consecutive_lost,
+            'last_error': self.last_error,
+            'connected_since': self.connected_since
+        }
+
+class LinkSupervisor:
+    """Klasa za nadzor otvorenih veza i automatsko ponovno povezivanje."""
+
+    def __init__(self):
+        self.links = {}
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.thread = None
+
+    def open(self, port, reliable=None, heartbeat_interval=None):
+        """Otvori nadgledanu vezu sa portom i dogovori parametre sesije."""
+        with self.lock:
+            link = self.links.get(port)
+            if link is None:
+                link = SupervisedLink(
+                    port,
+                    RELIABLE_DELIVERY if reliable is None else reliable,
+                    heartbeat_interval
+                )
+                link.communicator.error_handler = self._on_link_error
+                self.links[port] = link
+            else:
+                if reliable is not None:
+                    link.session['reliable'] = reliable
+                if heartbeat_interval is not None:
+                    link.heartbeat_interval = heartbeat_interval
+
+        if not link.connected.is_set() and not self._establish(link):
+            with self.lock:
+                self.links.pop(port, None)
+            return None
+
+        self._ensure_thread()
+        self._ensure_event_thread(link)
+        return link
+
+    def close(self, port):
+        """Zatvori nadgledanu vezu; vraća False ako port nije nadgledan."""
+        with self.lock:
+            link = self.links.pop(port, None)
+        if link is None:
+            return False
+
+        link.state = 'closed'
+        link.connected.clear()
+        with link.communicator.lock:
+            link.communicator.disconnect()
+        logger.info(f"Nadzor veze sa portom {port} je zaustavljen")
+        return True
+
+    def is_supervised(self, port):
+        """Provjeri da li je port pod nadzorom."""
+        return port in self.links
+
+    def get(self, port):
+        """Vrati nadgledanu vezu za port (ili None)."""
+        return self.links.get(port)
+
+    def acquire(self, port, timeout=None):
+        """Vrati povezan komunikator, čekajući ponovno povezivanje najviše `timeout` sekundi."""
+        link = self.links.get(port)
+        if link is None:
+            raise Exception(f"Port {port} nije pod nadzorom")
+
+        timeout = LINK_STALL_TIMEOUT if timeout is None else timeout
+        if not link.connected.wait(timeout):
+            raise Exception(f"Veza sa portom {port} nije obnovljena u roku od {timeout}s")
+        return link.communicator
+
+    def call(self, port, operation, timeout=None):
+        """Izvrši operaciju nad komunikatorom porta.
+
+        Ako veza padne tokom operacije, sačeka se ponovno povezivanje i
+        operacija se ponovi jednom, tako da pozivalac vidi kratak zastoj
+        umjesto greške.
+        """
+        link = self.links.get(port)
+        result = None
+        for attempt in range(2):
+            communicator = self.acquire(port, timeout)
+            with communicator.lock:
+                result = operation(communicator)
+            if link.connected.is_set() or link.state == 'closed':
+                break
+            logger.info(f"Veza sa portom {port} prekinuta tokom operacije, ponavljam nakon obnove")
+        return result
+
+    def status(self):
+        """Vrati stanje svih nadgledanih veza."""
+        return [link.to_dict() for link in list(self.links.values())]
+
+    def health(self, port=None):
+        """Vrati heartbeat statistiku (RTT percentili i gubici) po uređaju."""
+        if port is None:
+            links = list(self.links.values())
+        else:
+            links = [self.links[port]] if port in self.links else []
+
+        result = []
+        for link in links:
+            data = link.health.to_dict()
+            data['port'] = link.port
+            data['state'] = link.state
+            result.append(data)
+        return result
+
+    def _on_link_error(self, port, error):
+        """Callback komunikatora - I/O greška znači da je veza izgubljena."""
+        link = self.links.get(port)
+        if link is not None:
+            self._mark_lost(link, f"I/O greška: {error}")
+
+    def _mark_lost(self, link, reason):
+        """Označi vezu kao izgubljenu i probudi nit za ponovno povezivanje."""
+        if link.state in ('reconnecting', 'closed'):
+            return
+        logger.warning(f"Veza sa portom {link.port} izgubljena ({reason})")
+        link.connected.clear()
+        link.state = 'reconnecting'
+        link.last_error = reason
+        link.reconnect_attempts = 0
+        link.next_attempt = time.monotonic()
+        self.wakeup.set()
+
+    def _establish(self, link):
+        """Poveži komunikator i vrati dogovorene parametre sesije."""
+        communicator = link.communicator
+        with communicator.lock:
+            communicator.abort()
+            if not communicator.connect(link.port):
+                return False
+
+            restored_baudrate = link.session['baudrate']
+            if restored_baudrate and restored_baudrate > communicator.base_baudrate:
+                # Ne pregovaraj ispočetka - traži brzinu iz prethodne sesije
+                communicator.negotiate_baudrate([restored_baudrate])
+            elif restored_baudrate is None and SERIAL_NEGOTIATE_BAUDRATE:
+                communicator.negotiate_baudrate()
+
+            if link.state == 'reconnecting' and communicator.ping() is None:
+                communicator.abort()
+                return False
+
+            link.session['baudrate'] = communicator.baudrate
+
+        link.state = 'connected'
+        link.health.consecutive_lost = 0
+        link.last_heartbeat = time.monotonic()
+        link.connected_since = datetime.now().isoformat()
+        link.connected.set()
+        logger.info(f"Veza sa portom {link.port} uspostavljena ({communicator.baudrate} baud)")
+        return True
+
+    def _ensure_thread(self):
+        """Pokreni nit nadzora ako već ne radi."""
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._run, name='link-supervisor', daemon=True)
+                self.thread.start()
+
+    def _ensure_event_thread(self, link):
+        """Pokreni nit za prijem događaja uređaja ako već ne radi."""
+        if link.event_thread is None or not link.event_thread.is_alive():
+            link.event_thread = threading.Thread(
+                target=self._pump_events, args=(link,), name=f'device-events-{link.port}', daemon=True
+            )
+            link.event_thread.start()
+
+    def _pump_events(self, link):
+        """Čitaj nezatražene poruke uređaja dok je veza otvorena (između razmjena poruka)."""
+        while link.state != 'closed' and self.links.get(link.port) is link:
+            if not link.connected.wait(LINK_CHECK_INTERVAL):
+                continue
+            try:
+                if link.communicator.poll_events():
+                    continue
+            except Exception as e:
+                logger.debug(f"Greška pri prijemu događaja sa {link.port}: {e}")
+            time.sleep(DEVICE_EVENT_POLL_INTERVAL)
+
+    def _run(self):
+        """Glavna petlja nadzora: prisustvo porta, heartbeat i ponovno povezivanje."""
+        while self.links:
+            self.wakeup.wait(LINK_CHECK_INTERVAL)
+            self.wakeup.clear()
+
+            present_ports = None
+            for link in list(self.links.values()):
+                try:
+                    if link.state == 'connected':
+                        if present_ports is None:
+                            present_ports = self._list_present_ports()
+                        self._check_link(link, present_ports)
+                    elif link.state == 'reconnecting' and time.monotonic() >= link.next_attempt:
+                        self._reconnect(link)
+                except Exception as e:
+                    logger.error(f"Greška u nadzoru porta {link.port}: {e}")
+
+    def _check_link(self, link, present_ports):
+        """Provjeri da li je povezan port još prisutan i da li odgovara na heartbeat."""
+        if not self._port_present(link.port, present_ports):
+            # Vraćeni port može imati drugi uređaj - brzina se pregovara ispočetka
+            forget_baudrate(link.port)
+            self._mark_lost(link, 'port uklonjen')
+            return
+
+        interval = link.heartbeat_interval
+        if interval <= 0 or time.monotonic() - link.last_heartbeat < interval:
+            return
+
+        communicator = link.communicator
+        # Zauzet komunikator znači da veza ionako radi - preskoči heartbeat
+        if not communicator.lock.acquire(blocking=False):
+            return
+        try:
+            rtt = communicator.ping(timeout=min(1.0, interval))
+        finally:
+            communicator.lock.release()
+
+        link.last_heartbeat = time.monotonic()
+        link.health.record(rtt)
+        if link.health.consecutive_lost >= LINK_MAX_MISSED_HEARTBEATS:
+            self._mark_lost(link, f'{link.health.consecutive_lost} propuštenih heartbeat-a')
+
+    def _reconnect(self, link):
+        """Pokušaj ponovno povezivanje uz eksponencijalni backoff."""
+        link.reconnect_attempts += 1
+        if self._establish(link):
+            link.reconnects += 1
+            logger.info(f"Veza sa portom {link.port} obnovljena nakon {link.reconnect_attempts} pokušaja")
+            return
+
+        if LINK_MAX_RECONNECT_ATTEMPTS and link.reconnect_attempts >= LINK_MAX_RECONNECT_ATTEMPTS:
+            self._give_up(link)
+            return
+
+        delay = min(LINK_BACKOFF_MAX, LINK_BACKOFF_INITIAL * (2 ** (link.reconnect_attempts - 1)))
+        delay *= random.uniform(0.8, 1.2)
+        link.next_attempt = time.monotonic() + delay
+        logger.debug(f"Ponovno povezivanje sa {link.port} nije uspjelo, sljedeći pokušaj za {delay:.2f}s")
+
+    def _give_up(self, link):
+        """Port se nije vratio - ukloni vezu iz nadzora (ponovo je otvara tek novi open)."""
+        with self.lock:
+            if self.links.get(link.port) is link:
+                del self.links[link.port]
+        link.state = 'failed'
+        with link.communicator.lock:
+            link.communicator.abort()
+        logger.warning(f"Odustajem od porta {link.port} nakon {link.reconnect_attempts} neuspjelih pokušaja "
+                       f"({link.last_error})")
+
+    def _list_present_ports(self):
+        """Vrati skup trenutno prisutnih serijskih portova."""
+        try:
+            return {port.device for port in serial.tools.list_ports.comports()}
+        except Exception as e:
+            logger.debug(f"Greška pri listanju portova: {e}")
+            return None
+
+    def _port_present(self, port, present_ports):
+        """Provjeri da li je port još prisutan u sistemu."""
+        available = port_available(port)
+        if available is not None:
+            return available
+        # Ako listanje nije uspjelo, ne proglašavaj port uklonjenim
+        return present_ports is None or port in present_ports
+
+# Globalna instanca nadzora veza
+link_supervisor = LinkSupervisor()
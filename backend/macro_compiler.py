@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Macro compiler - multi-message button actions compiled into compact bytecode
+"""
+
+import base64
+import json
+import logging
+
+from config import MACRO_MAX_STEPS, MACRO_MAX_BYTES, MACRO_MAX_DELAY_MS
+from midi_encoder import command_messages, validate_midi, RunningStatusEncoder, MIDI_TYPES
+
+# Format bajtkoda: verzija, zatim instrukcije do OP_END
+MACRO_VERSION = 1
+OP_END = 0x00
+OP_SEND = 0x01   # varint dužina + sirovi MIDI bajtovi (segment počinje status bajtom)
+OP_DELAY = 0x02  # varint milisekunde
+
+logger = logging.getLogger(__name__)
+
+class MacroError(ValueError):
+    """Neispravan makro (korak, ograničenje veličine ili oštećen bajtkod)."""
+
+def _varint(value):
+    """Neoznačen broj u 7-bitnim grupama (LEB128), najmanje značajna grupa prva."""
+    encoded = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            encoded.append(byte | 0x80)
+        else:
+            encoded.append(byte)
+            return bytes(encoded)
+
+def _read_varint(blob, offset):
+    value = shift = 0
+    while True:
+        if offset >= len(blob) or shift > 28:
+            raise MacroError("Oštećen bajtkod makroa (varint)")
+        byte = blob[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, offset
+        shift += 7
+
+def validate_step(step):
+    """Provjeri jedan korak makroa; vraća poruku greške ili None."""
+    if not isinstance(step, dict):
+        return 'Korak makroa mora biti objekat'
+    kind = step.get('type')
+    if kind == 'delay':
+        ms = step.get('ms')
+        if not isinstance(ms, int) or not 0 <= ms <= MACRO_MAX_DELAY_MS:
+            return f'Pauza mora biti između 0 i {MACRO_MAX_DELAY_MS} ms'
+        return None
+    if kind not in MIDI_TYPES or kind == 'auto':
+        return 'Tip koraka mora biti cc, pc, nrpn, rpn ili delay'
+    value = step.get('value')
+    if not isinstance(value, int) or value < 0:
+        return 'Vrijednost koraka mora biti nenegativan broj'
+    if kind != 'pc' and step.get('param') is None:
+        return f'Korak {kind} zahtijeva param (kontroler ili parametar)'
+    return validate_midi(kind, step.get('channel', 1), step.get('param'), value)
+
+def compile_macro(steps):
+    """Kompajliraj korake u bajtkod.
+
+    Uzastopne MIDI poruke idu u jedan OP_SEND sa running status-om, a
+    uzastopne pauze se sabiraju, pa uređaj izvršava makro bez parsiranja
+    JSON-a i sa pauzama koje ne zavise od veze.
+    """
+    if not isinstance(steps, list) or not steps:
+        raise MacroError('Makro mora biti neprazna lista koraka')
+    if len(steps) > MACRO_MAX_STEPS:
+        raise MacroError(f'Makro može imati najviše {MACRO_MAX_STEPS} koraka')
+
+    blob = bytearray([MACRO_VERSION])
+    encoder = None
+    pending_delay = 0
+
+    def flush_send():
+        if encoder is not None and encoder.buffer:
+            blob.append(OP_SEND)
+            blob.extend(_varint(len(encoder.buffer)))
+            blob.extend(encoder.buffer)
+
+    for index, step in enumerate(steps):
+        error = validate_step(step)
+        if error:
+            raise MacroError(f'Korak {index + 1}: {error}')
+        if step['type'] == 'delay':
+            flush_send()
+            encoder = None
+            pending_delay += step['ms']
+            continue
+        if pending_delay:
+            blob.append(OP_DELAY)
+            blob.extend(_varint(pending_delay))
+            pending_delay = 0
+        if encoder is None:
+            encoder = RunningStatusEncoder()
+        encoder.write_all(command_messages(step['type'], step.get('channel', 1), step['value'], step.get('param')))
+
+    flush_send()
+    # Pauza na kraju ne mijenja ništa na izlazu, pa se izostavlja
+    blob.append(OP_END)
+
+    if len(blob) > MACRO_MAX_BYTES:
+        raise MacroError(f'Makro zauzima {len(blob)} bajtova (najviše {MACRO_MAX_BYTES})')
+    return bytes(blob)
+
+def decode_macro(blob):
+    """Pretvori bajtkod u listu instrukcija [('send', bajtovi) | ('delay', ms)]."""
+    if not blob or blob[0] != MACRO_VERSION:
+        raise MacroError('Nepoznata verzija bajtkoda makroa')
+    offset = 1
+    program = []
+    while offset < len(blob):
+        opcode = blob[offset]
+        offset += 1
+        if opcode == OP_END:
+            return program
+        value, offset = _read_varint(blob, offset)
+        if opcode == OP_SEND:
+            if offset + value > len(blob):
+                raise MacroError('Oštećen bajtkod makroa (OP_SEND)')
+            program.append(('send', bytes(blob[offset:offset + value])))
+            offset += value
+        elif opcode == OP_DELAY:
+            program.append(('delay', value))
+        else:
+            raise MacroError(f'Nepoznata instrukcija makroa: {opcode:#04x}')
+    raise MacroError('Bajtkod makroa nema OP_END')
+
+def macro_steps(button_data):
+    """Koraci makroa iz podataka mapiranja (JSON iz baze ili lista), None ako komanda nije makro."""
+    macro = button_data.get('macro')
+    if not macro or button_data.get('command_name') is None:
+        return None
+    return json.loads(macro) if isinstance(macro, str) else macro
+
+def macro_blob(button_data):
+    """Bajtkod makroa tastera u base64 obliku (None ako komanda nije makro ili se ne može kompajlirati)."""
+    try:
+        steps = macro_steps(button_data)
+        if steps is None:
+            return None
+        return base64.b64encode(compile_macro(steps)).decode('ascii')
+    except ValueError as e:  # MacroError ili oštećen JSON makroa
+        # Sačuvan makro ne prolazi trenutna ograničenja - taster ide bez makroa, ostali se šalju
+        logger.warning(f"Makro komande '{button_data.get('command_name')}' je preskočen: {e}")
+        return None
+
+def macro_summary(steps):
+    """Veličina bajtkoda, broj poruka i trajanje makroa (za odgovore API-ja)."""
+    blob = compile_macro(steps)
+    return {
+        'bytes': len(blob),
+        'messages': sum(1 for step in steps if step['type'] != 'delay'),
+        'duration_ms': sum(value for op, value in decode_macro(blob) if op == 'delay')
+    }
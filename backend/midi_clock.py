@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+MIDI clock - 24 PPQN tempo clock with tap tempo and jitter statistics
+"""
+
+import logging
+import os
+import threading
+import time
+
+from config import CLOCK_DEFAULT_BPM, CLOCK_MIN_BPM, CLOCK_MAX_BPM, CLOCK_SPIN_MARGIN
+from link_health import RTTHistogram
+
+logger = logging.getLogger(__name__)
+
+# MIDI clock šalje 24 impulsa po četvrtini (PPQN)
+CLOCK_PPQN = 24
+
+# Tap tempo: koliko zadnjih udaraca se uzima i pauza nakon koje se počinje ispočetka
+TAP_HISTORY = 8
+TAP_RESET_INTERVAL = 2.0
+
+def _raise_thread_priority():
+    """Podigni prioritet trenutne niti koliko sistem dozvoljava; vraća postignuti nivo."""
+    try:
+        priority = min(10, os.sched_get_priority_max(os.SCHED_FIFO))
+        os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(priority))
+        return 'realtime'
+    except (AttributeError, OSError):
+        pass
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), -10)
+        return 'nice -10'
+    except (AttributeError, OSError):
+        return 'normal'
+
+class TapTempo:
+    """Računa tempo iz razmaka između udaraca (medijan zadnjih razmaka)."""
+
+    def __init__(self):
+        self.taps = []
+
+    def tap(self, now=None):
+        """Zabilježi udarac; vraća BPM kada postoje bar dva udarca (inače None)."""
+        now = time.monotonic() if now is None else now
+        if self.taps and now - self.taps[-1] > TAP_RESET_INTERVAL:
+            self.taps = []
+        self.taps = (self.taps + [now])[-TAP_HISTORY:]
+        if len(self.taps) < 2:
+            return None
+
+        intervals = sorted(b - a for a, b in zip(self.taps, self.taps[1:]))
+        middle = len(intervals) // 2
+        interval = intervals[middle] if len(intervals) % 2 else (intervals[middle - 1] + intervals[middle]) / 2
+        return max(CLOCK_MIN_BPM, min(CLOCK_MAX_BPM, 60.0 / interval))
+
+class MidiClock:
+    """MIDI clock na posebnoj niti sa apsolutnim rokovima.
+
+    Rok impulsa n je `sidro + (n - n_sidra) * period`, pa se greške spavanja
+    ne sabiraju; promjena tempa samo pomjera sidro na sljedeći impuls. Nit
+    spava do `CLOCK_SPIN_MARGIN` prije roka i ostatak aktivno čeka. Kašnjenje
+    svakog impulsa u odnosu na rok bilježi se u histogram (jitter percentili).
+    """
+
+    def __init__(self, bpm=CLOCK_DEFAULT_BPM, spin_margin=CLOCK_SPIN_MARGIN):
+        self.bpm = bpm
+        self.spin_margin = spin_margin
+        self.targets = {}  # port -> (komunikator, da li ga clock zatvara pri zaustavljanju)
+        self.lock = threading.Lock()
+        self.tap_tempo = TapTempo()
+        self.jitter = RTTHistogram()
+        self.thread = None
+        self.stop_event = threading.Event()
+        self.running = False
+        self.priority = None
+        self.ticks = 0
+        self.late_ticks = 0      # Impulsi poslani više od pola perioda nakon roka
+        self.resyncs = 0         # Zastoji duži od jedne četvrtine - sidro pomjereno, impulsi preskočeni
+        self.write_errors = 0
+        self.anchor_time = None
+        self.anchor_tick = 0
+
+    @property
+    def period(self):
+        """Razmak između impulsa u sekundama za trenutni tempo."""
+        return 60.0 / (self.bpm * CLOCK_PPQN)
+
+    def add_target(self, port, communicator, owned=False):
+        """Dodaj uređaj koji prima clock."""
+        with self.lock:
+            self.targets[port] = (communicator, owned)
+        if self.running:
+            self._send(communicator, {'type': 'clock_start', 'bpm': round(self.bpm, 2)})
+
+    def remove_target(self, port):
+        """Ukloni uređaj iz clock-a (i zatvori vlastitu vezu)."""
+        with self.lock:
+            target = self.targets.pop(port, None)
+        if target is None:
+            return False
+        communicator, owned = target
+        if self.running:
+            self._send(communicator, {'type': 'clock_stop'})
+        if owned:
+            with communicator.lock:
+                communicator.disconnect()
+        return True
+
+    def start(self, bpm=None):
+        """Pokreni clock (MIDI Start) na trenutnom ili zadanom tempu."""
+        if bpm is not None:
+            self.set_tempo(bpm)
+        if self.running:
+            return
+        self.jitter.reset()
+        self.ticks = self.late_ticks = self.resyncs = 0
+        self.stop_event.clear()
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name='midi-clock', daemon=True)
+        self.thread.start()
+        logger.info(f"MIDI clock pokrenut ({self.bpm:.1f} BPM, {len(self.targets)} uređaja)")
+
+    def stop(self):
+        """Zaustavi clock (MIDI Stop)."""
+        if not self.running:
+            return
+        self.stop_event.set()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(1.0)
+        self.running = False
+        for communicator, _ in list(self.targets.values()):
+            self._send(communicator, {'type': 'clock_stop'})
+        logger.info(f"MIDI clock zaustavljen nakon {self.ticks} impulsa")
+
+    def set_tempo(self, bpm):
+        """Promijeni tempo od sljedećeg impulsa."""
+        if not CLOCK_MIN_BPM <= bpm <= CLOCK_MAX_BPM:
+            raise ValueError(f"Tempo mora biti između {CLOCK_MIN_BPM:g} i {CLOCK_MAX_BPM:g} BPM")
+        with self.lock:
+            if self.anchor_time is not None:
+                # Novo sidro je rok sljedećeg impulsa po starom tempu
+                next_tick = self.ticks
+                self.anchor_time += (next_tick - self.anchor_tick) * self.period
+                self.anchor_tick = next_tick
+            self.bpm = float(bpm)
+
+    def tap(self, now=None):
+        """Tap tempo; vraća novi tempo (ili None dok nema dovoljno udaraca)."""
+        bpm = self.tap_tempo.tap(now)
+        if bpm is not None:
+            self.set_tempo(bpm)
+        return bpm
+
+    def status(self):
+        """Vrati stanje clock-a i jitter percentile (ms)."""
+        return {
+            'running': self.running,
+            'bpm': round(self.bpm, 2),
+            'ppqn': CLOCK_PPQN,
+            'period_ms': round(self.period * 1000, 3),
+            'ports': list(self.targets.keys()),
+            'ticks': self.ticks,
+            'late_ticks': self.late_ticks,
+            'resyncs': self.resyncs,
+            'write_errors': self.write_errors,
+            'priority': self.priority,
+            'jitter_ms': self.jitter.to_dict()
+        }
+
+    def _send(self, communicator, message):
+        try:
+            with communicator.lock:
+                communicator.write_message(message)
+            return True
+        except Exception as e:
+            self.write_errors += 1
+            logger.debug(f"Greška pri slanju MIDI clock poruke: {e}")
+            return False
+
+    def _wait_until(self, deadline):
+        """Spavaj do malo prije roka, pa aktivno čekaj do samog roka."""
+        remaining = deadline - time.perf_counter()
+        if remaining > self.spin_margin:
+            if self.stop_event.wait(remaining - self.spin_margin):
+                return False
+        while time.perf_counter() < deadline:
+            # sleep(0) oslobađa GIL ostalim nitima tokom aktivnog čekanja
+            time.sleep(0)
+        return not self.stop_event.is_set()
+
+    def _run(self):
+        """Petlja clock-a na apsolutnim rokovima."""
+        self.priority = _raise_thread_priority()
+        for communicator, _ in list(self.targets.values()):
+            self._send(communicator, {'type': 'clock_start', 'bpm': round(self.bpm, 2)})
+
+        with self.lock:
+            self.anchor_time = time.perf_counter() + self.period
+            self.anchor_tick = 0
+
+        while not self.stop_event.is_set():
+            with self.lock:
+                period = self.period
+                deadline = self.anchor_time + (self.ticks - self.anchor_tick) * period
+            if not self._wait_until(deadline):
+                break
+
+            lateness = time.perf_counter() - deadline
+            if lateness > CLOCK_PPQN * period:
+                # Zastoj duži od četvrtine - ne šalji nalet impulsa, pomjeri sidro
+                with self.lock:
+                    self.anchor_time = time.perf_counter()
+                    self.anchor_tick = self.ticks
+                self.resyncs += 1
+                lateness = 0.0
+            elif lateness > period / 2:
+                self.late_ticks += 1
+            self.jitter.record(lateness)
+
+            message = {'type': 'clock', 'n': self.ticks & 0xFFFF}
+            for communicator, _ in list(self.targets.values()):
+                self._send(communicator, message)
+            self.ticks += 1
+
+        self.anchor_time = None
+
+# Globalna instanca MIDI clock-a
+midi_clock = MidiClock()
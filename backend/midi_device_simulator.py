@@ -8,21 +8,65 @@ import serial
 import json
 import sys
 import time
+import random
 import threading
+import zlib
+import base64
+from collections import deque
+from transports import open_transport, PtyTransport
+
+# Brzine koje simulirani uređaj podržava i osnovna brzina na koju se vraća
+SUPPORTED_BAUDRATES = (921600, 460800, 230400, 115200)
+BASE_BAUDRATE = 115200
+# Koliko dugo čekati ispravnu poruku na novoj brzini prije povratka na osnovnu
+BAUD_CONFIRM_TIMEOUT = 1.0
+
+# Broj zadnjih rednih brojeva okvira koje pamtimo radi odbacivanja duplikata
+SEEN_FRAMES_LIMIT = 256
 
 class MIDIDeviceSimulator:
-    def __init__(self, port, baudrate=9600):
+    def __init__(self, port, baudrate=BASE_BAUDRATE, drop_rate=0.0, connection=None, verbose=True, response_delay=0.0,
+                 device_id=None):
         self.port = port
+        self.device_id = device_id  # Identitet uređaja (npr. serijski broj) - vraća se u pong odgovoru
         self.baudrate = baudrate
-        self.connection = None
+        self.base_baudrate = baudrate
+        self.connection = connection  # Već otvoren transport (npr. strana loopback uređaja)
+        self.verbose = verbose
+        self.response_delay = response_delay  # Umjetno kašnjenje odgovora (spor uređaj)
         self.running = False
+        self.baud_confirm_deadline = None
+        self.drop_rate = drop_rate  # Udio okvira koje simulator namjerno "izgubi"
+        self.seen_frames = deque(maxlen=SEEN_FRAMES_LIMIT)
+        self.host_session = None  # Sesija hosta kojoj pripadaju seen_frames
+        self.switches = {}  # Trenutna konfiguracija tastera po ID-u
+        self.midi = {}  # Sirovi MIDI bajtovi tastera po ID-u (iz "midi" bafera)
+        self.preset_slots = {}  # Unaprijed upisani preseti po slotu (otisak, tasteri, MIDI bajtovi)
+        self.active_preset_slot = None
+        self.config_stream = None  # Prijem konfiguracije u dijelovima (samo brojači, bez bafera poruke)
+        self.firmware = None  # Stanje prijema firmware-a (ostaje nakon prekida radi nastavka)
+        self.installed_firmware = None
+        self.firmware_chunk_limit = None  # Prekini vezu nakon ovoliko primljenih dijelova (test nastavka)
+        self.write_lock = threading.Lock()  # Odgovori i nezatraženi događaji dolaze iz različitih niti
+        self.events_sent = 0
+        self.leds = b''  # Zadnji primljeni LED okvir (RGB bajtovi po tasteru)
+        self.led_frames = 0
+        self.led_frames_missed = 0  # Praznine u rednim brojevima okvira
+        self.last_led_frame = None
+        self.clock_running = False
+        self.clock_ticks = 0
+        self.clock_times = deque(maxlen=4096)  # Vrijeme prijema zadnjih clock impulsa
         
     def start(self):
         try:
-            self.connection = serial.Serial(self.port, self.baudrate, timeout=1)
+            if self.connection is None:
+                self.connection = open_transport(self.port, self.baudrate, timeout=1)
             self.running = True
-            print(f"MIDI Device Simulator pokrenut na portu {self.port}")
-            print("Čekam konfiguraciju...")
+            self.log(f"MIDI Device Simulator pokrenut na portu {self.port}")
+            if isinstance(self.connection, PtyTransport):
+                # Backend se povezuje na drugu stranu PTY para
+                print(f"Port za backend: {self.connection.peer_name}")
+            self.log("Čekam konfiguraciju...")
             
             while self.running:
                 try:
@@ -32,7 +76,11 @@ class MIDIDeviceSimulator:
                         message = line.decode('utf-8').strip()
                         if message:
                             self.process_message(message)
+                    self.check_baud_confirmation()
                             
+                except UnicodeDecodeError:
+                    # Smeće na liniji - vjerovatno pogrešna brzina
+                    self.revert_baudrate()
                 except serial.SerialTimeoutException:
                     continue
                 except Exception as e:
@@ -48,25 +96,105 @@ class MIDIDeviceSimulator:
     def process_message(self, message):
         try:
             data = json.loads(message)
-            print(f"\n--- Primljena poruka ---")
-            print(f"Tip: {data.get('type', 'unknown')}")
+            stream_handler = {'led': self.handle_led, 'clock': self.handle_clock}.get(data.get('type'))
+            if stream_handler:
+                # LED okviri i clock impulsi stižu desetine puta u sekundi - bez ispisa
+                self.baud_confirm_deadline = None
+                stream_handler(data)
+                return
+            self.log(f"\n--- Primljena poruka ---")
+            self.log(f"Tip: {data.get('type', 'unknown')}")
             
-            if data.get('type') == 'set_config':
+            # Ispravna poruka potvrđuje novu brzinu
+            self.baud_confirm_deadline = None
+            
+            if data.get('type') == 'frame':
+                self.handle_frame(data)
+            elif data.get('type') == 'set_config':
                 self.handle_config(data)
+            elif data.get('type') == 'set_switch':
+                self.handle_set_switch(data)
+            elif data.get('type') == 'config_begin':
+                self.handle_config_begin(data)
+            elif data.get('type') == 'config_chunk':
+                return self.handle_config_chunk(data)
+            elif data.get('type') == 'config_end':
+                self.handle_config_end(data)
+            elif data.get('type') == 'fw_begin':
+                self.handle_fw_begin(data)
+            elif data.get('type') == 'fw_chunk':
+                return self.handle_fw_chunk(data)
+            elif data.get('type') == 'fw_end':
+                self.handle_fw_end(data)
+            elif data.get('type') == 'clock_start':
+                self.handle_clock_start(data)
+            elif data.get('type') == 'clock_stop':
+                self.clock_running = False
+                self.log(f"MIDI clock zaustavljen nakon {self.clock_ticks} impulsa")
+            elif data.get('type') == 'get_config':
+                self.handle_get_config(data)
+            elif data.get('type') == 'preset_store':
+                self.handle_preset_store(data)
+            elif data.get('type') == 'preset_activate':
+                return self.handle_preset_activate(data)
+            elif data.get('type') == 'get_slots':
+                self.send_response({
+                    "type": "slots",
+                    "slots": {str(slot): stored['digest'] for slot, stored in self.preset_slots.items()}
+                })
+            elif data.get('type') == 'noop':
+                pass  # Prazna poruka (mjerenje kašnjenja kroz okvire) - samo ack okvira
             elif data.get('type') == 'ping':
                 self.handle_ping(data)
+            elif data.get('type') == 'set_baud':
+                self.handle_set_baud(data)
             else:
-                print(f"Nepoznat tip poruke: {data}")
+                self.log(f"Nepoznat tip poruke: {data}")
                 
         except json.JSONDecodeError:
-            print(f"Neispravna JSON poruka: {message}")
+            self.log(f"Neispravna JSON poruka: {message}")
+            self.revert_baudrate()
+    
+    def handle_frame(self, data):
+        seq = data.get('seq')
+        payload = data.get('data', '')
+        
+        # Nova sesija hosta (identitet u okviru; stariji host bez njega - novo
+        # otvaranje loopback porta) - redni brojevi kreću ispočetka
+        session = data.get('session', getattr(self.connection, 'host_sessions', None))
+        if session != self.host_session:
+            self.host_session = session
+            self.seen_frames.clear()
+        
+        if self.drop_rate and random.random() < self.drop_rate:
+            self.log(f"Okvir {seq} namjerno izgubljen")
+            return
+        
+        crc = format(zlib.crc32(payload.encode('utf-8')) & 0xFFFFFFFF, '08x')
+        if crc != data.get('crc'):
+            self.log(f"Okvir {seq} ima neispravan CRC")
+            self.send_response({"type": "nack", "seq": seq, "reason": "crc"})
+            return
+        
+        # Duplikat (izgubljen ACK) - samo ponovo potvrdi
+        if seq not in self.seen_frames:
+            if self.process_message(payload) is False:
+                # Sadržaj odbijen (npr. neispravan CRC dijela) - traži ponovno slanje
+                self.send_response({"type": "nack", "seq": seq, "reason": "rejected"})
+                return
+            self.seen_frames.append(seq)
+        
+        self.send_response({"type": "ack", "seq": seq})
     
     def handle_config(self, data):
-        print(f"Konfiguracija za {len(data.get('switches', []))} tastera:")
+        self.log(f"Konfiguracija za {len(data.get('switches', []))} tastera:")
         
+        self.switches = {switch.get('id'): switch for switch in data.get('switches', [])}
+        self.midi = {}
+        self.store_midi_bank(0, data.get('midi'))
         for switch in data.get('switches', []):
             status = "AKTIVNO" if switch.get('enabled') else "NEAKTIVNO"
-            print(f"  Taster {switch.get('id', '?')+1}: {switch.get('name', 'N/A')} "
+            self.log(f"  Taster {switch.get('id', '?')+1}: {switch.get('name', 'N/A')} "
                   f"(CC{switch.get('cc', '?')}, vrednost: {switch.get('value', '?')}) - {status}")
         
         # Pošalji potvrdu
@@ -77,8 +205,199 @@ class MIDIDeviceSimulator:
         }
         self.send_response(response)
     
+    def handle_config_begin(self, data):
+        total = data.get('slots', 0)
+        self.config_stream = {'slots': total, 'switches': 0}
+        # Slotovi izvan novog rasporeda se brišu
+        self.switches = {key: switch for key, switch in self.switches.items() if isinstance(key, int) and key < total}
+        self.log(f"Početak konfiguracije: {data.get('banks')} banaka x {data.get('switches_per_bank')} tastera")
+    
+    def handle_config_chunk(self, data):
+        if self.config_stream is None:
+            return False
+        for switch in data.get('switches', []):
+            if isinstance(switch.get('id'), int) and switch['id'] < self.config_stream['slots']:
+                self.switches[switch['id']] = switch
+                self.config_stream['switches'] += 1
+        self.store_midi_bank(data.get('first', 0), data.get('midi'))
+        self.log(f"  Primljeno {len(data.get('switches', []))} tastera od slota {data.get('first', 0) + 1}")
+        return True
+    
+    def handle_config_end(self, data):
+        stream = self.config_stream
+        self.config_stream = None
+        if stream is None:
+            self.send_response({"type": "config_ack", "status": "error", "message": "Nema config_begin"})
+            return
+        self.send_response({
+            "type": "config_ack",
+            "status": "success",
+            "switches": stream['switches'],
+            "message": f"Konfiguracija primljena za {stream['switches']} tastera u {data.get('chunks', 0)} dijelova"
+        })
+    
+    def store_midi_bank(self, first, payload):
+        # Bafer banke se dijeli po pomacima - svaki taster dobija svoj segment bajtova
+        if not payload:
+            return
+        buffer = base64.b64decode(payload['data'])
+        offsets = payload['offsets']
+        for index in range(len(offsets) - 1):
+            self.midi[first + index] = buffer[offsets[index]:offsets[index + 1]]
+    
+    def handle_set_switch(self, data):
+        # Ažuriranje uživo jednog tastera - bez odgovora
+        switch = data.get('switch', {})
+        self.switches[switch.get('id')] = switch
+        if data.get('midi') is not None:
+            self.midi[switch.get('id')] = base64.b64decode(data['midi'])
+        self.log(f"  Taster {switch.get('id', 0)+1} ažuriran: {switch.get('name', 'N/A')} ({switch.get('color', 'N/A')})")
+    
+    def handle_fw_begin(self, data):
+        size = data.get('size', 0)
+        crc = data.get('crc')
+        chunk_size = min(data.get('chunk_size', 512), 4096)
+        
+        # Ista slika kao prije prekida - nastavi od prvog dijela koji nedostaje
+        if not (self.firmware and self.firmware['size'] == size and self.firmware['crc'] == crc
+                and self.firmware['chunk_size'] == chunk_size):
+            self.firmware = {'size': size, 'crc': crc, 'chunk_size': chunk_size,
+                             'data': bytearray(size), 'received': set(), 'chunks': 0}
+        
+        offset = 0
+        while offset < size and offset in self.firmware['received']:
+            offset += chunk_size
+        
+        self.send_response({
+            "type": "fw_ready",
+            "offset": min(offset, size),
+            "chunk_size": chunk_size,
+            "message": f"Spreman za firmware od {size} bytes (od {offset})"
+        })
+    
+    def handle_fw_chunk(self, data):
+        if not self.firmware:
+            return False
+        
+        chunk = base64.b64decode(data.get('data', ''))
+        offset = data.get('offset', 0)
+        if format(zlib.crc32(chunk) & 0xFFFFFFFF, '08x') != data.get('crc') or offset + len(chunk) > self.firmware['size']:
+            self.log(f"Dio firmware-a na {offset} je neispravan")
+            return False
+        
+        self.firmware['data'][offset:offset + len(chunk)] = chunk
+        self.firmware['received'].add(offset)
+        self.firmware['chunks'] += 1
+        
+        if self.firmware_chunk_limit and self.firmware['chunks'] >= self.firmware_chunk_limit:
+            # Simulirani prekid veze usred slanja
+            self.firmware_chunk_limit = None
+            self.log("Simuliram prekid veze tokom slanja firmware-a")
+            self.running = False
+        return True
+    
+    def handle_fw_end(self, data):
+        firmware = self.firmware
+        if not firmware:
+            self.send_response({"type": "fw_done", "status": "error", "reason": "nema fw_begin"})
+            return
+        
+        missing = [o for o in range(0, firmware['size'], firmware['chunk_size']) if o not in firmware['received']]
+        crc = format(zlib.crc32(bytes(firmware['data'])) & 0xFFFFFFFF, '08x')
+        if missing:
+            self.send_response({"type": "fw_done", "status": "error", "reason": f"nedostaje dio na {missing[0]}"})
+        elif crc != firmware['crc']:
+            self.send_response({"type": "fw_done", "status": "error", "reason": "crc"})
+        else:
+            self.installed_firmware = bytes(firmware['data'])
+            self.firmware = None
+            self.send_response({"type": "fw_done", "status": "ok", "crc": crc,
+                                "message": f"Firmware od {firmware['size']} bytes instaliran"})
+    
+    def handle_led(self, data):
+        # LED okvir uživo - bez odgovora, samo se prikaže
+        pixels = base64.b64decode(data.get('c', ''))
+        offset = data.get('o', 0) * 3
+        leds = bytearray(self.leds)
+        if len(leds) < offset + len(pixels):
+            leds.extend(bytes(offset + len(pixels) - len(leds)))
+        leds[offset:offset + len(pixels)] = pixels
+        self.leds = bytes(leds)
+        
+        frame = data.get('f', 0)
+        if self.last_led_frame is not None:
+            self.led_frames_missed += (frame - self.last_led_frame - 1) & 0xFFFF
+        self.last_led_frame = frame
+        self.led_frames += 1
+    
+    def handle_clock_start(self, data):
+        self.clock_running = True
+        self.clock_ticks = 0
+        self.clock_times.clear()
+        self.log(f"MIDI clock pokrenut ({data.get('bpm')} BPM)")
+    
+    def handle_clock(self, data):
+        self.clock_ticks += 1
+        self.clock_times.append(time.perf_counter())
+    
+    def clock_bpm(self):
+        """Tempo izračunat iz vremena prijema clock impulsa (24 po četvrtini)."""
+        if len(self.clock_times) < 2:
+            return None
+        interval = (self.clock_times[-1] - self.clock_times[0]) / (len(self.clock_times) - 1)
+        return 60.0 / (interval * 24)
+    
+    def handle_preset_store(self, data):
+        slot = data.get('slot')
+        if data.get('first', 0) == 0:
+            self.preset_slots[slot] = {'digest': None, 'switches': {}, 'midi': {}}
+        stored = self.preset_slots.setdefault(slot, {'digest': None, 'switches': {}, 'midi': {}})
+        for switch in data.get('switches', []):
+            stored['switches'][switch['id']] = switch
+        if data.get('midi'):
+            buffer = base64.b64decode(data['midi']['data'])
+            offsets = data['midi']['offsets']
+            for index, switch in enumerate(data.get('switches', [])):
+                stored['midi'][switch['id']] = buffer[offsets[index]:offsets[index + 1]]
+        # Otisak važi tek kada je primljen cijeli preset
+        if len(stored['switches']) >= data.get('total', 0):
+            stored['digest'] = data.get('digest')
+        self.log(f"Preset slot {slot + 1}: primljeno {len(stored['switches'])}/{data.get('total', 0)} tastera")
+    
+    def handle_preset_activate(self, data):
+        stored = self.preset_slots.get(data.get('slot'))
+        if not stored or stored['digest'] is None:
+            self.log(f"Preset slot {data.get('slot')} je prazan")
+            return False
+        self.switches = dict(stored['switches'])
+        self.midi = dict(stored['midi'])
+        self.active_preset_slot = data['slot']
+        self.log(f"Aktiviran preset slot {data['slot'] + 1}")
+        return True
+    
+    def handle_get_config(self, data):
+        # Vrati konfiguraciju koju uređaj trenutno drži (po stranicama ako je tražen `first`)
+        keys = sorted(self.switches, key=lambda k: k if isinstance(k, int) else -1)
+        if data.get('first') is None:
+            switches = [self.switches[key] for key in keys]
+            self.send_response({
+                "type": "config",
+                "switches": switches,
+                "message": f"Aktivna konfiguracija ({len(switches)} tastera)"
+            })
+            return
+        
+        first = data['first']
+        page = [key for key in keys if isinstance(key, int) and key >= first][:data.get('count', 24)]
+        self.send_response({
+            "type": "config",
+            "first": first,
+            "total": len(keys),
+            "switches": [self.switches[key] for key in page]
+        })
+    
     def handle_ping(self, data):
-        print(f"Ping poruka: {data.get('message', 'N/A')}")
+        self.log(f"Ping poruka: {data.get('message', 'N/A')}")
         
         # Pošalji pong odgovor
         response = {
@@ -86,28 +405,124 @@ class MIDIDeviceSimulator:
             "status": "ok",
             "message": "MIDI Device aktivan"
         }
+        if self.device_id:
+            response["device_id"] = self.device_id
         self.send_response(response)
     
+    def handle_set_baud(self, data):
+        requested = [b for b in data.get('baudrates', []) if b in SUPPORTED_BAUDRATES]
+        if not requested:
+            self.log(f"Nijedna tražena brzina nije podržana: {data.get('baudrates')}")
+            return
+        
+        new_baudrate = max(requested)
+        
+        # Potvrda ide na staroj brzini, tek onda se prebacujemo
+        self.send_response({
+            "type": "baud_ack",
+            "baudrate": new_baudrate,
+            "message": f"Prelazim na {new_baudrate} baud"
+        })
+        self.switch_baudrate(new_baudrate)
+        
+        if new_baudrate != self.base_baudrate:
+            self.baud_confirm_deadline = time.time() + BAUD_CONFIRM_TIMEOUT
+    
+    def switch_baudrate(self, baudrate):
+        if baudrate == self.baudrate:
+            return
+        self.connection.flush()
+        self.connection.baudrate = baudrate
+        self.baudrate = baudrate
+        self.log(f"Brzina promijenjena na {baudrate} baud")
+    
+    def check_baud_confirmation(self):
+        if self.baud_confirm_deadline and time.time() > self.baud_confirm_deadline:
+            self.log("Nova brzina nije potvrđena")
+            self.revert_baudrate()
+    
+    def revert_baudrate(self):
+        self.baud_confirm_deadline = None
+        if self.baudrate != self.base_baudrate:
+            self.log(f"Vraćam osnovnu brzinu {self.base_baudrate} baud")
+            self.switch_baudrate(self.base_baudrate)
+    
     def send_response(self, response):
         try:
+            if self.response_delay:
+                time.sleep(self.response_delay)
             json_response = json.dumps(response, ensure_ascii=False)
-            self.connection.write((json_response + '\n').encode('utf-8'))
-            self.connection.flush()
-            print(f"Poslat odgovor: {response.get('message', 'N/A')}")
+            with self.write_lock:
+                self.connection.write((json_response + '\n').encode('utf-8'))
+                self.connection.flush()
+            self.log(f"Poslat odgovor: {response.get('message', response.get('type', 'N/A'))}")
         except Exception as e:
-            print(f"Greška pri slanju odgovora: {e}")
+            self.log(f"Greška pri slanju odgovora: {e}")
+    
+    def emit_event(self, event):
+        """Pošalji nezatražen događaj (npr. pritisak tastera) kao što to radi firmware."""
+        event = dict(event, uptime_ms=int(time.monotonic() * 1000))
+        with self.write_lock:
+            self.connection.write((json.dumps(event, ensure_ascii=False) + '\n').encode('utf-8'))
+            self.connection.flush()
+        self.events_sent += 1
+    
+    def press_switch(self, switch_id, state='down'):
+        """Simuliraj pritisak (ili otpuštanje) tastera."""
+        switch = self.switches.get(switch_id, {})
+        self.emit_event({"type": "button", "switch": switch_id, "state": state, "cc": switch.get('cc')})
+    
+    def run_macro(self, switch_id):
+        """Izvrši bajtkod makroa tastera kao uređaj; vraća [(ms od početka, poslani MIDI bajtovi)]."""
+        blob = base64.b64decode(self.switches.get(switch_id, {}).get('macro') or '')
+        if not blob or blob[0] != 1:
+            return []
+        
+        def varint(offset):
+            value = shift = 0
+            while True:
+                byte = blob[offset]
+                offset += 1
+                value |= (byte & 0x7F) << shift
+                if not byte & 0x80:
+                    return value, offset
+                shift += 7
+        
+        output = []
+        start = time.perf_counter()
+        due = 0.0  # Rokovi se računaju od početka makroa, pa se pauze ne sabiraju sa kašnjenjem
+        offset = 1
+        while offset < len(blob) and blob[offset] != 0x00:
+            opcode = blob[offset]
+            value, offset = varint(offset + 1)
+            if opcode == 0x01:
+                output.append((round((time.perf_counter() - start) * 1000, 3), blob[offset:offset + value]))
+                offset += value
+            elif opcode == 0x02:
+                due += value / 1000.0
+                delay = start + due - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+        self.log(f"Makro tastera {switch_id + 1}: {len(output)} slanja za {(time.perf_counter() - start) * 1000:.1f} ms")
+        return output
+    
+    def log(self, message):
+        if self.verbose:
+            print(message)
     
     def stop(self):
         self.running = False
 
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print("Upotreba: python midi_device_simulator.py <serial_port>")
+    if len(sys.argv) not in (2, 3):
+        print("Upotreba: python midi_device_simulator.py <serial_port> [baudrate]")
         print("Primjer: python midi_device_simulator.py /dev/ttyUSB0")
+        print("Bez hardvera: python midi_device_simulator.py pty://  (ispisuje port za backend)")
         sys.exit(1)
     
     port = sys.argv[1]
-    simulator = MIDIDeviceSimulator(port)
+    baudrate = int(sys.argv[2]) if len(sys.argv) == 3 else BASE_BAUDRATE
+    simulator = MIDIDeviceSimulator(port, baudrate)
     
     try:
         simulator.start()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+MIDI encoder - compiles commands into raw MIDI bytes with running status
+"""
+
+import base64
+import logging
+
+# Vrste MIDI poruka koje komanda može poslati ('auto' bira prema vrijednosti)
+MIDI_TYPES = ('auto', 'cc', 'pc', 'nrpn', 'rpn')
+
+# Kontroleri za odabir parametra i slanje 14-bitne vrijednosti
+NRPN_PARAM_MSB, NRPN_PARAM_LSB = 99, 98
+RPN_PARAM_MSB, RPN_PARAM_LSB = 101, 100
+DATA_ENTRY_MSB, DATA_ENTRY_LSB = 6, 38
+
+CONTROL_CHANGE = 0xB0
+PROGRAM_CHANGE = 0xC0
+
+logger = logging.getLogger(__name__)
+
+class MidiEncodingError(ValueError):
+    """Greška kada vrijednost komande ne stane u odabranu MIDI poruku."""
+
+def resolve_type(midi_type, value):
+    """Vrati stvarnu vrstu poruke: 'auto' je CC do 127, a NRPN za veće vrijednosti."""
+    if midi_type in (None, 'auto'):
+        return 'cc' if value <= 127 else 'nrpn'
+    return midi_type
+
+def validate_midi(midi_type, channel, param, value):
+    """Provjeri MIDI podešavanja komande; vraća poruku greške ili None."""
+    if midi_type not in MIDI_TYPES:
+        return f"midi_type mora biti jedno od: {', '.join(MIDI_TYPES)}"
+    if not isinstance(channel, int) or not 1 <= channel <= 16:
+        return 'midi_channel mora biti broj između 1 i 16'
+    kind = resolve_type(midi_type, value)
+    if param is not None:
+        if kind == 'pc':
+            return 'midi_param nije dozvoljen za program change'
+        limit = 127 if kind == 'cc' else 16383
+        if not isinstance(param, int) or not 0 <= param <= limit:
+            return f'midi_param mora biti između 0 i {limit}'
+    if kind in ('cc', 'pc') and value > 127:
+        return f'Vrijednost za {kind} mora biti između 0 i 127'
+    if kind in ('nrpn', 'rpn') and value > 16383:
+        if midi_type in (None, 'auto'):
+            # Dijeljenje na broj parametra bi na stvarnom uređaju mijenjalo nepovezan parametar
+            return 'Vrijednost iznad 16383 ne stane u MIDI poruku (NRPN/RPN prenose najviše 14 bita)'
+        return f'Vrijednost za {kind} mora biti između 0 i 16383'
+    return None
+
+def command_messages(midi_type, channel, value, param=None):
+    """Pretvori komandu u listu MIDI poruka (status, podaci...).
+
+    - cc: kontroler `param` (bez njega kontroler je sama vrijednost, kao u set_config)
+    - pc: program `value`
+    - nrpn/rpn: parametar `param` (bez njega 0), 14-bitna vrijednost kroz Data Entry MSB/LSB
+    """
+    channel_bits = (channel - 1) & 0x0F
+    value = value or 0
+    kind = resolve_type(midi_type, value)
+
+    if kind == 'pc':
+        if value > 127:
+            raise MidiEncodingError(f"Program change {value} nije u opsegu 0-127")
+        return [(PROGRAM_CHANGE | channel_bits, value)]
+
+    if kind == 'cc':
+        if value > 127:
+            raise MidiEncodingError(f"CC vrijednost {value} nije u opsegu 0-127")
+        controller = value if param is None else param
+        return [(CONTROL_CHANGE | channel_bits, controller & 0x7F, value)]
+
+    if value > 0x3FFF:
+        raise MidiEncodingError(f"{kind.upper()} vrijednost {value} nije u opsegu 0-16383")
+    if param is None:
+        param = 0
+    data = value
+    param_msb, param_lsb = (NRPN_PARAM_MSB, NRPN_PARAM_LSB) if kind == 'nrpn' else (RPN_PARAM_MSB, RPN_PARAM_LSB)
+    status = CONTROL_CHANGE | channel_bits
+    return [
+        (status, param_msb, (param >> 7) & 0x7F),
+        (status, param_lsb, param & 0x7F),
+        (status, DATA_ENTRY_MSB, data >> 7),
+        (status, DATA_ENTRY_LSB, data & 0x7F),
+    ]
+
+class RunningStatusEncoder:
+    """Upisuje MIDI poruke u bafer, izostavljajući ponovljeni status bajt (running status)."""
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.running_status = None
+
+    def reset(self):
+        """Sljedeća poruka počinje sa status bajtom (npr. na početku segmenta)."""
+        self.running_status = None
+
+    def write(self, status, *data):
+        if 0xF8 <= status:
+            # Real-time poruke ne mijenjaju running status
+            self.buffer.append(status)
+            return
+        if status != self.running_status or status >= 0xF0:
+            self.buffer.append(status)
+        # Sistemske poruke poništavaju running status
+        self.running_status = status if status < 0xF0 else None
+        self.buffer.extend(data)
+
+    def write_all(self, messages):
+        for message in messages:
+            self.write(*message)
+
+def encode_messages(messages):
+    """Kodiraj listu poruka u bajtove sa running status kompresijom."""
+    encoder = RunningStatusEncoder()
+    encoder.write_all(messages)
+    return bytes(encoder.buffer)
+
+def switch_messages(button_data):
+    """MIDI poruke tastera iz podataka mapiranja (prazna lista za nemapiran taster i makro)."""
+    if button_data.get('command_name') is None or button_data.get('macro'):
+        return []
+    try:
+        return command_messages(
+            button_data.get('midi_type'),
+            button_data.get('midi_channel') or 1,
+            button_data.get('command_value') or 0,
+            button_data.get('midi_param')
+        )
+    except MidiEncodingError as e:
+        # Komanda sačuvana prije provjere opsega - taster ostaje bez MIDI bajtova, ostali se šalju
+        logger.warning(f"Komanda '{button_data.get('command_name')}' se ne može kodirati: {e}")
+        return []
+
+def encode_bank(switch_message_lists):
+    """Kodiraj tastere banke u jedan bafer i vrati (bafer, pomaci).
+
+    Svaki taster je segment koji počinje status bajtom, pa uređaj može
+    proslijediti `buffer[offsets[i]:offsets[i + 1]]` bez ikakve obrade;
+    running status se koristi unutar segmenta (NRPN: 12 -> 9 bajtova).
+    """
+    encoder = RunningStatusEncoder()
+    offsets = [0]
+    for messages in switch_message_lists:
+        encoder.reset()
+        encoder.write_all(messages)
+        offsets.append(len(encoder.buffer))
+    return bytes(encoder.buffer), offsets
+
+def bank_payload(switch_message_lists):
+    """Kodirana banka u obliku za JSON poruku: base64 bafer i pomaci tastera."""
+    buffer, offsets = encode_bank(switch_message_lists)
+    return {'data': base64.b64encode(buffer).decode('ascii'), 'offsets': offsets}
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Payload cache - compiled configuration payloads keyed by a data version counter
+"""
+
+import json
+import logging
+import threading
+from collections import OrderedDict
+
+from config import PAYLOAD_CACHE_SIZE
+from config_delivery import CompiledConfig, load_button_data, button_data_from_preset
+from database import db_manager
+
+logger = logging.getLogger(__name__)
+
+class PayloadCache:
+    """Keš podataka za slanje i njihovih sastavljenih poruka.
+
+    Svaki upis koji mijenja mapiranja, komande ili presete poveća `version`
+    (bump). Dok se verzija ne promijeni, ponovno slanje iste konfiguracije
+    (ponavljanje, slanje na više uređaja, vraćanje nakon prekida veze) ne
+    čita bazu i ne sastavlja poruke ponovo.
+    """
+
+    def __init__(self, size=PAYLOAD_CACHE_SIZE):
+        self.size = size
+        self.version = 0
+        self.entries = OrderedDict()  # (baza, preset_id) -> CompiledConfig
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def bump(self, source):
+        """Podaci su izmijenjeni (`source` - mappings, color, commands, preset); pozvati nakon commit-a."""
+        with self.lock:
+            self.version += 1
+            self.entries.clear()
+        logger.debug(f"Verzija podataka za slanje: {self.version} ({source})")
+
+    def load(self, preset_id=None, db=None):
+        """Podaci tastera za slanje (trenutna mapiranja ili preset) kao CompiledConfig; None ako preset ne postoji."""
+        db = db or db_manager
+        key = (db.db_path, preset_id)
+        with self.lock:
+            version = self.version
+            cached = self.entries.get(key)
+            if cached is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return cached
+            self.misses += 1
+
+        with db.get_connection() as conn:
+            cursor = conn.cursor()
+            if preset_id is None:
+                button_data = load_button_data(cursor)
+            else:
+                cursor.execute('SELECT config_data FROM presets WHERE id = ?', (preset_id,))
+                row = cursor.fetchone()
+                if not row:
+                    return None
+                button_data = button_data_from_preset(json.loads(row['config_data']))
+
+        compiled = CompiledConfig(button_data, version)
+        with self.lock:
+            # Izmjena tokom čitanja - rezultat važi samo za ovaj poziv
+            if self.version == version:
+                self.entries[key] = compiled
+                while len(self.entries) > self.size:
+                    self.entries.popitem(last=False)
+        return compiled
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'version': self.version,
+                'entries': len(self.entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else None
+            }
+
+# Globalna instanca keša podataka za slanje
+payload_cache = PayloadCache()
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Preset slots - presets preloaded into device memory with LRU slot management
+"""
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from datetime import datetime
+
+from config import PRESET_SLOT_COUNT, PRESET_SLOT_SYNC_TIMEOUT, CONFIG_STREAM_CHUNK_SWITCHES
+from device_mirror import device_mirror
+from midi_encoder import bank_payload, switch_messages
+
+logger = logging.getLogger(__name__)
+
+def preset_digest(switches):
+    """Otisak kompajlirane konfiguracije - izmjena komande ili boje daje novi otisak."""
+    encoded = json.dumps(switches, sort_keys=True, separators=(',', ':')).encode('utf-8')
+    return hashlib.sha1(encoded).hexdigest()[:16]
+
+class PresetSlots:
+    """Zauzetost preset slotova po portu, sa izbacivanjem najdavnije korištenog (LRU).
+
+    Preset se unaprijed upiše u slot uređaja (`preset_store`), pa promjena
+    preseta na bini postaje jedna kratka `preset_activate` poruka. Slot se
+    prepoznaje po otisku sadržaja; nakon novog povezivanja tabela je
+    zastarjela dok se ne uporedi sa otiscima koje vrati uređaj (`get_slots`).
+    """
+
+    def __init__(self, slot_count=PRESET_SLOT_COUNT):
+        self.slot_count = slot_count
+        self.ports = {}
+        self.lock = threading.Lock()
+        self.clock = 0  # Brojač korištenja (LRU redoslijed)
+
+    def _entry(self, port):
+        entry = self.ports.get(port)
+        if entry is None:
+            entry = self.ports[port] = {'slots': [None] * self.slot_count, 'active': None, 'stale': True}
+        return entry
+
+    def _touch(self, slot_info):
+        self.clock += 1
+        slot_info['last_used'] = self.clock
+
+    def mark_stale(self, port):
+        """Sadržaj slotova treba potvrditi sa uređajem (npr. nakon ponovnog povezivanja)."""
+        with self.lock:
+            entry = self.ports.get(port)
+            if entry is not None:
+                entry['stale'] = True
+
+    def forget_preset(self, preset_id):
+        """Preset je obrisan - njegovi slotovi postaju prvi kandidati za izbacivanje."""
+        with self.lock:
+            for entry in self.ports.values():
+                for slot_info in entry['slots']:
+                    if slot_info and slot_info['preset_id'] == preset_id:
+                        slot_info['preset_id'] = None
+                        slot_info['last_used'] = 0
+
+    def sync(self, comm):
+        """Uporedi tabelu slotova sa otiscima na uređaju (bez odgovora slotovi se smatraju praznim)."""
+        comm.write_message({'type': 'get_slots'})
+        reply = comm.read_message(PRESET_SLOT_SYNC_TIMEOUT, types=('slots',))
+        device_digests = (reply or {}).get('slots') or {}
+        with self.lock:
+            entry = self._entry(comm.port)
+            for index in range(self.slot_count):
+                digest = device_digests.get(str(index))
+                known = entry['slots'][index]
+                if digest is None:
+                    entry['slots'][index] = None
+                elif known is None or known['digest'] != digest:
+                    # Sadržaj nepoznatog porijekla - zadržava se dok ne zatreba mjesto
+                    entry['slots'][index] = {'preset_id': None, 'name': None, 'digest': digest,
+                                             'switches': None, 'last_used': 0, 'stored': None}
+            if reply is None:
+                logger.warning(f"Uređaj na portu {comm.port} nije vratio sadržaj slotova")
+            entry['active'] = None
+            entry['stale'] = False
+
+    def load(self, comm, preset_id, button_data, name=None):
+        """Osiguraj da je preset u nekom slotu; vraća (slot, da li je već bio učitan)."""
+        switches = list(comm.iter_switch_configs(button_data))
+        digest = preset_digest(switches)
+        if self._entry(comm.port)['stale']:
+            self.sync(comm)
+
+        with self.lock:
+            entry = self._entry(comm.port)
+            for index, slot_info in enumerate(entry['slots']):
+                if slot_info and slot_info['digest'] == digest:
+                    slot_info.update(preset_id=preset_id, name=name)
+                    if slot_info['switches'] is None:
+                        slot_info['switches'] = switches
+                    self._touch(slot_info)
+                    return index, True
+            index = self._pick_slot(entry)
+
+        messages = self._store_messages(index, digest, switches, button_data)
+        report = comm.send_messages(messages)
+        with self.lock:
+            entry = self._entry(comm.port)
+            evicted = entry['slots'][index]
+            if evicted and evicted['preset_id'] is not None:
+                logger.info(f"Slot {index + 1} na portu {comm.port}: preset {evicted['preset_id']} izbačen")
+            if entry['active'] == index:
+                entry['active'] = None
+            entry['slots'][index] = {
+                'preset_id': preset_id,
+                'name': name,
+                'digest': digest,
+                'switches': switches,
+                'last_used': 0,
+                'stored': datetime.now().isoformat()
+            }
+            self._touch(entry['slots'][index])
+        logger.info(f"Preset {preset_id} upisan u slot {index + 1} na portu {comm.port} "
+                    f"({len(messages)} poruka, {report['latency_ms']['max']} ms)")
+        return index, False
+
+    def _pick_slot(self, entry):
+        """Prazan slot ili najdavnije korišten (aktivni slot se ne izbacuje dok ima drugih)."""
+        for index, slot_info in enumerate(entry['slots']):
+            if slot_info is None:
+                return index
+        candidates = [index for index in range(self.slot_count) if index != entry['active']] or [entry['active']]
+        return min(candidates, key=lambda index: entry['slots'][index]['last_used'])
+
+    def _store_messages(self, index, digest, switches, button_data):
+        """Poruke za upis preseta u slot, u dijelovima kao kod konfiguracije više banaka."""
+        button_dict = {data['button']: data for data in button_data}
+        messages = []
+        for first in range(0, len(switches), CONFIG_STREAM_CHUNK_SWITCHES):
+            chunk = switches[first:first + CONFIG_STREAM_CHUNK_SWITCHES]
+            messages.append({
+                'type': 'preset_store',
+                'slot': index,
+                'digest': digest,
+                'first': first,
+                'total': len(switches),
+                'switches': chunk,
+                'midi': bank_payload(switch_messages(button_dict.get(switch['id'] + 1, {})) for switch in chunk)
+            })
+        return messages
+
+    def activate(self, comm, preset_id, button_data, name=None):
+        """Aktiviraj preset na uređaju (upis u slot samo ako već nije učitan)."""
+        start = time.perf_counter()
+        index, hit = self.load(comm, preset_id, button_data, name)
+        report = self.activate_slot(comm, index)
+        report.update(hit=hit, latency_ms=round((time.perf_counter() - start) * 1000, 3))
+        return report
+
+    def activate_slot(self, comm, index):
+        """Pošalji `preset_activate` za slot (0-based); None ako je slot prazan."""
+        if self._entry(comm.port)['stale']:
+            self.sync(comm)
+        with self.lock:
+            entry = self._entry(comm.port)
+            slot_info = entry['slots'][index]
+        if slot_info is None:
+            return None
+
+        start = time.perf_counter()
+        comm.send_messages([{'type': 'preset_activate', 'slot': index}])
+        activate_ms = round((time.perf_counter() - start) * 1000, 3)
+
+        with self.lock:
+            entry['active'] = index
+            self._touch(slot_info)
+        if slot_info['switches'] is not None:
+            device_mirror.replace(comm.port, slot_info['switches'], 'preset')
+        else:
+            device_mirror.mark_stale(comm.port)
+        return {
+            'slot': index + 1,
+            'preset_id': slot_info['preset_id'],
+            'activate_ms': activate_ms
+        }
+
+    def status(self, port):
+        """Zauzetost slotova porta (1-based brojevi slotova, najskorije korišten prvi u `lru`)."""
+        with self.lock:
+            entry = self._entry(port)
+            slots = []
+            for index, slot_info in enumerate(entry['slots']):
+                slot = {'slot': index + 1, 'empty': slot_info is None}
+                if slot_info:
+                    slot.update({key: slot_info[key] for key in ('preset_id', 'name', 'digest', 'stored')})
+                slots.append(slot)
+            used = [index for index, slot_info in enumerate(entry['slots']) if slot_info]
+            used.sort(key=lambda index: entry['slots'][index]['last_used'], reverse=True)
+            return {
+                'port': port,
+                'slot_count': self.slot_count,
+                'active': entry['active'] + 1 if entry['active'] is not None else None,
+                'stale': entry['stale'],
+                'lru': [index + 1 for index in used],
+                'slots': slots
+            }
+
+# Globalna instanca tabele preset slotova
+preset_slots = PresetSlots()
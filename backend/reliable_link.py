@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Reliable delivery layer for MIDI Configurator serial link
+"""
+
+import json
+import logging
+import time
+import zlib
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+class DeliveryError(Exception):
+    """Greška kada okvir nije potvrđen ni nakon maksimalnog broja ponavljanja."""
+
+def frame_crc(data):
+    """CRC32 sadržaja okvira kao hex string."""
+    return format(zlib.crc32(data.encode('utf-8')) & 0xFFFFFFFF, '08x')
+
+def serialize_message(message):
+    """Kompaktan JSON poruke u obliku koji se prenosi unutar okvira."""
+    return json.dumps(message, ensure_ascii=False, separators=(',', ':'))
+
+def build_frame(seq, message, session=None):
+    """Upakuj poruku u okvir sa rednim brojem i CRC-om.
+
+    Poruka se prenosi kao JSON string kako bi uređaj mogao provjeriti CRC
+    nad tačno onim bajtovima koje je backend poslao. Već serijalizovana
+    poruka (str iz serialize_message) se ne kodira ponovo. `session`
+    (identitet konekcije) govori uređaju kojoj sesiji pripada redni broj -
+    nova sesija briše njegovu listu viđenih okvira.
+    """
+    data = message if isinstance(message, str) else serialize_message(message)
+    frame = {
+        "type": "frame",
+        "seq": seq,
+        "crc": frame_crc(data),
+        "data": data
+    }
+    if session is not None:
+        frame["session"] = session
+    return frame
+
+class ReliableChannel:
+    """Pouzdana isporuka poruka sa rednim brojevima, ACK/NACK i kliznim prozorom."""
+
+    def __init__(self, communicator, window=4, ack_timeout=0.5, max_retries=3, on_ack=None):
+        self.communicator = communicator
+        self.window = max(1, window)
+        self.ack_timeout = ack_timeout
+        self.max_retries = max_retries
+        self.on_ack = on_ack  # Poziva se sa originalnom porukom kada uređaj potvrdi okvir
+
+    def send(self, messages):
+        """Pošalji poruke i čekaj potvrdu za svaku; vraća izvještaj o isporuci.
+
+        Do `window` okvira može biti nepotvrđeno u isto vrijeme. Okvir se šalje
+        ponovo nakon NACK-a ili isteka `ack_timeout`; nakon `max_retries`
+        neuspjelih ponavljanja baca se DeliveryError. `messages` može biti i
+        generator - poruke se uzimaju tek kada ima mjesta u prozoru.
+        """
+        pending = iter(messages)
+        next_message = next(pending, None)
+        in_flight = OrderedDict()
+        latencies = []
+        responses = []
+        total_retries = 0
+        start_time = time.monotonic()
+
+        while next_message is not None or in_flight:
+            # Popuni prozor
+            while next_message is not None and len(in_flight) < self.window:
+                seq = self.communicator.next_sequence()
+                frame = build_frame(seq, next_message, getattr(self.communicator, 'session', None))
+                now = time.monotonic()
+                self.communicator.write_message(frame)
+                in_flight[seq] = {'frame': frame, 'message': next_message, 'first_sent': now, 'sent_at': now, 'retries': 0}
+                next_message = next(pending, None)
+
+            oldest_deadline = min(entry['sent_at'] for entry in in_flight.values()) + self.ack_timeout
+            reply = self.communicator.read_message(max(0.0, oldest_deadline - time.monotonic()))
+            now = time.monotonic()
+
+            if reply is not None:
+                seq = reply.get('seq')
+                if reply.get('type') == 'ack' and seq in in_flight:
+                    entry = in_flight.pop(seq)
+                    latencies.append(now - entry['first_sent'])
+                    if self.on_ack:
+                        self.on_ack(entry['message'])
+                elif reply.get('type') == 'nack' and seq in in_flight:
+                    logger.debug(f"NACK za okvir {seq}: {reply.get('reason', 'n/a')}")
+                    total_retries += self._retransmit(seq, in_flight[seq], now)
+                elif reply.get('type') not in ('ack', 'nack'):
+                    # Odgovori na samu poruku (npr. config_ack) se vraćaju pozivaocu
+                    responses.append(reply)
+                continue
+
+            for seq, entry in list(in_flight.items()):
+                if now - entry['sent_at'] >= self.ack_timeout:
+                    total_retries += self._retransmit(seq, entry, now)
+
+        elapsed = time.monotonic() - start_time
+        report = {
+            'frames': len(latencies),
+            'retries': total_retries,
+            'elapsed_ms': round(elapsed * 1000, 2),
+            'latency_ms': {
+                'min': round(min(latencies) * 1000, 2) if latencies else None,
+                'avg': round(sum(latencies) / len(latencies) * 1000, 2) if latencies else None,
+                'max': round(max(latencies) * 1000, 2) if latencies else None
+            },
+            'responses': responses
+        }
+        logger.info(f"Isporučeno {report['frames']} okvira za {report['elapsed_ms']} ms, ponavljanja: {total_retries}")
+        return report
+
+    def _retransmit(self, seq, entry, now):
+        """Ponovo pošalji okvir; baca DeliveryError kada se iscrpe pokušaji."""
+        if entry['retries'] >= self.max_retries:
+            raise DeliveryError(f"Okvir {seq} nije potvrđen nakon {self.max_retries} ponavljanja")
+        entry['retries'] += 1
+        entry['sent_at'] = now
+        self.communicator.write_message(entry['frame'])
+        return 1
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+API routes for link latency benchmarks
+"""
+
+from flask import Blueprint, request, jsonify
+import logging
+from latency_benchmark import run_benchmark, BENCHMARK_MODES, BENCHMARK_MAX_COUNT, BENCHMARK_MAX_PAYLOAD
+from link_supervisor import link_supervisor
+from serial_comm import SerialCommunicator
+from config_delivery import port_lock
+from config import SERIAL_NEGOTIATE_BAUDRATE
+
+logger = logging.getLogger(__name__)
+
+# Kreiranje Blueprint-a za benchmark API
+benchmark_bp = Blueprint('benchmark', __name__)
+
+@benchmark_bp.route('/api/benchmark/latency', methods=['POST'])
+def benchmark_latency():
+    """Izmjeri RTT porta (`usbPort`, opciono `count`, `rate`, `payload`, `mode`)."""
+    try:
+        data = request.get_json() or {}
+        usb_port = data.get('usbPort')
+        count = data.get('count', 100)
+        rate = data.get('rate')
+        payload = data.get('payload', 0)
+        mode = data.get('mode', 'ping')
+
+        if not usb_port:
+            return jsonify({
+                'success': False,
+                'error': 'USB port je obavezan'
+            }), 400
+
+        if not isinstance(count, int) or not 0 < count <= BENCHMARK_MAX_COUNT \
+                or not isinstance(payload, int) or not 0 <= payload <= BENCHMARK_MAX_PAYLOAD \
+                or (rate is not None and (not isinstance(rate, (int, float)) or rate <= 0)) \
+                or mode not in BENCHMARK_MODES:
+            return jsonify({
+                'success': False,
+                'error': f"count 1-{BENCHMARK_MAX_COUNT}, payload 0-{BENCHMARK_MAX_PAYLOAD}, "
+                         f"rate > 0, mode: {', '.join(BENCHMARK_MODES)}"
+            }), 400
+
+        def measure(comm):
+            return run_benchmark(comm, count, rate, payload, mode)
+
+        with port_lock(usb_port):
+            if link_supervisor.is_supervised(usb_port):
+                report = link_supervisor.call(usb_port, measure)
+            else:
+                comm = SerialCommunicator()
+                if not comm.connect(usb_port):
+                    return jsonify({
+                        'success': False,
+                        'error': f'Nije moguće povezati se sa portom {usb_port}'
+                    }), 500
+                try:
+                    if SERIAL_NEGOTIATE_BAUDRATE:
+                        comm.negotiate_baudrate()
+                    report = measure(comm)
+                finally:
+                    comm.disconnect()
+
+        return jsonify({
+            'success': True,
+            'data': report
+        })
+
+    except Exception as e:
+        logger.error(f"Greška pri mjerenju kašnjenja: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+API routes for the MIDI clock and tap tempo
+"""
+
+from flask import Blueprint, request, jsonify
+import logging
+from midi_clock import midi_clock
+from link_supervisor import link_supervisor
+from serial_comm import SerialCommunicator
+from config_delivery import port_lock
+
+logger = logging.getLogger(__name__)
+
+# Kreiranje Blueprint-a za MIDI clock API
+clock_bp = Blueprint('clock', __name__)
+
+def _attach_port(port):
+    """Dodaj port u clock (nadgledana veza ili vlastita konekcija)."""
+    if port in midi_clock.targets:
+        return
+    if link_supervisor.is_supervised(port):
+        midi_clock.add_target(port, link_supervisor.acquire(port))
+        return
+    comm = SerialCommunicator()
+    # Impulsi vlastite veze se upisuju pod zaključavanjem porta, između slanja konfiguracije
+    comm.lock = port_lock(port)
+    with comm.lock:
+        if not comm.connect(port):
+            raise Exception(f'Nije moguće povezati se sa portom {port}')
+    midi_clock.add_target(port, comm, owned=True)
+
+@clock_bp.route('/api/clock', methods=['GET'])
+def get_clock():
+    """Stanje clock-a: tempo, broj impulsa i jitter percentili."""
+    try:
+        return jsonify({
+            'success': True,
+            'data': midi_clock.status()
+        })
+
+    except Exception as e:
+        logger.error(f"Greška pri dohvatanju stanja clock-a: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@clock_bp.route('/api/clock/start', methods=['POST'])
+def start_clock():
+    """Pokreni clock (opciono `bpm`) i dodaj uređaje iz `usbPorts`."""
+    try:
+        data = request.get_json() or {}
+        ports = data.get('usbPorts', [])
+        if not isinstance(ports, list):
+            return jsonify({
+                'success': False,
+                'error': 'usbPorts mora biti lista portova'
+            }), 400
+
+        for port in ports:
+            _attach_port(port)
+
+        try:
+            midi_clock.start(data.get('bpm'))
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+
+        return jsonify({
+            'success': True,
+            'data': midi_clock.status(),
+            'message': f'MIDI clock pokrenut ({midi_clock.bpm:.1f} BPM)'
+        })
+
+    except Exception as e:
+        logger.error(f"Greška pri pokretanju clock-a: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@clock_bp.route('/api/clock/stop', methods=['POST'])
+def stop_clock():
+    """Zaustavi clock; sa `release: true` uređaji se i uklanjaju."""
+    try:
+        data = request.get_json(silent=True) or {}
+        midi_clock.stop()
+        if data.get('release'):
+            for port in list(midi_clock.targets):
+                midi_clock.remove_target(port)
+
+        return jsonify({
+            'success': True,
+            'data': midi_clock.status(),
+            'message': 'MIDI clock zaustavljen'
+        })
+
+    except Exception as e:
+        logger.error(f"Greška pri zaustavljanju clock-a: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@clock_bp.route('/api/clock/tempo', methods=['POST'])
+def set_clock_tempo():
+    """Promijeni tempo (`bpm`) od sljedećeg impulsa."""
+    try:
+        bpm = (request.get_json() or {}).get('bpm')
+        if not isinstance(bpm, (int, float)):
+            return jsonify({
+                'success': False,
+                'error': 'bpm je obavezan'
+            }), 400
+
+        try:
+            midi_clock.set_tempo(bpm)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+
+        return jsonify({
+            'success': True,
+            'data': midi_clock.status()
+        })
+
+    except Exception as e:
+        logger.error(f"Greška pri promjeni tempa: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@clock_bp.route('/api/clock/tap', methods=['POST'])
+def tap_clock_tempo():
+    """Tap tempo: svaki poziv je jedan udarac, tempo se mijenja od drugog udarca."""
+    try:
+        bpm = midi_clock.tap()
+        return jsonify({
+            'success': True,
+            'data': {
+                'bpm': round(bpm, 2) if bpm is not None else None,
+                'taps': len(midi_clock.tap_tempo.taps)
+            }
+        })
+
+    except Exception as e:
+        logger.error(f"Greška pri tap tempu: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@clock_bp.route('/api/clock/ports', methods=['DELETE'])
+def remove_clock_port():
+    """Ukloni uređaj (`?usbPort=`) iz clock-a."""
+    try:
+        usb_port = request.args.get('usbPort')
+        if not midi_clock.remove_target(usb_port):
+            return jsonify({
+                'success': False,
+                'error': f'Port {usb_port} ne prima clock'
+            }), 404
+
+        return jsonify({
+            'success': True,
+            'data': midi_clock.status()
+        })
+
+    except Exception as e:
+        logger.error(f"Greška pri uklanjanju porta iz clock-a: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
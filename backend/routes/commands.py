@@ -6,8 +6,13 @@ API routes for commands management
 
 from flask import Blueprint, request, jsonify
 import sqlite3
+import json
 import logging
 from database import db_manager
+from midi_encoder import validate_midi
+from macro_compiler import macro_summary, MacroError
+from auto_sync import auto_sync
+from payload_cache import payload_cache
 
 logger = logging.getLogger(__name__)
 
@@ -21,11 +26,19 @@ def get_commands():
         with db_manager.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('''
-                SELECT id, name, value, created_at, updated_at 
+                SELECT id, name, value, midi_type, midi_channel, midi_param, macro, created_at, updated_at 
                 FROM commands 
                 ORDER BY name ASC
             ''')
             commands = [dict(row) for row in cursor.fetchall()]
+            for command in commands:
+                if command['macro']:
+                    command['macro'] = json.loads(command['macro'])
+                    try:
+                        command['macro_info'] = macro_summary(command['macro'])
+                    except MacroError as e:
+                        # Makro sačuvan pod drugim ograničenjima - prijavi ga umjesto greške cijele liste
+                        command['macro_info'] = {'error': str(e)}
             
             logger.info(f"Vraćeno {len(commands)} komandi")
             return jsonify({
@@ -53,7 +66,9 @@ def create_command():
             }), 400
         
         name = data.get('name', '').strip()
-        value = data.get('value')
+        macro = data.get('macro')
+        # Makro komanda ne mora imati vrijednost
+        value = data.get('value', 0 if macro else None)
         
         # Validacija
         if not name:
@@ -68,12 +83,32 @@ def create_command():
                 'error': 'Vrednost mora biti broj između 0 i 65535'
             }), 400
         
+        macro_info = None
+        if macro is not None:
+            try:
+                macro_info = macro_summary(macro)
+            except MacroError as e:
+                return jsonify({
+                    'success': False,
+                    'error': str(e)
+                }), 400
+        
+        midi_type = data.get('midi_type', 'auto')
+        midi_channel = data.get('midi_channel', 1)
+        midi_param = data.get('midi_param')
+        midi_error = validate_midi(midi_type, midi_channel, midi_param, value)
+        if midi_error:
+            return jsonify({
+                'success': False,
+                'error': midi_error
+            }), 400
+        
         with db_manager.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('''
-                INSERT INTO commands (name, value) 
-                VALUES (?, ?)
-            ''', (name, value))
+                INSERT INTO commands (name, value, midi_type, midi_channel, midi_param, macro) 
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (name, value, midi_type, midi_channel, midi_param, json.dumps(macro) if macro is not None else None))
             
             command_id = cursor.lastrowid
             conn.commit()
@@ -84,7 +119,12 @@ def create_command():
                 'data': {
                     'id': command_id,
                     'name': name,
-                    'value': value
+                    'value': value,
+                    'midi_type': midi_type,
+                    'midi_channel': midi_channel,
+                    'midi_param': midi_param,
+                    'macro': macro,
+                    'macro_info': macro_info
                 }
             })
     
@@ -114,7 +154,6 @@ def update_command(command_id):
             }), 400
         
         name = data.get('name', '').strip()
-        value = data.get('value')
         
         # Validacija
         if not name:
@@ -123,27 +162,61 @@ def update_command(command_id):
                 'error': 'Naziv komande je obavezan'
             }), 400
         
-        if not isinstance(value, int) or value < 0 or value > 65535:
-            return jsonify({
-                'success': False,
-                'error': 'Vrednost mora biti broj između 0 i 65535'
-            }), 400
-        
         with db_manager.get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute('''
-                UPDATE commands 
-                SET name = ?, value = ?, updated_at = CURRENT_TIMESTAMP
-                WHERE id = ?
-            ''', (name, value, command_id))
-            
-            if cursor.rowcount == 0:
+            cursor.execute('SELECT value, midi_type, midi_channel, midi_param, macro FROM commands WHERE id = ?', (command_id,))
+            existing = cursor.fetchone()
+            if existing is None:
                 return jsonify({
                     'success': False,
                     'error': 'Komanda nije pronađena'
                 }), 404
             
+            # Makro ostaje ako nije poslan; `macro: null` ga uklanja
+            if 'macro' in data:
+                macro = data['macro']
+            else:
+                macro = json.loads(existing['macro']) if existing['macro'] else None
+            value = data.get('value', existing['value'] if macro else None)
+            
+            if not isinstance(value, int) or value < 0 or value > 65535:
+                return jsonify({
+                    'success': False,
+                    'error': 'Vrednost mora biti broj između 0 i 65535'
+                }), 400
+            
+            macro_info = None
+            if macro is not None:
+                try:
+                    macro_info = macro_summary(macro)
+                except MacroError as e:
+                    return jsonify({
+                        'success': False,
+                        'error': str(e)
+                    }), 400
+            
+            # MIDI podešavanja koja nisu poslana ostaju nepromijenjena
+            midi_type = data.get('midi_type', existing['midi_type'] or 'auto')
+            midi_channel = data.get('midi_channel', existing['midi_channel'] or 1)
+            midi_param = data['midi_param'] if 'midi_param' in data else existing['midi_param']
+            midi_error = validate_midi(midi_type, midi_channel, midi_param, value)
+            if midi_error:
+                return jsonify({
+                    'success': False,
+                    'error': midi_error
+                }), 400
+            
+            cursor.execute('''
+                UPDATE commands 
+                SET name = ?, value = ?, midi_type = ?, midi_channel = ?, midi_param = ?, macro = ?,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            ''', (name, value, midi_type, midi_channel, midi_param,
+                  json.dumps(macro) if macro is not None else None, command_id))
+            
             conn.commit()
+            payload_cache.bump('commands')
+            auto_sync.mark_dirty('commands')
             
             logger.info(f"Ažurirana komanda: {name} (ID: {command_id})")
             return jsonify({
@@ -151,7 +224,12 @@ def update_command(command_id):
                 'data': {
                     'id': command_id,
                     'name': name,
-                    'value': value
+                    'value': value,
+                    'midi_type': midi_type,
+                    'midi_channel': midi_channel,
+                    'midi_param': midi_param,
+                    'macro': macro,
+                    'macro_info': macro_info
                 }
             })
     
@@ -183,6 +261,8 @@ def delete_command(command_id):
                 }), 404
             
             conn.commit()
+            payload_cache.bump('commands')
+            auto_sync.mark_dirty('commands')
             
             logger.info(f"Obrisana komanda sa ID: {command_id}")
             return jsonify({
@@ -4,12 +4,20 @@
 API routes for configuration and USB ports management
 """
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+import json
 import logging
+import time
 from datetime import datetime
-from database import db_manager
 from usb_utils import usb_detector
 from serial_comm import serial_comm
+from link_supervisor import link_supervisor
+from device_mirror import device_mirror
+from config_delivery import deliver_configuration, push_fleet, port_lock
+from auto_sync import auto_sync
+from config_jobs import config_jobs, JobQueueFull
+from payload_cache import payload_cache
+from config import SERIAL_NEGOTIATE_BAUDRATE, RELIABLE_DELIVERY, AUTO_SYNC_DEBOUNCE, AUTO_SYNC_MAX_DELAY, CONFIG_JOB_KEEPALIVE
 
 logger = logging.getLogger(__name__)
 
@@ -22,6 +30,8 @@ def send_configuration():
     try:
         data = request.get_json()
         usb_port = data.get('usbPort')
+        reliable = bool(data.get('reliable', RELIABLE_DELIVERY))
+        supervised = link_supervisor.is_supervised(usb_port)
         
         if not usb_port:
             return jsonify({
@@ -29,98 +39,447 @@ def send_configuration():
                 'error': 'USB port je obavezan'
             }), 400
         
-        with db_manager.get_connection() as conn:
-            cursor = conn.cursor()
-            
-            # Get all button mappings with their colors (including unmapped buttons)
-            cursor.execute('''
-                SELECT 
-                    bm.button_number,
-                    c.name as command_name,
-                    c.value as command_value,
-                    bm.color,
-                    bm.is_preset_color
-                FROM button_mappings bm
-                LEFT JOIN commands c ON bm.command_id = c.id
-                ORDER BY bm.button_number ASC
-            ''')
-            
-            all_button_data = {}
-            for row in cursor.fetchall():
-                all_button_data[row['button_number']] = {
-                    'button': row['button_number'],
-                    'command_name': row['command_name'],
-                    'command_value': row['command_value'],
-                    'color': row['color'],
-                    'is_preset_color': bool(row['is_preset_color']) if row['is_preset_color'] is not None else True
-                }
-            
-            # Ensure we have data for all 6 buttons
-            for i in range(1, 7):
-                if i not in all_button_data:
-                    all_button_data[i] = {
-                        'button': i,
-                        'command_name': None,
-                        'command_value': None,
-                        'color': None,
-                        'is_preset_color': True
-                    }
-            
-            # Get only mapped buttons for the old logic compatibility
-            button_mappings = [data for data in all_button_data.values() if data['command_name'] is not None]
-            
-            if not button_mappings:
-                return jsonify({
-                    'success': False,
-                    'error': 'Nema mapiranih tastera za slanje'
-                }), 400
-            
-                        # Connect to the specified USB port
-            if not serial_comm.connect(usb_port):
-                return jsonify({
-                    'success': False,
-                    'error': f'Nije moguće povezati se sa portom {usb_port}'
-                }), 400
+        # Nepromijenjena konfiguracija dolazi iz keša (bez upita i ponovnog sastavljanja poruka)
+        all_button_data = payload_cache.load()
+        
+        # Get only mapped buttons for the old logic compatibility
+        button_mappings = [data for data in all_button_data.values() if data['command_name'] is not None]
+        
+        if not button_mappings:
+            return jsonify({
+                'success': False,
+                'error': 'Nema mapiranih tastera za slanje'
+            }), 400
+        
+        if supervised:
+            # Port je pod nadzorom - veza je već otvorena, a prekid se preživi kratkim zastojem
+            if 'reliable' not in data:
+                reliable = link_supervisor.get(usb_port).session['reliable']
+            with port_lock(usb_port):
+                details = link_supervisor.call(
+                    usb_port,
+                    lambda comm: deliver_configuration(comm, list(all_button_data.values()), reliable, all_button_data)
+                )
+        else:
+            # Poslovi, fleet i auto-sync na isti port čekaju kraj ovog slanja
+            with port_lock(usb_port), serial_comm.lock:
+                # Connect to the specified USB port
+                if not serial_comm.connect(usb_port):
+                    return jsonify({
+                        'success': False,
+                        'error': f'Nije moguće povezati se sa portom {usb_port}'
+                    }), 400
+                
+                try:
+                    # Dogovori veću brzinu ako je uređaj podržava
+                    if SERIAL_NEGOTIATE_BAUDRATE:
+                        serial_comm.negotiate_baudrate()
+                    
+                    # Send configuration with all button data (including colors)
+                    details = deliver_configuration(serial_comm, list(all_button_data.values()), reliable, all_button_data)
+                finally:
+                    # Uvijek prekini jednokratnu konekciju (nadgledane veze ostaju otvorene)
+                    serial_comm.disconnect()
+        
+        if details:
+            result = {
+                'usb_port': usb_port,
+                'button_mappings': button_mappings,
+                'timestamp': datetime.now().isoformat()
+            }
+            result.update(details)
             
-            # Send configuration with all button data (including colors)
-            success = serial_comm.send_configuration(list(all_button_data.values()))
+            logger.info(f"Konfiguracija uspješno poslana na port: {usb_port}")
+            return jsonify({
+                'success': True,
+                'data': result,
+                'message': f'Konfiguracija uspješno poslana na {usb_port}'
+            })
+        else:
+            return jsonify({
+                'success': False,
+                'error': 'Greška pri slanju konfiguracije na uređaj'
+            }), 500
+    
+    except Exception as e:
+        logger.error(f"Greška pri slanju konfiguracije: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@config_bp.route('/api/configuration/fleet', methods=['POST'])
+def send_fleet_configuration():
+    """Pošalji trenutna mapiranja (ili izabrani preset) na više portova istovremeno.
+    
+    Sa `stream: true` odgovor je NDJSON: jedan red po uređaju čim završi,
+    pa završni red sa sažetkom.
+    """
+    try:
+        data = request.get_json() or {}
+        usb_ports = data.get('usbPorts')
+        preset_id = data.get('presetId')
+        reliable = bool(data.get('reliable', RELIABLE_DELIVERY))
+        
+        if not isinstance(usb_ports, list) or not usb_ports or not all(isinstance(p, str) and p for p in usb_ports):
+            return jsonify({
+                'success': False,
+                'error': 'usbPorts mora biti neprazna lista portova'
+            }), 400
+        
+        all_button_data = payload_cache.load(preset_id)
+        if all_button_data is None:
+            return jsonify({
+                'success': False,
+                'error': 'Preset nije pronađen'
+            }), 404
+        
+        if not any(button['command_name'] is not None for button in all_button_data.values()):
+            return jsonify({
+                'success': False,
+                'error': 'Nema mapiranih tastera za slanje'
+            }), 400
+        
+        logger.info(f"Slanje konfiguracije na {len(usb_ports)} portova")
+        
+        if data.get('stream'):
+            def generate():
+                start = time.monotonic()
+                results = []
+                for result in push_fleet(usb_ports, all_button_data, reliable):
+                    results.append(result)
+                    yield json.dumps({'type': 'result', **result}, ensure_ascii=False) + '\n'
+                yield json.dumps({'type': 'summary', **_fleet_summary(results, start)}) + '\n'
             
-            if success:
-                # Pokušaj da pročitaš odgovor (neobavezno)
-                response = serial_comm.read_response(timeout=1)
-                
-                result = {
-                    'usb_port': usb_port,
-                    'button_mappings': button_mappings,
-                    'timestamp': datetime.now().isoformat(),
-                    'status': 'sent'
-                }
-                
-                if response:
-                    result['device_response'] = response
-                
-                logger.info(f"Konfiguracija uspješno poslana na port: {usb_port}")
-                return jsonify({
-                    'success': True,
-                    'data': result,
-                    'message': f'Konfiguracija uspješno poslana na {usb_port}'
-                })
+            return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+        
+        start = time.monotonic()
+        results = list(push_fleet(usb_ports, all_button_data, reliable))
+        summary = _fleet_summary(results, start)
+        
+        return jsonify({
+            'success': summary['failed'] == 0,
+            'data': {
+                'results': results,
+                'summary': summary
+            },
+            'message': f"Konfiguracija poslana na {summary['succeeded']} od {summary['total']} uređaja"
+        })
+    
+    except Exception as e:
+        logger.error(f"Greška pri slanju konfiguracije na više uređaja: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+def _fleet_summary(results, start):
+    """Sažetak slanja na više uređaja."""
+    latencies = [result['latency_ms'] for result in results]
+    return {
+        'total': len(results),
+        'succeeded': len([result for result in results if result['success']]),
+        'failed': len([result for result in results if not result['success']]),
+        'acknowledged': len([result for result in results if result['ack']]),
+        'elapsed_ms': round((time.monotonic() - start) * 1000, 1),
+        'slowest_ms': max(latencies) if latencies else None,
+        'sum_ms': round(sum(latencies), 1)
+    }
+
+@config_bp.route('/api/configuration/cache', methods=['GET'])
+def get_payload_cache():
+    """Stanje keša sastavljenih konfiguracija (verzija podataka, pogoci i promašaji)."""
+    try:
+        return jsonify({
+            'success': True,
+            'data': payload_cache.stats()
+        })
+    
+    except Exception as e:
+        logger.error(f"Greška pri dohvatanju stanja keša konfiguracija: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@config_bp.route('/api/configuration/jobs', methods=['POST'])
+def create_configuration_job():
+    """Stavi slanje konfiguracije u red i odmah vrati 202 sa ID-em posla.
+
+    Prima `usbPort` ili `usbPorts`, opciono `presetId` i `reliable`. Podaci
+    se čitaju iz baze u trenutku zahtjeva, a slanje ide u pozadini.
+    """
+    try:
+        data = request.get_json() or {}
+        usb_ports = data.get('usbPorts') or ([data['usbPort']] if data.get('usbPort') else None)
+        reliable = bool(data.get('reliable', RELIABLE_DELIVERY))
+        
+        if not isinstance(usb_ports, list) or not usb_ports or not all(isinstance(p, str) and p for p in usb_ports):
+            return jsonify({
+                'success': False,
+                'error': 'USB port je obavezan (usbPort ili usbPorts)'
+            }), 400
+        
+        all_button_data = payload_cache.load(data.get('presetId'))
+        if all_button_data is None:
+            return jsonify({
+                'success': False,
+                'error': 'Preset nije pronađen'
+            }), 404
+        
+        if not any(button['command_name'] is not None for button in all_button_data.values()):
+            return jsonify({
+                'success': False,
+                'error': 'Nema mapiranih tastera za slanje'
+            }), 400
+        
+        source = f"preset:{data['presetId']}" if data.get('presetId') is not None else 'mappings'
+        job = config_jobs.submit(usb_ports, all_button_data, reliable, source)
+        response = jsonify({
+            'success': True,
+            'data': job,
+            'message': f"Slanje na {len(job['ports'])} portova je u redu (posao {job['id']})"
+        })
+        response.headers['Location'] = f"/api/configuration/jobs/{job['id']}"
+        return response, 202
+    
+    except JobQueueFull as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 503
+    
+    except Exception as e:
+        logger.error(f"Greška pri kreiranju posla slanja: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@config_bp.route('/api/configuration/jobs', methods=['GET'])
+def get_configuration_jobs():
+    """Vrati nedavne poslove slanja (najnoviji prvi)."""
+    try:
+        return jsonify({
+            'success': True,
+            'data': config_jobs.list()
+        })
+    
+    except Exception as e:
+        logger.error(f"Greška pri dohvatanju poslova slanja: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@config_bp.route('/api/configuration/jobs/<job_id>', methods=['GET'])
+def get_configuration_job(job_id):
+    """Stanje i napredak posla; sa `?wait=<verzija>` čeka promjenu (long-poll, najviše `timeout` sekundi)."""
+    try:
+        version = request.args.get('wait', type=int)
+        if version is not None:
+            timeout = min(request.args.get('timeout', 25, type=float), 60)
+            job = config_jobs.wait(job_id, version, timeout)
+        else:
+            job = config_jobs.get(job_id)
+        
+        if job is None:
+            return jsonify({
+                'success': False,
+                'error': 'Posao nije pronađen'
+            }), 404
+        
+        return jsonify({
+            'success': True,
+            'data': job
+        })
+    
+    except Exception as e:
+        logger.error(f"Greška pri dohvatanju posla slanja: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@config_bp.route('/api/configuration/jobs/<job_id>/stream', methods=['GET'])
+def stream_configuration_job(job_id):
+    """Prati posao kao NDJSON: jedan red pri svakoj promjeni, zadnji red je završno stanje."""
+    if config_jobs.get(job_id) is None:
+        return jsonify({
+            'success': False,
+            'error': 'Posao nije pronađen'
+        }), 404
+    
+    def generate():
+        for job in config_jobs.follow(job_id, CONFIG_JOB_KEEPALIVE):
+            # Prazan red održava vezu dok se ništa ne mijenja
+            yield json.dumps(job, ensure_ascii=False) + '\n' if job is not None else '\n'
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@config_bp.route('/api/configuration/jobs/<job_id>', methods=['DELETE'])
+def cancel_configuration_job(job_id):
+    """Otkaži portove posla koji još čekaju (slanje koje je u toku se završava)."""
+    try:
+        job = config_jobs.cancel(job_id)
+        if job is None:
+            return jsonify({
+                'success': False,
+                'error': 'Posao nije pronađen'
+            }), 404
+        
+        return jsonify({
+            'success': True,
+            'data': job,
+            'message': f'Posao {job_id} otkazan'
+        })
+    
+    except Exception as e:
+        logger.error(f"Greška pri otkazivanju posla slanja: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@config_bp.route('/api/device-config', methods=['GET'])
+def get_device_config():
+    """Vrati konfiguraciju koja je na uređaju (iz ogledala) i odstupanja od baze.
+
+    Bez `refresh=1` odgovor dolazi iz ogledala bez komunikacije sa uređajem.
+    """
+    usb_port = request.args.get('usbPort')
+    refresh = request.args.get('refresh') == '1'
+    try:
+        if not usb_port:
+            return jsonify({
+                'success': False,
+                'error': 'USB port je obavezan'
+            }), 400
+        
+        if refresh:
+            if link_supervisor.is_supervised(usb_port):
+                with port_lock(usb_port):
+                    switches = link_supervisor.call(usb_port, lambda comm: comm.read_configuration())
             else:
+                with port_lock(usb_port), serial_comm.lock:
+                    if not serial_comm.connect(usb_port):
+                        return jsonify({
+                            'success': False,
+                            'error': f'Nije moguće povezati se sa portom {usb_port}'
+                        }), 400
+                    try:
+                        switches = serial_comm.read_configuration()
+                    finally:
+                        serial_comm.disconnect()
+            
+            if switches is None:
                 return jsonify({
                     'success': False,
-                    'error': 'Greška pri slanju konfiguracije na uređaj'
-                }), 500
+                    'error': 'Uređaj nije vratio konfiguraciju'
+                }), 502
+        
+        mirror = device_mirror.get(usb_port)
+        if mirror is None:
+            return jsonify({
+                'success': False,
+                'error': f'Konfiguracija uređaja na portu {usb_port} nije poznata (pokušajte sa refresh=1)'
+            }), 404
+        
+        # Odstupanje: tasteri čija konfiguracija u bazi nije ono što uređaj drži
+        all_button_data = payload_cache.load()
+        expected = serial_comm.iter_switch_configs(list(all_button_data.values()))
+        device_switches = {switch.get('id'): switch for switch in mirror['switches']}
+        mirror['drift'] = [switch['id'] for switch in expected if device_switches.get(switch['id']) != switch]
+        
+        return jsonify({
+            'success': True,
+            'data': mirror
+        })
     
     except Exception as e:
-        logger.error(f"Greška pri slanju konfiguracije: {e}")
+        logger.error(f"Greška pri čitanju konfiguracije uređaja: {e}")
         return jsonify({
             'success': False,
             'error': str(e)
         }), 500
+
+@config_bp.route('/api/configuration/auto-sync', methods=['GET'])
+def get_auto_sync():
+    """Stanje automatskog slanja izmjena (opciono `?usbPort=`)."""
+    try:
+        return jsonify({
+            'success': True,
+            'data': auto_sync.status(request.args.get('usbPort'))
+        })
+    
+    except Exception as e:
+        logger.error(f"Greška pri dohvatanju stanja automatskog slanja: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@config_bp.route('/api/configuration/auto-sync', methods=['POST'])
+def set_auto_sync():
+    """Uključi ili isključi automatsko slanje (`usbPort`, `enabled`, opciono `debounce_ms`, `max_delay_ms`, `reliable`)."""
+    try:
+        data = request.get_json() or {}
+        usb_port = data.get('usbPort')
+        debounce_ms = data.get('debounce_ms', AUTO_SYNC_DEBOUNCE * 1000)
+        max_delay_ms = data.get('max_delay_ms', AUTO_SYNC_MAX_DELAY * 1000)
+        
+        if not usb_port:
+            return jsonify({
+                'success': False,
+                'error': 'USB port je obavezan'
+            }), 400
+        
+        if not data.get('enabled', True):
+            auto_sync.disable(usb_port)
+            return jsonify({
+                'success': True,
+                'message': f'Automatsko slanje isključeno za {usb_port}'
+            })
+        
+        if not isinstance(debounce_ms, (int, float)) or not isinstance(max_delay_ms, (int, float)) \
+                or debounce_ms < 0 or max_delay_ms <= 0:
+            return jsonify({
+                'success': False,
+                'error': 'debounce_ms mora biti >= 0, a max_delay_ms > 0'
+            }), 400
+        
+        reliable = bool(data.get('reliable', RELIABLE_DELIVERY))
+        auto_sync.enable(usb_port, debounce_ms / 1000.0, max_delay_ms / 1000.0, reliable)
+        return jsonify({
+            'success': True,
+            'data': auto_sync.status(usb_port)[0],
+            'message': f'Automatsko slanje uključeno za {usb_port}'
+        })
+    
+    except Exception as e:
+        logger.error(f"Greška pri podešavanju automatskog slanja: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@config_bp.route('/api/configuration/auto-sync/flush', methods=['POST'])
+def flush_auto_sync():
+    """Odmah pošalji neposlane izmjene (opciono samo za `usbPort`)."""
+    try:
+        data = request.get_json(silent=True) or {}
+        return jsonify({
+            'success': True,
+            'data': auto_sync.flush(data.get('usbPort'))
+        })
     
-    finally:
-        # Uvijek prekini konekciju
-        serial_comm.disconnect()
+    except Exception as e:
+        logger.error(f"Greška pri slanju neposlanih izmjena: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
 
 @config_bp.route('/api/usb-ports', methods=['GET'])
 def get_usb_ports():
@@ -256,39 +615,40 @@ def test_serial_connection():
                 'error': 'Port ID je obavezan'
             }), 400
         
-        # Poveži se sa serial portom
-        if not serial_comm.connect(port_id):
-            return jsonify({
-                'success': False,
-                'error': f'Greška pri povezivanju sa portom {port_id}'
-            }), 500
-        
-        try:
-            # Pošalji test poruku
-            success = serial_comm.send_test_message()
-            
-            if success:
-                # Pokušaj da pročitaš odgovor
-                response = serial_comm.read_response(timeout=2)
-                
-                return jsonify({
-                    'success': True,
-                    'data': {
-                        'port_id': port_id,
-                        'connected': True,
-                        'test_sent': success,
-                        'device_response': response,
-                        'message': 'Serial komunikacija uspješna' if response else 'Test poruka poslana (nema odgovora)'
-                    }
-                })
-            else:
+        with port_lock(port_id), serial_comm.lock:
+            # Poveži se sa serial portom
+            if not serial_comm.connect(port_id):
                 return jsonify({
                     'success': False,
-                    'error': 'Greška pri slanju test poruke'
+                    'error': f'Greška pri povezivanju sa portom {port_id}'
                 }), 500
+            
+            try:
+                # Pošalji test poruku
+                success = serial_comm.send_test_message()
                 
-        finally:
-            serial_comm.disconnect()
+                if success:
+                    # Pokušaj da pročitaš odgovor
+                    response = serial_comm.read_response(timeout=2)
+                    
+                    return jsonify({
+                        'success': True,
+                        'data': {
+                            'port_id': port_id,
+                            'connected': True,
+                            'test_sent': success,
+                            'device_response': response,
+                            'message': 'Serial komunikacija uspješna' if response else 'Test poruka poslana (nema odgovora)'
+                        }
+                    })
+                else:
+                    return jsonify({
+                        'success': False,
+                        'error': 'Greška pri slanju test poruke'
+                    }), 500
+                    
+            finally:
+                serial_comm.disconnect()
     
     except Exception as e:
         logger.error(f"Greška pri testiranju serial komunikacije: {e}")
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+API routes for live device events (server-sent events)
+"""
+
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+import json
+import logging
+import time
+from datetime import datetime
+from config import DEVICE_EVENT_KEEPALIVE
+from device_events import device_events
+from event_store import event_store, ROLLUP_TABLES
+
+logger = logging.getLogger(__name__)
+
+# Kreiranje Blueprint-a za događaje uređaja
+events_bp = Blueprint('events', __name__)
+
+def _sse(event, data, event_id=None):
+    """Formatiraj jednu SSE poruku."""
+    lines = []
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f'event: {event}')
+    lines.append('data: ' + json.dumps(data, ensure_ascii=False, separators=(',', ':')))
+    return '\n'.join(lines) + '\n\n'
+
+@events_bp.route('/api/events', methods=['GET'])
+def get_events():
+    """Vrati zadnje događaje porta (ili stanje bafera bez porta)."""
+    try:
+        port = request.args.get('port')
+        limit = request.args.get('limit', 100, type=int)
+
+        data = device_events.status()
+        if port:
+            data['port'] = port
+            data['events'] = device_events.recent(port, max(1, min(limit, device_events.capacity)))
+
+        return jsonify({
+            'success': True,
+            'data': data
+        })
+
+    except Exception as e:
+        logger.error(f"Greška pri dohvatanju događaja: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+def _parse_time(value, default=None):
+    """Pretvori ISO datum ili Unix vrijeme u sekunde (ValueError za neispravnu vrijednost)."""
+    if value is None or value == '':
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+def _rollup_query_args():
+    """Zajednički parametri upita nad sažecima: since, until, port, resolution."""
+    since = _parse_time(request.args.get('since'), time.time() - 86400)
+    until = _parse_time(request.args.get('until'))
+    resolution = request.args.get('resolution')
+    if resolution is not None and resolution not in ROLLUP_TABLES:
+        raise ValueError(f"resolution mora biti jedno od: {', '.join(ROLLUP_TABLES)}")
+    return since, until, request.args.get('port'), resolution
+
+@events_bp.route('/api/events/usage', methods=['GET'])
+def get_event_usage():
+    """Najkorištenije komande u intervalu (npr. zadnji nastup), iz sažetaka po minuti/satu."""
+    try:
+        try:
+            since, until, port, resolution = _rollup_query_args()
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+
+        usage = event_store.usage(
+            since, until, port,
+            event_type=request.args.get('type', 'button'),
+            limit=request.args.get('limit', 10, type=int),
+            resolution=resolution
+        )
+        return jsonify({
+            'success': True,
+            'data': usage
+        })
+
+    except Exception as e:
+        logger.error(f"Greška pri dohvatanju statistike korištenja: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@events_bp.route('/api/events/timeline', methods=['GET'])
+def get_event_timeline():
+    """Broj događaja po minuti ili satu u intervalu."""
+    try:
+        try:
+            since, until, port, resolution = _rollup_query_args()
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+
+        return jsonify({
+            'success': True,
+            'data': event_store.timeline(since, until, port, request.args.get('type'), resolution),
+            'store': event_store.status()
+        })
+
+    except Exception as e:
+        logger.error(f"Greška pri dohvatanju vremenske linije događaja: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@events_bp.route('/api/events/stream', methods=['GET'])
+def stream_events():
+    """Prati događaje porta uživo kao server-sent events.
+
+    Svaki klijent ima svoj kursor u prstenastom baferu; nastavak nakon
+    prekida ide od `Last-Event-ID` zaglavlja (ili `?since=`), a događaji
+    koje spor klijent propusti javljaju se kao `dropped`.
+    """
+    port = request.args.get('port')
+    if not port:
+        return jsonify({
+            'success': False,
+            'error': 'port je obavezan'
+        }), 400
+
+    last_id = request.headers.get('Last-Event-ID', request.args.get('since'))
+    try:
+        cursor = int(last_id) + 1 if last_id is not None else None
+    except ValueError:
+        return jsonify({
+            'success': False,
+            'error': 'Neispravan Last-Event-ID'
+        }), 400
+
+    if cursor is None:
+        # Bez nastavka prati samo nove događaje
+        cursor = device_events.head(port)
+
+    def generate():
+        yield _sse('ready', {'port': port, 'next': cursor})
+        for events, dropped in device_events.follow(port, cursor, DEVICE_EVENT_KEEPALIVE):
+            if dropped:
+                yield _sse('dropped', {'count': dropped})
+            if not events:
+                # Komentar održava vezu kroz proxy-je
+                yield ': keepalive\n\n'
+                continue
+            yield ''.join(
+                _sse(message.get('type') or 'event', message, seq)
+                for seq, _, message in events
+            )
+
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
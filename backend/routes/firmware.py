@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+API routes for firmware upload
+"""
+
+from flask import Blueprint, request, jsonify
+import logging
+from firmware_upload import firmware_uploader
+from link_supervisor import link_supervisor
+from serial_comm import SerialCommunicator
+from config_delivery import port_lock
+from config import SERIAL_NEGOTIATE_BAUDRATE
+
+logger = logging.getLogger(__name__)
+
+# Kreiranje Blueprint-a za firmware API
+firmware_bp = Blueprint('firmware', __name__)
+
+@firmware_bp.route('/api/firmware/upload', methods=['POST'])
+def upload_firmware():
+    """Pošalji firmware sliku na uređaj (`?usbPort=`, slika kao `file` ili sirovo tijelo zahtjeva).
+
+    Ponovljeni zahtjev nakon prekida nastavlja od zadnjeg primljenog dijela.
+    """
+    usb_port = request.args.get('usbPort')
+    try:
+        if not usb_port:
+            return jsonify({
+                'success': False,
+                'error': 'USB port je obavezan'
+            }), 400
+
+        upload = request.files.get('file')
+        image = upload.read() if upload else request.get_data()
+        if not image:
+            return jsonify({
+                'success': False,
+                'error': 'Firmware slika je prazna'
+            }), 400
+
+        if not firmware_uploader.begin(usb_port, len(image)):
+            return jsonify({
+                'success': False,
+                'error': f'Slanje firmware-a na port {usb_port} je već u toku'
+            }), 409
+
+        try:
+            # Cijelo slanje drži port - slanja konfiguracije čekaju kraj slike
+            with port_lock(usb_port):
+                if link_supervisor.is_supervised(usb_port):
+                    # Nakon obnove veze poziv se ponavlja i slanje nastavlja gdje je stalo
+                    report = link_supervisor.call(usb_port, lambda comm: firmware_uploader.upload(comm, image))
+                else:
+                    comm = SerialCommunicator()
+                    if not comm.connect(usb_port):
+                        raise Exception(f'Nije moguće povezati se sa portom {usb_port}')
+                    try:
+                        if SERIAL_NEGOTIATE_BAUDRATE:
+                            comm.negotiate_baudrate()
+                        report = firmware_uploader.upload(comm, image)
+                    finally:
+                        comm.disconnect()
+        except Exception as e:
+            firmware_uploader.finish(usb_port, error=e)
+            raise
+
+        firmware_uploader.finish(usb_port, report)
+        return jsonify({
+            'success': True,
+            'data': report,
+            'message': f"Firmware poslan na {usb_port} ({report['bytes_per_second']} bytes/s)"
+        })
+
+    except Exception as e:
+        logger.error(f"Greška pri slanju firmware-a na port {usb_port}: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@firmware_bp.route('/api/firmware/status', methods=['GET'])
+def get_firmware_status():
+    """Vrati napredak slanja firmware-a (za `?usbPort=` ili sve portove)."""
+    try:
+        usb_port = request.args.get('usbPort')
+        status = firmware_uploader.status(usb_port)
+
+        if usb_port and status is None:
+            return jsonify({
+                'success': False,
+                'error': 'Nema slanja firmware-a za ovaj port'
+            }), 404
+
+        return jsonify({
+            'success': True,
+            'data': status
+        })
+
+    except Exception as e:
+        logger.error(f"Greška pri dohvatanju statusa firmware-a: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+API routes for live LED color streaming
+"""
+
+from flask import Blueprint, request, jsonify
+import logging
+from led_stream import led_streams, parse_color, LED_EFFECTS
+from link_supervisor import link_supervisor
+from serial_comm import SerialCommunicator
+from config_delivery import port_lock
+from banks import slot_count
+from config import LED_STREAM_FPS, LED_STREAM_MAX_FPS, SERIAL_NEGOTIATE_BAUDRATE
+
+logger = logging.getLogger(__name__)
+
+# Kreiranje Blueprint-a za LED stream API
+leds_bp = Blueprint('leds', __name__)
+
+@leds_bp.route('/api/leds/stream', methods=['POST'])
+def start_led_stream():
+    """Pokreni slanje LED okvira uživo (`usbPort`, opciono `fps` i `effect`)."""
+    try:
+        data = request.get_json() or {}
+        usb_port = data.get('usbPort')
+        fps = data.get('fps', LED_STREAM_FPS)
+        effect = data.get('effect')
+
+        if not usb_port:
+            return jsonify({
+                'success': False,
+                'error': 'USB port je obavezan'
+            }), 400
+
+        if not isinstance(fps, (int, float)) or fps <= 0 or fps > LED_STREAM_MAX_FPS:
+            return jsonify({
+                'success': False,
+                'error': f'fps mora biti između 0 i {LED_STREAM_MAX_FPS:g}'
+            }), 400
+
+        if effect is not None and effect not in LED_EFFECTS:
+            return jsonify({
+                'success': False,
+                'error': f"effect mora biti jedno od: {', '.join(LED_EFFECTS)}"
+            }), 400
+
+        if link_supervisor.is_supervised(usb_port):
+            # Nadgledana veza dijeli komunikator sa heartbeat-om i događajima
+            stream = led_streams.start(usb_port, link_supervisor.acquire(usb_port), fps, effect)
+        else:
+            led_streams.stop(usb_port)
+            comm = SerialCommunicator()
+            # Okviri vlastite veze se upisuju pod zaključavanjem porta, između slanja konfiguracije
+            comm.lock = port_lock(usb_port)
+            with comm.lock:
+                if not comm.connect(usb_port):
+                    return jsonify({
+                        'success': False,
+                        'error': f'Nije moguće povezati se sa portom {usb_port}'
+                    }), 500
+                if SERIAL_NEGOTIATE_BAUDRATE:
+                    comm.negotiate_baudrate()
+            stream = led_streams.start(usb_port, comm, fps, effect, owned=True)
+
+        return jsonify({
+            'success': True,
+            'data': stream.to_dict(),
+            'message': f'LED stream na {usb_port} pokrenut'
+        })
+
+    except Exception as e:
+        logger.error(f"Greška pri pokretanju LED streama: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@leds_bp.route('/api/leds/frame', methods=['POST'])
+def submit_led_frame():
+    """Dodaj okvir boja (`colors` od slota `offset`) u aktivni stream porta."""
+    try:
+        data = request.get_json() or {}
+        usb_port = data.get('usbPort')
+        stream = led_streams.get(usb_port)
+        if stream is None:
+            return jsonify({
+                'success': False,
+                'error': f'LED stream na portu {usb_port} nije pokrenut'
+            }), 404
+
+        colors = data.get('colors')
+        offset = data.get('offset', 0)
+        if not isinstance(colors, list) or not colors or not isinstance(offset, int) \
+                or offset < 0 or offset + len(colors) > slot_count():
+            return jsonify({
+                'success': False,
+                'error': f'colors mora biti lista boja unutar {slot_count()} slotova'
+            }), 400
+
+        try:
+            pixels = b''.join(parse_color(color) for color in colors)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+
+        stream.submit(pixels, offset)
+        return jsonify({
+            'success': True,
+            'data': {
+                'frames_submitted': stream.stats['frames_submitted'],
+                'frames_dropped': stream.stats['frames_dropped']
+            }
+        })
+
+    except Exception as e:
+        logger.error(f"Greška pri slanju LED okvira: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@leds_bp.route('/api/leds/stream', methods=['GET'])
+def get_led_streams():
+    """Statistika LED streamova: postignuti fps, odbačeni okviri i preskočeni rokovi."""
+    try:
+        return jsonify({
+            'success': True,
+            'data': led_streams.status(request.args.get('usbPort'))
+        })
+
+    except Exception as e:
+        logger.error(f"Greška pri dohvatanju LED streamova: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@leds_bp.route('/api/leds/stream', methods=['DELETE'])
+def stop_led_stream():
+    """Zaustavi LED stream porta (`?usbPort=`) i vrati završnu statistiku."""
+    try:
+        usb_port = request.args.get('usbPort')
+        stats = led_streams.stop(usb_port)
+        if stats is None:
+            return jsonify({
+                'success': False,
+                'error': f'LED stream na portu {usb_port} nije pokrenut'
+            }), 404
+
+        return jsonify({
+            'success': True,
+            'data': stats,
+            'message': f'LED stream na {usb_port} zaustavljen'
+        })
+
+    except Exception as e:
+        logger.error(f"Greška pri zaustavljanju LED streama: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
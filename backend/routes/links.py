@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+API routes for supervised device links
+"""
+
+from flask import Blueprint, request, jsonify
+import logging
+from link_supervisor import link_supervisor
+
+logger = logging.getLogger(__name__)
+
+# Kreiranje Blueprint-a za links API
+links_bp = Blueprint('links', __name__)
+
+@links_bp.route('/api/links', methods=['GET'])
+def get_links():
+    """Vrati stanje svih nadgledanih veza."""
+    try:
+        return jsonify({
+            'success': True,
+            'data': link_supervisor.status()
+        })
+
+    except Exception as e:
+        logger.error(f"Greška pri dohvatanju stanja veza: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@links_bp.route('/api/links/health', methods=['GET'])
+def get_links_health():
+    """Vrati RTT percentile (p50/p95/p99) i gubitke heartbeat-a po uređaju."""
+    try:
+        port = request.args.get('port')
+        health = link_supervisor.health(port)
+
+        if port and not health:
+            return jsonify({
+                'success': False,
+                'error': 'Port nije pod nadzorom'
+            }), 404
+
+        return jsonify({
+            'success': True,
+            'data': health
+        })
+
+    except Exception as e:
+        logger.error(f"Greška pri dohvatanju statistike veza: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@links_bp.route('/api/links', methods=['POST'])
+def open_link():
+    """Otvori nadgledanu vezu sa portom (automatsko ponovno povezivanje)."""
+    try:
+        data = request.get_json() or {}
+        port = data.get('port')
+
+        if not port:
+            return jsonify({
+                'success': False,
+                'error': 'Port je obavezan'
+            }), 400
+
+        heartbeat_interval = data.get('heartbeat_interval')
+        if heartbeat_interval is not None and (not isinstance(heartbeat_interval, (int, float)) or heartbeat_interval < 0):
+            return jsonify({
+                'success': False,
+                'error': 'heartbeat_interval mora biti broj sekundi >= 0'
+            }), 400
+
+        link = link_supervisor.open(
+            port,
+            reliable=data.get('reliable'),
+            heartbeat_interval=heartbeat_interval
+        )
+        if link is None:
+            return jsonify({
+                'success': False,
+                'error': f'Nije moguće povezati se sa portom {port}'
+            }), 400
+
+        logger.info(f"Otvorena nadgledana veza sa portom {port}")
+        return jsonify({
+            'success': True,
+            'data': link.to_dict()
+        })
+
+    except Exception as e:
+        logger.error(f"Greška pri otvaranju veze: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@links_bp.route('/api/links/close', methods=['POST'])
+def close_link():
+    """Zatvori nadgledanu vezu sa portom."""
+    try:
+        data = request.get_json() or {}
+        port = data.get('port')
+
+        if not port:
+            return jsonify({
+                'success': False,
+                'error': 'Port je obavezan'
+            }), 400
+
+        if not link_supervisor.close(port):
+            return jsonify({
+                'success': False,
+                'error': 'Port nije pod nadzorom'
+            }), 404
+
+        return jsonify({
+            'success': True,
+            'message': f'Veza sa portom {port} je zatvorena'
+        })
+
+    except Exception as e:
+        logger.error(f"Greška pri zatvaranju veze: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
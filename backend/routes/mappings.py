@@ -7,6 +7,13 @@ API routes for button mappings management
 from flask import Blueprint, request, jsonify
 import logging
 from database import db_manager
+from link_supervisor import link_supervisor
+from auto_sync import auto_sync
+from payload_cache import payload_cache
+from device_mirror import device_mirror
+from write_queue import QueueFullError
+from banks import slot_count, is_valid_slot, bank_range, page_range, layout
+from config import BANK_COUNT
 
 logger = logging.getLogger(__name__)
 
@@ -15,15 +22,23 @@ mappings_bp = Blueprint('mappings', __name__)
 
 @mappings_bp.route('/api/button-mappings', methods=['GET'])
 def get_button_mappings():
-    """Vrati mapiranje tastera."""
+    """Vrati mapiranje tastera (sve ili samo `?bank=` / `?page=`)."""
     try:
+        first, last = _requested_range()
+        if first is None:
+            return jsonify({
+                'success': False,
+                'error': f'bank mora biti između 1 i {BANK_COUNT}'
+            }), 400
+        
         with db_manager.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('''
                 SELECT button_number, command_id, color, is_preset_color 
                 FROM button_mappings 
+                WHERE button_number BETWEEN ? AND ?
                 ORDER BY button_number ASC
-            ''')
+            ''', (first, last))
             
             mappings = {}
             for row in cursor.fetchall():
@@ -37,7 +52,8 @@ def get_button_mappings():
             logger.info(f"Vraćeno mapiranje za {len(mappings)} tastera")
             return jsonify({
                 'success': True,
-                'data': mappings
+                'data': mappings,
+                'layout': layout()
             })
     
     except Exception as e:
@@ -49,7 +65,11 @@ def get_button_mappings():
 
 @mappings_bp.route('/api/button-mappings', methods=['POST'])
 def update_button_mappings():
-    """Ažuriraj mapiranje tastera."""
+    """Ažuriraj mapiranje tastera.
+    
+    Bez `?bank=` / `?page=` zamjenjuju se sva mapiranja; sa njima samo
+    slotovi te banke ili stranice (ključevi su uvijek brojevi slotova).
+    """
     try:
         data = request.get_json()
         
@@ -59,34 +79,53 @@ def update_button_mappings():
                 'error': 'Neispravni podaci'
             }), 400
         
+        first, last = _requested_range()
+        if first is None:
+            return jsonify({
+                'success': False,
+                'error': f'bank mora biti između 1 i {BANK_COUNT}'
+            }), 400
+        
         with db_manager.get_connection() as conn:
             cursor = conn.cursor()
             
-            # Resetuj sva mapiranja
-            cursor.execute('UPDATE button_mappings SET command_id = NULL')
+            # Resetuj mapiranja u opsegu
+            cursor.execute('UPDATE button_mappings SET command_id = NULL WHERE button_number BETWEEN ? AND ?', (first, last))
             
-            # Postaviti nova mapiranja
+            # Postaviti nova mapiranja (slotovi viših banaka se kreiraju po potrebi)
+            rows = []
             for button_num, command_id in data.items():
                 try:
                     button_num = int(button_num)
                     command_id = int(command_id) if command_id else None
                     
-                    if 1 <= button_num <= 6:
-                        cursor.execute('''
-                            UPDATE button_mappings 
-                            SET command_id = ?, updated_at = CURRENT_TIMESTAMP
-                            WHERE button_number = ?
-                        ''', (command_id, button_num))
+                    if first <= button_num <= last:
+                        rows.append((button_num, command_id))
                 except (ValueError, TypeError):
                     continue
             
+            cursor.executemany('''
+                INSERT INTO button_mappings (button_number, command_id) VALUES (?, ?)
+                ON CONFLICT(button_number) DO UPDATE SET
+                    command_id = excluded.command_id, updated_at = CURRENT_TIMESTAMP
+            ''', rows)
+            
             conn.commit()
+            payload_cache.bump('mappings')
+            auto_sync.mark_dirty('mappings')
             
             logger.info("Mapiranje tastera je ažurirano")
-            return jsonify({
+            result = {
                 'success': True,
                 'message': 'Mapiranje tastera je ažurirano'
-            })
+            }
+            
+            # Opciono: odmah pošalji izmjene na nadgledani uređaj
+            usb_port = request.args.get('usbPort')
+            if usb_port:
+                result['live_update'] = _queue_live_updates(usb_port, first, last)
+            
+            return jsonify(result)
     
     except Exception as e:
         logger.error(f"Greška pri ažuriranju mapiranja: {e}")
@@ -111,10 +150,10 @@ def update_button_color():
                 'error': 'button_number i color su obavezni'
             }), 400
         
-        if not (1 <= button_number <= 6):
+        if not is_valid_slot(button_number):
             return jsonify({
                 'success': False,
-                'error': 'button_number mora biti između 1 i 6'
+                'error': f'button_number mora biti između 1 i {slot_count()}'
             }), 400
         
         with db_manager.get_connection() as conn:
@@ -140,12 +179,21 @@ def update_button_color():
             ''', (color, is_preset, button_number))
             
             conn.commit()
+            payload_cache.bump('color')
+            auto_sync.mark_dirty('color')
             
             logger.info(f"Boja tastera {button_number} je ažurirana na {color}")
-            return jsonify({
+            result = {
                 'success': True,
                 'message': f'Boja tastera {button_number} je ažurirana'
-            })
+            }
+            
+            # Opciono: odmah pošalji novu boju na nadgledani uređaj
+            usb_port = data.get('usbPort')
+            if usb_port:
+                result['live_update'] = _queue_live_updates(usb_port, button_number, button_number)
+            
+            return jsonify(result)
     
     except Exception as e:
         logger.error(f"Greška pri ažuriranju boje tastera: {e}")
@@ -153,3 +201,78 @@ def update_button_color():
             'success': False,
             'error': str(e)
         }), 500
+
+def _requested_range():
+    """Opseg slotova iz `?bank=` ili `?page=` (svi slotovi bez njih); (None, None) za neispravan zahtjev."""
+    bank = request.args.get('bank', type=int)
+    page = request.args.get('page', type=int)
+    if bank is not None:
+        if not 1 <= bank <= BANK_COUNT:
+            return None, None
+        return bank_range(bank)
+    if page is not None:
+        first, last = page_range(page)
+        if page < 1 or first > slot_count():
+            return None, None
+        return first, last
+    return 1, slot_count()
+
+def _queue_live_updates(usb_port, first, last):
+    """Stavi ažuriranja tastera u izlazni red nadgledanog uređaja (bez čekanja na slanje).
+    
+    Vraća False ako uređaj nije povezan, inače broj prihvaćenih ažuriranja
+    (`queued` od `total`). Ogledalo uređaja se ažurira samo za prihvaćena
+    ažuriranja; kada red ne prihvati sve, ogledalo se označava zastarjelim,
+    a izmjene u bazi ostaju sačuvane za sljedeće slanje.
+    """
+    link = link_supervisor.get(usb_port)
+    if link is None or not link.connected.is_set():
+        return False
+    
+    report = {'queued': 0, 'total': 0}
+    try:
+        with db_manager.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT 
+                    bm.button_number,
+                    c.name as command_name,
+                    c.value as command_value,
+                    c.midi_type,
+                    c.midi_channel,
+                    c.midi_param,
+                    c.macro,
+                    bm.color,
+                    bm.is_preset_color
+                FROM button_mappings bm
+                LEFT JOIN commands c ON bm.command_id = c.id
+                WHERE bm.button_number BETWEEN ? AND ?
+                ORDER BY bm.button_number ASC
+            ''', (first, last))
+            rows = cursor.fetchall()
+        
+        report['total'] = len(rows)
+        for row in rows:
+            link.communicator.queue_switch_update({
+                'button': row['button_number'],
+                'command_name': row['command_name'],
+                'command_value': row['command_value'],
+                'midi_type': row['midi_type'],
+                'midi_channel': row['midi_channel'],
+                'midi_param': row['midi_param'],
+                'macro': row['macro'],
+                'color': row['color'],
+                'is_preset_color': bool(row['is_preset_color']) if row['is_preset_color'] is not None else True
+            })
+            report['queued'] += 1
+    
+    except QueueFullError as e:
+        logger.warning(f"Izlazni red porta {usb_port} je pun - poslano uživo {report['queued']}/{report['total']} tastera")
+        device_mirror.mark_stale(usb_port)
+        report['error'] = str(e)
+    except Exception as e:
+        logger.warning(f"Ažuriranje uživo na portu {usb_port} nije poslano: {e}")
+        device_mirror.mark_stale(usb_port)
+        report['error'] = str(e)
+    
+    return report
@@ -9,6 +9,11 @@ import logging
 import json
 from datetime import datetime
 from database import db_manager
+from config_delivery import button_data_from_preset, port_lock
+from preset_slots import preset_slots
+from auto_sync import auto_sync
+from payload_cache import payload_cache
+from link_supervisor import link_supervisor
 
 logger = logging.getLogger(__name__)
 
@@ -74,6 +79,10 @@ def save_preset():
                     bm.command_id,
                     c.name as command_name,
                     c.value as command_value,
+                    c.midi_type,
+                    c.midi_channel,
+                    c.midi_param,
+                    c.macro,
                     bm.color,
                     bm.is_preset_color
                 FROM button_mappings bm
@@ -89,6 +98,10 @@ def save_preset():
                         'command_id': row['command_id'],
                         'command_name': row['command_name'],
                         'command_value': row['command_value'],
+                        'midi_type': row['midi_type'],
+                        'midi_channel': row['midi_channel'],
+                        'midi_param': row['midi_param'],
+                        'macro': row['macro'],
                         'color': row['color'],
                         'is_preset_color': bool(row['is_preset_color']) if row['is_preset_color'] is not None else True
                     }
@@ -101,6 +114,7 @@ def save_preset():
             
             preset_id = cursor.lastrowid
             conn.commit()
+            payload_cache.bump('preset')
             
             logger.info(f"Sačuvan preset '{name}' sa ID {preset_id}")
             return jsonify({
@@ -154,6 +168,8 @@ def load_preset(preset_id):
                 ))
             
             conn.commit()
+            payload_cache.bump('preset')
+            auto_sync.mark_dirty('preset')
             
             logger.info(f"Učitan preset '{row['name']}' sa ID {preset_id}")
             return jsonify({
@@ -191,7 +207,10 @@ def delete_preset(preset_id):
             
             # Delete preset
             cursor.execute('DELETE FROM presets WHERE id = ?', (preset_id,))
+            cursor.execute('DELETE FROM setlist_items WHERE preset_id = ?', (preset_id,))
             conn.commit()
+            payload_cache.bump('preset')
+            preset_slots.forget_preset(preset_id)
             
             logger.info(f"Obrisan preset '{row['name']}' sa ID {preset_id}")
             return jsonify({
@@ -205,3 +224,162 @@ def delete_preset(preset_id):
             'success': False,
             'error': str(e)
         }), 500
+
+def _on_port(usb_port, operation):
+    """Izvrši operaciju nad komunikatorom porta kroz nadgledanu vezu (otvara se po potrebi).
+    
+    Privremena konekcija bi pri svakoj aktivaciji resetovala uređaj, ponovo
+    dogovarala brzinu i sinhronizovala tabelu slotova; otvorena veza
+    zadržava tabelu, pa je promjena preseta samo jedna `preset_activate` poruka.
+    """
+    with port_lock(usb_port):
+        if not link_supervisor.is_supervised(usb_port) and link_supervisor.open(usb_port) is None:
+            raise Exception(f'Nije moguće povezati se sa portom {usb_port}')
+        return link_supervisor.call(usb_port, operation)
+
+def _preset_button_data(preset_id):
+    """Vrati (naziv, podaci tastera) sačuvanog preseta ili None ako ne postoji."""
+    with db_manager.get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('SELECT name, config_data FROM presets WHERE id = ?', (preset_id,))
+        row = cursor.fetchone()
+    if not row:
+        return None
+    button_data = button_data_from_preset(json.loads(row['config_data']))
+    return row['name'], list(button_data.values())
+
+@presets_bp.route('/api/presets/slots', methods=['GET'])
+def get_preset_slots():
+    """Vrati zauzetost preset slotova uređaja (`?usbPort=`)."""
+    try:
+        usb_port = request.args.get('usbPort')
+        if not usb_port:
+            return jsonify({
+                'success': False,
+                'error': 'USB port je obavezan'
+            }), 400
+        
+        return jsonify({
+            'success': True,
+            'data': preset_slots.status(usb_port)
+        })
+    
+    except Exception as e:
+        logger.error(f"Greška pri dohvatanju preset slotova: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@presets_bp.route('/api/presets/<int:preset_id>/upload', methods=['POST'])
+def upload_preset(preset_id):
+    """Unaprijed upiši preset u slot uređaja (najdavnije korišten slot se izbacuje)."""
+    try:
+        data = request.get_json() or {}
+        usb_port = data.get('usbPort')
+        if not usb_port:
+            return jsonify({
+                'success': False,
+                'error': 'USB port je obavezan'
+            }), 400
+        
+        preset = _preset_button_data(preset_id)
+        if preset is None:
+            return jsonify({
+                'success': False,
+                'error': 'Preset nije pronađen'
+            }), 404
+        name, button_data = preset
+        
+        slot, hit = _on_port(usb_port, lambda comm: preset_slots.load(comm, preset_id, button_data, name))
+        return jsonify({
+            'success': True,
+            'message': f'Preset "{name}" je u slotu {slot + 1}',
+            'data': {
+                'slot': slot + 1,
+                'already_loaded': hit
+            }
+        })
+    
+    except Exception as e:
+        logger.error(f"Greška pri upisu preset-a u slot: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@presets_bp.route('/api/presets/<int:preset_id>/activate', methods=['POST'])
+def activate_preset(preset_id):
+    """Aktiviraj preset na uređaju kratkom porukom (upis u slot samo ako nije već učitan).
+    
+    Mapiranja u bazi se ne mijenjaju - uređaj prelazi na preset, a ogledalo
+    uređaja prati aktivni sadržaj.
+    """
+    try:
+        data = request.get_json() or {}
+        usb_port = data.get('usbPort')
+        if not usb_port:
+            return jsonify({
+                'success': False,
+                'error': 'USB port je obavezan'
+            }), 400
+        
+        preset = _preset_button_data(preset_id)
+        if preset is None:
+            return jsonify({
+                'success': False,
+                'error': 'Preset nije pronađen'
+            }), 404
+        name, button_data = preset
+        
+        report = _on_port(usb_port, lambda comm: preset_slots.activate(comm, preset_id, button_data, name))
+        logger.info(f"Preset '{name}' aktiviran iz slota {report['slot']} za {report['latency_ms']} ms")
+        return jsonify({
+            'success': True,
+            'message': f'Preset "{name}" je aktiviran',
+            'data': report
+        })
+    
+    except Exception as e:
+        logger.error(f"Greška pri aktivaciji preset-a: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@presets_bp.route('/api/presets/slots/<int:slot>/activate', methods=['POST'])
+def activate_preset_slot(slot):
+    """Aktiviraj već upisan slot (1-based) bez ikakvog upisa."""
+    try:
+        data = request.get_json() or {}
+        usb_port = data.get('usbPort')
+        if not usb_port:
+            return jsonify({
+                'success': False,
+                'error': 'USB port je obavezan'
+            }), 400
+        
+        if not 1 <= slot <= preset_slots.slot_count:
+            return jsonify({
+                'success': False,
+                'error': f'Slot mora biti između 1 i {preset_slots.slot_count}'
+            }), 400
+        
+        report = _on_port(usb_port, lambda comm: preset_slots.activate_slot(comm, slot - 1))
+        if report is None:
+            return jsonify({
+                'success': False,
+                'error': f'Slot {slot} nije upisan'
+            }), 404
+        
+        return jsonify({
+            'success': True,
+            'data': report
+        })
+    
+    except Exception as e:
+        logger.error(f"Greška pri aktivaciji preset slota: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
@@ -0,0 +1,409 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+API routes for setlists and the live setlist runner
+"""
+
+from flask import Blueprint, request, jsonify
+import logging
+from database import db_manager
+from setlist_runner import load_setlist, setlist_runners
+from link_supervisor import link_supervisor
+from serial_comm import SerialCommunicator
+from config_delivery import port_lock
+from config import SETLIST_LOOKAHEAD
+
+logger = logging.getLogger(__name__)
+
+# Kreiranje Blueprint-a za setlists API
+setlists_bp = Blueprint('setlists', __name__)
+
+def _validate_presets(cursor, preset_ids):
+    """Vrati poruku greške ako lista preset-a nije ispravna (ili None)."""
+    if not isinstance(preset_ids, list) or not all(isinstance(preset_id, int) for preset_id in preset_ids):
+        return 'preset_ids mora biti lista ID-jeva preset-a'
+    if preset_ids:
+        placeholders = ','.join('?' * len(set(preset_ids)))
+        cursor.execute(f'SELECT id FROM presets WHERE id IN ({placeholders})', tuple(set(preset_ids)))
+        missing = set(preset_ids) - {row['id'] for row in cursor.fetchall()}
+        if missing:
+            return f"Preset-i ne postoje: {', '.join(str(preset_id) for preset_id in sorted(missing))}"
+    return None
+
+def _write_items(cursor, setlist_id, preset_ids):
+    cursor.execute('DELETE FROM setlist_items WHERE setlist_id = ?', (setlist_id,))
+    cursor.executemany(
+        'INSERT INTO setlist_items (setlist_id, position, preset_id) VALUES (?, ?, ?)',
+        [(setlist_id, position, preset_id) for position, preset_id in enumerate(preset_ids)]
+    )
+
+def _setlist_dict(setlist):
+    return {
+        'id': setlist['id'],
+        'name': setlist['name'],
+        'description': setlist['description'],
+        'created_at': setlist['created_at'],
+        'updated_at': setlist['updated_at'],
+        'items': [
+            {'position': position + 1, 'preset_id': item['preset_id'], 'name': item['name']}
+            for position, item in enumerate(setlist['items'])
+        ]
+    }
+
+@setlists_bp.route('/api/setlists', methods=['GET'])
+def get_setlists():
+    """Vrati sve setliste sa brojem pjesama."""
+    try:
+        with db_manager.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT s.id, s.name, s.description, s.created_at, s.updated_at, COUNT(si.position) as songs
+                FROM setlists s
+                LEFT JOIN setlist_items si ON si.setlist_id = s.id
+                GROUP BY s.id
+                ORDER BY s.updated_at DESC
+            ''')
+            setlists = [dict(row) for row in cursor.fetchall()]
+
+        return jsonify({
+            'success': True,
+            'data': setlists
+        })
+
+    except Exception as e:
+        logger.error(f"Greška pri dohvatanju setlista: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@setlists_bp.route('/api/setlists', methods=['POST'])
+def create_setlist():
+    """Kreiraj setlistu (`name`, opciono `description`, `preset_ids` po redoslijedu)."""
+    try:
+        data = request.get_json() or {}
+        name = data.get('name')
+        preset_ids = data.get('preset_ids', [])
+
+        if not name:
+            return jsonify({
+                'success': False,
+                'error': 'Naziv setliste je obavezan'
+            }), 400
+
+        with db_manager.get_connection() as conn:
+            cursor = conn.cursor()
+            error = _validate_presets(cursor, preset_ids)
+            if error:
+                return jsonify({
+                    'success': False,
+                    'error': error
+                }), 400
+
+            cursor.execute('SELECT id FROM setlists WHERE name = ?', (name,))
+            if cursor.fetchone():
+                return jsonify({
+                    'success': False,
+                    'error': 'Setlista sa tim nazivom već postoji'
+                }), 400
+
+            cursor.execute('INSERT INTO setlists (name, description) VALUES (?, ?)', (name, data.get('description', '')))
+            setlist_id = cursor.lastrowid
+            _write_items(cursor, setlist_id, preset_ids)
+            conn.commit()
+            setlist = load_setlist(cursor, setlist_id)
+
+        logger.info(f"Kreirana setlista '{name}' sa {len(preset_ids)} pjesama")
+        return jsonify({
+            'success': True,
+            'data': _setlist_dict(setlist)
+        })
+
+    except Exception as e:
+        logger.error(f"Greška pri kreiranju setliste: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@setlists_bp.route('/api/setlists/<int:setlist_id>', methods=['GET'])
+def get_setlist(setlist_id):
+    """Vrati setlistu sa pjesmama po redoslijedu."""
+    try:
+        with db_manager.get_connection() as conn:
+            setlist = load_setlist(conn.cursor(), setlist_id)
+
+        if setlist is None:
+            return jsonify({
+                'success': False,
+                'error': 'Setlista nije pronađena'
+            }), 404
+
+        return jsonify({
+            'success': True,
+            'data': _setlist_dict(setlist)
+        })
+
+    except Exception as e:
+        logger.error(f"Greška pri dohvatanju setliste: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@setlists_bp.route('/api/setlists/<int:setlist_id>', methods=['PUT'])
+def update_setlist(setlist_id):
+    """Izmijeni naziv, opis ili redoslijed pjesama (`preset_ids`) setliste."""
+    try:
+        data = request.get_json() or {}
+
+        with db_manager.get_connection() as conn:
+            cursor = conn.cursor()
+            setlist = load_setlist(cursor, setlist_id)
+            if setlist is None:
+                return jsonify({
+                    'success': False,
+                    'error': 'Setlista nije pronađena'
+                }), 404
+
+            if 'preset_ids' in data:
+                error = _validate_presets(cursor, data['preset_ids'])
+                if error:
+                    return jsonify({
+                        'success': False,
+                        'error': error
+                    }), 400
+                _write_items(cursor, setlist_id, data['preset_ids'])
+
+            cursor.execute('''
+                UPDATE setlists SET name = ?, description = ?, updated_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            ''', (data.get('name') or setlist['name'], data.get('description', setlist['description']), setlist_id))
+            conn.commit()
+            setlist = load_setlist(cursor, setlist_id)
+
+        return jsonify({
+            'success': True,
+            'data': _setlist_dict(setlist)
+        })
+
+    except Exception as e:
+        logger.error(f"Greška pri ažuriranju setliste: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@setlists_bp.route('/api/setlists/<int:setlist_id>', methods=['DELETE'])
+def delete_setlist(setlist_id):
+    """Obriši setlistu."""
+    try:
+        with db_manager.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT name FROM setlists WHERE id = ?', (setlist_id,))
+            row = cursor.fetchone()
+            if not row:
+                return jsonify({
+                    'success': False,
+                    'error': 'Setlista nije pronađena'
+                }), 404
+
+            cursor.execute('DELETE FROM setlist_items WHERE setlist_id = ?', (setlist_id,))
+            cursor.execute('DELETE FROM setlists WHERE id = ?', (setlist_id,))
+            conn.commit()
+
+        logger.info(f"Obrisana setlista '{row['name']}' sa ID {setlist_id}")
+        return jsonify({
+            'success': True,
+            'message': f'Setlista "{row["name"]}" je uspješno obrisana'
+        })
+
+    except Exception as e:
+        logger.error(f"Greška pri brisanju setliste: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+def _port_caller(port):
+    """Vrati (call, on_stop) za izvršavanje operacija nad portom tokom nastupa.
+
+    Svaka operacija drži zaključavanje porta, pa se smjenjuje sa poslovima,
+    fleet-om i auto-sync-om umjesto da se njihove poruke ispreplitaju.
+    """
+    if link_supervisor.is_supervised(port):
+        def supervised_call(operation):
+            with port_lock(port):
+                return link_supervisor.call(port, operation)
+        return supervised_call, None
+
+    comm = SerialCommunicator()
+    comm.lock = port_lock(port)
+    with comm.lock:
+        if not comm.connect(port):
+            raise Exception(f'Nije moguće povezati se sa portom {port}')
+
+    def call(operation):
+        with comm.lock:
+            return operation(comm)
+
+    def on_stop():
+        with comm.lock:
+            comm.disconnect()
+    return call, on_stop
+
+@setlists_bp.route('/api/setlists/<int:setlist_id>/start', methods=['POST'])
+def start_setlist(setlist_id):
+    """Pokreni setlistu na uređaju (`usbPort`, opciono `lookahead` i početna `position`)."""
+    try:
+        data = request.get_json() or {}
+        usb_port = data.get('usbPort')
+        lookahead = data.get('lookahead', SETLIST_LOOKAHEAD)
+        position = data.get('position', 1)
+
+        if not usb_port:
+            return jsonify({
+                'success': False,
+                'error': 'USB port je obavezan'
+            }), 400
+
+        if not isinstance(lookahead, int) or lookahead < 0 or not isinstance(position, int):
+            return jsonify({
+                'success': False,
+                'error': 'lookahead i position moraju biti cijeli brojevi'
+            }), 400
+
+        with db_manager.get_connection() as conn:
+            setlist = load_setlist(conn.cursor(), setlist_id)
+        if setlist is None:
+            return jsonify({
+                'success': False,
+                'error': 'Setlista nije pronađena'
+            }), 404
+        if not 1 <= position <= len(setlist['items']):
+            return jsonify({
+                'success': False,
+                'error': f"Pozicija mora biti između 1 i {len(setlist['items'])}"
+            }), 400
+
+        # Prethodna setlista porta zatvara svoju vezu prije nove konekcije
+        setlist_runners.stop(usb_port)
+        call, on_stop = _port_caller(usb_port)
+        try:
+            runner, report = setlist_runners.start(usb_port, call, setlist, lookahead, position - 1, on_stop)
+        except Exception:
+            if on_stop:
+                on_stop()
+            raise
+
+        return jsonify({
+            'success': True,
+            'message': f"Setlista \"{setlist['name']}\" pokrenuta",
+            'data': {
+                'step': report,
+                'runner': runner.to_dict()
+            }
+        })
+
+    except Exception as e:
+        logger.error(f"Greška pri pokretanju setliste: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@setlists_bp.route('/api/setlists/run/<action>', methods=['POST'])
+def step_setlist(action):
+    """Sljedeća (`next`), prethodna (`previous`) ili zadana (`goto` sa `position`) pjesma."""
+    try:
+        data = request.get_json() or {}
+        usb_port = data.get('usbPort')
+        runner = setlist_runners.get(usb_port)
+
+        if action not in ('next', 'previous', 'goto'):
+            return jsonify({
+                'success': False,
+                'error': 'Akcija mora biti next, previous ili goto'
+            }), 404
+
+        if runner is None:
+            return jsonify({
+                'success': False,
+                'error': f'Nema aktivne setliste na portu {usb_port}'
+            }), 404
+
+        try:
+            if action == 'next':
+                report = runner.next()
+            elif action == 'previous':
+                report = runner.previous()
+            else:
+                position = data.get('position')
+                if not isinstance(position, int):
+                    raise IndexError('Pozicija je obavezna')
+                report = runner.go(position - 1)
+        except IndexError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+
+        return jsonify({
+            'success': True,
+            'data': report
+        })
+
+    except Exception as e:
+        logger.error(f"Greška pri promjeni pjesme: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@setlists_bp.route('/api/setlists/run', methods=['GET'])
+def get_setlist_run():
+    """Stanje aktivne setliste porta: pozicija, upisane naredne pjesme i latencija promjena."""
+    try:
+        usb_port = request.args.get('usbPort')
+        runner = setlist_runners.get(usb_port)
+        if runner is None:
+            return jsonify({
+                'success': False,
+                'error': f'Nema aktivne setliste na portu {usb_port}'
+            }), 404
+
+        return jsonify({
+            'success': True,
+            'data': runner.to_dict()
+        })
+
+    except Exception as e:
+        logger.error(f"Greška pri dohvatanju stanja setliste: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@setlists_bp.route('/api/setlists/run', methods=['DELETE'])
+def stop_setlist_run():
+    """Zaustavi setlistu porta (`?usbPort=`) i vrati završnu statistiku."""
+    try:
+        usb_port = request.args.get('usbPort')
+        summary = setlist_runners.stop(usb_port)
+        if summary is None:
+            return jsonify({
+                'success': False,
+                'error': f'Nema aktivne setliste na portu {usb_port}'
+            }), 404
+
+        return jsonify({
+            'success': True,
+            'data': summary
+        })
+
+    except Exception as e:
+        logger.error(f"Greška pri zaustavljanju setliste: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
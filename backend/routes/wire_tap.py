@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+API routes for the serial wire tap
+"""
+
+from flask import Blueprint, request, jsonify
+import logging
+from wire_tap import wire_tap
+
+logger = logging.getLogger(__name__)
+
+# Kreiranje Blueprint-a za wire tap API
+wire_tap_bp = Blueprint('wire_tap', __name__)
+
+@wire_tap_bp.route('/api/wire-tap', methods=['GET'])
+def get_wire_tap():
+    """Vrati zabilježene TX/RX okvire za port (ili stanje wire tap-a bez porta)."""
+    try:
+        port = request.args.get('port')
+        limit = request.args.get('limit', type=int)
+
+        data = wire_tap.status()
+        if port:
+            data['port'] = port
+            data['frames'] = wire_tap.snapshot(port, limit)
+
+        return jsonify({
+            'success': True,
+            'data': data
+        })
+
+    except Exception as e:
+        logger.error(f"Greška pri dohvatanju wire tap-a: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@wire_tap_bp.route('/api/wire-tap', methods=['POST'])
+def update_wire_tap():
+    """Uključi/isključi wire tap ili promijeni kapacitet bafera."""
+    try:
+        data = request.get_json() or {}
+
+        if 'capacity' in data:
+            capacity = data['capacity']
+            if not isinstance(capacity, int) or capacity < 1 or capacity > 100000:
+                return jsonify({
+                    'success': False,
+                    'error': 'capacity mora biti broj između 1 i 100000'
+                }), 400
+            wire_tap.set_capacity(capacity)
+
+        if 'enabled' in data:
+            wire_tap.set_enabled(data['enabled'])
+
+        return jsonify({
+            'success': True,
+            'data': wire_tap.status()
+        })
+
+    except Exception as e:
+        logger.error(f"Greška pri ažuriranju wire tap-a: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@wire_tap_bp.route('/api/wire-tap', methods=['DELETE'])
+def clear_wire_tap():
+    """Obriši zabilježene okvire (za `?port=` ili sve)."""
+    try:
+        wire_tap.clear(request.args.get('port'))
+        return jsonify({
+            'success': True,
+            'message': 'Wire tap je obrisan'
+        })
+
+    except Exception as e:
+        logger.error(f"Greška pri brisanju wire tap-a: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
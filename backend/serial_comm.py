@@ -6,12 +6,48 @@ Serial communication module for MIDI Configurator Backend
 
 import serial
 import json
+import base64
 import logging
 import time
+import threading
+import uuid
 from datetime import datetime
+from config import (
+    SERIAL_BAUDRATE, SERIAL_UPGRADE_BAUDRATES,
+    RELIABLE_WINDOW, RELIABLE_ACK_TIMEOUT, RELIABLE_MAX_RETRIES,
+    CONFIG_PUSH_MINIMIZE, CONFIG_READBACK_TIMEOUT,
+    SWITCHES_PER_BANK, CONFIG_STREAM_CHUNK_SWITCHES,
+    WRITE_QUEUE_WINDOW, WRITE_QUEUE_MAX_MESSAGES, WRITE_QUEUE_MAX_BYTES
+)
+from reliable_link import ReliableChannel, serialize_message
+from write_queue import CoalescingWriteQueue
+from wire_tap import wire_tap
+from transports import open_transport
+from device_mirror import device_mirror
+from preset_slots import preset_slots
+from device_events import device_events, DEVICE_EVENT_TYPES
+from banks import slot_count, layout
+from midi_encoder import resolve_type, switch_messages, encode_messages, bank_payload
+from macro_compiler import macro_blob
 
 logger = logging.getLogger(__name__)
 
+# Tipovi poruka kojima uređaj odgovara na ping (firmware šalje 'response', simulator 'pong')
+PING_REPLY_TYPES = ('pong', 'response')
+
+# Vrijeme čekanja na potvrdu promjene brzine i pauza prije prebacivanja porta
+BAUD_ACK_TIMEOUT = 0.5
+BAUD_SWITCH_SETTLE = 0.05
+
+# Rezultat pregovora brzine po portu, zajednički za sve komunikatore:
+# port -> potvrđena brzina ili None (uređaj ne podržava set_baud).
+# Važi preko connect-ova; briše se kada port nestane ili uz renegotiate=True.
+negotiated_baudrates = {}
+
+def forget_baudrate(port):
+    """Zaboravi rezultat pregovora brzine za port (port uklonjen ili zamijenjen uređaj)."""
+    negotiated_baudrates.pop(port, None)
+
 # Predefined color mappings to hex codes
 PRESET_COLORS = {
     'red': '#dc3545',
@@ -32,38 +68,59 @@ class SerialCommunicator:
     def __init__(self):
         self.connection = None
         self.port = None
-        self.baudrate = 115200  # ESP32 standard baudrate
+        self.baudrate = SERIAL_BAUDRATE  # ESP32 standard baudrate
+        self.base_baudrate = SERIAL_BAUDRATE
         self.timeout = 2
+        self.readback_unsupported = set()  # Portovi čiji uređaj ne odgovara na get_config
+        self.sequence = 0  # Redni broj zadnjeg poslanog okvira
+        self.session = None  # Identitet trenutne konekcije - šalje se u svakom okviru
+        self.last_delivery = None  # Izvještaj zadnje pouzdane isporuke
+        self.last_push = None  # Način zadnjeg slanja konfiguracije (full/partial/skipped)
+        self.lock = threading.RLock()  # Serijalizuje razmjenu poruka između niti
+        self.error_handler = None  # Poziva se sa (port, greška) kada link otkaže
+        self.write_queue = None  # Izlazni red za nalete malih poruka (kreira se po potrebi)
     
-    def connect(self, port, baudrate=115200, timeout=2):
+    def connect(self, port, baudrate=None, timeout=2):
         """Povezuje se sa serial portom."""
         try:
             if self.connection and self.connection.is_open:
                 self.disconnect()
             
+            baudrate = baudrate or SERIAL_BAUDRATE
             self.port = port
             self.baudrate = baudrate
+            self.base_baudrate = baudrate
             self.timeout = timeout
             
-            self.connection = serial.Serial(
-                port=port,
+            self.connection = open_transport(
+                port,
                 baudrate=baudrate,
                 timeout=timeout,
                 write_timeout=timeout
             )
             
+            self.new_session()
+            
+            # Uređaj je mogao biti promijenjen dok nismo bili povezani
+            device_mirror.mark_stale(port)
+            preset_slots.mark_stale(port)
+            
             logger.info(f"Uspješno povezan sa portom {port}")
             return True
             
         except Exception as e:
             logger.error(f"Greška pri povezivanju sa portom {port}: {e}")
             self.connection = None
+            forget_baudrate(port)
             return False
     
     def disconnect(self):
         """Prekida konekciju sa serial portom."""
         try:
+            self._close_write_queue()
             if self.connection and self.connection.is_open:
+                if self.baudrate != self.base_baudrate:
+                    self._restore_base_baudrate()
                 self.connection.close()
                 logger.info(f"Prekinuta konekcija sa portom {self.port}")
             self.connection = None
@@ -71,47 +128,368 @@ class SerialCommunicator:
         except Exception as e:
             logger.error(f"Greška pri prekidanju konekcije: {e}")
     
+    def abort(self):
+        """Zatvori port bez razmjene sa uređajem (npr. nakon prekida veze)."""
+        try:
+            if self.connection:
+                self.connection.close()
+            self._close_write_queue()
+        except Exception as e:
+            logger.debug(f"Greška pri zatvaranju prekinute veze {self.port}: {e}")
+        finally:
+            self.connection = None
+            self.baudrate = self.base_baudrate
+    
     def is_connected(self):
         """Provjeri da li je konekcija aktivna."""
         return self.connection and self.connection.is_open
     
-    def send_configuration(self, button_mappings):
-        """Šalje MIDI konfiguraciju preko serial porta."""
+    def ping(self, timeout=1):
+        """Pošalji ping i vrati vrijeme odziva u sekundama (None ako nema odgovora)."""
         try:
             if not self.is_connected():
-                raise Exception("Nema aktivne konekcije sa serial portom")
-            
-            # Kreiraj MIDI konfiguraciju
-            config_message = self._create_midi_config(button_mappings)
-            
-            # Konvertuj u JSON string - u jednoj liniji
-            json_message = json.dumps(config_message)
-            
-            # Isprintaj poruku koja se šalje
-            print("\n" + "=" * 80)
-            print("🚀 SLANJE MIDI KONFIGURACIJE NA PORT:", self.port)
-            print("=" * 80)
-            print(json_message)
-            print("=" * 80)
-            
-            # Dodaj newline i konvertuj u bytes
-            message_bytes = (json_message + '\n').encode()
-            
-            # Pošalji poruku
-            bytes_written = self.connection.write(message_bytes)
-            self.connection.flush()  # Osiguraj da se poruka pošalje odmah
+                return None
             
-            print(f"✅ USPJEŠNO POSLANO {bytes_written} bytes na port {self.port}")
-            print("=" * 80 + "\n")
+            start_time = time.monotonic()
+            self.write_message({"type": "ping", "timestamp": datetime.now().isoformat()})
+            reply = self.read_message(timeout, types=PING_REPLY_TYPES)
+            if reply is None:
+                return None
+            return time.monotonic() - start_time
+        
+        except Exception as e:
+            logger.warning(f"Greška pri ping-u porta {self.port}: {e}")
+            self._report_error(e)
+            return None
+    
+    def negotiate_baudrate(self, candidates=None, renegotiate=False):
+        """Dogovori najveću zajedničku brzinu sa uređajem nakon uspješnog ping-a.
+        
+        Uređaj odgovara sa 'baud_ack' na staroj brzini pa se prebacuje; ako ping na
+        novoj brzini ne uspije, obje strane se vraćaju na osnovnu brzinu.
+        Rezultat se pamti po portu (negotiated_baudrates): uređaj bez podrške
+        se ne pita ponovo, a već potvrđena brzina se traži bez početnog ping-a.
+        `renegotiate=True` zaboravlja raniji rezultat. Vraća brzinu na kojoj
+        link radi nakon pregovora.
+        """
+        if not self.is_connected():
+            return self.baudrate
+        if renegotiate:
+            forget_baudrate(self.port)
+        if self.port in negotiated_baudrates and negotiated_baudrates[self.port] is None:
+            return self.baudrate
+        
+        candidates = sorted(
+            (b for b in (candidates or SERIAL_UPGRADE_BAUDRATES) if b > self.base_baudrate),
+            reverse=True
+        )
+        known = negotiated_baudrates.get(self.port)
+        if known in candidates:
+            # Uređaj je ovu brzinu već potvrdio - ping prije zahtjeva nije potreban
+            candidates = [known]
+        elif not candidates or self.ping() is None:
+            return self.baudrate
+        
+        try:
+            self.write_message({"type": "set_baud", "baudrates": candidates})
+            reply = self.read_message(BAUD_ACK_TIMEOUT, types=('baud_ack',))
+            
+            if not reply or reply.get('baudrate') not in candidates:
+                logger.info(f"Uređaj na portu {self.port} ne podržava promjenu brzine")
+                negotiated_baudrates[self.port] = None
+                return self.baudrate
+            
+            new_baudrate = reply['baudrate']
+            time.sleep(BAUD_SWITCH_SETTLE)
+            self.connection.baudrate = new_baudrate
+            self.connection.reset_input_buffer()
+            
+            if self.ping() is not None:
+                self.baudrate = new_baudrate
+                negotiated_baudrates[self.port] = new_baudrate
+                logger.info(f"Port {self.port} prebačen na {new_baudrate} baud")
+                return new_baudrate
+            
+            logger.warning(f"Provjera na {new_baudrate} baud nije uspjela, vraćam na {self.base_baudrate}")
+        
+        except Exception as e:
+            logger.warning(f"Greška pri pregovoru brzine na portu {self.port}: {e}")
+        
+        # Uređaj podržava set_baud, ali brzina ne radi - sljedeći pregovor kreće ispočetka
+        forget_baudrate(self.port)
+        self.fallback_baudrate()
+        return self.baudrate
+    
+    def fallback_baudrate(self):
+        """Vrati link na osnovnu brzinu nakon greške na povećanoj brzini."""
+        try:
+            if not self.is_connected():
+                return False
             
-            logger.info(f"✅ Uspješno poslano {bytes_written} bytes na port {self.port}")
+            if self.connection.baudrate != self.base_baudrate:
+                self._restore_base_baudrate()
+            self.baudrate = self.base_baudrate
             
+            # Uređaj se sam vraća na osnovnu brzinu ako ne dobije ispravnu poruku
+            if self.ping() is None:
+                time.sleep(BAUD_ACK_TIMEOUT)
+                self.connection.reset_input_buffer()
+                return self.ping() is not None
             return True
-            
+        
         except Exception as e:
-            print(f"❌ GREŠKA PRI SLANJU: {e}")
+            logger.error(f"Greška pri vraćanju osnovne brzine: {e}")
+            return False
+    
+    def _restore_base_baudrate(self):
+        """Zatraži od uređaja povratak na osnovnu brzinu (best effort)."""
+        try:
+            self.write_message({"type": "set_baud", "baudrates": [self.base_baudrate]})
+            time.sleep(BAUD_SWITCH_SETTLE)
+        except Exception as e:
+            logger.debug(f"Uređaj nije primio zahtjev za osnovnu brzinu: {e}")
+        finally:
+            self.connection.baudrate = self.base_baudrate
+            self.baudrate = self.base_baudrate
+            self.connection.reset_input_buffer()
+    
+    def new_session(self):
+        """Započni novu sesiju okvira: redni brojevi kreću od 1 sa novim identitetom.
+        
+        Uređaj po identitetu sesije zna da ponovljeni redni brojevi nisu
+        duplikati okvira iz prethodne konekcije.
+        """
+        self.session = uuid.uuid4().hex[:8]
+        self.sequence = 0
+    
+    def next_sequence(self):
+        """Vrati sljedeći redni broj okvira."""
+        self.sequence += 1
+        return self.sequence
+    
+    def send_messages(self, messages, window=None):
+        """Pošalji niz poruka kroz pouzdani kanal i vrati izvještaj o isporuci."""
+        if not self.is_connected():
+            raise Exception("Nema aktivne konekcije sa serial portom")
+        
+        channel = ReliableChannel(
+            self,
+            window=window or RELIABLE_WINDOW,
+            ack_timeout=RELIABLE_ACK_TIMEOUT,
+            max_retries=RELIABLE_MAX_RETRIES
+        )
+        self.last_delivery = channel.send(messages)
+        return self.last_delivery
+    
+    def send_configuration(self, button_mappings, reliable=False, minimize=None, payload=None):
+        """Šalje MIDI konfiguraciju preko serial porta.
+        
+        Sa `reliable=True` konfiguracija ide kao potvrđeni okvir, a izvještaj
+        o isporuci (latencija, ponavljanja) ostaje u `last_delivery`.
+        Sa `minimize` (podrazumijevano CONFIG_PUSH_MINIMIZE) šalju se samo
+        tasteri koji se razlikuju od ogledala uređaja; način slanja ostaje
+        u `last_push`. Sa `payload` (CompiledConfig iz payload_cache) poruke
+        i njihov JSON se sastavljaju samo pri prvom slanju te verzije.
+        """
+        self.last_delivery = None
+        self.last_push = None
+        if minimize is None:
+            minimize = CONFIG_PUSH_MINIMIZE
+        try:
+            return self._send_configuration(button_mappings, reliable, minimize, payload)
+        except Exception as e:
+            if self.is_connected() and self.baudrate != self.base_baudrate:
+                logger.warning(f"Greška na {self.baudrate} baud ({e}), pokušavam ponovo na osnovnoj brzini")
+                if self.fallback_baudrate():
+                    try:
+                        return self._send_configuration(button_mappings, reliable, minimize, payload)
+                    except Exception as retry_error:
+                        e = retry_error
             logger.error(f"❌ Greška pri slanju konfiguracije: {e}")
+            self._report_error(e)
+            return False
+    
+    def _send_configuration(self, button_mappings, reliable=False, minimize=False, payload=None):
+        """Serijalizuj i upiši konfiguraciju; izuzeci se propagiraju pozivaocu."""
+        if not self.is_connected():
+            raise Exception("Nema aktivne konekcije sa serial portom")
+        
+        if slot_count() > SWITCHES_PER_BANK:
+            return self._stream_configuration(button_mappings, minimize, payload)
+        
+        # Kreiraj MIDI konfiguraciju (sa payload-om samo pri prvom slanju ove verzije)
+        if payload is not None:
+            config_message = payload.memo('set_config', lambda: self._create_midi_config(button_mappings))
+        else:
+            config_message = self._create_midi_config(button_mappings)
+        switches = config_message['switches']
+        
+        if minimize and self._send_changed_switches(switches, reliable, button_mappings):
+            return True
+        
+        self.last_push = {'mode': 'full', 'switches': len(switches)}
+        
+        if reliable:
+            if payload is not None:
+                config_message = payload.memo('set_config_frame', lambda: serialize_message(config_message))
+            report = self.send_messages([config_message])
+            device_mirror.replace(self.port, switches, 'push')
+            logger.info(f"✅ Konfiguracija isporučena na port {self.port} "
+                        f"({report['latency_ms']['max']} ms, ponavljanja: {report['retries']})")
+            return True
+        
+        # Konvertuj u JSON string - u jednoj liniji, sa newline-om, kao bytes
+        if payload is not None:
+            message_bytes = payload.memo('set_config_wire', lambda: (json.dumps(config_message) + '\n').encode())
+        else:
+            message_bytes = (json.dumps(config_message) + '\n').encode()
+        
+        # Pošalji poruku (sadržaj je dostupan kroz wire tap, bez ispisa na konzolu)
+        bytes_written = self._write_bytes(message_bytes)
+        device_mirror.replace(self.port, switches, 'push')
+        
+        logger.info(f"✅ Uspješno poslano {bytes_written} bytes na port {self.port}")
+        
+        return True
+    
+    def _stream_configuration(self, button_mappings, minimize=False, payload=None):
+        """Pošalji konfiguraciju više banaka kao niz config_chunk poruka.
+        
+        Dijelovi se generišu tek kada se otvori mjesto u kliznom prozoru, pa
+        memorija na obje strane zavisi od veličine dijela i prozora, a ne od
+        broja banaka. Sa poznatim ogledalom šalju se samo izmijenjeni dijelovi.
+        Sa `payload` se svi dijelovi i njihov JSON čuvaju uz tu verziju podataka.
+        """
+        total = slot_count()
+        button_dict = {data['button']: data for data in button_mappings}
+        
+        def build_chunks():
+            for first in range(0, total, CONFIG_STREAM_CHUNK_SWITCHES):
+                slots = range(first, min(total, first + CONFIG_STREAM_CHUNK_SWITCHES))
+                yield slots, [self._create_switch_config(i, button_dict.get(i + 1, {})) for i in slots], None
+        
+        def chunk_message(chunk, slots):
+            return {
+                "type": "config_chunk",
+                "first": chunk[0]['id'],
+                "switches": chunk,
+                "midi": bank_payload(switch_messages(button_dict.get(i + 1, {})) for i in slots)
+            }
+        
+        compiled = None
+        if payload is not None:
+            compiled = payload.memo(('chunks', total, CONFIG_STREAM_CHUNK_SWITCHES), lambda: [
+                (slots, chunk, serialize_message(chunk_message(chunk, slots))) for slots, chunk, _ in build_chunks()
+            ])
+        
+        mirror_known = False
+        if minimize:
+            if device_mirror.diff(self.port, []) is None and self.port not in self.readback_unsupported:
+                self.read_configuration()
+            mirror_known = device_mirror.diff(self.port, []) is not None
+        
+        def chunks():
+            for slots, chunk, frame_data in (compiled if compiled is not None else build_chunks()):
+                if not mirror_known or device_mirror.diff(self.port, chunk):
+                    yield chunk, slots, frame_data
+        
+        if mirror_known and next(chunks(), None) is None:
+            self.last_push = {'mode': 'skipped', 'switches': 0}
+            logger.info(f"Konfiguracija na portu {self.port} je već aktuelna - slanje preskočeno")
+            return True
+        
+        sent = []
+        
+        def messages():
+            yield {"type": "config_begin", **layout()}
+            for chunk, slots, frame_data in chunks():
+                sent.append(chunk)
+                yield frame_data or chunk_message(chunk, slots)
+            yield {"type": "config_end", "chunks": len(sent)}
+        
+        report = self.send_messages(messages())
+        switches = [switch for chunk in sent for switch in chunk]
+        if mirror_known:
+            device_mirror.apply(self.port, switches, 'push')
+        else:
+            device_mirror.replace(self.port, switches, 'push')
+        
+        total_chunks = (total + CONFIG_STREAM_CHUNK_SWITCHES - 1) // CONFIG_STREAM_CHUNK_SWITCHES
+        self.last_push = {
+            'mode': 'partial' if len(sent) < total_chunks else 'full',
+            'switches': len(switches),
+            'chunks': len(sent)
+        }
+        logger.info(f"✅ Poslano {len(switches)} tastera u {len(sent)} dijelova na port {self.port} "
+                    f"({report['elapsed_ms']} ms, ponavljanja: {report['retries']})")
+        return True
+    
+    def _send_changed_switches(self, switches, reliable, button_mappings):
+        """Pošalji samo tastere koji se razlikuju od ogledala; False ako je potrebno puno slanje."""
+        if device_mirror.diff(self.port, switches) is None and self.port not in self.readback_unsupported:
+            # Ogledalo nije potvrđeno - jedno čitanje je jeftinije od slanja svega
+            self.read_configuration()
+        
+        changed = device_mirror.diff(self.port, switches)
+        if changed is None or len(changed) == len(switches):
             return False
+        
+        self.last_push = {'mode': 'partial' if changed else 'skipped', 'switches': len(changed)}
+        if not changed:
+            logger.info(f"Konfiguracija na portu {self.port} je već aktuelna - slanje preskočeno")
+            return True
+        
+        button_dict = {data['button']: data for data in button_mappings}
+        messages = [
+            {"type": "set_switch", "switch": switch, "midi": self._switch_midi(button_dict.get(switch['id'] + 1, {}))}
+            for switch in changed
+        ]
+        if reliable:
+            self.send_messages(messages)
+        else:
+            self._write_bytes(b''.join(
+                (json.dumps(message, ensure_ascii=False, separators=(',', ':')) + '\n').encode('utf-8')
+                for message in messages
+            ))
+        device_mirror.apply(self.port, changed, 'push')
+        logger.info(f"✅ Poslano {len(changed)} izmijenjenih tastera na port {self.port}")
+        return True
+    
+    def read_configuration(self, timeout=CONFIG_READBACK_TIMEOUT):
+        """Pročitaj aktivnu konfiguraciju sa uređaja (get_config) i osvježi ogledalo."""
+        try:
+            if not self.is_connected():
+                return None
+            
+            switches = []
+            paged = slot_count() > SWITCHES_PER_BANK
+            while True:
+                message = {"type": "get_config"}
+                if paged:
+                    # Veća konfiguracija se čita po stranicama ograničene veličine
+                    first = switches[-1].get('id', len(switches) - 1) + 1 if switches else 0
+                    message.update(first=first, count=CONFIG_STREAM_CHUNK_SWITCHES)
+                self.write_message(message)
+                reply = self.read_message(timeout, types=('config',))
+                if reply is None:
+                    # Stariji firmware ne poznaje get_config - ne pokušavaj ponovo na ovom portu
+                    self.readback_unsupported.add(self.port)
+                    logger.info(f"Uređaj na portu {self.port} ne podržava čitanje konfiguracije")
+                    return None
+                
+                page = reply.get('switches', [])
+                switches.extend(page)
+                if not paged or not page or 'total' not in reply or len(switches) >= reply['total']:
+                    break
+            
+            device_mirror.replace(self.port, switches, 'readback')
+            self.readback_unsupported.discard(self.port)
+            return switches
+        
+        except Exception as e:
+            logger.warning(f"Greška pri čitanju konfiguracije sa porta {self.port}: {e}")
+            self._report_error(e)
+            return None
     
     def _get_hex_color(self, color, is_preset_color=True):
         """Convert color to hex code."""
@@ -128,50 +506,109 @@ class SerialCommunicator:
             return '#667eea'
     
     def _create_midi_config(self, all_button_data):
-        """Kreira MIDI konfiguraciju na osnovu mapiranja tastera."""
-        # Kreiraj osnovni template za svih 6 tastera
+        """Kreira MIDI konfiguraciju jedne banke (set_config) na osnovu mapiranja tastera."""
+        # Kreiraj osnovni template za sve tastere banke
         switches = []
         
         # Create a dictionary for easy lookup
         button_dict = {data['button']: data for data in all_button_data}
         
-        # Kreiraj konfiguraciju za svih 6 tastera
-        for i in range(6):
+        # Kreiraj konfiguraciju za sve tastere banke
+        for i in range(SWITCHES_PER_BANK):
             button_num = i + 1  # Convert to 1-based numbering
-            button_data = button_dict.get(button_num, {})
-            
-            # Get color information
-            hex_color = self._get_hex_color(
-                button_data.get('color'), 
-                button_data.get('is_preset_color', True)
-            )
-            
-            # Check if button has a command mapped
-            has_command = button_data.get('command_name') is not None
-            
-            switch_config = {
-                "id": i,
-                "name": button_data.get('command_name', f"Neaktivan_{button_num}"),
-                "channel": 1,
-                "cc": button_data.get('command_value', 0),
-                "value": button_data.get('command_value', 0),
-                "enabled": has_command,
-                "color": hex_color
-            }
-            
-            switches.append(switch_config)
+            switches.append(self._create_switch_config(i, button_dict.get(button_num, {})))
         
-        # Kreiraj konačnu konfiguraciju
+        # Kreiraj konačnu konfiguraciju (sa MIDI bajtovima cijele banke u jednom baferu)
         config = {
             "type": "set_config",
-            "switches": switches
+            "switches": switches,
+            "midi": bank_payload(switch_messages(button_dict.get(i + 1, {})) for i in range(SWITCHES_PER_BANK))
         }
         
         enabled_count = len([s for s in switches if s['enabled']])
-        print(f"🔧 Kreirana MIDI konfiguracija sa {enabled_count} aktivnih tastera i bojama za svih 6 tastera")
+        logger.debug(f"🔧 Kreirana MIDI konfiguracija sa {enabled_count} aktivnih tastera i bojama za svih {len(switches)} tastera")
         
         return config
     
+    def iter_switch_configs(self, all_button_data):
+        """Generator konfiguracija svih slotova (sve banke), bez pravljenja jedne velike poruke."""
+        button_dict = {data['button']: data for data in all_button_data}
+        for i in range(slot_count()):
+            yield self._create_switch_config(i, button_dict.get(i + 1, {}))
+    
+    def _create_switch_config(self, index, button_data):
+        """Kreira konfiguraciju jednog tastera (0-based `index`)."""
+        button_num = index + 1
+        
+        # Get color information
+        hex_color = self._get_hex_color(
+            button_data.get('color'), 
+            button_data.get('is_preset_color', True)
+        )
+        
+        # Check if button has a command mapped
+        has_command = button_data.get('command_name') is not None
+        
+        config = {
+            "id": index,
+            "name": button_data.get('command_name', f"Neaktivan_{button_num}"),
+            "channel": button_data.get('midi_channel') or 1,
+            "cc": button_data.get('command_value', 0),
+            "value": button_data.get('command_value', 0),
+            "midi_type": resolve_type(button_data.get('midi_type'), button_data.get('command_value') or 0),
+            "param": button_data.get('midi_param'),
+            "enabled": has_command,
+            "color": hex_color
+        }
+        # Makro komanda nosi bajtkod koji uređaj izvršava umjesto jedne poruke
+        blob = macro_blob(button_data)
+        if blob is not None:
+            config["macro"] = blob
+        return config
+    
+    def _switch_midi(self, button_data):
+        """Sirovi MIDI bajtovi jednog tastera (base64) za set_switch poruke."""
+        return base64.b64encode(encode_messages(switch_messages(button_data))).decode('ascii')
+    
+    def queue_switch_update(self, button_data):
+        """Stavi ažuriranje jednog tastera u izlazni red (zamjenjuje neposlano ažuriranje istog tastera)."""
+        index = button_data['button'] - 1
+        message = {
+            "type": "set_switch",
+            "switch": self._create_switch_config(index, button_data),
+            "midi": self._switch_midi(button_data)
+        }
+        self.queue_message(message, key=('switch', index))
+        device_mirror.apply(self.port, [message['switch']], 'live')
+    
+    def queue_message(self, message, key=None):
+        """Stavi poruku u izlazni red porta; nalet poruka ide jednim write() pozivom."""
+        if not self.is_connected():
+            raise Exception("Nema aktivne konekcije sa serial portom")
+        
+        if self.write_queue is None:
+            self.write_queue = CoalescingWriteQueue(
+                self._write_batch,
+                window=WRITE_QUEUE_WINDOW,
+                max_messages=WRITE_QUEUE_MAX_MESSAGES,
+                max_bytes=WRITE_QUEUE_MAX_BYTES,
+                on_error=self._report_error
+            )
+        self.write_queue.put(message, key=key)
+    
+    def _write_batch(self, data):
+        """Upiši spojene poruke iz izlaznog reda jednim write() i flush()."""
+        with self.lock:
+            if not self.is_connected():
+                raise Exception("Nema aktivne konekcije sa serial portom")
+            self._write_bytes(data)
+    
+    def _close_write_queue(self):
+        """Pošalji preostale poruke iz reda i zaustavi ga."""
+        if self.write_queue is not None:
+            queue, self.write_queue = self.write_queue, None
+            queue.close()
+    
     def send_test_message(self):
         """Šalje test poruku."""
         try:
@@ -186,27 +623,16 @@ class SerialCommunicator:
             
             json_message = json.dumps(test_message, ensure_ascii=False, separators=(',', ':'))
             
-            # Isprintaj test poruku
-            print("\n" + "-" * 60)
-            print("🔍 SLANJE TEST PORUKE NA PORT:", self.port)
-            print("-" * 60)
-            print(json_message)
-            print("-" * 60)
-            
             message_bytes = (json_message + '\n').encode('utf-8')
             
-            bytes_written = self.connection.write(message_bytes)
-            self.connection.flush()
-            
-            print(f"✅ TEST PORUKA POSLANA ({bytes_written} bytes)")
-            print("-" * 60 + "\n")
+            bytes_written = self._write_bytes(message_bytes)
             
             logger.info(f"✅ Test poruka poslana ({bytes_written} bytes)")
             return True
             
         except Exception as e:
-            print(f"❌ GREŠKA PRI SLANJU TEST PORUKE: {e}")
             logger.error(f"❌ Greška pri slanju test poruke: {e}")
+            self._report_error(e)
             return False
     
     def read_response(self, timeout=None):
@@ -215,14 +641,7 @@ class SerialCommunicator:
             if not self.is_connected():
                 return None
             
-            original_timeout = self.connection.timeout
-            if timeout is not None:
-                self.connection.timeout = timeout
-            
-            line = self.connection.readline()
-            
-            # Vrati originalni timeout
-            self.connection.timeout = original_timeout
+            line = self._read_line(timeout)
             
             if line:
                 response = line.decode('utf-8').strip()
@@ -233,7 +652,96 @@ class SerialCommunicator:
             
         except Exception as e:
             logger.warning(f"Greška pri čitanju odgovora: {e}")
+            self._report_error(e)
             return None
+    
+    def _report_error(self, error):
+        """Prijavi grešku linka (I/O greške porta) nadzoru veze, ako postoji."""
+        if self.error_handler and isinstance(error, (serial.SerialException, OSError)):
+            self.error_handler(self.port, error)
+    
+    def write_message(self, message):
+        """Serijalizuj poruku u jednu JSON liniju i upiši je na port."""
+        json_message = json.dumps(message, ensure_ascii=False, separators=(',', ':'))
+        return self._write_bytes((json_message + '\n').encode('utf-8'))
+    
+    def _write_bytes(self, data):
+        """Upiši bajtove na port, odmah ih pošalji i zabilježi u wire tap."""
+        bytes_written = self.connection.write(data)
+        self.connection.flush()  # Osiguraj da se poruka pošalje odmah
+        wire_tap.record(self.port, 'TX', data)
+        return bytes_written
+    
+    def _read_line(self, timeout=None):
+        """Pročitaj jednu liniju sa porta uz privremeni timeout."""
+        original_timeout = self.connection.timeout
+        if timeout is not None:
+            self.connection.timeout = timeout
+        try:
+            line = self.connection.readline()
+            if line:
+                wire_tap.record(self.port, 'RX', line)
+            return line
+        finally:
+            # Vrati originalni timeout
+            self.connection.timeout = original_timeout
+    
+    def read_message(self, timeout, types=None):
+        """Čitaj JSON poruke do prve čiji je tip u `types` ili do isteka timeout-a."""
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            
+            line = self._read_line(remaining)
+            if not line:
+                continue
+            
+            try:
+                message = json.loads(line.decode('utf-8'))
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                continue
+            
+            if not isinstance(message, dict):
+                continue
+            if types is None or message.get('type') in types:
+                return message
+            if message.get('type') in DEVICE_EVENT_TYPES:
+                # Događaj stigao usred razmjene - ne gubi ga
+                device_events.publish(self.port, message)
+    
+    def poll_events(self, timeout=0.05):
+        """Pročitaj nezatražene poruke koje čekaju na portu i objavi ih kao događaje.
+        
+        Ne blokira razmjenu poruka: ako je komunikator zauzet ili na portu
+        nema podataka, odmah vraća 0. Vraća broj objavljenih događaja.
+        """
+        if not self.lock.acquire(blocking=False):
+            return 0
+        try:
+            if not self.is_connected() or not self.connection.in_waiting:
+                return 0
+            published = 0
+            while self.connection.in_waiting:
+                line = self._read_line(timeout)
+                if not line:
+                    break
+                try:
+                    message = json.loads(line.decode('utf-8'))
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    continue
+                # Zakašnjeli odgovori (npr. ack nakon isteka) nisu događaji
+                if isinstance(message, dict) and message.get('type') in DEVICE_EVENT_TYPES:
+                    device_events.publish(self.port, message)
+                    published += 1
+            return published
+        except Exception as e:
+            logger.warning(f"Greška pri čitanju događaja sa uređaja: {e}")
+            self._report_error(e)
+            return 0
+        finally:
+            self.lock.release()
 
 # Globalna instanca serial komunikatora
 serial_comm = SerialCommunicator()
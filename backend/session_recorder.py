@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Session recorder - captures timestamped TX/RX traffic of device sessions into compact files
+"""
+
+import os
+import re
+import json
+import struct
+import logging
+import threading
+import time
+from datetime import datetime
+
+from config import SESSION_RECORD_DIR
+
+logger = logging.getLogger(__name__)
+
+# Format fajla: MAGIC, dužina zaglavlja (uint16), JSON zaglavlje, pa zapisi
+# (razmak od prethodnog zapisa u µs, smjer 'T'/'R', dužina podataka, podaci)
+SESSION_MAGIC = b'MSR1'
+SESSION_FILE_EXTENSION = '.msr'
+_HEADER = struct.Struct('<H')
+_RECORD = struct.Struct('<IcI')
+_MAX_DELTA_US = 0xFFFFFFFF
+
+class SessionFormatError(Exception):
+    """Greška kada fajl nije ispravan snimak sesije."""
+
+class SessionWriter:
+    """Upisuje TX/RX zapise jedne sesije u fajl (bezbjedno za više niti)."""
+
+    def __init__(self, path, port, baudrate=None):
+        self.path = path
+        self.file = open(path, 'wb')
+        self.lock = threading.Lock()
+        self.last = time.monotonic()
+        self.records = 0
+        header = json.dumps({
+            'port': port,
+            'baudrate': baudrate,
+            'started': datetime.now().isoformat()
+        }).encode('utf-8')
+        self.file.write(SESSION_MAGIC + _HEADER.pack(len(header)) + header)
+
+    def record(self, direction, data):
+        """Zabilježi bajtove u smjeru 'TX' ili 'RX'."""
+        if not data:
+            return
+        with self.lock:
+            if self.file is None:
+                return
+            now = time.monotonic()
+            delta_us = min(_MAX_DELTA_US, int((now - self.last) * 1e6))
+            self.last = now
+            self.file.write(_RECORD.pack(delta_us, direction[0].encode('ascii'), len(data)) + data)
+            self.records += 1
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+                logger.info(f"Snimak sesije zatvoren: {self.path} ({self.records} zapisa)")
+
+def load_session(path):
+    """Učitaj snimak; vraća (zaglavlje, [(vrijeme u s od početka, 'TX'/'RX', bajtovi), ...])."""
+    with open(path, 'rb') as f:
+        content = f.read()
+
+    if not content.startswith(SESSION_MAGIC):
+        raise SessionFormatError(f"{path} nije snimak sesije")
+
+    offset = len(SESSION_MAGIC)
+    (header_length,) = _HEADER.unpack_from(content, offset)
+    offset += _HEADER.size
+    header = json.loads(content[offset:offset + header_length].decode('utf-8'))
+    offset += header_length
+
+    records = []
+    elapsed = 0.0
+    while offset < len(content):
+        if offset + _RECORD.size > len(content):
+            raise SessionFormatError(f"Nepotpun zapis na kraju fajla {path}")
+        delta_us, direction, length = _RECORD.unpack_from(content, offset)
+        offset += _RECORD.size
+        elapsed += delta_us / 1e6
+        records.append((elapsed, 'TX' if direction == b'T' else 'RX', content[offset:offset + length]))
+        offset += length
+
+    return header, records
+
+class RecordingTransport:
+    """Omotač transporta koji bilježi sve poslane i primljene bajtove."""
+
+    def __init__(self, transport, writer):
+        self.transport = transport
+        self.writer = writer
+
+    @property
+    def baudrate(self):
+        return self.transport.baudrate
+
+    @baudrate.setter
+    def baudrate(self, value):
+        self.transport.baudrate = value
+
+    @property
+    def timeout(self):
+        return self.transport.timeout
+
+    @timeout.setter
+    def timeout(self, value):
+        self.transport.timeout = value
+
+    @property
+    def in_waiting(self):
+        return self.transport.in_waiting
+
+    @property
+    def is_open(self):
+        return self.transport.is_open
+
+    def write(self, data):
+        written = self.transport.write(data)
+        self.writer.record('TX', bytes(data))
+        return written
+
+    def readline(self):
+        data = self.transport.readline()
+        self.writer.record('RX', data)
+        return data
+
+    def read(self, size=1):
+        data = self.transport.read(size)
+        self.writer.record('RX', data)
+        return data
+
+    def close(self):
+        try:
+            self.transport.close()
+        finally:
+            self.writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __getattr__(self, name):
+        return getattr(self.transport, name)
+
+class SessionRecording:
+    """Uključuje snimanje svih sesija otvorenih kroz `open_transport` u zadati direktorij."""
+
+    def __init__(self, directory=SESSION_RECORD_DIR):
+        self.directory = directory or None
+
+    @property
+    def enabled(self):
+        return self.directory is not None
+
+    def start(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        logger.info(f"Snimanje sesija uključeno: {directory}")
+
+    def stop(self):
+        self.directory = None
+
+    def wrap(self, transport, port):
+        """Vrati transport koji snima sesiju (ili originalni ako snimanje nije uključeno)."""
+        if not self.enabled:
+            return transport
+
+        os.makedirs(self.directory, exist_ok=True)
+        name = re.sub(r'[^A-Za-z0-9_.-]+', '_', port).strip('_') or 'port'
+        path = os.path.join(
+            self.directory,
+            f"{name}-{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}{SESSION_FILE_EXTENSION}"
+        )
+        writer = SessionWriter(path, port, getattr(transport, 'baudrate', None))
+        logger.info(f"Snimam sesiju porta {port} u {path}")
+        return RecordingTransport(transport, writer)
+
+# Globalna instanca snimanja sesija
+session_recording = SessionRecording()
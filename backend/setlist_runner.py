@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Setlist runner - steps through ordered presets with lookahead prefetch into device slots
+"""
+
+import json
+import logging
+import threading
+from collections import deque
+from datetime import datetime
+
+from config import SETLIST_LOOKAHEAD, SETLIST_HISTORY
+from config_delivery import button_data_from_preset
+from link_health import RTTHistogram
+from preset_slots import preset_slots
+
+logger = logging.getLogger(__name__)
+
+def load_setlist(cursor, setlist_id):
+    """Učitaj setlistu sa stavkama po redoslijedu (None ako ne postoji)."""
+    cursor.execute('SELECT id, name, description, created_at, updated_at FROM setlists WHERE id = ?', (setlist_id,))
+    row = cursor.fetchone()
+    if not row:
+        return None
+
+    cursor.execute('''
+        SELECT si.position, si.preset_id, p.name, p.config_data
+        FROM setlist_items si
+        JOIN presets p ON si.preset_id = p.id
+        WHERE si.setlist_id = ?
+        ORDER BY si.position ASC
+    ''', (setlist_id,))
+
+    return {
+        'id': row['id'],
+        'name': row['name'],
+        'description': row['description'],
+        'created_at': row['created_at'],
+        'updated_at': row['updated_at'],
+        'items': [
+            {'preset_id': item['preset_id'], 'name': item['name'], 'config_data': item['config_data']}
+            for item in cursor.fetchall()
+        ]
+    }
+
+class SetlistRunner:
+    """Prolazak kroz setlistu na jednom uređaju.
+
+    Podaci tastera svih pjesama kompajliraju se pri pokretanju, a pozadinska
+    nit drži sljedećih `lookahead` preseta upisanih u slotove uređaja, pa je
+    "sljedeća pjesma" samo `preset_activate` poruka. `call` izvršava operaciju
+    nad komunikatorom porta (nadgledana veza ili vlastita konekcija).
+    """
+
+    def __init__(self, port, call, setlist, lookahead=SETLIST_LOOKAHEAD, on_stop=None):
+        self.port = port
+        self.call = call
+        self.on_stop = on_stop
+        self.setlist_id = setlist['id']
+        self.name = setlist['name']
+        self.steps = [
+            {
+                'preset_id': item['preset_id'],
+                'name': item['name'],
+                'button_data': list(button_data_from_preset(json.loads(item['config_data'])).values())
+            }
+            for item in setlist['items']
+        ]
+        # Aktivni slot se ne izbacuje, pa unaprijed stane najviše slot_count - 1 preseta
+        self.lookahead = max(0, min(lookahead, preset_slots.slot_count - 1))
+        self.position = None
+        self.staged = set()  # Pozicije (0-based) za koje je preset potvrđeno u slotu
+        self.switch_latency = RTTHistogram()
+        self.history = deque(maxlen=SETLIST_HISTORY)
+        self.hits = 0
+        self.misses = 0
+        self.prefetch_errors = 0
+        self.started = datetime.now().isoformat()
+        self.wakeup = threading.Event()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self, position=0):
+        """Aktiviraj prvu (ili zadanu) pjesmu i pokreni prefetch nit."""
+        report = self.go(position)
+        self.thread = threading.Thread(target=self._prefetch_loop, name=f'setlist-{self.port}', daemon=True)
+        self.thread.start()
+        return report
+
+    def stop(self):
+        self.stop_event.set()
+        self.wakeup.set()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(2.0)
+        if self.on_stop:
+            self.on_stop()
+
+    def go(self, position):
+        """Pređi na pjesmu `position` (0-based) i vrati izvještaj o promjeni."""
+        if not 0 <= position < len(self.steps):
+            raise IndexError(f"Pozicija mora biti između 1 i {len(self.steps)}")
+        step = self.steps[position]
+        report = self.call(lambda comm: preset_slots.activate(comm, step['preset_id'], step['button_data'], step['name']))
+
+        self.switch_latency.record(report['latency_ms'] / 1000.0)
+        if report['hit']:
+            self.hits += 1
+        else:
+            self.misses += 1
+        self.position = position
+        self.staged.discard(position)
+
+        step_report = {
+            'position': position + 1,
+            'preset_id': step['preset_id'],
+            'name': step['name'],
+            'slot': report['slot'],
+            'prefetched': report['hit'],
+            'latency_ms': report['latency_ms'],
+            'activate_ms': report['activate_ms'],
+            'time': datetime.now().isoformat()
+        }
+        self.history.append(step_report)
+        logger.info(f"Setlista '{self.name}': pjesma {position + 1} ({step['name']}) za {report['latency_ms']} ms"
+                    f"{'' if report['hit'] else ' (bez prefetch-a)'}")
+        self.wakeup.set()
+        return step_report
+
+    def next(self):
+        return self.go(0 if self.position is None else self.position + 1)
+
+    def previous(self):
+        return self.go(0 if self.position is None else self.position - 1)
+
+    def upcoming(self):
+        """Pozicije koje treba držati u slotovima (sljedećih `lookahead` pjesama)."""
+        if self.position is None:
+            return []
+        return list(range(self.position + 1, min(len(self.steps), self.position + 1 + self.lookahead)))
+
+    def _prefetch_loop(self):
+        """Upisuj naredne preset-e jedan po jedan, da promjena pjesme ne čeka cijeli prefetch."""
+        while not self.stop_event.is_set():
+            self.wakeup.wait()
+            self.wakeup.clear()
+            for position in self.upcoming():
+                if self.stop_event.is_set() or self.wakeup.is_set():
+                    break  # Pozicija se promijenila - kreni ispočetka
+                step = self.steps[position]
+                try:
+                    self.call(lambda comm: preset_slots.load(comm, step['preset_id'], step['button_data'], step['name']))
+                    self.staged.add(position)
+                except Exception as e:
+                    self.prefetch_errors += 1
+                    logger.warning(f"Prefetch pjesme {position + 1} setliste '{self.name}' nije uspio: {e}")
+                    break
+            self.staged.intersection_update(self.upcoming())
+
+    def to_dict(self):
+        current = self.steps[self.position] if self.position is not None else None
+        return {
+            'port': self.port,
+            'setlist_id': self.setlist_id,
+            'name': self.name,
+            'position': self.position + 1 if self.position is not None else None,
+            'total': len(self.steps),
+            'current': {'preset_id': current['preset_id'], 'name': current['name']} if current else None,
+            'lookahead': self.lookahead,
+            'staged': sorted(position + 1 for position in self.staged),
+            'switches': self.hits + self.misses,
+            'prefetch_hits': self.hits,
+            'prefetch_misses': self.misses,
+            'prefetch_errors': self.prefetch_errors,
+            'switch_latency_ms': self.switch_latency.to_dict(),
+            'history': list(self.history),
+            'started': self.started
+        }
+
+class SetlistRunnerManager:
+    """Aktivne setliste po portu."""
+
+    def __init__(self):
+        self.runners = {}
+        self.lock = threading.Lock()
+
+    def start(self, port, call, setlist, lookahead=SETLIST_LOOKAHEAD, position=0, on_stop=None):
+        """Pokreni setlistu na portu (postojeća se zaustavlja) i vrati izvještaj prve promjene."""
+        self.stop(port)
+        runner = SetlistRunner(port, call, setlist, lookahead, on_stop)
+        report = runner.start(position)
+        with self.lock:
+            self.runners[port] = runner
+        return runner, report
+
+    def stop(self, port):
+        """Zaustavi setlistu porta i vrati njeno završno stanje (ili None)."""
+        with self.lock:
+            runner = self.runners.pop(port, None)
+        if runner is None:
+            return None
+        runner.stop()
+        logger.info(f"Setlista '{runner.name}' na {port} zaustavljena")
+        return runner.to_dict()
+
+    def get(self, port):
+        """Vrati aktivnu setlistu porta (ili None)."""
+        return self.runners.get(port)
+
+# Globalna instanca aktivnih setlista
+setlist_runners = SetlistRunnerManager()
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Simulator farm - many simulated devices on PTY pairs served by one selector loop
+"""
+
+import os
+import sys
+import time
+import logging
+import selectors
+import threading
+
+from transports import PtyTransport
+from midi_device_simulator import MIDIDeviceSimulator, BASE_BAUDRATE
+
+logger = logging.getLogger(__name__)
+
+class _FarmEndpoint:
+    """Strana uređaja u farmi - simulator piše u izlazni bafer, a petlja ga prazni bez blokiranja.
+
+    Ima samo dio interfejsa transporta koji simulator koristi (write, flush, baudrate).
+    """
+
+    def __init__(self, farm, device):
+        self.farm = farm
+        self.device = device
+        self.baudrate = BASE_BAUDRATE  # PTY nema fizičku liniju - brzina se samo pamti
+        self.out = bytearray()
+        self.lock = threading.Lock()
+
+    def write(self, data):
+        with self.lock:
+            self.out += data
+        self.farm._want_write(self.device)
+        return len(data)
+
+    def flush(self):
+        pass
+
+class FarmDevice:
+    """Jedan uređaj u farmi: PTY par, vlastiti simulator (stanje i identitet) i ulazni bafer."""
+
+    def __init__(self, farm, index, prefix, baudrate):
+        self.transport = PtyTransport()
+        os.set_blocking(self.transport.master_fd, False)
+        self.port = self.transport.peer_name
+        self.device_id = f'{prefix}-{index + 1:04d}'
+        self.endpoint = _FarmEndpoint(farm, self)
+        self.simulator = MIDIDeviceSimulator(self.port, baudrate, connection=self.endpoint, verbose=False,
+                                             device_id=self.device_id)
+        self.simulator.running = True
+        self.buffer = bytearray()
+        self.messages = 0
+        self.writing = False  # Registrovan za EVENT_WRITE (izlaz nije stao u PTY bafer)
+
+    def to_dict(self):
+        return {
+            'device_id': self.device_id,
+            'port': self.port,
+            'messages': self.messages,
+            'switches': len(self.simulator.switches),
+            'baudrate': self.simulator.baudrate
+        }
+
+class SimulatorFarm:
+    """N simuliranih uređaja na Linux PTY parovima, opsluženih jednom selector petljom.
+
+    Svaki uređaj ima vlastiti MIDIDeviceSimulator (konfiguracija, okviri,
+    preset slotovi) i identitet koji vraća u pong-u. Umjesto niti i
+    blokirajućeg readline-a po uređaju, jedna nit čeka na sve PTY-jeve
+    odjednom, pa stotine uređaja rade na jednoj mašini.
+    """
+
+    def __init__(self, count, prefix='SIM', baudrate=BASE_BAUDRATE):
+        self.count = count
+        self.prefix = prefix
+        self.baudrate = baudrate
+        self.devices = []
+        self.selector = None
+        self.thread = None
+        self.running = False
+        self.pending = set()  # Uređaji sa neposlanim izlazom
+        self.pending_lock = threading.Lock()
+        self.wake_r = self.wake_w = None
+
+    def start(self):
+        """Kreiraj PTY parove i pokreni petlju; vraća listu portova za backend."""
+        self.selector = selectors.DefaultSelector()
+        self.wake_r, self.wake_w = os.pipe()
+        os.set_blocking(self.wake_r, False)
+        os.set_blocking(self.wake_w, False)
+        self.selector.register(self.wake_r, selectors.EVENT_READ, None)
+        try:
+            for index in range(self.count):
+                device = FarmDevice(self, index, self.prefix, self.baudrate)
+                self.devices.append(device)
+                self.selector.register(device.transport.master_fd, selectors.EVENT_READ, device)
+        except Exception:
+            self.stop()
+            raise
+
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name='simulator-farm', daemon=True)
+        self.thread.start()
+        logger.info(f"Farma simulatora pokrenuta: {len(self.devices)} uređaja")
+        return self.ports()
+
+    def ports(self):
+        return [device.port for device in self.devices]
+
+    def device(self, port):
+        return next((device for device in self.devices if device.port == port), None)
+
+    def _want_write(self, device):
+        """Uređaj ima izlaz; izvan petlje (npr. press_switch iz testa) probudi petlju da ga pošalje."""
+        with self.pending_lock:
+            self.pending.add(device)
+        if threading.current_thread() is not self.thread:
+            self._wake()
+
+    def _wake(self):
+        if self.wake_w is not None:
+            try:
+                os.write(self.wake_w, b'\0')
+            except OSError:
+                pass  # Petlja je već probuđena (ili zaustavljena)
+
+    def _run(self):
+        while self.running:
+            try:
+                events = self.selector.select(timeout=0.25)
+            except (OSError, ValueError):
+                break
+            for key, mask in events:
+                device = key.data
+                if device is None:
+                    self._drain_wakeup()
+                    continue
+                if mask & selectors.EVENT_READ:
+                    self._read(device)
+                if mask & selectors.EVENT_WRITE:
+                    self._flush(device)
+            self._flush_pending()
+            for device in self.devices:
+                if device.simulator.baud_confirm_deadline:
+                    device.simulator.check_baud_confirmation()
+
+    def _drain_wakeup(self):
+        try:
+            while os.read(self.wake_r, 4096):
+                pass
+        except BlockingIOError:
+            pass
+
+    def _read(self, device):
+        try:
+            data = os.read(device.transport.master_fd, 65536)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            return  # EIO dok druga strana nije otvorena
+        device.buffer += data
+        while True:
+            index = device.buffer.find(b'\n')
+            if index < 0:
+                break
+            line = bytes(device.buffer[:index])
+            del device.buffer[:index + 1]
+            try:
+                message = line.decode('utf-8').strip()
+            except UnicodeDecodeError:
+                # Smeće na liniji - vjerovatno pogrešna brzina
+                device.simulator.revert_baudrate()
+                continue
+            if message:
+                device.messages += 1
+                try:
+                    device.simulator.process_message(message)
+                except Exception as e:
+                    logger.warning(f"Greška uređaja {device.device_id}: {e}")
+
+    def _flush_pending(self):
+        with self.pending_lock:
+            devices, self.pending = self.pending, set()
+        for device in devices:
+            self._flush(device)
+
+    def _flush(self, device):
+        """Upiši koliko PTY primi; ostatak čeka EVENT_WRITE (spor host ne blokira ostale uređaje)."""
+        endpoint = device.endpoint
+        with endpoint.lock:
+            try:
+                while endpoint.out:
+                    written = os.write(device.transport.master_fd, endpoint.out)
+                    del endpoint.out[:written]
+            except (BlockingIOError, InterruptedError):
+                pass
+            except OSError as e:
+                logger.debug(f"Izlaz uređaja {device.device_id} odbačen: {e}")
+                endpoint.out.clear()
+            waiting = bool(endpoint.out)
+        if waiting != device.writing:
+            device.writing = waiting
+            events = selectors.EVENT_READ | (selectors.EVENT_WRITE if waiting else 0)
+            self.selector.modify(device.transport.master_fd, events, device)
+
+    def status(self):
+        return {
+            'devices': len(self.devices),
+            'messages': sum(device.messages for device in self.devices),
+            'per_device': [device.to_dict() for device in self.devices]
+        }
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self._wake()
+            self.thread.join(2)
+        for device in self.devices:
+            device.transport.close()
+        if self.selector is not None:
+            self.selector.close()
+        for fd in (self.wake_r, self.wake_w):
+            if fd is not None:
+                os.close(fd)
+        self.wake_r = self.wake_w = None
+        logger.info("Farma simulatora zaustavljena")
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (2, 3):
+        print("Upotreba: python simulator_farm.py <broj_uređaja> [datoteka_portova]")
+        print("Primjer: python simulator_farm.py 120 /tmp/farm_ports.txt")
+        print("Datoteka sadrži po jedan port u redu (EXTRA_SERIAL_PORTS_FILE za detekciju portova)")
+        sys.exit(1)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    farm = SimulatorFarm(int(sys.argv[1]))
+    ports_file = sys.argv[2] if len(sys.argv) == 3 else None
+    try:
+        ports = farm.start()
+        if ports_file:
+            with open(ports_file, 'w') as f:
+                f.write('\n'.join(ports) + '\n')
+            print(f"Portovi za backend upisani u {ports_file}")
+        else:
+            for device in farm.devices:
+                print(f"{device.device_id}: {device.port}")
+        while True:
+            time.sleep(10)
+            print(f"Primljeno {farm.status()['messages']} poruka na {len(farm.devices)} uređaja")
+    except KeyboardInterrupt:
+        print("\nZaustavljanje farme...")
+    finally:
+        farm.stop()
+        if ports_file and os.path.exists(ports_file):
+            os.remove(ports_file)
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for debounced auto-sync of edits to a device
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import tempfile
+import threading
+import time
+import auto_sync as auto_sync_module
+from auto_sync import AutoSync
+from database import DatabaseManager
+from payload_cache import PayloadCache
+from transports import create_loopback
+from midi_device_simulator import MIDIDeviceSimulator
+
+PORT = 'loop://test-auto-sync'
+
+def _edit(db, value):
+    """Izmjena kao kroz API: vrijednost komande mapirane na taster 1 (nova verzija podataka za slanje)."""
+    with db.get_connection() as conn:
+        conn.execute('UPDATE commands SET value = ? WHERE id = 1', (value,))
+        conn.commit()
+    auto_sync_module.payload_cache.bump('commands')
+
+def _wait(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.005)
+    return False
+
+def test_debounce_and_max_delay():
+    """Nalet izmjena daje jedno slanje, a neprekidne izmjene se šalju najkasnije nakon max_delay."""
+    original_db, original_cache = auto_sync_module.db_manager, auto_sync_module.payload_cache
+    device = create_loopback('test-auto-sync', timeout=0.05)
+    simulator = MIDIDeviceSimulator(PORT, connection=device, verbose=False)
+    thread = threading.Thread(target=simulator.start, daemon=True)
+    thread.start()
+
+    with tempfile.TemporaryDirectory() as directory:
+        db = DatabaseManager(os.path.join(directory, 'sync.db'))
+        with db.get_connection() as conn:
+            conn.execute("INSERT INTO commands (id, name, value) VALUES (1, 'Gain', 0)")
+            conn.execute('UPDATE button_mappings SET command_id = 1 WHERE button_number = 1')
+            conn.commit()
+        auto_sync_module.db_manager = db
+        cache = auto_sync_module.payload_cache = PayloadCache()
+        sync = AutoSync()
+        try:
+            sync.mark_dirty('mappings')  # Port još nije uključen - ništa se ne bilježi
+            sync.enable(PORT, debounce=0.05, max_delay=0.3, reliable=True)
+            assert sync.status(PORT)[0]['pending_edits'] == 0
+
+            # Nalet od 10 izmjena - jedno slanje sa konačnim stanjem
+            for value in range(1, 11):
+                _edit(db, value)
+                sync.mark_dirty('commands')
+                time.sleep(0.01)
+            assert _wait(lambda: sync.status(PORT)[0]['pushes'] == 1)
+            time.sleep(0.1)
+            status = sync.status(PORT)[0]
+            print(f"Nalet: {status['edits_pushed']} izmjena u {status['pushes']} slanju, "
+                  f"kašnjenje {status['last_push']['latency_ms']} ms")
+            assert status['pushes'] == 1 and status['edits_pushed'] == 10
+            assert status['last_push']['success']
+            assert simulator.switches[0]['value'] == 10
+            # Slanje je sastavilo verziju u kešu - sljedeće slanje iste verzije je ponovo koristi
+            assert cache.stats()['misses'] == 1
+            assert cache.load(db=db) is cache.load(db=db) and cache.stats()['hits'] == 2
+
+            # Neprekidne izmjene 0.7 s - max_delay ograničava kašnjenje
+            start = time.monotonic()
+            value = 10
+            while time.monotonic() - start < 0.7:
+                value += 1
+                _edit(db, value)
+                sync.mark_dirty('commands')
+                time.sleep(0.02)
+            assert _wait(lambda: simulator.switches[0]['value'] == value)
+            time.sleep(0.1)
+            status = sync.status(PORT)[0]
+            print(f"Neprekidne izmjene: {status['pushes'] - 1} slanja, najveće kašnjenje {status['latency_ms']['max']} ms")
+            assert 2 <= status['pushes'] - 1 <= 5
+            assert status['latency_ms']['max'] <= 500  # max_delay + trajanje jednog slanja
+            assert status['pending_edits'] == 0 and status['errors'] == 0
+
+            # Ručni flush ne čeka mirovanje
+            _edit(db, 99)
+            sync.mark_dirty('preset')
+            results = sync.flush(PORT)
+            assert results[0]['success'] and results[0]['edits'] == 1
+            assert simulator.switches[0]['value'] == 99
+            assert sync.disable(PORT) and sync.status(PORT) == []
+        finally:
+            sync.disable(PORT)
+            auto_sync_module.db_manager, auto_sync_module.payload_cache = original_db, original_cache
+            simulator.stop()
+            device.close()
+            thread.join(2)
+
+if __name__ == "__main__":
+    test_debounce_and_max_delay()
+    print("✅ Testovi automatskog slanja prošli")
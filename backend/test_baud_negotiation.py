@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for baud rate negotiation against the device simulator
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import threading
+import time
+import midi_device_simulator
+import serial_comm
+from transports import create_loopback
+from serial_comm import SerialCommunicator, forget_baudrate
+from midi_device_simulator import MIDIDeviceSimulator, BASE_BAUDRATE
+
+def _start_simulator(name):
+    device = create_loopback(name, timeout=0.05)
+    simulator = MIDIDeviceSimulator(f'loop://{name}', connection=device, verbose=False)
+    thread = threading.Thread(target=simulator.start, daemon=True)
+    thread.start()
+    return simulator, device, thread
+
+def _stop(comm, simulator, device, thread):
+    comm.abort()
+    simulator.stop()
+    device.close()
+    thread.join(2)
+
+def test_upgrade():
+    """Uređaj potvrdi najveću zajedničku brzinu i link radi na njoj."""
+    simulator, device, thread = _start_simulator('test-baud-upgrade')
+    comm = SerialCommunicator()
+    try:
+        assert comm.connect('loop://test-baud-upgrade', timeout=1)
+        assert comm.negotiate_baudrate([460800, 230400]) == 460800
+        assert comm.baudrate == comm.connection.baudrate == 460800
+        assert simulator.baudrate == 460800
+        assert comm.ping() is not None
+        assert simulator.baud_confirm_deadline is None  # Ping je potvrdio novu brzinu
+    finally:
+        _stop(comm, simulator, device, thread)
+
+def test_missing_or_garbled_ack():
+    """Bez baud_ack (ili sa neispravnim) link ostaje na osnovnoj brzini, a port se ne pita ponovo do renegotiate."""
+    simulator, device, thread = _start_simulator('test-baud-noack')
+    comm = SerialCommunicator()
+    port = 'loop://test-baud-noack'
+    requests = []
+    handle_set_baud = simulator.handle_set_baud
+    try:
+        assert comm.connect(port, timeout=1)
+
+        simulator.handle_set_baud = requests.append  # Stari firmware bez podrške za set_baud
+        assert comm.negotiate_baudrate() == BASE_BAUDRATE
+        assert serial_comm.negotiated_baudrates[port] is None
+        assert comm.ping() is not None
+
+        # Rezultat važi i za novi connect i za drugi komunikator - bez čekanja na baud_ack
+        assert comm.connect(port, timeout=1)
+        other = SerialCommunicator()
+        assert other.connect(port, timeout=1)
+        start = time.monotonic()
+        assert comm.negotiate_baudrate() == other.negotiate_baudrate() == BASE_BAUDRATE
+        assert time.monotonic() - start < serial_comm.BAUD_ACK_TIMEOUT
+        assert len(requests) == 1
+        other.abort()
+
+        # Eksplicitan ponovni pregovor, ali potvrda je neispravna
+        simulator.handle_set_baud = lambda data: simulator.send_response({'type': 'baud_ack', 'baudrate': 12345})
+        assert comm.negotiate_baudrate(renegotiate=True) == BASE_BAUDRATE
+        assert serial_comm.negotiated_baudrates[port] is None
+
+        simulator.handle_set_baud = lambda data: device.write(b'{"type": "baud_ack", "baud\xff\xfe\n')
+        assert comm.negotiate_baudrate(renegotiate=True) == BASE_BAUDRATE
+        assert simulator.baudrate == BASE_BAUDRATE
+
+        # Ažuriran uređaj na istom portu dobija veću brzinu nakon ponovnog pregovora
+        simulator.handle_set_baud = handle_set_baud
+        assert comm.negotiate_baudrate(renegotiate=True) == 921600
+        assert comm.ping() is not None
+    finally:
+        forget_baudrate(port)
+        _stop(comm, simulator, device, thread)
+
+def test_result_kept_across_connects():
+    """Potvrđena brzina se na sljedećem connect-u traži bez početnog ping-a; nestanak porta je briše."""
+    simulator, device, thread = _start_simulator('test-baud-kept')
+    comm = SerialCommunicator()
+    port = 'loop://test-baud-kept'
+    pings = []
+    handle_ping = simulator.handle_ping
+
+    def counting_ping(data):
+        pings.append(simulator.baudrate)
+        handle_ping(data)
+
+    try:
+        assert comm.connect(port, timeout=1)
+        assert comm.negotiate_baudrate() == 921600
+        comm.disconnect()
+        assert simulator.baudrate == BASE_BAUDRATE
+
+        simulator.handle_ping = counting_ping
+        assert comm.connect(port, timeout=1)
+        assert comm.negotiate_baudrate() == 921600
+        assert pings == [921600]  # Samo provjera na novoj brzini
+        comm.disconnect()
+
+        # Port je nestao - rezultat se zaboravlja i pregovara ispočetka
+        assert not comm.connect('loop://test-baud-kept-missing', timeout=1)
+        serial_comm.negotiated_baudrates['loop://test-baud-kept-missing'] = 921600
+        assert not comm.connect('loop://test-baud-kept-missing', timeout=1)
+        assert 'loop://test-baud-kept-missing' not in serial_comm.negotiated_baudrates
+    finally:
+        forget_baudrate(port)
+        _stop(comm, simulator, device, thread)
+
+def test_confirmation_timeout():
+    """Ping na novoj brzini ne uspije - host se vraća na osnovnu, a uređaj sam odustaje bez potvrde."""
+    original_timeout = midi_device_simulator.BAUD_CONFIRM_TIMEOUT
+    simulator, device, thread = _start_simulator('test-baud-confirm')
+    comm = SerialCommunicator()
+    handle_ping = simulator.handle_ping
+
+    def ping_at_base_only(data):
+        if simulator.baudrate == simulator.base_baudrate:
+            handle_ping(data)
+
+    try:
+        assert comm.connect('loop://test-baud-confirm', timeout=1)
+        simulator.handle_ping = ping_at_base_only
+        assert comm.negotiate_baudrate() == BASE_BAUDRATE
+        assert comm.baudrate == comm.connection.baudrate == BASE_BAUDRATE
+        assert simulator.baudrate == BASE_BAUDRATE
+        assert 'loop://test-baud-confirm' not in serial_comm.negotiated_baudrates  # Vrijedi pokušati ponovo
+        assert comm.ping() is not None
+
+        # Uređaj potvrdi brzinu, ali host nikad ne pošalje ispravnu poruku na njoj
+        midi_device_simulator.BAUD_CONFIRM_TIMEOUT = 0.2
+        comm.write_message({'type': 'set_baud', 'baudrates': [921600]})
+        assert comm.read_message(1, types=('baud_ack',))['baudrate'] == 921600
+        assert simulator.baudrate == 921600
+        deadline = time.monotonic() + 2
+        while simulator.baudrate != BASE_BAUDRATE and time.monotonic() < deadline:
+            time.sleep(0.02)
+        assert simulator.baudrate == BASE_BAUDRATE and simulator.baud_confirm_deadline is None
+        assert comm.ping() is not None
+    finally:
+        midi_device_simulator.BAUD_CONFIRM_TIMEOUT = original_timeout
+        _stop(comm, simulator, device, thread)
+
+if __name__ == "__main__":
+    test_upgrade()
+    test_missing_or_garbled_ack()
+    test_result_kept_across_connects()
+    test_confirmation_timeout()
+    print("✅ Testovi pregovora brzine prošli")
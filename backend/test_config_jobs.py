@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for queued configuration-send jobs
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import tempfile
+import threading
+import time
+import payload_cache as payload_cache_module
+from database import DatabaseManager
+from serial_comm import SerialCommunicator
+from transports import create_loopback
+from midi_device_simulator import MIDIDeviceSimulator
+from config_delivery import button_data_from_preset
+from config_jobs import ConfigJobManager, JobQueueFull
+
+PRESET = {
+    '1': {'command_id': 1, 'command_name': 'Delay', 'command_value': 20, 'color': 'red', 'is_preset_color': True},
+    '2': {'command_id': 2, 'command_name': 'Reverb', 'command_value': 23, 'color': '#123456', 'is_preset_color': False}
+}
+
+def _start_devices(count):
+    devices = []
+    for i in range(count):
+        device = create_loopback(f'test-jobs-{i}', timeout=0.05)
+        simulator = MIDIDeviceSimulator(f'loop://test-jobs-{i}', connection=device, verbose=False, response_delay=0.05)
+        thread = threading.Thread(target=simulator.start, daemon=True)
+        thread.start()
+        devices.append((simulator, device, thread))
+    return devices
+
+def _stop_devices(devices):
+    for simulator, device, thread in devices:
+        simulator.stop()
+        device.close()
+        thread.join(2)
+
+def test_hung_device_does_not_block():
+    """Posao se vraća odmah, a uređaj koji ne odgovara zauzima samo jednu nit."""
+    devices = _start_devices(3)
+    hung = create_loopback('test-jobs-hung', timeout=0.05)  # Niko ne čita - uređaj "visi"
+    jobs = ConfigJobManager(max_workers=2, queue_limit=8)
+    data = button_data_from_preset(PRESET)
+    try:
+        start = time.monotonic()
+        slow = jobs.submit(['loop://test-jobs-hung'], data, reliable=True)
+        fast = jobs.submit([f'loop://test-jobs-{i}' for i in range(3)], data, reliable=True)
+        submit_ms = (time.monotonic() - start) * 1000
+        assert fast['state'] == 'queued' and fast['progress'] == {
+            'total': 3, 'completed': 0, 'succeeded': 0, 'failed': 0, 'percent': 0.0}
+
+        states = [job['progress']['completed'] for job in jobs.follow(fast['id'], 1.0) if job]
+        result = jobs.get(fast['id'])
+        print(f"Predaja {submit_ms:.1f} ms, tri uređaja za {result['elapsed_ms']} ms "
+              f"dok je uređaj bez odgovora još u stanju {jobs.get(slow['id'])['state']}")
+        assert submit_ms < 50
+        assert result['state'] == 'completed' and result['progress']['succeeded'] == 3
+        assert states == sorted(states) and states[-1] == 3
+        assert all(entry['result']['ack'] for entry in result['ports'])
+        assert jobs.get(slow['id'])['state'] == 'running'
+        for simulator, _, _ in devices:
+            assert simulator.switches[1]['color'] == '#123456'
+
+        slow_result = jobs.wait(slow['id'], None, 10)
+        while slow_result['state'] == 'running':
+            slow_result = jobs.wait(slow['id'], slow_result['version'], 10)
+        assert slow_result['state'] == 'failed' and slow_result['ports'][0]['result']['error']
+    finally:
+        hung.close()
+        _stop_devices(devices)
+
+def test_same_port_queue_and_cancel():
+    """Poslovi za isti port idu redom; posao koji čeka može se otkazati, a pun red se odbija."""
+    devices = _start_devices(1)
+    jobs = ConfigJobManager(max_workers=4, queue_limit=2)
+    data = button_data_from_preset(PRESET)
+    try:
+        first = jobs.submit(['loop://test-jobs-0'], data)
+        second = jobs.submit(['loop://test-jobs-0'], data)
+        try:
+            jobs.submit(['loop://test-jobs-0'], data)
+            assert False, "Pun red mora odbiti novi posao"
+        except JobQueueFull:
+            pass
+
+        cancelled = jobs.cancel(second['id'])
+        assert cancelled['state'] == 'cancelled' and cancelled['ports'][0]['state'] == 'cancelled'
+
+        third = jobs.submit(['loop://test-jobs-0'], data)
+        done = jobs.wait(first['id'], None, 5)
+        while done['state'] not in ('completed', 'failed'):
+            done = jobs.wait(first['id'], done['version'], 5)
+        assert done['state'] == 'completed'
+        last = jobs.wait(third['id'], None, 5)
+        while last['state'] not in ('completed', 'failed'):
+            last = jobs.wait(third['id'], last['version'], 5)
+        assert last['state'] == 'completed'
+        # Treći posao je počeo tek kada je prvi završio
+        assert last['started'] >= done['finished']
+        assert [job['id'] for job in jobs.list()] == [third['id'], second['id'], first['id']]
+    finally:
+        _stop_devices(devices)
+
+def test_job_and_direct_send_share_port_lock():
+    """Posao i direktno slanje (/api/configuration) na isti port ne otvaraju veze istovremeno."""
+    from app import create_app
+
+    port = 'loop://test-jobs-0'
+    devices = _start_devices(1)
+    jobs = ConfigJobManager(max_workers=2)
+    open_sessions = {'now': 0, 'max': 0}
+    counter_lock = threading.Lock()
+    connect, disconnect = SerialCommunicator.connect, SerialCommunicator.disconnect
+
+    def counting_connect(self, *args, **kwargs):
+        connected = connect(self, *args, **kwargs)
+        if connected:
+            with counter_lock:
+                open_sessions['now'] += 1
+                open_sessions['max'] = max(open_sessions['max'], open_sessions['now'])
+        return connected
+
+    def counting_disconnect(self):
+        if self.is_connected():
+            with counter_lock:
+                open_sessions['now'] -= 1
+        return disconnect(self)
+
+    original_db = payload_cache_module.db_manager
+    SerialCommunicator.connect, SerialCommunicator.disconnect = counting_connect, counting_disconnect
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            db = DatabaseManager(os.path.join(directory, 'jobs.db'))
+            with db.get_connection() as conn:
+                conn.execute("INSERT INTO commands (id, name, value) VALUES (1, 'Gain', 10)")
+                conn.execute('UPDATE button_mappings SET command_id = 1 WHERE button_number = 1')
+                conn.commit()
+            payload_cache_module.db_manager = db
+            payload_cache_module.payload_cache.bump('test')
+            client = create_app().test_client()
+
+            job = jobs.submit([port], button_data_from_preset(PRESET), reliable=True)
+            time.sleep(0.02)  # Posao je upravo otvorio port
+            response = client.post('/api/configuration', json={'usbPort': port, 'reliable': True})
+            done = jobs.wait(job['id'], None, 5)
+            while done['state'] not in ('completed', 'failed'):
+                done = jobs.wait(job['id'], done['version'], 5)
+
+            print(f"Istovremeno otvorenih veza na portu: najviše {open_sessions['max']}")
+            assert response.status_code == 200 and response.get_json()['success']
+            assert done['state'] == 'completed'
+            assert open_sessions['max'] == 1
+            # Direktno slanje je čekalo kraj posla, pa na uređaju ostaje njegova konfiguracija
+            assert done['finished'] <= response.get_json()['data']['timestamp']
+            assert devices[0][0].switches[0]['name'] == 'Gain'
+    finally:
+        SerialCommunicator.connect, SerialCommunicator.disconnect = connect, disconnect
+        payload_cache_module.db_manager = original_db
+        payload_cache_module.payload_cache.bump('test')
+        _stop_devices(devices)
+
+def test_job_and_firmware_upload_share_port_lock():
+    """Posao i slanje firmware-a na isti port idu jedno za drugim - obje strane stižu cijele."""
+    from app import create_app
+
+    port = 'loop://test-jobs-0'
+    devices = _start_devices(1)
+    simulator = devices[0][0]
+    jobs = ConfigJobManager(max_workers=2)
+    image = os.urandom(16 * 1024)
+    open_sessions = {'now': 0, 'max': 0}
+    counter_lock = threading.Lock()
+    connect, disconnect = SerialCommunicator.connect, SerialCommunicator.disconnect
+
+    def counting_connect(self, *args, **kwargs):
+        connected = connect(self, *args, **kwargs)
+        if connected:
+            with counter_lock:
+                open_sessions['now'] += 1
+                open_sessions['max'] = max(open_sessions['max'], open_sessions['now'])
+        return connected
+
+    def counting_disconnect(self):
+        if self.is_connected():
+            with counter_lock:
+                open_sessions['now'] -= 1
+        return disconnect(self)
+
+    SerialCommunicator.connect, SerialCommunicator.disconnect = counting_connect, counting_disconnect
+    try:
+        client = create_app().test_client()
+        job = jobs.submit([port], button_data_from_preset(PRESET), reliable=True)
+        time.sleep(0.02)  # Posao je upravo otvorio port
+        response = client.post(f'/api/firmware/upload?usbPort={port}', data=image,
+                               content_type='application/octet-stream')
+        done = jobs.wait(job['id'], None, 5)
+        while done['state'] not in ('completed', 'failed'):
+            done = jobs.wait(job['id'], done['version'], 5)
+
+        print(f"Istovremeno otvorenih veza na portu: najviše {open_sessions['max']}")
+        assert response.status_code == 200 and response.get_json()['success']
+        assert done['state'] == 'completed'
+        assert open_sessions['max'] == 1
+        assert simulator.installed_firmware == image
+        assert simulator.switches[1]['color'] == '#123456'
+    finally:
+        SerialCommunicator.connect, SerialCommunicator.disconnect = connect, disconnect
+        _stop_devices(devices)
+
+if __name__ == "__main__":
+    test_hung_device_does_not_block()
+    test_same_port_queue_and_cancel()
+    test_job_and_direct_send_share_port_lock()
+    test_job_and_firmware_upload_share_port_lock()
+    print("✅ Testovi poslova slanja prošli")
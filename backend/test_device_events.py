@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for device event ingestion, the event ring buffer and SSE fan-out
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import json
+import threading
+import time
+from device_events import EventRing, device_events
+from transports import create_loopback
+from link_supervisor import link_supervisor
+from midi_device_simulator import MIDIDeviceSimulator
+
+def test_ring_keeps_newest_and_counts_drops():
+    """Čitalac koji zaostane preskače najstarije događaje i dobija broj izgubljenih."""
+    ring = EventRing(capacity=8)
+    for i in range(20):
+        ring.append({'type': 'button', 'switch': i})
+
+    events, cursor, dropped = ring.read(0)
+    assert [event['switch'] for _, _, event in events] == list(range(12, 20))
+    assert cursor == 20 and dropped == 12
+
+    # Drugi čitalac ima svoj kursor i ne utiče na prvog
+    events, cursor, dropped = ring.read(18)
+    assert len(events) == 2 and dropped == 0
+    assert not ring.wait(20, 0.01)
+
+def test_events_fan_out_to_many_readers():
+    """Nalet događaja sa uređaja stiže do svih čitalaca preko nadgledane veze."""
+    port = 'loop://test-events'
+    device = create_loopback('test-events', timeout=0.05)
+    simulator = MIDIDeviceSimulator(port, connection=device, verbose=False)
+    thread = threading.Thread(target=simulator.start, daemon=True)
+    thread.start()
+
+    count = 2000
+    readers = 4
+    received = [[] for _ in range(readers)]
+    cursor = device_events.head(port)
+
+    def follow(index):
+        for events, dropped in device_events.follow(port, cursor, timeout=0.2):
+            assert dropped == 0
+            received[index].extend(event['switch'] for _, _, event in events)
+            if len(received[index]) >= count or not events:
+                break
+
+    try:
+        assert link_supervisor.open(port, reliable=False, heartbeat_interval=0)
+        followers = [threading.Thread(target=follow, args=(i,)) for i in range(readers)]
+        for follower in followers:
+            follower.start()
+
+        start = time.perf_counter()
+        for i in range(count):
+            simulator.press_switch(i % 6)
+        # Događaj usred razmjene poruka se ne gubi
+        link_supervisor.call(port, lambda comm: comm.ping())
+
+        for follower in followers:
+            follower.join(5)
+        elapsed = time.perf_counter() - start
+        print(f"{count} događaja do {readers} čitalaca za {elapsed * 1000:.1f} ms "
+              f"({count / elapsed:.0f} događaja/s)")
+
+        for events in received:
+            assert events == [i % 6 for i in range(count)]
+        assert device_events.status()['ports'][port]['readers'] == 0
+    finally:
+        link_supervisor.close(port)
+        simulator.stop()
+        device.close()
+        thread.join(2)
+
+def test_sse_stream_resumes_from_last_event_id():
+    """SSE klijent nastavlja od Last-Event-ID i dobija događaje u SSE formatu."""
+    from app import create_app
+
+    port = 'loop://test-sse'
+    first = device_events.publish(port, {'type': 'button', 'switch': 0, 'state': 'down'})
+    device_events.publish(port, {'type': 'status', 'battery': 80})
+
+    client = create_app().test_client()
+    response = client.get(f'/api/events/stream?port={port}', headers={'Last-Event-ID': str(first)}, buffered=False)
+    assert response.mimetype == 'text/event-stream'
+    chunks = iter(response.response)
+    ready = next(chunks)
+    ready = ready.decode('utf-8') if isinstance(ready, bytes) else ready
+    body = next(chunks)
+    body = body.decode('utf-8') if isinstance(body, bytes) else body
+    response.close()
+
+    assert ready.startswith('event: ready')
+    assert body.startswith(f'id: {first + 1}\nevent: status\n')
+    assert json.loads(body.split('data: ', 1)[1])['battery'] == 80
+
+if __name__ == "__main__":
+    test_ring_keeps_newest_and_counts_drops()
+    test_events_fan_out_to_many_readers()
+    test_sse_stream_resumes_from_last_event_id()
+    print("✅ Testovi događaja uređaja prošli")
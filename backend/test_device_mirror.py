@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for device configuration readback and the cached device mirror
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import threading
+from device_mirror import DeviceMirror, device_mirror
+from transports import create_loopback
+from serial_comm import SerialCommunicator
+from midi_device_simulator import MIDIDeviceSimulator
+
+def _buttons(color='red'):
+    return [
+        {'button': i, 'command_name': f'Komanda {i}', 'command_value': 20 + i, 'color': color, 'is_preset_color': True}
+        for i in range(1, 7)
+    ]
+
+def test_generation_counts_only_changes():
+    """Generacija raste samo kada se sadržaj ogledala promijeni."""
+    mirror = DeviceMirror()
+    switches = [{'id': 0, 'cc': 20}, {'id': 1, 'cc': 21}]
+
+    assert mirror.replace('p', switches, 'push') == 1
+    assert mirror.replace('p', switches, 'readback') == 1
+    assert mirror.apply('p', [{'id': 1, 'cc': 99}], 'live') == 2
+    assert mirror.diff('p', [{'id': 0, 'cc': 20}, {'id': 1, 'cc': 21}]) == [{'id': 1, 'cc': 21}]
+
+    # Nakon ponovnog povezivanja ogledalo se ne koristi za poređenje
+    mirror.mark_stale('p')
+    assert mirror.diff('p', switches) is None
+    assert mirror.get('p')['stale']
+    assert mirror.apply('unknown', switches, 'live') is None
+
+def test_push_is_skipped_or_minimized():
+    """Slanje koristi ogledalo: prvo puno, zatim preskočeno, pa samo izmijenjeni taster."""
+    device = create_loopback('test-mirror', timeout=0.1)
+    simulator = MIDIDeviceSimulator('loop://test-mirror', connection=device, verbose=False)
+    thread = threading.Thread(target=simulator.start, daemon=True)
+    thread.start()
+
+    comm = SerialCommunicator()
+    try:
+        assert comm.connect('loop://test-mirror', timeout=1)
+
+        assert comm.send_configuration(_buttons(), reliable=True, minimize=True)
+        assert comm.last_push['mode'] == 'full'
+
+        assert comm.send_configuration(_buttons(), reliable=True, minimize=True)
+        assert comm.last_push == {'mode': 'skipped', 'switches': 0}
+
+        buttons = _buttons()
+        buttons[2]['color'] = 'green'
+        assert comm.send_configuration(buttons, reliable=True, minimize=True)
+        assert comm.last_push == {'mode': 'partial', 'switches': 1}
+        assert simulator.switches[2]['color'] == '#28a745'
+
+        # Čitanje sa uređaja se slaže sa ogledalom
+        generation = device_mirror.get('loop://test-mirror')['generation']
+        switches = comm.read_configuration()
+        assert switches == device_mirror.get('loop://test-mirror')['switches']
+        assert device_mirror.get('loop://test-mirror')['generation'] == generation
+        print(f"Ogledalo: generacija {generation}, {len(switches)} tastera")
+    finally:
+        comm.abort()
+        simulator.stop()
+        device.close()
+        thread.join(2)
+
+if __name__ == "__main__":
+    test_generation_counts_only_changes()
+    test_push_is_skipped_or_minimized()
+    print("✅ Testovi ogledala uređaja prošli")
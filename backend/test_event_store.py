@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for the batched device event store and its rollups
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import sqlite3
+import tempfile
+import time
+from database import DatabaseManager
+from event_store import EventStore
+
+def _database(directory):
+    path = os.path.join(directory, 'events.db')
+    DatabaseManager(path)
+    with sqlite3.connect(path) as conn:
+        for button, name in ((1, 'Distortion'), (2, 'Delay')):
+            cursor = conn.execute('INSERT INTO commands (name, value) VALUES (?, ?)', (name, button))
+            conn.execute('UPDATE button_mappings SET command_id = ? WHERE button_number = ?', (cursor.lastrowid, button))
+    return path
+
+def test_batched_writes_and_usage_from_rollups():
+    """Događaji se upisuju u grupama, a statistika korištenja čita samo sažetke."""
+    with tempfile.TemporaryDirectory() as directory:
+        path = _database(directory)
+        store = EventStore(db_path=path, batch_size=200, flush_interval=0.05)
+
+        gig_start = time.time() // 3600 * 3600 - 3600
+        start = time.perf_counter()
+        for i in range(3000):
+            # Taster 1 dva puta češće od tastera 2, kroz dva sata
+            switch = 0 if i % 3 else 1
+            store.record('loop://gig', {'type': 'button', 'switch': switch, 'state': 'down'}, gig_start + i * 2.4)
+            store.record('loop://gig', {'type': 'button', 'switch': switch, 'state': 'up'}, gig_start + i * 2.4 + 0.1)
+        assert store.flush()
+        elapsed = time.perf_counter() - start
+        status = store.status()
+        print(f"6000 događaja u {status['batches']} grupa za {elapsed * 1000:.1f} ms")
+        assert status['written'] == 6000 and status['batches'] <= 60
+
+        with sqlite3.connect(path) as conn:
+            assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+            assert conn.execute('SELECT COUNT(*) FROM event_rollups_hour').fetchone()[0] <= 2 * 2 * 2
+            # Bez sirovih događaja statistika ostaje ista - čita se iz sažetaka
+            conn.execute('DELETE FROM device_events')
+
+        usage = store.usage(gig_start, gig_start + 7200)
+        assert usage == [{'command': 'Distortion', 'count': 2000}, {'command': 'Delay', 'count': 1000}]
+        assert store.usage(gig_start, gig_start + 7200, resolution='hour') == usage
+
+        timeline = store.timeline(gig_start, gig_start + 7200, resolution='hour')
+        assert [entry['count'] for entry in timeline] == [3000, 3000]
+        print(f"Najkorištenija komanda: {usage[0]}")
+
+def test_retention_removes_old_events():
+    """Sirovi događaji se brišu nakon perioda čuvanja, sažeci po satu ostaju duže."""
+    with tempfile.TemporaryDirectory() as directory:
+        path = _database(directory)
+        store = EventStore(db_path=path, batch_size=10, flush_interval=0.01)
+        old = time.time() - 40 * 86400
+        store.record('loop://old', {'type': 'button', 'switch': 1}, old)
+        store.record('loop://old', {'type': 'status', 'battery': 50})
+        assert store.flush()
+
+        with sqlite3.connect(path) as conn:
+            store._apply_retention(conn)
+            assert conn.execute('SELECT COUNT(*) FROM device_events').fetchone()[0] == 1
+            assert conn.execute('SELECT COUNT(*) FROM event_rollups_minute').fetchone()[0] == 1
+            assert conn.execute('SELECT COUNT(*) FROM event_rollups_hour').fetchone()[0] == 2
+
+if __name__ == "__main__":
+    test_batched_writes_and_usage_from_rollups()
+    test_retention_removes_old_events()
+    print("✅ Testovi skladišta događaja prošli")
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for chunked, resumable firmware upload against the device simulator
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import threading
+import zlib
+import serial
+from transports import create_loopback, open_transport
+from serial_comm import SerialCommunicator
+from midi_device_simulator import MIDIDeviceSimulator
+from firmware_upload import FirmwareUploader
+
+IMAGE = os.urandom(64 * 1024 + 100)
+
+def _start_simulator(name, firmware=None, chunk_limit=None, line_rate=False):
+    device = create_loopback(name, timeout=0.1, line_rate=line_rate)
+    simulator = MIDIDeviceSimulator(f'loop://{name}', connection=device, verbose=False)
+    simulator.firmware = firmware
+    simulator.firmware_chunk_limit = chunk_limit
+    thread = threading.Thread(target=simulator.start, daemon=True)
+    thread.start()
+    return simulator, thread
+
+def test_upload_reports_throughput():
+    """Cijela slika stiže na uređaj, a izvještaj sadrži propusnost."""
+    simulator, thread = _start_simulator('test-fw', line_rate=True)
+    comm = SerialCommunicator()
+    try:
+        assert comm.connect('loop://test-fw', timeout=1)
+        assert comm.negotiate_baudrate() == 921600
+        uploader = FirmwareUploader(chunk_size=1024, window=16)
+        report = uploader.upload(comm, IMAGE)
+        print(f"{report['size']} bytes u {report['chunks']} dijelova: {report['bytes_per_second']} bytes/s")
+        assert simulator.installed_firmware == IMAGE
+        assert report['resumed_from'] == 0
+        assert report['chunks'] == 65
+        # Base64 i JSON okviri troše dio linije od ~92 KB/s na 921600 baud
+        assert 20000 < report['bytes_per_second'] < 92160
+    finally:
+        comm.abort()
+        simulator.stop()
+        thread.join(2)
+
+def test_upload_resumes_after_interruption():
+    """Nakon prekida veze slanje se nastavlja od zadnjeg primljenog dijela."""
+    uploader = FirmwareUploader(chunk_size=1024, window=8)
+    simulator, thread = _start_simulator('test-fw-resume', chunk_limit=20)
+    comm = SerialCommunicator()
+    try:
+        assert comm.connect('loop://test-fw-resume', timeout=1)
+        uploader.begin(comm.port, len(IMAGE))
+        try:
+            uploader.upload(comm, IMAGE)
+        except Exception as e:
+            print(f"Očekivan prekid: {e}")
+        else:
+            assert False, "Slanje je trebalo biti prekinuto"
+    finally:
+        comm.abort()
+        thread.join(2)
+
+    # "Isti" uređaj ponovo priključen - stanje prijema je sačuvano
+    simulator, thread = _start_simulator('test-fw-resume', firmware=simulator.firmware)
+    try:
+        assert comm.connect('loop://test-fw-resume', timeout=1)
+        report = uploader.upload(comm, IMAGE)
+        print(f"Nastavak od {report['resumed_from']} bytes, poslano još {report['bytes_sent']} bytes")
+        assert report['resumed_from'] >= 19 * 1024
+        assert report['bytes_sent'] == len(IMAGE) - report['resumed_from']
+        assert simulator.installed_firmware == IMAGE
+        uploader.finish(comm.port, report)
+        assert uploader.status(comm.port)['state'] == 'done'
+    finally:
+        comm.abort()
+        simulator.stop()
+        thread.join(2)
+
+def test_route_resume_over_pty():
+    """Nastavak preko API-ja na istom uređaju (PTY): ponovo poslani dijelovi se ne odbacuju kao duplikati."""
+    from app import create_app
+
+    if not hasattr(os, 'openpty'):
+        print("PTY nije podržan na ovom sistemu - preskačem")
+        return
+
+    device = open_transport('pty://', timeout=0.05)
+    simulator = MIDIDeviceSimulator('pty://', connection=device, verbose=False)
+    thread = threading.Thread(target=simulator.start, daemon=True)
+    thread.start()
+    port = device.peer_name
+    client = create_app().test_client()
+    write_message = SerialCommunicator.write_message
+    chunks_sent = []
+
+    def write_until_unplugged(self, message):
+        if message.get('type') == 'frame' and '"fw_chunk"' in message['data']:
+            if len(chunks_sent) >= 20:
+                raise serial.SerialException("Kabl isključen")
+            chunks_sent.append(message['seq'])
+        return write_message(self, message)
+
+    try:
+        SerialCommunicator.write_message = write_until_unplugged
+        response = client.post(f'/api/firmware/upload?usbPort={port}', data=IMAGE,
+                               content_type='application/octet-stream')
+        SerialCommunicator.write_message = write_message
+        assert response.status_code == 500
+        assert client.get(f'/api/firmware/status?usbPort={port}').get_json()['data']['state'] == 'failed'
+        assert simulator.installed_firmware is None and simulator.firmware['received']
+
+        # Uređaj nije resetovan - i dalje pamti redne brojeve okvira iz prekinute sesije
+        response = client.post(f'/api/firmware/upload?usbPort={port}', data=IMAGE,
+                               content_type='application/octet-stream')
+        body = response.get_json()
+        assert response.status_code == 200 and body['success'], body
+        assert body['data']['resumed_from'] > 0
+        print(f"Nastavak preko PTY-a od {body['data']['resumed_from']} bytes")
+        assert simulator.installed_firmware == IMAGE
+        assert zlib.crc32(simulator.installed_firmware) == zlib.crc32(IMAGE)
+    finally:
+        SerialCommunicator.write_message = write_message
+        simulator.stop()
+        thread.join(2)
+        device.close()
+
+if __name__ == "__main__":
+    test_upload_reports_throughput()
+    test_upload_resumes_after_interruption()
+    test_route_resume_over_pty()
+    print("✅ Firmware testovi prošli")
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for pushing one configuration to several devices concurrently
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import threading
+import time
+from transports import create_loopback
+from midi_device_simulator import MIDIDeviceSimulator
+from config_delivery import push_fleet, button_data_from_preset
+
+PRESET = {
+    '1': {'command_id': 1, 'command_name': 'Delay', 'command_value': 20, 'color': 'red', 'is_preset_color': True},
+    '4': {'command_id': 2, 'command_name': 'Reverb', 'command_value': 23, 'color': '#123456', 'is_preset_color': False}
+}
+
+def test_fleet_push_runs_concurrently():
+    """Ukupno vrijeme je blizu najsporijeg uređaja, a ne zbira svih."""
+    devices = []
+    for i in range(4):
+        device = create_loopback(f'test-fleet-{i}', timeout=0.05)
+        simulator = MIDIDeviceSimulator(f'loop://test-fleet-{i}', connection=device, verbose=False, response_delay=0.05)
+        thread = threading.Thread(target=simulator.start, daemon=True)
+        thread.start()
+        devices.append((simulator, device, thread))
+
+    ports = [f'loop://test-fleet-{i}' for i in range(4)] + ['loop://test-fleet-missing']
+    try:
+        start = time.monotonic()
+        results = list(push_fleet(ports, button_data_from_preset(PRESET), reliable=True))
+        elapsed_ms = (time.monotonic() - start) * 1000
+
+        by_port = {result['port']: result for result in results}
+        assert len(results) == 5
+        assert not by_port['loop://test-fleet-missing']['success']
+        assert by_port['loop://test-fleet-missing']['error']
+
+        succeeded = [result for result in results if result['success']]
+        assert len(succeeded) == 4
+        assert all(result['ack'] for result in succeeded)
+        for simulator, _, _ in devices:
+            assert simulator.switches[3]['color'] == '#123456'
+            assert not simulator.switches[1]['enabled']
+
+        total = sum(result['latency_ms'] for result in succeeded)
+        slowest = max(result['latency_ms'] for result in succeeded)
+        print(f"Ukupno {elapsed_ms:.0f} ms, najsporiji {slowest:.0f} ms, zbir {total:.0f} ms")
+        assert elapsed_ms < total * 0.6
+    finally:
+        for simulator, device, thread in devices:
+            simulator.stop()
+            device.close()
+            thread.join(2)
+
+if __name__ == "__main__":
+    test_fleet_push_runs_concurrently()
+    print("✅ Fleet push test prošao")
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for the round-trip latency benchmark
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import threading
+from latency_benchmark import run_benchmark
+from transports import create_loopback
+from serial_comm import SerialCommunicator
+from midi_device_simulator import MIDIDeviceSimulator
+
+def _measure(name, baudrate, **options):
+    device = create_loopback(name, timeout=0.05, line_rate=True)
+    simulator = MIDIDeviceSimulator(f'loop://{name}', baudrate=baudrate, connection=device, verbose=False)
+    thread = threading.Thread(target=simulator.start, daemon=True)
+    thread.start()
+
+    comm = SerialCommunicator()
+    try:
+        assert comm.connect(f'loop://{name}', baudrate=baudrate, timeout=1)
+        return run_benchmark(comm, **options)
+    finally:
+        comm.abort()
+        simulator.stop()
+        device.close()
+        thread.join(2)
+
+def test_baud_rates_are_comparable():
+    """Veća brzina linka daje manji RTT za istu veličinu poruke."""
+    slow = _measure('test-bench-slow', 115200, count=30, payload=256)
+    fast = _measure('test-bench-fast', 921600, count=30, payload=256)
+    for report in (slow, fast):
+        print(f"{report['baudrate']} baud: p50 {report['rtt_ms']['p50']} ms, p99 {report['rtt_ms']['p99']} ms, "
+              f"{report['messages_per_second']} poruka/s")
+        assert report['lost'] == 0 and report['rtt_ms']['count'] == 30
+    assert fast['rtt_ms']['p50'] < slow['rtt_ms']['p50']
+
+def test_frame_mode_and_rate():
+    """No-op okviri se potvrđuju ack-om, a `rate` ograničava broj poruka u sekundi."""
+    report = _measure('test-bench-frame', 921600, count=20, rate=100, mode='frame')
+    print(f"Okviri pri 100/s: p50 {report['rtt_ms']['p50']} ms, trajanje {report['elapsed_ms']} ms")
+    assert report['received'] == 20
+    assert report['elapsed_ms'] >= 190
+    assert report['messages_per_second'] <= 105
+
+if __name__ == "__main__":
+    test_baud_rates_are_comparable()
+    test_frame_mode_and_rate()
+    print("✅ Testovi mjerenja kašnjenja prošli")
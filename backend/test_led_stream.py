@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for live LED streaming: frame pacing, encoding and drop-oldest under lag
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import json
+import threading
+import time
+from led_stream import LedStream, encode_frame, parse_color
+from transports import create_loopback
+from serial_comm import SerialCommunicator
+from midi_device_simulator import MIDIDeviceSimulator
+
+def _device(name, baudrate=115200):
+    device = create_loopback(name, timeout=0.05, line_rate=True)
+    simulator = MIDIDeviceSimulator(f'loop://{name}', baudrate=baudrate, connection=device, verbose=False)
+    thread = threading.Thread(target=simulator.start, daemon=True)
+    thread.start()
+    comm = SerialCommunicator()
+    assert comm.connect(f'loop://{name}', baudrate=baudrate, timeout=1)
+    return device, simulator, thread, comm
+
+def _close(device, simulator, thread, comm):
+    comm.abort()
+    simulator.stop()
+    device.close()
+    thread.join(2)
+
+def test_frame_encoding_is_compact():
+    """Okvir za 6 tastera stane u nekoliko desetina bajtova."""
+    pixels = b''.join(parse_color(color) for color in ('red', '#00ff00', [0, 0, 255], 'blue', 'cyan', 'pink'))
+    line = json.dumps(encode_frame(7, pixels), separators=(',', ':'))
+    print(f"LED okvir za 6 tastera: {len(line) + 1} bytes")
+    assert len(line) + 1 < 60
+
+def test_stream_keeps_target_fps():
+    """Stream sa efektom drži 60 fps na 115200 baud i uređaj prima sve okvire."""
+    device, simulator, thread, comm = _device('test-leds')
+    try:
+        stream = LedStream('loop://test-leds', comm, fps=60, effect='rainbow')
+        stream.start()
+        time.sleep(1.0)
+        stats = stream.to_dict()
+        stream.stop()
+        time.sleep(0.1)
+
+        print(f"60 fps cilj: postignuto {stats['achieved_fps']} fps, poslano {stream.stats['frames_sent']}, "
+              f"primljeno {simulator.led_frames}, preskočeno rokova {stats['ticks_skipped']}")
+        assert 55 <= stats['achieved_fps'] <= 65
+        assert simulator.led_frames == stream.stats['frames_sent']
+        assert simulator.led_frames_missed == 0
+        assert len(simulator.leds) == 18
+    finally:
+        _close(device, simulator, thread, comm)
+
+def test_lagging_link_drops_oldest_frames():
+    """Na sporoj vezi stream preskače rokove i šalje najnoviji okvir, bez rasta reda."""
+    device, simulator, thread, comm = _device('test-leds-slow', baudrate=9600)
+    try:
+        stream = LedStream('loop://test-leds-slow', comm, fps=120)
+        stream.start()
+        for i in range(200):
+            stream.submit(bytes((i, 0, 0)) * 6)
+            time.sleep(0.002)
+        last = bytes((199, 0, 0)) * 6
+        time.sleep(0.3)
+        stream.stop()
+        time.sleep(0.1)
+
+        stats = stream.to_dict()
+        print(f"9600 baud, 120 fps cilj: poslano {stats['frames_sent']}, odbačeno {stats['frames_dropped']}, "
+              f"preskočeno rokova {stats['ticks_skipped']}")
+        assert stats['frames_dropped'] > 0 and stats['ticks_skipped'] > 0
+        assert len(stream.frames) == 0
+        assert simulator.leds == last
+    finally:
+        _close(device, simulator, thread, comm)
+
+if __name__ == "__main__":
+    test_frame_encoding_is_compact()
+    test_stream_keeps_target_fps()
+    test_lagging_link_drops_oldest_frames()
+    print("✅ Testovi LED streama prošli")
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for RTT histogram and heartbeat loss statistics
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import random
+from link_health import RTTHistogram, LinkHealth
+
+def test_histogram_percentiles_are_accurate():
+    """Percentili iz histograma su unutar preciznosti korpi (~3%)."""
+    histogram = RTTHistogram()
+    random.seed(7)
+    samples = [random.uniform(0.0005, 0.050) for _ in range(20000)]
+    for sample in samples:
+        histogram.record(sample)
+
+    samples.sort()
+    for percent in (50, 95, 99):
+        exact_ms = samples[int(len(samples) * percent / 100) - 1] * 1000
+        measured_ms = histogram.percentile(percent)
+        print(f"p{percent}: tačno {exact_ms:.3f} ms, histogram {measured_ms:.3f} ms")
+        assert abs(measured_ms - exact_ms) / exact_ms < 0.04
+
+def test_histogram_memory_is_fixed():
+    """Broj korpi ne zavisi od broja uzoraka ni od ekstremnih vrijednosti."""
+    histogram = RTTHistogram()
+    buckets = len(histogram.counts)
+    for value in (0, 0.000001, 1.5, 59.9, 3600):
+        histogram.record(value)
+    assert len(histogram.counts) == buckets
+    assert histogram.to_dict()['max'] == 60000.0
+    print(f"Histogram koristi {buckets} korpi")
+
+def test_link_health_counts_losses():
+    """Gubici heartbeat-a se broje ukupno i uzastopno."""
+    health = LinkHealth()
+    for rtt in (0.002, None, None, 0.003, None):
+        health.record(rtt)
+
+    data = health.to_dict()
+    print(f"Statistika: {data}")
+    assert data['heartbeats_sent'] == 5
+    assert data['heartbeats_lost'] == 3
+    assert data['consecutive_lost'] == 1
+    assert data['loss_ratio'] == 0.6
+    assert data['rtt_ms']['count'] == 2
+
+if __name__ == "__main__":
+    test_histogram_percentiles_are_accurate()
+    test_histogram_memory_is_fixed()
+    test_link_health_counts_losses()
+    print("✅ Link health testovi prošli")
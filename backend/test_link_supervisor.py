@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for the link supervisor (reconnect, session restore, give-up) over loopback
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import threading
+import time
+import link_supervisor as link_supervisor_module
+from link_supervisor import LinkSupervisor, SupervisedLink
+from transports import create_loopback
+from midi_device_simulator import MIDIDeviceSimulator
+
+class _Device:
+    """Simulator na strani uređaja loopback para; unplug/plug simuliraju kabl."""
+
+    def __init__(self, name):
+        self.name = name
+        self.port = f'loop://{name}'
+        self.plug()
+
+    def plug(self):
+        self.transport = create_loopback(self.name, timeout=0.05)
+        self.simulator = MIDIDeviceSimulator(self.port, connection=self.transport, verbose=False)
+        self.thread = threading.Thread(target=self.simulator.start, daemon=True)
+        self.thread.start()
+
+    def unplug(self):
+        self.simulator.stop()
+        self.transport.close()
+        self.thread.join(2)
+
+def _wait(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.02)
+    return True
+
+def test_drop_goes_to_reconnecting():
+    """Isključen uređaj ili propušteni heartbeat-i prebacuju vezu u 'reconnecting'."""
+    supervisor = LinkSupervisor()
+    device = _Device('test-link-drop')
+    try:
+        link = supervisor.open(device.port, reliable=True, heartbeat_interval=0)
+        assert link is not None and link.state == 'connected'
+
+        device.unplug()
+        assert _wait(lambda: link.state == 'reconnecting')
+        assert not link.connected.is_set()
+        assert link.last_error in ('port uklonjen', 'I/O greška: Loopback veza je zatvorena')
+        assert supervisor.status()[0]['baudrate'] is None
+    finally:
+        supervisor.close(device.port)
+        device.unplug()
+
+    # Uređaj visi (port prisutan, ali ne odgovara na heartbeat)
+    device = _Device('test-link-heartbeat')
+    try:
+        link = supervisor.open(device.port, heartbeat_interval=0.1)
+        assert _wait(lambda: link.health.sent >= 2)
+        device.simulator.handle_ping = lambda data: None
+        assert _wait(lambda: link.state == 'reconnecting')
+        assert link.last_error.endswith('propuštenih heartbeat-a')
+    finally:
+        supervisor.close(device.port)
+        device.unplug()
+
+def test_reconnect_restores_session():
+    """Nakon ponovnog priključenja veza se obnavlja na brzini i sa sesijom iz prethodne veze."""
+    supervisor = LinkSupervisor()
+    device = _Device('test-link-restore')
+    try:
+        link = supervisor.open(device.port, reliable=True, heartbeat_interval=0)
+        assert link.communicator.baudrate == 921600
+        assert link.session == {'baudrate': 921600, 'reliable': True}
+
+        device.unplug()
+        assert _wait(lambda: link.state == 'reconnecting')
+        time.sleep(0.3)  # Nekoliko neuspjelih pokušaja dok uređaja nema
+        device.plug()
+
+        assert _wait(lambda: link.state == 'connected')
+        assert link.reconnects == 1 and link.reconnect_attempts >= 1
+        assert link.communicator.baudrate == link.communicator.connection.baudrate == 921600
+        assert device.simulator.baudrate == 921600
+        assert link.session == {'baudrate': 921600, 'reliable': True}
+        assert supervisor.call(device.port, lambda comm: comm.ping()) is not None
+        assert device.simulator.baud_confirm_deadline is None
+    finally:
+        supervisor.close(device.port)
+        device.unplug()
+
+def test_call_retries_across_reconnect():
+    """Operacija prekinuta padom veze ponavlja se nakon obnove - pozivalac vidi samo zastoj."""
+    supervisor = LinkSupervisor()
+    device = _Device('test-link-call')
+    calls = []
+
+    def operation(comm):
+        calls.append(comm.baudrate)
+        if len(calls) == 1:
+            # Kabl ispada usred razmjene, a vraća se nešto kasnije
+            device.unplug()
+            threading.Timer(0.3, device.plug).start()
+        return comm.ping()
+
+    try:
+        assert supervisor.open(device.port, heartbeat_interval=0)
+        start = time.monotonic()
+        rtt = supervisor.call(device.port, operation, timeout=5)
+        elapsed = time.monotonic() - start
+        print(f"Operacija ponovljena nakon obnove veze: {elapsed * 1000:.0f} ms")
+        assert rtt is not None
+        assert len(calls) == 2 and calls[1] == 921600
+        assert supervisor.get(device.port).reconnects == 1
+    finally:
+        supervisor.close(device.port)
+        device.unplug()
+
+def test_removed_port_gives_up():
+    """Port koji se ne vraća: backoff raste (sa jitter-om) do granice, pa nadzor odustaje."""
+    original = (link_supervisor_module.LINK_BACKOFF_INITIAL, link_supervisor_module.LINK_BACKOFF_MAX,
+                link_supervisor_module.LINK_MAX_RECONNECT_ATTEMPTS)
+    supervisor = LinkSupervisor()
+    try:
+        # Backoff: 0.25, 0.5, 1, 2 s ... do LINK_BACKOFF_MAX, svaki ±20%
+        link_supervisor_module.LINK_MAX_RECONNECT_ATTEMPTS = 0
+        link = SupervisedLink('loop://test-link-missing')
+        link.state = 'reconnecting'
+        initial, maximum = original[0], original[1]
+        for attempt in range(1, 8):
+            before = time.monotonic()
+            supervisor._reconnect(link)
+            delay = link.next_attempt - before
+            expected = min(maximum, initial * 2 ** (attempt - 1))
+            assert expected * 0.8 - 0.01 <= delay <= expected * 1.2 + 0.01, (attempt, delay)
+        assert link.state == 'reconnecting'
+
+        link_supervisor_module.LINK_BACKOFF_INITIAL = 0.02
+        link_supervisor_module.LINK_BACKOFF_MAX = 0.05
+        link_supervisor_module.LINK_MAX_RECONNECT_ATTEMPTS = 3
+        device = _Device('test-link-removed')
+        link = supervisor.open(device.port, heartbeat_interval=0)
+        assert link is not None
+        device.unplug()
+
+        assert _wait(lambda: link.state == 'failed')
+        assert link.reconnect_attempts == 3 and link.reconnects == 0
+        assert not supervisor.is_supervised(device.port)
+        assert not link.communicator.is_connected()
+        try:
+            supervisor.acquire(device.port, timeout=0.1)
+        except Exception as e:
+            print(f"Očekivana greška: {e}")
+        else:
+            assert False, "acquire je vratio komunikator uklonjenog porta"
+
+        # Priključen uređaj se ne preuzima sam - potreban je novi open
+        device.plug()
+        time.sleep(0.2)
+        assert link.state == 'failed'
+        assert supervisor.open(device.port, heartbeat_interval=0).state == 'connected'
+        supervisor.close(device.port)
+        device.unplug()
+    finally:
+        (link_supervisor_module.LINK_BACKOFF_INITIAL, link_supervisor_module.LINK_BACKOFF_MAX,
+         link_supervisor_module.LINK_MAX_RECONNECT_ATTEMPTS) = original
+
+if __name__ == "__main__":
+    test_drop_goes_to_reconnecting()
+    test_reconnect_restores_session()
+    test_call_retries_across_reconnect()
+    test_removed_port_gives_up()
+    print("✅ Testovi nadzora veze prošli")
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for macro commands compiled into bytecode
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import json
+import tempfile
+import threading
+import banks
+import macro_compiler
+from macro_compiler import compile_macro, decode_macro, macro_summary, macro_blob, MacroError, MACRO_VERSION
+from database import DatabaseManager
+from transports import create_loopback
+from serial_comm import SerialCommunicator
+from midi_device_simulator import MIDIDeviceSimulator
+
+MACRO = [
+    {'type': 'pc', 'channel': 1, 'value': 12},
+    {'type': 'cc', 'channel': 1, 'param': 7, 'value': 100},
+    {'type': 'cc', 'channel': 1, 'param': 11, 'value': 64},
+    {'type': 'delay', 'ms': 30},
+    {'type': 'delay', 'ms': 20},
+    {'type': 'nrpn', 'channel': 2, 'param': 300, 'value': 1000},
+    {'type': 'delay', 'ms': 500},
+]
+
+def test_compile_and_decode():
+    """Poruke između pauza idu u jedan blok, pauze se spajaju, a pauza na kraju se izostavlja."""
+    blob = compile_macro(MACRO)
+    program = decode_macro(blob)
+    print(f"Makro: {len(blob)} bytes bajtkoda, JSON po poruci: {len(json.dumps(MACRO))} bytes")
+    assert blob[0] == MACRO_VERSION
+    assert program == [
+        ('send', bytes([0xC0, 12, 0xB0, 7, 100, 11, 64])),
+        ('delay', 50),
+        ('send', bytes([0xB1, 99, 2, 98, 44, 6, 7, 38, 104])),
+    ]
+    assert len(blob) < len(json.dumps(MACRO)) / 5
+    assert macro_summary(MACRO) == {'bytes': len(blob), 'messages': 4, 'duration_ms': 50}
+
+def test_invalid_macros():
+    """Neispravni koraci, preveliki makroi i oštećen bajtkod se odbijaju."""
+    for steps in ([], [{'type': 'cc', 'value': 1}], [{'type': 'delay', 'ms': -1}],
+                  [{'type': 'pc', 'channel': 20, 'value': 1}], [{'type': 'cc', 'param': 1, 'value': 1}] * 65):
+        try:
+            compile_macro(steps)
+            assert False, f"Makro {steps[:1]} mora biti odbijen"
+        except MacroError:
+            pass
+
+    blob = compile_macro(MACRO)
+    for broken in (blob[:-1], bytes([9]) + blob[1:], blob[:3]):
+        try:
+            decode_macro(broken)
+            assert False, "Oštećen bajtkod mora biti odbijen"
+        except MacroError:
+            pass
+
+def test_device_runs_macro():
+    """Makro se šalje jednom uz konfiguraciju, a uređaj ga izvršava sa svojim rokovima."""
+    original_banks = banks.BANK_COUNT
+    banks.BANK_COUNT = 1
+    device = create_loopback('test-macros', timeout=0.1)
+    simulator = MIDIDeviceSimulator('loop://test-macros', connection=device, verbose=False)
+    thread = threading.Thread(target=simulator.start, daemon=True)
+    thread.start()
+
+    comm = SerialCommunicator()
+    buttons = [
+        {'button': 1, 'command_name': 'Scena', 'command_value': 0, 'macro': json.dumps(MACRO)},
+        {'button': 2, 'command_name': 'Volume', 'command_value': 100, 'midi_type': 'cc', 'midi_param': 7},
+    ]
+    try:
+        assert comm.connect('loop://test-macros', timeout=1)
+        assert comm.send_configuration(buttons, reliable=True, minimize=False)
+        assert 'macro' in simulator.switches[0] and 'macro' not in simulator.switches[1]
+        assert simulator.midi[0] == b'' and simulator.midi[1] == bytes([0xB0, 7, 100])
+
+        output = simulator.run_macro(0)
+        print(f"Izvršenje na uređaju: {[(offset, data.hex(' ')) for offset, data in output]}")
+        assert [data for _, data in output] == [data for op, data in decode_macro(compile_macro(MACRO)) if op == 'send']
+        assert 50 <= output[1][0] < 80
+    finally:
+        banks.BANK_COUNT = original_banks
+        comm.abort()
+        simulator.stop()
+        device.close()
+        thread.join(2)
+
+def test_stored_macro_over_current_limits():
+    """Makro koji više ne prolazi ograničenja ne ruši listu komandi ni slanje konfiguracije."""
+    import routes.commands as commands_routes
+    from app import create_app
+
+    original_steps, original_db = macro_compiler.MACRO_MAX_STEPS, commands_routes.db_manager
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            db = DatabaseManager(os.path.join(directory, 'macros.db'))
+            with db.get_connection() as conn:
+                conn.execute("INSERT INTO commands (name, value, macro) VALUES ('Scena', 0, ?)", (json.dumps(MACRO),))
+                conn.execute("INSERT INTO commands (name, value) VALUES ('Gain', 10)")
+                conn.commit()
+            commands_routes.db_manager = db
+
+            # Ograničenje je smanjeno nakon što je makro sačuvan
+            macro_compiler.MACRO_MAX_STEPS = 3
+            response = create_app().test_client().get('/api/commands')
+            assert response.status_code == 200
+            commands = {command['name']: command for command in response.get_json()['data']}
+            assert 'najviše 3 koraka' in commands['Scena']['macro_info']['error']
+            assert 'macro_info' not in commands['Gain']
+
+            button = {'button': 1, 'command_name': 'Scena', 'command_value': 0, 'macro': json.dumps(MACRO)}
+            assert macro_blob(button) is None
+            config = SerialCommunicator()._create_switch_config(0, button)
+            assert config['enabled'] and 'macro' not in config
+
+            macro_compiler.MACRO_MAX_STEPS = original_steps
+            assert macro_blob(button) is not None
+    finally:
+        macro_compiler.MACRO_MAX_STEPS = original_steps
+        commands_routes.db_manager = original_db
+
+if __name__ == "__main__":
+    test_compile_and_decode()
+    test_invalid_macros()
+    test_device_runs_macro()
+    test_stored_macro_over_current_limits()
+    print("✅ Testovi makro kompajlera prošli")
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script and jitter benchmark for the MIDI clock against the loopback transport
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import threading
+import time
+from midi_clock import MidiClock, TapTempo, CLOCK_PPQN
+from transports import create_loopback
+from serial_comm import SerialCommunicator
+from midi_device_simulator import MIDIDeviceSimulator
+
+# Granice za benchmark na loopback transportu (ms); GIL se predaje svakih 5 ms.
+# Na jednojezgarnom CI hostu simulator i clock dijele procesor - tamo se granica
+# p99 može povećati samo eksplicitno (CLOCK_JITTER_P99_LIMIT_MS)
+JITTER_P95_LIMIT_MS = 5.0
+JITTER_P99_LIMIT_MS = float(os.environ.get('CLOCK_JITTER_P99_LIMIT_MS', '5.0'))
+JITTER_MAX_LIMIT_MS = 20.0
+
+def test_tap_tempo():
+    """Tempo se računa iz medijana razmaka, a duga pauza počinje mjerenje ispočetka."""
+    tap = TapTempo()
+    assert tap.tap(0.0) is None
+    assert round(tap.tap(0.5), 3) == 120.0
+    tap.tap(1.0)
+    # Jedan neprecizan udarac ne mijenja medijan
+    assert round(tap.tap(1.62), 3) == 120.0
+    assert tap.tap(10.0) is None
+    assert round(tap.tap(10.4), 3) == 150.0
+
+def test_clock_jitter_benchmark():
+    """Clock na 240 BPM drži tempo bez drifta, a jitter je ograničen."""
+    device = create_loopback('test-clock', timeout=0.05)
+    simulator = MIDIDeviceSimulator('loop://test-clock', connection=device, verbose=False)
+    thread = threading.Thread(target=simulator.start, daemon=True)
+    thread.start()
+
+    comm = SerialCommunicator()
+    clock = MidiClock(bpm=240)
+    try:
+        assert comm.connect('loop://test-clock', timeout=1)
+        clock.add_target('loop://test-clock', comm)
+        clock.start()
+        time.sleep(1.0)
+        clock.set_tempo(180)
+        time.sleep(1.0)
+        clock.stop()
+        time.sleep(0.1)
+
+        status = clock.status()
+        jitter = status['jitter_ms']
+        print(f"{status['ticks']} impulsa ({status['priority']} prioritet), jitter p50 {jitter['p50']} ms, "
+              f"p95 {jitter['p95']} ms, p99 {jitter['p99']} ms, max {jitter['max']} ms")
+
+        assert simulator.clock_ticks == status['ticks'] and not simulator.clock_running
+        expected = 1.0 * 240 * CLOCK_PPQN / 60 + 1.0 * 180 * CLOCK_PPQN / 60
+        assert abs(status['ticks'] - expected) <= 3
+        assert status['resyncs'] == 0
+        assert jitter['p95'] <= JITTER_P95_LIMIT_MS
+        assert jitter['p99'] <= JITTER_P99_LIMIT_MS
+        assert jitter['max'] <= JITTER_MAX_LIMIT_MS
+
+        # Tempo nakon promjene, mjeren na strani uređaja
+        simulator.clock_times = list(simulator.clock_times)[-60:]
+        print(f"Tempo na uređaju nakon promjene: {simulator.clock_bpm():.2f} BPM")
+        assert abs(simulator.clock_bpm() - 180) < 1.8
+    finally:
+        clock.stop()
+        comm.abort()
+        simulator.stop()
+        device.close()
+        thread.join(2)
+
+if __name__ == "__main__":
+    test_tap_tempo()
+    test_clock_jitter_benchmark()
+    print("✅ Testovi MIDI clock-a prošli")
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for the raw MIDI encoder (running status, 14-bit NRPN/RPN)
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import threading
+import banks
+from midi_encoder import (command_messages, encode_messages, encode_bank, validate_midi, switch_messages,
+                          MidiEncodingError)
+from transports import create_loopback
+from serial_comm import SerialCommunicator
+from midi_device_simulator import MIDIDeviceSimulator
+
+def test_message_types():
+    """CC, PC i RPN poruke imaju ispravne status bajtove i kontrolere."""
+    # Stari format: kontroler je sama vrijednost komande
+    assert encode_messages(command_messages('auto', 1, 64)) == bytes([0xB0, 64, 64])
+    assert encode_messages(command_messages('cc', 3, 100, param=7)) == bytes([0xB2, 7, 100])
+    assert encode_messages(command_messages('pc', 16, 5)) == bytes([0xCF, 5])
+    rpn = command_messages('rpn', 1, 0x2000, param=0)
+    assert [message[1] for message in rpn] == [101, 100, 6, 38]
+
+    try:
+        command_messages('pc', 1, 300)
+        assert False, "PC iznad 127 mora biti odbijen"
+    except MidiEncodingError:
+        pass
+
+def test_running_status_nrpn():
+    """NRPN se šalje sa jednim status bajtom (9 umjesto 12 bajtova)."""
+    encoded = encode_messages(command_messages('nrpn', 2, 1000, param=300))
+    print(f"NRPN: {encoded.hex(' ')}")
+    assert encoded == bytes([0xB1, 99, 2, 98, 44, 6, 7, 38, 104])
+
+    # Promjena kanala vraća status bajt
+    mixed = encode_messages(command_messages('cc', 1, 1, param=1) + command_messages('cc', 2, 1, param=1))
+    assert mixed == bytes([0xB0, 1, 1, 0xB1, 1, 1])
+
+def test_auto_rejects_values_above_14_bits():
+    """'auto' iznad 16383 se odbija - NRPN ne može prenijeti vrijednost bez mijenjanja drugog parametra."""
+    assert validate_midi('auto', 1, None, 16383) is None
+    assert validate_midi('auto', 1, None, 16384) is not None
+    assert validate_midi('auto', 1, 10, 50000) is not None
+    assert validate_midi('nrpn', 1, 10, 50000) is not None
+    try:
+        command_messages('auto', 1, 50000)
+    except MidiEncodingError as e:
+        print(f"Očekivana greška: {e}")
+    else:
+        assert False, "MidiEncodingError nije bačen"
+
+    messages = command_messages('auto', 1, 16383)
+    assert (messages[0][2], messages[1][2]) == (0, 0)
+    assert (messages[2][2] << 7) | messages[3][2] == 16383
+
+    # Ranije sačuvana komanda sa prevelikom vrijednošću ne ruši slanje ostalih tastera
+    assert switch_messages({'command_name': 'Stara', 'command_value': 50000}) == []
+
+def test_validation():
+    """Neispravna podešavanja daju poruku greške."""
+    assert validate_midi('sysex', 1, None, 1) is not None
+    assert validate_midi('cc', 17, None, 1) is not None
+    assert validate_midi('cc', 1, 128, 1) is not None
+    assert validate_midi('pc', 1, 3, 1) is not None
+    assert validate_midi('nrpn', 1, 16383, 16383) is None
+
+def test_bank_offsets():
+    """Svaki taster banke je segment koji počinje status bajtom."""
+    buffer, offsets = encode_bank([
+        command_messages('cc', 1, 10, param=1),
+        [],
+        command_messages('cc', 1, 20, param=1),
+    ])
+    assert offsets == [0, 3, 3, 6]
+    assert buffer[offsets[2]] == 0xB0
+
+def test_push_carries_midi_bytes():
+    """Slanje konfiguracije nosi MIDI bajtove koje uređaj samo prosljeđuje."""
+    original_banks = banks.BANK_COUNT
+    banks.BANK_COUNT = 1
+    device = create_loopback('test-midi-encoder', timeout=0.1)
+    simulator = MIDIDeviceSimulator('loop://test-midi-encoder', connection=device, verbose=False)
+    thread = threading.Thread(target=simulator.start, daemon=True)
+    thread.start()
+
+    comm = SerialCommunicator()
+    buttons = [
+        {'button': 1, 'command_name': 'Volume', 'command_value': 100, 'midi_type': 'cc', 'midi_channel': 1, 'midi_param': 7},
+        {'button': 2, 'command_name': 'Fine', 'command_value': 9000, 'midi_type': 'nrpn', 'midi_channel': 2, 'midi_param': 5},
+    ]
+    try:
+        assert comm.connect('loop://test-midi-encoder', timeout=1)
+        assert comm.send_configuration(buttons, reliable=True, minimize=False)
+        assert simulator.midi[0] == bytes([0xB0, 7, 100])
+        assert len(simulator.midi[1]) == 9
+        assert simulator.midi[2] == b''
+
+        buttons[0]['command_value'] = 90
+        assert comm.send_configuration(buttons, reliable=True, minimize=True)
+        assert comm.last_push['mode'] == 'partial'
+        assert simulator.midi[0] == bytes([0xB0, 7, 90])
+    finally:
+        banks.BANK_COUNT = original_banks
+        comm.abort()
+        simulator.stop()
+        device.close()
+        thread.join(2)
+
+if __name__ == "__main__":
+    test_message_types()
+    test_running_status_nrpn()
+    test_auto_rejects_values_above_14_bits()
+    test_validation()
+    test_bank_offsets()
+    test_push_carries_midi_bytes()
+    print("✅ Testovi MIDI enkodera prošli")
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for multi-bank configurations streamed in chunks
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import threading
+import banks
+from banks import slot_position, page_range
+from transports import create_loopback
+from serial_comm import SerialCommunicator
+from midi_device_simulator import MIDIDeviceSimulator
+from device_mirror import device_mirror
+from wire_tap import wire_tap
+
+def test_slot_layout():
+    """Slot se preslikava na stranicu, banku i taster u banci."""
+    assert slot_position(1) == {'page': 1, 'bank': 1, 'switch': 1}
+    assert slot_position(7) == {'page': 1, 'bank': 2, 'switch': 1}
+    assert slot_position(25) == {'page': 2, 'bank': 5, 'switch': 1}
+
+    original_banks = banks.BANK_COUNT
+    banks.BANK_COUNT = 6
+    try:
+        assert page_range(1) == (1, 24)
+        assert page_range(2) == (25, 36)  # Zadnja stranica ima samo dvije banke
+    finally:
+        banks.BANK_COUNT = original_banks
+
+def test_streamed_configuration():
+    """300 slotova ide u dijelovima ograničene veličine, a izmjena šalje samo svoj dio."""
+    original_banks = banks.BANK_COUNT
+    banks.BANK_COUNT = 50
+    device = create_loopback('test-banks', timeout=0.1)
+    simulator = MIDIDeviceSimulator('loop://test-banks', connection=device, verbose=False)
+    thread = threading.Thread(target=simulator.start, daemon=True)
+    thread.start()
+
+    comm = SerialCommunicator()
+    buttons = [
+        {'button': slot, 'command_name': f'Slot {slot}', 'command_value': slot % 128, 'color': 'red', 'is_preset_color': True}
+        for slot in (1, 150, 300)
+    ]
+    try:
+        wire_tap.clear('loop://test-banks')
+        assert comm.connect('loop://test-banks', timeout=1)
+        assert comm.send_configuration(buttons, minimize=True)
+        print(f"Puno slanje: {comm.last_push}")
+        assert comm.last_push == {'mode': 'full', 'switches': 300, 'chunks': 13}
+        assert len(simulator.switches) == 300
+        assert simulator.switches[149]['name'] == 'Slot 150'
+
+        largest = max(frame['size'] for frame in wire_tap.snapshot('loop://test-banks') if frame['direction'] == 'TX')
+        print(f"Najveća poslana poruka: {largest} bytes")
+        assert largest < 8 * 1024
+
+        assert comm.send_configuration(buttons, minimize=True)
+        assert comm.last_push['mode'] == 'skipped'
+
+        buttons[1]['color'] = 'green'
+        assert comm.send_configuration(buttons, minimize=True)
+        assert comm.last_push == {'mode': 'partial', 'switches': 24, 'chunks': 1}
+        assert simulator.switches[149]['color'] == '#28a745'
+
+        # Čitanje po stranicama vraća istu konfiguraciju kao ogledalo
+        switches = comm.read_configuration()
+        assert len(switches) == 300
+        assert switches == device_mirror.get('loop://test-banks')['switches']
+    finally:
+        banks.BANK_COUNT = original_banks
+        comm.abort()
+        simulator.stop()
+        device.close()
+        thread.join(2)
+
+if __name__ == "__main__":
+    test_slot_layout()
+    test_streamed_configuration()
+    print("✅ Testovi više banaka prošli")
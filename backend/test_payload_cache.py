@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for the versioned compiled-payload cache
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import json
+import tempfile
+import threading
+import time
+import banks
+from database import DatabaseManager
+from payload_cache import PayloadCache
+from config_delivery import load_button_data
+from transports import create_loopback
+from serial_comm import SerialCommunicator
+from midi_device_simulator import MIDIDeviceSimulator
+
+def _create_db(directory):
+    db = DatabaseManager(os.path.join(directory, 'cache.db'))
+    with db.get_connection() as conn:
+        conn.execute("INSERT INTO commands (id, name, value) VALUES (1, 'Gain', 10)")
+        conn.execute('UPDATE button_mappings SET command_id = 1 WHERE button_number = 1')
+        conn.execute("INSERT INTO presets (id, name, config_data) VALUES (1, 'Solo', ?)",
+                     (json.dumps({'2': {'command_name': 'Boost', 'command_value': 5, 'color': 'red'}}),))
+        conn.commit()
+    return db
+
+def test_version_counter():
+    """Ista verzija vraća isti sastavljeni objekat; bump ga invalidira."""
+    with tempfile.TemporaryDirectory() as directory:
+        db = _create_db(directory)
+        cache = PayloadCache(size=4)
+
+        first = cache.load(db=db)
+        assert cache.load(db=db) is first
+        assert cache.load(preset_id=1, db=db)[2]['command_name'] == 'Boost'
+        assert cache.load(preset_id=99, db=db) is None
+        assert first[1]['command_value'] == 10 and first.version == 0
+
+        with db.get_connection() as conn:
+            conn.execute('UPDATE commands SET value = 20 WHERE id = 1')
+            conn.commit()
+        assert cache.load(db=db) is first  # Bez bump-a izmjena nije prijavljena
+        cache.bump('commands')
+        second = cache.load(db=db)
+        assert second is not first and second[1]['command_value'] == 20 and second.version == 1
+
+        stats = cache.stats()
+        assert stats['version'] == 1 and stats['hits'] == 2 and stats['misses'] == 4
+
+        # Cijena: upit + sastavljanje poruke naspram ponovne upotrebe iz keša
+        comm = SerialCommunicator()
+        rounds = 200
+        start = time.perf_counter()
+        for _ in range(rounds):
+            with db.get_connection() as conn:
+                data = load_button_data(conn.cursor())
+            json.dumps(comm._create_midi_config(list(data.values())))
+        cold = (time.perf_counter() - start) / rounds
+        start = time.perf_counter()
+        for _ in range(rounds):
+            payload = cache.load(db=db)
+            message = payload.memo('set_config', lambda: comm._create_midi_config(list(payload.values())))
+            payload.memo('set_config_wire', lambda: json.dumps(message))
+        warm = (time.perf_counter() - start) / rounds
+        print(f"Priprema slanja: bez keša {cold * 1e6:.0f} µs, iz keša {warm * 1e6:.1f} µs")
+        assert warm < cold / 10
+
+def _run_device(name):
+    device = create_loopback(name, timeout=0.05)
+    simulator = MIDIDeviceSimulator(f'loop://{name}', connection=device, verbose=False)
+    thread = threading.Thread(target=simulator.start, daemon=True)
+    thread.start()
+    return simulator, device, thread
+
+def test_repeated_push_reuses_payload():
+    """Ponovljeno slanje iste verzije ne sastavlja poruke ponovo (jedna i više banaka)."""
+    original_banks = banks.BANK_COUNT
+    simulator, device, thread = _run_device('test-payload-cache')
+    comm = SerialCommunicator()
+    builds = []
+    create_switch_config = comm._create_switch_config
+
+    def counting(index, button_data):
+        builds.append(index)
+        return create_switch_config(index, button_data)
+
+    comm._create_switch_config = counting
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            db = _create_db(directory)
+            cache = PayloadCache()
+            assert comm.connect('loop://test-payload-cache', timeout=1)
+
+            for bank_count in (1, 2):
+                banks.BANK_COUNT = bank_count
+                payload = cache.load(db=db)
+                for reliable in (True, True, False):
+                    assert comm.send_configuration(list(payload.values()), reliable=reliable,
+                                                   minimize=False, payload=payload)
+                assert len(builds) == banks.slot_count()
+                assert simulator.switches[0]['value'] == 10 and simulator.switches[0]['enabled']
+                builds.clear()
+                cache.bump('mappings')
+
+            # Nova verzija se sastavlja ponovo
+            payload = cache.load(db=db)
+            assert comm.send_configuration(list(payload.values()), reliable=True, minimize=False, payload=payload)
+            assert len(builds) == banks.slot_count()
+    finally:
+        banks.BANK_COUNT = original_banks
+        comm.abort()
+        simulator.stop()
+        device.close()
+        thread.join(2)
+
+if __name__ == "__main__":
+    test_version_counter()
+    test_repeated_push_reuses_payload()
+    print("✅ Testovi keša konfiguracija prošli")
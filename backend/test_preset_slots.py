@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for on-device preset slots with LRU eviction
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import threading
+import banks
+from preset_slots import preset_slots
+from transports import create_loopback
+from serial_comm import SerialCommunicator
+from midi_device_simulator import MIDIDeviceSimulator
+from device_mirror import device_mirror
+from wire_tap import wire_tap
+
+PORT = 'loop://test-preset-slots'
+
+def _preset(value, color):
+    return [
+        {'button': button, 'command_name': f'Preset {value}/{button}', 'command_value': value + button,
+         'color': color, 'is_preset_color': True}
+        for button in range(1, 7)
+    ]
+
+def test_lru_slots_and_instant_activation():
+    """Preseti se upisuju unaprijed, aktivacija je jedna kratka poruka, a izbacuje se najdavnije korišten."""
+    original_banks, original_count = banks.BANK_COUNT, preset_slots.slot_count
+    banks.BANK_COUNT = 1
+    preset_slots.slot_count = 2
+    preset_slots.ports.pop(PORT, None)
+    device = create_loopback('test-preset-slots', timeout=0.1)
+    simulator = MIDIDeviceSimulator(PORT, connection=device, verbose=False)
+    thread = threading.Thread(target=simulator.start, daemon=True)
+    thread.start()
+
+    comm = SerialCommunicator()
+    presets = {1: _preset(10, 'red'), 2: _preset(20, 'green'), 3: _preset(30, 'blue')}
+    try:
+        assert comm.connect(PORT, timeout=1)
+        first = preset_slots.activate(comm, 1, presets[1], 'Prvi')
+        second = preset_slots.activate(comm, 2, presets[2], 'Drugi')
+        assert not first['hit'] and not second['hit']
+        assert simulator.switches[0]['name'] == 'Preset 20/1'
+
+        wire_tap.clear(PORT)
+        switch = preset_slots.activate(comm, 1, presets[1], 'Prvi')
+        sent = [frame['size'] for frame in wire_tap.snapshot(PORT) if frame['direction'] == 'TX']
+        print(f"Aktivacija iz slota {switch['slot']}: {switch['latency_ms']} ms, {sent} bytes "
+              f"(upis + aktivacija: {first['latency_ms']} ms)")
+        assert switch['hit'] and switch['slot'] == first['slot']
+        assert len(sent) == 1 and sent[0] < 128
+        assert simulator.switches[0]['name'] == 'Preset 10/1'
+        assert device_mirror.get(PORT)['switches'][0]['name'] == 'Preset 10/1'
+
+        # Treći preset izbacuje preset 2 (najdavnije korišten)
+        third = preset_slots.activate(comm, 3, presets[3], 'Treći')
+        assert third['slot'] == second['slot'] and not third['hit']
+        status = preset_slots.status(PORT)
+        assert [slot['preset_id'] for slot in status['slots']] == [1, 3]
+        assert status['lru'] == [third['slot'], first['slot']] and status['active'] == third['slot']
+
+        # Izmijenjen preset ima novi otisak i ponovo se upisuje
+        presets[1][0]['color'] = 'yellow'
+        assert not preset_slots.activate(comm, 1, presets[1], 'Prvi')['hit']
+
+        # Nakon ponovnog povezivanja slotovi se potvrđuju otiscima sa uređaja
+        comm.disconnect()
+        assert comm.connect(PORT, timeout=1)
+        assert preset_slots.status(PORT)['stale']
+        again = preset_slots.activate(comm, 3, presets[3], 'Treći')
+        assert again['hit'] and simulator.active_preset_slot == again['slot'] - 1
+    finally:
+        banks.BANK_COUNT = original_banks
+        preset_slots.slot_count = original_count
+        preset_slots.ports.pop(PORT, None)
+        comm.abort()
+        simulator.stop()
+        device.close()
+        thread.join(2)
+
+def test_route_activation_keeps_link_open():
+    """Aktivacija preko API-ja otvara nadgledanu vezu jednom - sljedeća je samo preset_activate."""
+    from routes.presets import _on_port
+    from link_supervisor import link_supervisor
+
+    port = 'loop://test-preset-route'
+    original_count = preset_slots.slot_count
+    preset_slots.slot_count = 2
+    preset_slots.ports.pop(port, None)
+    device = create_loopback('test-preset-route', timeout=0.1)
+    simulator = MIDIDeviceSimulator(port, connection=device, verbose=False)
+    thread = threading.Thread(target=simulator.start, daemon=True)
+    thread.start()
+    presets = {1: _preset(10, 'red'), 2: _preset(20, 'green')}
+    try:
+        _on_port(port, lambda comm: preset_slots.activate(comm, 1, presets[1], 'Prvi'))
+        _on_port(port, lambda comm: preset_slots.activate(comm, 2, presets[2], 'Drugi'))
+        assert link_supervisor.is_supervised(port)
+
+        wire_tap.clear(port)
+        report = _on_port(port, lambda comm: preset_slots.activate(comm, 1, presets[1], 'Prvi'))
+        sent = [frame for frame in wire_tap.snapshot(port)
+                if frame['direction'] == 'TX' and '"ping"' not in frame['data']]
+        assert report['hit'] and simulator.active_preset_slot == report['slot'] - 1
+        assert len(sent) == 1 and 'preset_activate' in sent[0]['data']
+        assert device.host_sessions == 1  # Port je otvoren samo jednom
+        assert not preset_slots.status(port)['stale']
+    finally:
+        link_supervisor.close(port)
+        preset_slots.slot_count = original_count
+        preset_slots.ports.pop(port, None)
+        simulator.stop()
+        device.close()
+        thread.join(2)
+
+if __name__ == "__main__":
+    test_lru_slots_and_instant_activation()
+    test_route_activation_keeps_link_open()
+    print("✅ Testovi preset slotova prošli")
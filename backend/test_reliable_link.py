@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for reliable delivery (sequence numbers, ACK/NACK, sliding window)
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import json
+import threading
+from collections import deque
+from reliable_link import ReliableChannel, DeliveryError, frame_crc
+from transports import open_transport
+from midi_device_simulator import MIDIDeviceSimulator
+from config_delivery import push_to_port, button_data_from_preset
+
+class FakeLink:
+    """Simulira uređaj koji potvrđuje okvire, uz zadane gubitke i NACK-ove."""
+
+    def __init__(self, drop=(), corrupt=(), dead=False):
+        self.sequence = 0
+        self.replies = deque()
+        self.drop = set(drop)        # redni brojevi čiji se prvi prenos izgubi
+        self.corrupt = set(corrupt)  # redni brojevi na koje prvo stiže NACK
+        self.dead = dead
+        self.max_in_flight = 0
+        self.in_flight = set()
+        self.writes = 0
+
+    def next_sequence(self):
+        self.sequence += 1
+        return self.sequence
+
+    def write_message(self, frame):
+        self.writes += 1
+        seq = frame['seq']
+        assert frame['crc'] == frame_crc(frame['data'])
+        self.in_flight.add(seq)
+        self.max_in_flight = max(self.max_in_flight, len(self.in_flight))
+        if self.dead:
+            return
+        if seq in self.drop:
+            self.drop.discard(seq)
+            return
+        if seq in self.corrupt:
+            self.corrupt.discard(seq)
+            self.replies.append({"type": "nack", "seq": seq, "reason": "crc"})
+            return
+        message = json.loads(frame['data'])
+        if message.get('type') == 'set_config':
+            self.replies.append({"type": "config_ack", "status": "success"})
+        self.replies.append({"type": "ack", "seq": seq})
+
+    def read_message(self, timeout, types=None):
+        if self.replies:
+            reply = self.replies.popleft()
+            if reply.get('type') == 'ack':
+                self.in_flight.discard(reply['seq'])
+            return reply
+        return None
+
+def test_delivers_all_frames_within_window():
+    """Svi okviri su potvrđeni, a broj nepotvrđenih nikad ne prelazi prozor."""
+    link = FakeLink()
+    channel = ReliableChannel(link, window=3, ack_timeout=0.05)
+    messages = [{"type": "ping", "n": i} for i in range(10)]
+
+    report = channel.send(messages)
+
+    print(f"Izvještaj: {report}")
+    assert report['frames'] == 10
+    assert report['retries'] == 0
+    assert link.max_in_flight <= 3
+
+def test_retransmits_lost_and_nacked_frames():
+    """Izgubljeni i NACK-ovani okviri se ponovo šalju i broje."""
+    link = FakeLink(drop={2}, corrupt={4})
+    channel = ReliableChannel(link, window=4, ack_timeout=0.02)
+
+    report = channel.send([{"type": "set_config", "switches": []}] + [{"type": "ping"}] * 4)
+
+    print(f"Izvještaj: {report}")
+    assert report['frames'] == 5
+    assert report['retries'] == 2
+    assert {"type": "config_ack", "status": "success"} in report['responses']
+
+def test_gives_up_after_max_retries():
+    """Uređaj koji ne odgovara izaziva DeliveryError."""
+    link = FakeLink(dead=True)
+    channel = ReliableChannel(link, window=2, ack_timeout=0.01, max_retries=2)
+
+    try:
+        channel.send([{"type": "ping"}])
+    except DeliveryError as e:
+        print(f"Očekivana greška: {e}")
+        assert link.writes == 3
+        return
+    assert False, "DeliveryError nije bačen"
+
+def test_fresh_communicator_over_pty():
+    """Dva slanja sa zasebnim komunikatorima preko PTY-a - drugo ne smije biti odbačeno kao duplikat.
+
+    PTY (kao i pravi serijski port) ne javlja uređaju novo otvaranje porta,
+    pa uređaj novu sesiju prepoznaje samo po identitetu sesije u okviru.
+    """
+    if not hasattr(os, 'openpty'):
+        print("PTY nije podržan na ovom sistemu - preskačem")
+        return
+
+    device = open_transport('pty://', timeout=0.05)
+    simulator = MIDIDeviceSimulator('pty://', connection=device, verbose=False)
+    thread = threading.Thread(target=simulator.start, daemon=True)
+    thread.start()
+    try:
+        first = push_to_port(device.peer_name, button_data_from_preset(
+            {'1': {'command_name': 'Delay', 'command_value': 20, 'color': 'red'}}), reliable=True)
+        assert first['success'] and first['status'] == 'delivered'
+        assert simulator.switches[0]['name'] == 'Delay'
+
+        second = push_to_port(device.peer_name, button_data_from_preset(
+            {'1': {'command_name': 'Reverb', 'command_value': 23, 'color': 'blue'}}), reliable=True)
+        assert second['success'] and second['status'] == 'delivered'
+        assert simulator.switches[0]['name'] == 'Reverb'
+        assert simulator.switches[0]['cc'] == 23
+    finally:
+        simulator.stop()
+        thread.join(2)
+        device.close()
+
+if __name__ == "__main__":
+    test_delivers_all_frames_within_window()
+    test_retransmits_lost_and_nacked_frames()
+    test_gives_up_after_max_retries()
+    test_fresh_communicator_over_pty()
+    print("✅ Reliable delivery testovi prošli")
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for recording a device session and replaying it without the device
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import glob
+import tempfile
+import threading
+import time
+from transports import create_loopback
+from session_recorder import session_recording, load_session, SessionWriter
+from serial_comm import SerialCommunicator
+from midi_device_simulator import MIDIDeviceSimulator
+
+BUTTONS = [
+    {'button': i, 'command_name': f'Komanda {i}', 'command_value': 20 + i, 'color': 'blue', 'is_preset_color': True}
+    for i in range(1, 7)
+]
+
+def _session(comm, port):
+    """Ista sekvenca operacija pri snimanju i pri reprodukciji."""
+    assert comm.connect(port, timeout=1)
+    try:
+        assert comm.ping() is not None
+        assert comm.send_configuration(BUTTONS, reliable=True)
+    finally:
+        comm.abort()
+
+def _record(directory):
+    device = create_loopback('test-record', timeout=0.1)
+    simulator = MIDIDeviceSimulator('loop://test-record', connection=device, verbose=False)
+    thread = threading.Thread(target=simulator.start, daemon=True)
+    thread.start()
+
+    session_recording.start(directory)
+    try:
+        _session(SerialCommunicator(), 'loop://test-record')
+    finally:
+        session_recording.stop()
+        simulator.stop()
+        device.close()
+        thread.join(2)
+
+    files = glob.glob(os.path.join(directory, '*.msr'))
+    assert len(files) == 1
+    return files[0]
+
+def test_record_and_replay():
+    """Snimljena sesija se reprodukuje bez uređaja sa istim rezultatom."""
+    with tempfile.TemporaryDirectory() as directory:
+        path = _record(directory)
+        header, records = load_session(path)
+        print(f"Snimak {os.path.basename(path)}: {len(records)} zapisa, {os.path.getsize(path)} bytes")
+        assert header['port'] == 'loop://test-record'
+        assert {direction for _, direction, _ in records} == {'TX', 'RX'}
+
+        comm = SerialCommunicator()
+        start = time.perf_counter()
+        _session(comm, f'replay://{path}?speed=0')
+        print(f"Reprodukcija bez čekanja: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+def test_replay_keeps_scaled_timing():
+    """Odgovor se pušta sa snimljenim kašnjenjem podijeljenim sa speed."""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'ping.msr')
+        writer = SessionWriter(path, '/dev/ttyUSB0')
+        writer.record('TX', b'{"type":"ping"}\n')
+        time.sleep(0.1)
+        writer.record('RX', b'{"type":"pong","status":"ok"}\n')
+        writer.close()
+
+        comm = SerialCommunicator()
+        assert comm.connect(f'replay://{path}?speed=2', timeout=1)
+        try:
+            rtt = comm.ping()
+            print(f"Snimljeno kašnjenje 100 ms, reprodukovano sa speed=2: {rtt * 1000:.1f} ms")
+            assert 0.045 <= rtt < 0.09
+            # Ping sadrži vremensku oznaku pa se razlikuje od snimljenog
+            assert comm.connection.mismatches == 1
+        finally:
+            comm.abort()
+
+if __name__ == "__main__":
+    test_record_and_replay()
+    test_replay_keeps_scaled_timing()
+    print("✅ Testovi snimanja i reprodukcije prošli")
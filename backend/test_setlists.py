@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for setlists and the lookahead setlist runner
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import json
+import tempfile
+import threading
+import time
+import banks
+from database import DatabaseManager
+from setlist_runner import load_setlist, SetlistRunner
+from preset_slots import preset_slots
+from transports import create_loopback
+from serial_comm import SerialCommunicator
+from midi_device_simulator import MIDIDeviceSimulator
+
+PORT = 'loop://test-setlists'
+SONGS = 6
+
+def _create_setlist(db):
+    """Setlista od SONGS preset-a u privremenoj bazi."""
+    with db.get_connection() as conn:
+        cursor = conn.cursor()
+        preset_ids = []
+        for song in range(SONGS):
+            config = {str(button): {'command_id': None, 'command_name': f'Pjesma {song + 1}/{button}',
+                                    'command_value': song * 10 + button, 'color': 'red'} for button in range(1, 7)}
+            cursor.execute('INSERT INTO presets (name, config_data) VALUES (?, ?)', (f'Pjesma {song + 1}', json.dumps(config)))
+            preset_ids.append(cursor.lastrowid)
+        cursor.execute("INSERT INTO setlists (name) VALUES ('Koncert')")
+        setlist_id = cursor.lastrowid
+        cursor.executemany('INSERT INTO setlist_items (setlist_id, position, preset_id) VALUES (?, ?, ?)',
+                           [(setlist_id, position, preset_id) for position, preset_id in enumerate(reversed(preset_ids))])
+        conn.commit()
+        return load_setlist(cursor, setlist_id)
+
+def _wait_staged(runner, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if len(runner.staged) == len(runner.upcoming()):
+            return True
+        time.sleep(0.005)
+    return False
+
+def test_setlist_order():
+    """Stavke setliste se vraćaju po poziciji."""
+    with tempfile.TemporaryDirectory() as directory:
+        setlist = _create_setlist(DatabaseManager(os.path.join(directory, 'setlists.db')))
+        assert [item['name'] for item in setlist['items']] == [f'Pjesma {song}' for song in range(SONGS, 0, -1)]
+
+def test_runner_prefetch():
+    """Sa unaprijed upisanim pjesmama svaka promjena je jedna kratka poruka (prefetch hit)."""
+    original_banks, original_count = banks.BANK_COUNT, preset_slots.slot_count
+    banks.BANK_COUNT = 1
+    preset_slots.slot_count = 3
+    preset_slots.ports.pop(PORT, None)
+    device = create_loopback('test-setlists', timeout=0.1, line_rate=True)
+    simulator = MIDIDeviceSimulator(PORT, connection=device, verbose=False)
+    thread = threading.Thread(target=simulator.start, daemon=True)
+    thread.start()
+
+    comm = SerialCommunicator()
+
+    def call(operation):
+        with comm.lock:
+            return operation(comm)
+
+    runner = None
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            setlist = _create_setlist(DatabaseManager(os.path.join(directory, 'setlists.db')))
+        assert comm.connect(PORT, timeout=1)
+
+        runner = SetlistRunner(PORT, call, setlist, lookahead=5)
+        assert runner.lookahead == 2  # Ograničeno na slot_count - 1
+        first = runner.start()
+        assert not first['prefetched']
+
+        steps = []
+        for _ in range(SONGS - 1):
+            assert _wait_staged(runner)
+            steps.append(runner.next())
+        assert all(step['prefetched'] for step in steps)
+        assert simulator.switches[0]['name'] == 'Pjesma 1/1'
+
+        status = runner.to_dict()
+        latency = status['switch_latency_ms']
+        print(f"Promjena pjesme: prvi upis {first['latency_ms']} ms, sa prefetch-om p50 {latency['p50']} ms, "
+              f"max {max(step['latency_ms'] for step in steps)} ms")
+        assert status['prefetch_hits'] == SONGS - 1 and status['prefetch_misses'] == 1
+        assert max(step['latency_ms'] for step in steps) < first['latency_ms']
+
+        # Nazad na prvu pjesmu - više nije u slotovima
+        assert not runner.go(0)['prefetched']
+        try:
+            runner.go(SONGS)
+            assert False, "Pozicija van setliste mora biti odbijena"
+        except IndexError:
+            pass
+    finally:
+        if runner:
+            runner.stop()
+        banks.BANK_COUNT = original_banks
+        preset_slots.slot_count = original_count
+        preset_slots.ports.pop(PORT, None)
+        comm.abort()
+        simulator.stop()
+        device.close()
+        thread.join(2)
+
+if __name__ == "__main__":
+    test_setlist_order()
+    test_runner_prefetch()
+    print("✅ Testovi setlisti prošli")
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for the PTY simulator farm with 100+ virtual devices
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import tempfile
+import time
+import usb_utils
+from usb_utils import USBPortDetector
+from simulator_farm import SimulatorFarm
+from config_delivery import push_fleet, button_data_from_preset
+from serial_comm import SerialCommunicator
+from led_stream import LedStream
+
+DEVICES = 120
+
+PRESET = {
+    '1': {'command_id': 1, 'command_name': 'Delay', 'command_value': 20, 'color': 'red', 'is_preset_color': True},
+    '3': {'command_id': 2, 'command_name': 'Reverb', 'command_value': 23, 'color': '#123456', 'is_preset_color': False}
+}
+
+def _farm():
+    farm = SimulatorFarm(DEVICES, prefix='FARM')
+    farm.start()
+    return farm
+
+def test_farm_discovery_and_fleet_push():
+    """Jedna petlja opslužuje 120 uređaja: detekcija vidi identitete, a fleet push stiže do svih."""
+    farm = _farm()
+    original_file = usb_utils.EXTRA_SERIAL_PORTS_FILE
+    try:
+        ports = farm.ports()
+        assert len(set(ports)) == DEVICES
+        assert len({device.device_id for device in farm.devices}) == DEVICES
+
+        # Detekcija: portovi iz datoteke (list_ports ne vidi PTY) i identitet iz pong-a
+        with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False) as f:
+            f.write('\n'.join(ports[:6]) + '\n')
+        usb_utils.EXTRA_SERIAL_PORTS_FILE = f.name
+        detected = {port['id']: port for port in USBPortDetector().get_available_ports()}
+        os.remove(f.name)
+        for device in farm.devices[:6]:
+            assert detected[device.port]['is_verified'], detected[device.port]
+            assert detected[device.port]['device_id'] == device.device_id
+
+        start = time.monotonic()
+        results = list(push_fleet(ports, button_data_from_preset(PRESET), reliable=True))
+        elapsed = time.monotonic() - start
+        failed = [result for result in results if not result['success']]
+        print(f"Fleet push na {DEVICES} PTY uređaja: {elapsed * 1000:.0f} ms, "
+              f"najsporiji {max(result['latency_ms'] for result in results)} ms, neuspjelih {len(failed)}")
+        assert not failed, failed[:3]
+        assert all(result['ack'] for result in results)
+        for device in farm.devices:
+            assert device.simulator.switches[2]['color'] == '#123456'
+            assert device.simulator.switches[0]['enabled'] and not device.simulator.switches[1]['enabled']
+        assert farm.status()['messages'] >= DEVICES * 2
+    finally:
+        usb_utils.EXTRA_SERIAL_PORTS_FILE = original_file
+        farm.stop()
+
+def test_farm_led_streaming():
+    """LED okviri na 50 uređaja istovremeno - svaki uređaj dobija okvire bez praznina."""
+    farm = SimulatorFarm(50, prefix='LED')
+    farm.start()
+    streams = []
+    try:
+        for port in farm.ports():
+            comm = SerialCommunicator()
+            assert comm.connect(port, timeout=1)
+            stream = LedStream(port, comm, fps=30, effect='rainbow', owned=True)
+            stream.start()
+            streams.append(stream)
+        time.sleep(1.0)
+    finally:
+        for stream in streams:
+            stream.stop()
+        time.sleep(0.1)
+        frames = [device.simulator.led_frames for device in farm.devices]
+        missed = sum(device.simulator.led_frames_missed for device in farm.devices)
+        farm.stop()
+
+    print(f"LED stream na {len(frames)} uređaja: {min(frames)}-{max(frames)} okvira po uređaju, propušteno {missed}")
+    assert min(frames) >= 20
+    assert missed == 0
+
+if __name__ == "__main__":
+    test_farm_discovery_and_fleet_push()
+    test_farm_led_streaming()
+    print("✅ Testovi farme simulatora prošli")
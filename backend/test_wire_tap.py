@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for the serial wire tap and its API routes
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import json
+import threading
+from wire_tap import WireTap, wire_tap
+from transports import create_loopback
+from serial_comm import SerialCommunicator
+from midi_device_simulator import MIDIDeviceSimulator
+
+def test_ring_is_bounded_per_port():
+    """Bafer po portu zadržava samo najnovijih `capacity` okvira."""
+    tap = WireTap(enabled=True, capacity=5)
+    for i in range(12):
+        tap.record('A', 'TX', f'{{"n":{i}}}\n'.encode())
+    tap.record('B', 'RX', b'{"type":"pong"}\n')
+
+    frames = tap.snapshot('A')
+    assert [json.loads(frame['data'])['n'] for frame in frames] == [7, 8, 9, 10, 11]
+    assert [json.loads(frame['data'])['n'] for frame in tap.snapshot('A', limit=2)] == [10, 11]
+    assert tap.status()['ports'] == {'A': 5, 'B': 1}
+
+    tap.set_capacity(3)
+    assert [json.loads(frame['data'])['n'] for frame in tap.snapshot('A')] == [9, 10, 11]
+    tap.record('A', 'TX', b'{"n":12}\n')
+    assert len(tap.snapshot('A')) == 3
+
+    tap.clear('A')
+    assert tap.snapshot('A') == [] and tap.ports() == ['B']
+
+def test_enable_disable():
+    """Isključen tap ne bilježi ništa; ponovno uključivanje nastavlja bilježenje."""
+    tap = WireTap(enabled=False)
+    tap.record('A', 'TX', b'{"n":1}\n')
+    assert tap.snapshot('A') == [] and tap.status()['ports'] == {}
+
+    tap.set_enabled(True)
+    tap.record('A', 'TX', b'{"n":2}\n')
+    tap.set_enabled(False)
+    tap.record('A', 'TX', b'{"n":3}\n')
+    assert [frame['data'] for frame in tap.snapshot('A')] == ['{"n":2}']
+
+def test_large_payload_is_truncated():
+    """Veliki okviri se čuvaju skraćeni, uz stvarnu veličinu i oznaku skraćivanja."""
+    tap = WireTap(enabled=True, max_frame=16)
+    tap.record('A', 'TX', b'x' * 100 + b'\n')
+    tap.record('A', 'RX', b'{"ok":1}\n')
+
+    large, small = tap.snapshot('A')
+    assert large['size'] == 101 and large['truncated'] and large['data'] == 'x' * 16
+    assert small['size'] == 9 and not small['truncated'] and small['data'] == '{"ok":1}'
+    assert small['direction'] == 'RX' and large['direction'] == 'TX'
+
+def test_route_returns_captured_frames():
+    """GET /api/wire-tap vraća TX/RX okvire stvarne razmjene sa uređajem."""
+    from app import create_app
+
+    name = 'test-wire-tap'
+    port = f'loop://{name}'
+    device = create_loopback(name, timeout=0.05)
+    simulator = MIDIDeviceSimulator(port, connection=device, verbose=False)
+    thread = threading.Thread(target=simulator.start, daemon=True)
+    thread.start()
+    comm = SerialCommunicator()
+    client = create_app().test_client()
+    original = (wire_tap.enabled, wire_tap.capacity)
+    try:
+        wire_tap.set_enabled(True)
+        wire_tap.clear(port)
+        assert comm.connect(port, timeout=1)
+        assert comm.ping() is not None
+
+        body = client.get(f'/api/wire-tap?port={port}').get_json()
+        assert body['success'] and body['data']['port'] == port
+        frames = body['data']['frames']
+        assert [frame['direction'] for frame in frames] == ['TX', 'RX']
+        assert json.loads(frames[0]['data'])['type'] == 'ping'
+        assert json.loads(frames[1]['data'])['type'] == 'pong'
+
+        # Isključivanje preko API-ja zaustavlja bilježenje
+        body = client.post('/api/wire-tap', json={'enabled': False, 'capacity': 50}).get_json()
+        assert body['success'] and not body['data']['enabled'] and body['data']['capacity'] == 50
+        assert comm.ping() is not None
+        assert len(client.get(f'/api/wire-tap?port={port}&limit=10').get_json()['data']['frames']) == 2
+
+        assert client.post('/api/wire-tap', json={'capacity': 0}).status_code == 400
+        assert client.delete(f'/api/wire-tap?port={port}').get_json()['success']
+        assert client.get(f'/api/wire-tap?port={port}').get_json()['data']['frames'] == []
+    finally:
+        wire_tap.set_enabled(original[0])
+        wire_tap.set_capacity(original[1])
+        comm.abort()
+        simulator.stop()
+        device.close()
+        thread.join(2)
+
+if __name__ == "__main__":
+    test_ring_is_bounded_per_port()
+    test_enable_disable()
+    test_large_payload_is_truncated()
+    test_route_returns_captured_frames()
+    print("✅ Testovi wire tap-a prošli")
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test script for the coalescing outbound write queue
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import json
+import tempfile
+import threading
+from write_queue import CoalescingWriteQueue, QueueFullError
+
+def test_burst_is_coalesced_into_one_write():
+    """Nalet ažuriranja istih tastera ide jednim write() sa zadnjim stanjem."""
+    writes = []
+    queue = CoalescingWriteQueue(writes.append, window=0.05)
+
+    # Simulacija povlačenja boje: 50 ažuriranja za 3 tastera
+    for step in range(50):
+        switch_id = step % 3
+        queue.put({"type": "set_switch", "switch": {"id": switch_id, "step": step}}, key=('switch', switch_id))
+    assert queue.flush(timeout=1)
+    queue.close()
+
+    print(f"Write poziva: {len(writes)}, statistika: {queue.stats}")
+    assert len(writes) == 1
+    messages = [json.loads(line) for line in writes[0].decode('utf-8').splitlines()]
+    assert [m['switch']['id'] for m in messages] == [0, 1, 2]
+    assert [m['switch']['step'] for m in messages] == [48, 49, 47]
+    assert queue.stats['messages_coalesced'] == 47
+
+def test_unkeyed_messages_keep_order():
+    """Poruke bez ključa se ne spajaju i zadržavaju redoslijed."""
+    writes = []
+    queue = CoalescingWriteQueue(writes.append, window=0.02)
+    for i in range(5):
+        queue.put({"type": "ping", "n": i})
+    queue.close()
+
+    lines = b''.join(writes).decode('utf-8').splitlines()
+    assert [json.loads(line)['n'] for line in lines] == [0, 1, 2, 3, 4]
+
+def test_full_queue_applies_backpressure():
+    """Pun red blokira proizvođača i baca QueueFullError nakon isteka čekanja."""
+    release = threading.Event()
+    queue = CoalescingWriteQueue(lambda data: release.wait(), window=0.0, max_messages=2)
+
+    queue.put({"n": 0})
+    queue.flush(timeout=0.1)  # Prvi batch je "zaglavljen" u write()
+    queue.put({"n": 1})
+    queue.put({"n": 2})
+    try:
+        queue.put({"n": 3}, timeout=0.05)
+    except QueueFullError as e:
+        print(f"Očekivana greška: {e}")
+    else:
+        assert False, "QueueFullError nije bačen"
+    finally:
+        release.set()
+        queue.close()
+
+def test_growing_keyed_message_respects_byte_limit():
+    """Veća zamjena za isti ključ ne smije prebaciti red preko max_bytes."""
+    writes = []
+    queue = CoalescingWriteQueue(writes.append, window=5.0, max_bytes=200)
+    try:
+        queue.put({"type": "set_switch", "name": "a"}, key=('switch', 1))
+        queue.put({"type": "fill", "data": "x" * 100})
+        before = queue.pending_bytes
+
+        # Manja ili jednaka zamjena uvijek prolazi
+        queue.put({"type": "set_switch", "name": "b"}, key=('switch', 1))
+        assert queue.pending_bytes == before
+
+        try:
+            queue.put({"type": "set_switch", "name": "c" * 80}, key=('switch', 1), timeout=0.05)
+        except QueueFullError as e:
+            print(f"Očekivana greška: {e}")
+        else:
+            assert False, "QueueFullError nije bačen"
+        assert queue.pending_bytes == before <= queue.max_bytes
+
+        # Proizvođač čeka mjesto; nakon slanja reda veća poruka ide kao nova
+        waiter = threading.Thread(target=queue.put, args=({"type": "set_switch", "name": "d" * 80},),
+                                  kwargs={'key': ('switch', 1), 'timeout': 2})
+        waiter.start()
+        queue.flush(timeout=0.5)
+        waiter.join(2)
+        assert not waiter.is_alive()
+        assert queue.pending_bytes <= queue.max_bytes
+    finally:
+        queue.close()
+
+    lines = [json.loads(line) for line in b''.join(writes).decode('utf-8').splitlines()]
+    assert [line.get('name') for line in lines] == ['b', None, 'd' * 80]
+
+def test_live_update_reports_partial_queue():
+    """Pun red usred ažuriranja uživo: izmjene ostaju u bazi, ogledalo postaje zastarjelo, odgovor je djelimičan."""
+    from app import create_app
+    from database import DatabaseManager
+    from device_mirror import device_mirror
+    from link_supervisor import link_supervisor
+    from transports import create_loopback
+    from midi_device_simulator import MIDIDeviceSimulator
+    import serial_comm
+    import routes.mappings as mappings_routes
+
+    port = 'loop://test-live-partial'
+    device = create_loopback('test-live-partial', timeout=0.05)
+    simulator = MIDIDeviceSimulator(port, connection=device, verbose=False)
+    thread = threading.Thread(target=simulator.start, daemon=True)
+    thread.start()
+    original = (serial_comm.WRITE_QUEUE_MAX_MESSAGES, mappings_routes.db_manager)
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            db = DatabaseManager(os.path.join(directory, 'live.db'))
+            with db.get_connection() as conn:
+                conn.execute("INSERT INTO commands (id, name, value) VALUES (1, 'Gain', 10)")
+                conn.commit()
+            mappings_routes.db_manager = db
+            serial_comm.WRITE_QUEUE_MAX_MESSAGES = 2
+            link = link_supervisor.open(port, heartbeat_interval=0)
+            device_mirror.replace(port, [], 'push')
+            client = create_app().test_client()
+
+            # Zauzet komunikator zadržava upis reda, pa se red napuni
+            with link.communicator.lock:
+                response = client.post(f'/api/button-mappings?usbPort={port}&bank=1',
+                                       json={'1': 1, '2': 1, '3': 1, '4': 1, '5': 1, '6': 1})
+            body = response.get_json()
+            print(f"Ažuriranje uživo: {body['live_update']}")
+            assert response.status_code == 200 and body['success']
+            live = body['live_update']
+            assert 0 < live['queued'] < live['total'] and live['error']
+            assert device_mirror.diff(port, []) is None  # Ogledalo više nije pouzdano
+
+            with db.get_connection() as conn:
+                mapped = conn.execute('SELECT COUNT(*) FROM button_mappings WHERE command_id = 1').fetchone()[0]
+            assert mapped == 6
+    finally:
+        link_supervisor.close(port)
+        serial_comm.WRITE_QUEUE_MAX_MESSAGES, mappings_routes.db_manager = original
+        simulator.stop()
+        device.close()
+        thread.join(2)
+
+if __name__ == "__main__":
+    test_burst_is_coalesced_into_one_write()
+    test_unkeyed_messages_keep_order()
+    test_full_queue_applies_backpressure()
+    test_growing_keyed_message_respects_byte_limit()
+    test_live_update_reports_partial_queue()
+    print("✅ Write queue testovi prošli")
@@ -0,0 +1,450 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pluggable transports for the device link: serial, PTY, TCP socket and in-memory loopback
+"""
+
+import os
+import select
+import socket
+import threading
+import time
+import logging
+
+import serial
+from urllib.parse import urlsplit, parse_qs
+
+from session_recorder import load_session, session_recording
+
+logger = logging.getLogger(__name__)
+
+class TransportError(serial.SerialException):
+    """Greška transporta (zatvorena veza, nepostojeći loopback, ...)."""
+
+class Transport:
+    """Osnovna klasa transporta sa interfejsom koji koristi ostatak backenda.
+
+    Interfejs je podskup `serial.Serial` (write/flush/readline/read,
+    in_waiting, timeout, baudrate), pa isti protokolski kod radi nad
+    pravim portom, PTY parom, TCP mostom ili loopback-om u memoriji.
+    Podklase implementiraju `_recv`, `_send` i `_close`.
+    """
+
+    def __init__(self, port, baudrate=115200, timeout=None, write_timeout=None):
+        self.port = port
+        self._baudrate = baudrate
+        self.timeout = timeout
+        self.write_timeout = write_timeout
+        self.is_open = True
+        self._buffer = bytearray()
+
+    @property
+    def baudrate(self):
+        return self._baudrate
+
+    @baudrate.setter
+    def baudrate(self, value):
+        # Transporti bez fizičke linije samo pamte brzinu
+        self._baudrate = value
+
+    @property
+    def in_waiting(self):
+        if not self._buffer:
+            self._buffer += self._recv(0)
+        return len(self._buffer)
+
+    def write(self, data):
+        if not self.is_open:
+            raise TransportError(f"Transport {self.port} je zatvoren")
+        self._send(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def readline(self):
+        """Čitaj do '\\n' ili do isteka timeout-a (vraća djelimičnu liniju kao pyserial)."""
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        while True:
+            index = self._buffer.find(b'\n')
+            if index >= 0:
+                line = bytes(self._buffer[:index + 1])
+                del self._buffer[:index + 1]
+                return line
+
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                line = bytes(self._buffer)
+                self._buffer.clear()
+                return line
+
+            self._buffer += self._recv(remaining)
+
+    def read(self, size=1):
+        """Čitaj tačno `size` bajtova ili manje ako istekne timeout."""
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        while len(self._buffer) < size:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                break
+            self._buffer += self._recv(remaining)
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+    def reset_input_buffer(self):
+        self._buffer.clear()
+        while self._recv(0):
+            pass
+
+    def reset_output_buffer(self):
+        pass
+
+    def close(self):
+        if self.is_open:
+            self.is_open = False
+            self._close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _recv(self, timeout):
+        """Vrati dostupne bajtove (b'' nakon isteka timeout-a)."""
+        raise NotImplementedError
+
+    def _send(self, data):
+        raise NotImplementedError
+
+    def _close(self):
+        pass
+
+class SerialTransport(Transport):
+    """Pravi serijski port (ili pyserial URL kao rfc2217://) preko pyserial-a."""
+
+    def __init__(self, port, baudrate=115200, timeout=None, write_timeout=None):
+        if '://' in port:
+            self.serial = serial.serial_for_url(port, baudrate=baudrate, timeout=timeout, write_timeout=write_timeout)
+        else:
+            self.serial = serial.Serial(port=port, baudrate=baudrate, timeout=timeout, write_timeout=write_timeout)
+        self.port = port
+
+    @property
+    def is_open(self):
+        return self.serial.is_open
+
+    @property
+    def baudrate(self):
+        return self.serial.baudrate
+
+    @baudrate.setter
+    def baudrate(self, value):
+        self.serial.baudrate = value
+
+    @property
+    def timeout(self):
+        return self.serial.timeout
+
+    @timeout.setter
+    def timeout(self, value):
+        self.serial.timeout = value
+
+    @property
+    def in_waiting(self):
+        return self.serial.in_waiting
+
+    def write(self, data):
+        return self.serial.write(data)
+
+    def flush(self):
+        self.serial.flush()
+
+    def readline(self):
+        return self.serial.readline()
+
+    def read(self, size=1):
+        return self.serial.read(size)
+
+    def reset_input_buffer(self):
+        self.serial.reset_input_buffer()
+
+    def reset_output_buffer(self):
+        self.serial.reset_output_buffer()
+
+    def close(self):
+        self.serial.close()
+
+class PtyTransport(Transport):
+    """Master strana Linux PTY para; druga strana (`peer_name`) se otvara kao običan serijski port."""
+
+    def __init__(self, port='pty://', baudrate=115200, timeout=None, write_timeout=None):
+        import tty
+        super().__init__(port, baudrate, timeout, write_timeout)
+        self.master_fd, self.slave_fd = os.openpty()
+        # Raw mod - bez eha i bez pretvaranja '\n' u '\r\n' na slave strani
+        tty.setraw(self.slave_fd)
+        self.peer_name = os.ttyname(self.slave_fd)
+        logger.info(f"Kreiran PTY par, druga strana: {self.peer_name}")
+
+    def fileno(self):
+        return self.master_fd
+
+    def _recv(self, timeout):
+        readable, _, _ = select.select([self.master_fd], [], [], timeout)
+        if not readable:
+            return b''
+        return os.read(self.master_fd, 4096)
+
+    def _send(self, data):
+        view = memoryview(data)
+        while view:
+            written = os.write(self.master_fd, view)
+            view = view[written:]
+
+    def _close(self):
+        for fd in (self.master_fd, self.slave_fd):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+class TcpTransport(Transport):
+    """TCP veza prema mrežnom serijskom mostu (npr. ser2net u raw modu)."""
+
+    def __init__(self, port, baudrate=115200, timeout=None, write_timeout=None):
+        super().__init__(port, baudrate, timeout, write_timeout)
+        address = port.split('://', 1)[1].split('/', 1)[0]
+        host, _, tcp_port = address.rpartition(':')
+        if not host or not tcp_port.isdigit():
+            raise TransportError(f"Neispravna TCP adresa: {port}")
+        try:
+            self.sock = socket.create_connection((host, int(tcp_port)), timeout=write_timeout or 5)
+        except OSError as e:
+            raise TransportError(f"Nije moguće povezati se sa {host}:{tcp_port}: {e}")
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sock.settimeout(write_timeout)
+
+    def fileno(self):
+        return self.sock.fileno()
+
+    def _recv(self, timeout):
+        readable, _, _ = select.select([self.sock], [], [], timeout)
+        if not readable:
+            return b''
+        data = self.sock.recv(4096)
+        if not data:
+            raise TransportError(f"TCP veza {self.port} je zatvorena")
+        return data
+
+    def _send(self, data):
+        self.sock.sendall(data)
+
+    def _close(self):
+        self.sock.close()
+
+class _ByteChannel:
+    """Jednosmjerni kanal bajtova između dvije niti."""
+
+    def __init__(self):
+        self.data = bytearray()
+        self.closed = False
+        self.sessions = 0  # Broj otvaranja sa strane hosta (kanal host->uređaj)
+        self.condition = threading.Condition()
+
+    def send(self, data):
+        with self.condition:
+            if self.closed:
+                raise TransportError("Loopback veza je zatvorena")
+            self.data += data
+            self.condition.notify_all()
+
+    def recv(self, timeout):
+        with self.condition:
+            if not self.data and not self.closed:
+                self.condition.wait(timeout)
+            if self.data:
+                chunk = bytes(self.data)
+                self.data.clear()
+                return chunk
+            if self.closed:
+                raise TransportError("Loopback veza je zatvorena")
+            return b''
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+class LoopbackTransport(Transport):
+    """Jedna strana loopback para u memoriji (bez hardvera i bez OS resursa)."""
+
+    def __init__(self, port, tx, rx, owner=False, baudrate=115200, timeout=None, write_timeout=None, line_rate=False):
+        super().__init__(port, baudrate, timeout, write_timeout)
+        self.tx = tx
+        self.rx = rx
+        self.owner = owner  # Strana uređaja - njeno zatvaranje "isključuje" uređaj
+        self.line_rate = line_rate  # Emuliraj trajanje prenosa na trenutnoj brzini (8N1)
+
+    def _recv(self, timeout):
+        return self.rx.recv(timeout)
+
+    def _send(self, data):
+        if self.line_rate:
+            time.sleep(len(data) * 10 / self.baudrate)
+        self.tx.send(data)
+
+    @property
+    def host_sessions(self):
+        """Koliko puta je host otvorio port (strana uređaja prepoznaje novu sesiju)."""
+        return self.rx.sessions
+
+    def _close(self):
+        if self.owner:
+            self.tx.close()
+            self.rx.close()
+            name = self.port.split('://', 1)[1]
+            with _loopback_lock:
+                if _loopbacks.get(name, ())[:2] == (self.rx, self.tx):
+                    del _loopbacks[name]
+
+class ReplayTransport(Transport):
+    """Reprodukuje snimljenu sesiju (`replay://<putanja>?speed=1.0`).
+
+    Odgovori uređaja (RX) puštaju se sa snimljenim kašnjenjem u odnosu na
+    poruku backenda (TX) koja im je prethodila, podijeljenim sa `speed`
+    (speed=0 - bez čekanja). Tako je reprodukcija deterministična i kada
+    je backend brži ili sporiji nego pri snimanju; poslani bajtovi koji se
+    razlikuju od snimljenih broje se u `mismatches`.
+    """
+
+    def __init__(self, port, baudrate=115200, timeout=None, write_timeout=None):
+        super().__init__(port, baudrate, timeout, write_timeout)
+        parts = urlsplit(port)
+        path = parts.netloc + parts.path
+        query = parse_qs(parts.query)
+        self.speed = float(query.get('speed', ['1'])[0])
+        self.header, records = load_session(path)
+
+        self.tx_records = []
+        self.rx_records = []  # (broj prethodnih TX, kašnjenje u s, bajtovi)
+        previous_tx_time = 0.0
+        for timestamp, direction, data in records:
+            if direction == 'TX':
+                self.tx_records.append(data)
+                previous_tx_time = timestamp
+            else:
+                self.rx_records.append((len(self.tx_records), timestamp - previous_tx_time, data))
+
+        self.tx_times = []
+        self.rx_cursor = 0
+        self.mismatches = 0
+        self.started = time.monotonic()
+        self.condition = threading.Condition()
+
+    def reset_input_buffer(self):
+        # Odbačeni bajtovi nisu ni snimljeni - ne preskači snimljene odgovore
+        self._buffer.clear()
+
+    def _send(self, data):
+        with self.condition:
+            index = len(self.tx_times)
+            if index >= len(self.tx_records) or self.tx_records[index] != data:
+                self.mismatches += 1
+            self.tx_times.append(time.monotonic())
+            self.condition.notify_all()
+
+    def _recv(self, timeout):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.condition:
+            while True:
+                if self.rx_cursor >= len(self.rx_records):
+                    # Kraj snimka - uređaj više ništa ne šalje
+                    self.condition.wait(timeout)
+                    return b''
+
+                after_tx, delay, data = self.rx_records[self.rx_cursor]
+                if len(self.tx_times) >= after_tx:
+                    anchor = self.tx_times[after_tx - 1] if after_tx else self.started
+                    due = anchor + (delay / self.speed if self.speed > 0 else 0)
+                    now = time.monotonic()
+                    if due <= now:
+                        self.rx_cursor += 1
+                        return data
+                    wait = due - now
+                else:
+                    wait = None  # Odgovor čeka poruku backenda
+
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return b''
+                    wait = remaining if wait is None else min(wait, remaining)
+                self.condition.wait(wait)
+
+# Registrovani loopback uređaji: naziv -> (kanal host->uređaj, kanal uređaj->host, emulacija brzine)
+_loopbacks = {}
+_loopback_lock = threading.Lock()
+
+def create_loopback(name, timeout=None, line_rate=False):
+    """Registruj loopback uređaj `loop://<name>` i vrati stranu uređaja.
+
+    Backend otvara `loop://<name>` kao bilo koji port; zatvaranje strane
+    uređaja simulira isključivanje kabla. Sa `line_rate=True` obje strane
+    troše onoliko vremena na slanje koliko bi trajalo na serijskoj liniji
+    trenutne brzine, pa su mjerenja propusnosti realna.
+    """
+    to_device = _ByteChannel()
+    to_host = _ByteChannel()
+    with _loopback_lock:
+        if name in _loopbacks:
+            raise TransportError(f"Loopback {name} već postoji")
+        _loopbacks[name] = (to_device, to_host, line_rate)
+    return LoopbackTransport(f'loop://{name}', to_host, to_device, owner=True, timeout=timeout, line_rate=line_rate)
+
+def open_transport(port, baudrate=115200, timeout=None, write_timeout=None):
+    """Otvori transport na osnovu naziva porta.
+
+    - `loop://<naziv>` - loopback u memoriji (uređaj registrovan sa create_loopback)
+    - `pty://` - novi PTY par (druga strana u `peer_name`)
+    - `socket://host:port` ili `tcp://host:port` - TCP serijski most
+    - `replay://<putanja>?speed=1.0` - reprodukcija snimljene sesije
+    - ostali URL-ovi (npr. `rfc2217://`) i putanje uređaja - pyserial
+
+    Kada je snimanje sesija uključeno, transport se omotava snimačem.
+    """
+    if port.startswith('replay://'):
+        return ReplayTransport(port, baudrate, timeout, write_timeout)
+
+    return session_recording.wrap(_open_transport(port, baudrate, timeout, write_timeout), port)
+
+def _open_transport(port, baudrate, timeout, write_timeout):
+    if port.startswith('loop://'):
+        name = port.split('://', 1)[1]
+        with _loopback_lock:
+            channels = _loopbacks.get(name)
+        if channels is None:
+            raise TransportError(f"Loopback uređaj {name} ne postoji")
+        to_device, to_host, line_rate = channels
+        to_device.sessions += 1  # Kao DTR impuls koji resetuje ESP32 pri otvaranju porta
+        return LoopbackTransport(port, to_device, to_host, baudrate=baudrate, timeout=timeout,
+                                 write_timeout=write_timeout, line_rate=line_rate)
+
+    if port.startswith('pty://'):
+        return PtyTransport(port, baudrate, timeout, write_timeout)
+
+    if port.startswith(('socket://', 'tcp://')):
+        return TcpTransport(port, baudrate, timeout, write_timeout)
+
+    return SerialTransport(port, baudrate, timeout, write_timeout)
+
+def port_available(port):
+    """Provjeri da li je port još prisutan (None ako se to ne može znati bez listanja portova)."""
+    if port.startswith('loop://'):
+        return port.split('://', 1)[1] in _loopbacks
+    if '://' in port:
+        return True
+    if port.startswith('/'):
+        return os.path.exists(port)
+    return None
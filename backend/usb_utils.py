@@ -11,6 +11,9 @@ import json
 import time
 import platform
 from datetime import datetime
+from config import SERIAL_BAUDRATE, EXTRA_SERIAL_PORTS_FILE
+from transports import open_transport
+from serial_comm import PING_REPLY_TYPES, forget_baudrate
 
 logger = logging.getLogger(__name__)
 
@@ -59,6 +62,25 @@ class USBPortDetector:
                     
                     ports.append(port_info)
             
+            # Virtuelni portovi (npr. farma simulatora) - list_ports ih ne vidi
+            for device in self._extra_ports():
+                if device in current_port_ids:
+                    continue
+                current_port_ids.add(device)
+                port_info = {
+                    'id': device,
+                    'name': f"{device} - Virtuelni port",
+                    'description': 'Virtuelni port',
+                    'manufacturer': '',
+                    'product': '',
+                    'hwid': 'virtual'
+                }
+                if self._needs_verification(device, current_time):
+                    port_info.update(self.verify_midi_device(device))
+                else:
+                    port_info.update(self.verified_ports[device]['result'])
+                ports.append(port_info)
+            
             # Ukloni iz cache portove koji više nisu dostupni
             self._cleanup_cache(current_port_ids)
             
@@ -88,7 +110,7 @@ class USBPortDetector:
         
         try:
             # Pokušaj konekciju sa portom
-            with serial.Serial(port, 115200, timeout=1) as ser:
+            with open_transport(port, SERIAL_BAUDRATE, timeout=1) as ser:
                 # Počisti buffer
                 ser.reset_input_buffer()
                 ser.reset_output_buffer()
@@ -115,13 +137,15 @@ class USBPortDetector:
                             if response_line:
                                 response_data = json.loads(response_line)
                                 
-                                if (response_data.get('type') == 'response'):
+                                # Firmware odgovara sa 'response', simulator sa 'pong'
+                                if response_data.get('type') in PING_REPLY_TYPES:
                                     response_time = time.time() - start_time
                                     result = {
                                         'is_midi_device': True,
                                         'is_verified': True,
                                         'status': 'midi_verified',
-                                        'response_time': round(response_time * 1000, 2)  # ms
+                                        'response_time': round(response_time * 1000, 2),  # ms
+                                        'device_id': response_data.get('device_id')
                                     }
                                     break
                                     
@@ -145,6 +169,16 @@ class USBPortDetector:
         
         return result
     
+    def _extra_ports(self):
+        """Portovi iz EXTRA_SERIAL_PORTS_FILE (po jedan u redu); datoteka se čita pri svakom skeniranju."""
+        if not EXTRA_SERIAL_PORTS_FILE:
+            return []
+        try:
+            with open(EXTRA_SERIAL_PORTS_FILE) as f:
+                return [line.strip() for line in f if line.strip()]
+        except OSError:
+            return []
+    
     def _needs_verification(self, port, current_time):
         """Provjeri da li port treba verifikaciju."""
         # Ako port nije u cache-u, treba verifikaciju
@@ -277,6 +311,7 @@ class USBPortDetector:
             for port in available_ports:
                 if self._has_connected_device(port):
                     current_ports.add(port.device)
+            current_ports.update(self._extra_ports())
             
             # Provjeri da li se skup portova promijenio
             if current_ports != self.known_ports:
@@ -288,6 +323,10 @@ class USBPortDetector:
                 if removed_ports:
                     logger.info(f"Portovi uklonjeni: {list(removed_ports)}")
                 
+                # Na promijenjenom portu može biti drugi uređaj - brzina se pregovara ispočetka
+                for port in new_ports | removed_ports:
+                    forget_baudrate(port)
+                
                 return True
             
             return False
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Wire tap - bounded in-memory record of serial TX/RX frames per port
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from config import WIRE_TAP_ENABLED, WIRE_TAP_CAPACITY, WIRE_TAP_MAX_FRAME
+
+logger = logging.getLogger(__name__)
+
+class WireTap:
+    """Prstenasti bafer poslanih (TX) i primljenih (RX) okvira po portu.
+
+    Bilježenje je jedan `deque.append` bez zaključavanja i bez I/O-a, pa se
+    može ostaviti uključeno i na putanji slanja. Najstariji okviri se
+    automatski odbacuju kada se bafer napuni.
+    """
+
+    def __init__(self, enabled=WIRE_TAP_ENABLED, capacity=WIRE_TAP_CAPACITY, max_frame=WIRE_TAP_MAX_FRAME):
+        self.enabled = enabled
+        self.capacity = capacity
+        self.max_frame = max_frame
+        self.buffers = {}
+        self.lock = threading.Lock()
+
+    def record(self, port, direction, data):
+        """Zabilježi okvir ('TX' ili 'RX') za port."""
+        if not self.enabled:
+            return
+
+        buffer = self.buffers.get(port)
+        if buffer is None:
+            with self.lock:
+                buffer = self.buffers.setdefault(port, deque(maxlen=self.capacity))
+
+        if len(data) > self.max_frame:
+            buffer.append((time.time(), direction, len(data), data[:self.max_frame]))
+        else:
+            buffer.append((time.time(), direction, len(data), data))
+
+    def set_enabled(self, enabled):
+        """Uključi ili isključi bilježenje u toku rada."""
+        self.enabled = bool(enabled)
+        logger.info(f"Wire tap {'uključen' if self.enabled else 'isključen'}")
+
+    def set_capacity(self, capacity):
+        """Promijeni kapacitet bafera po portu (zadržava najnovije okvire)."""
+        with self.lock:
+            self.capacity = capacity
+            for port, buffer in list(self.buffers.items()):
+                self.buffers[port] = deque(buffer, maxlen=capacity)
+
+    def clear(self, port=None):
+        """Obriši zabilježene okvire za port ili za sve portove."""
+        with self.lock:
+            if port is None:
+                self.buffers.clear()
+            else:
+                self.buffers.pop(port, None)
+
+    def ports(self):
+        """Vrati portove za koje postoje zabilježeni okviri."""
+        return list(self.buffers.keys())
+
+    def snapshot(self, port, limit=None):
+        """Vrati zabilježene okvire porta (najnoviji na kraju) u formatu za API."""
+        buffer = self.buffers.get(port)
+        if not buffer:
+            return []
+
+        frames = list(buffer)
+        if limit:
+            frames = frames[-limit:]
+
+        return [
+            {
+                'timestamp': datetime.fromtimestamp(timestamp).isoformat(),
+                'direction': direction,
+                'size': size,
+                'truncated': size > len(data),
+                'data': data.decode('utf-8', errors='replace').rstrip('\r\n')
+            }
+            for timestamp, direction, size, data in frames
+        ]
+
+    def status(self):
+        """Vrati stanje wire tap-a."""
+        return {
+            'enabled': self.enabled,
+            'capacity': self.capacity,
+            'max_frame': self.max_frame,
+            'ports': {port: len(buffer) for port, buffer in list(self.buffers.items())}
+        }
+
+# Globalna instanca wire tap-a
+wire_tap = WireTap()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Coalescing outbound write queue for serial device messages
+"""
+
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+class QueueFullError(Exception):
+    """Greška kada red ostane pun duže od dozvoljenog čekanja (backpressure)."""
+
+class CoalescingWriteQueue:
+    """Izlazni red koji nalete malih poruka spaja u jedan write().
+
+    Poruke sa istim ključem (npr. ažuriranje istog tastera) zamjenjuju
+    prethodnu poruku koja još nije poslana, pa se šalje samo najnovije
+    stanje. Red je ograničen brojem poruka i bajtova; kada je pun, `put`
+    čeka najviše `timeout` sekundi pa baca QueueFullError.
+    """
+
+    def __init__(self, write, window=0.01, max_messages=256, max_bytes=64 * 1024, on_error=None):
+        self.write = write
+        self.window = window
+        self.max_messages = max_messages
+        self.max_bytes = max_bytes
+        self.on_error = on_error
+        self.pending = OrderedDict()
+        self.pending_bytes = 0
+        self.batch_deadline = None
+        self.sequence = 0
+        self.in_flight = False
+        self.closed = False
+        self.condition = threading.Condition()
+        self.stats = {
+            'messages_queued': 0,
+            'messages_coalesced': 0,
+            'writes': 0,
+            'bytes_written': 0,
+            'write_errors': 0
+        }
+        self.thread = threading.Thread(target=self._run, name='write-queue', daemon=True)
+        self.thread.start()
+
+    def put(self, message, key=None, timeout=1.0):
+        """Dodaj poruku u red; poruka sa istim ključem zamjenjuje neposlanu prethodnicu."""
+        data = (json.dumps(message, ensure_ascii=False, separators=(',', ':')) + '\n').encode('utf-8')
+        if len(data) > self.max_bytes:
+            raise QueueFullError(f"Poruka ({len(data)} bytes) je veća od kapaciteta reda")
+
+        deadline = time.monotonic() + timeout
+        with self.condition:
+            if self.closed:
+                raise QueueFullError("Red je zatvoren")
+
+            while True:
+                replaced = self.pending.get(key) if key is not None else None
+                if replaced is not None:
+                    # Zamijeni zastarjelo ažuriranje na istom mjestu u redu (veća poruka mora stati u red)
+                    if self.pending_bytes + len(data) - len(replaced) <= self.max_bytes:
+                        self.pending_bytes += len(data) - len(replaced)
+                        self.pending[key] = data
+                        self.stats['messages_coalesced'] += 1
+                        return
+                elif (len(self.pending) < self.max_messages
+                      and self.pending_bytes + len(data) <= self.max_bytes):
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self.closed:
+                    raise QueueFullError("Izlazni red je pun")
+                self.condition.wait(remaining)
+
+            if key is None:
+                self.sequence += 1
+                key = ('_', self.sequence)
+            self.pending[key] = data
+            self.pending_bytes += len(data)
+            self.stats['messages_queued'] += 1
+
+            if self.batch_deadline is None:
+                self.batch_deadline = time.monotonic() + self.window
+                self.condition.notify_all()
+
+    def flush(self, timeout=1.0):
+        """Sačekaj da se red isprazni; vraća False ako istekne timeout."""
+        deadline = time.monotonic() + timeout
+        with self.condition:
+            self.batch_deadline = time.monotonic() if self.pending else None
+            self.condition.notify_all()
+            while self.pending or self.in_flight:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self.condition.wait(remaining)
+        return True
+
+    def close(self, timeout=1.0):
+        """Pošalji preostale poruke i zaustavi nit reda."""
+        self.flush(timeout)
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        self.thread.join(timeout)
+
+    def _run(self):
+        """Nit koja nakon prozora spajanja šalje sve poruke jednim write()."""
+        while True:
+            with self.condition:
+                while not self.closed and (self.batch_deadline is None
+                                           or time.monotonic() < self.batch_deadline):
+                    if self.batch_deadline is None:
+                        self.condition.wait()
+                    else:
+                        self.condition.wait(max(0.0, self.batch_deadline - time.monotonic()))
+                if self.closed and not self.pending:
+                    return
+
+                batch = b''.join(self.pending.values())
+                count = len(self.pending)
+                self.pending.clear()
+                self.pending_bytes = 0
+                self.batch_deadline = None
+                self.in_flight = True
+                # Oslobodi proizvođače koji čekaju na mjesto u redu
+                self.condition.notify_all()
+
+            try:
+                if batch:
+                    self.write(batch)
+                    self.stats['writes'] += 1
+                    self.stats['bytes_written'] += len(batch)
+                    logger.debug(f"Poslano {count} poruka u jednom write() ({len(batch)} bytes)")
+            except Exception as e:
+                self.stats['write_errors'] += 1
+                logger.warning(f"Greška pri slanju {count} poruka iz reda: {e}")
+                if self.on_error:
+                    self.on_error(e)
+            finally:
+                with self.condition:
+                    self.in_flight = False
+                    self.condition.notify_all()